@@ -4,45 +4,190 @@ Advanced Order Types
 - Trailing stops
 - Take-profit orders
 - OCO (One-Cancels-Other)
+
+Active orders live in a TriggerBook per (exchange, symbol), indexed by trigger
+price, so a price tick fires only the crossed orders (O(log n + k)) and each
+symbol is priced once per tick however many orders it has. Orders are
+persisted to the advanced_orders collection and reloaded on start().
+
+An order whose execution fails before its trade is recorded goes back into
+its book and fires again on a later tick; after MAX_EXECUTION_ATTEMPTS it is
+persisted as failed, so a restart does not re-trigger it.
 """
 
 import asyncio
+import uuid
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
 from logger_config import logger
 import database as db
 
+MAX_EXECUTION_ATTEMPTS = 3
 
-class AdvancedOrderManager:
+
+def _price(entry):
+    return entry[0]
+
+
+class TriggerBook:
+    """Active triggers for one (exchange, symbol)
+    
+    - stops: (stop_price, order_id) ascending; fire when price <= stop
+      (stop-losses and trailing stops)
+    - targets: (target_price, order_id) ascending; fire when price >= target
+    - trailing: (highest_price, order_id) ascending; a trailing stop is only
+      re-anchored when the price makes a new high above its highest_price
+    """
+    
     def __init__(self):
+        self.orders: Dict[str, dict] = {}
+        self.stops: List[Tuple[float, str]] = []
+        self.targets: List[Tuple[float, str]] = []
+        self.trailing: List[Tuple[float, str]] = []
+    
+    def __len__(self):
+        return len(self.orders)
+    
+    def add(self, order: dict):
+        order_id = order['id']
+        if order_id in self.orders:
+            self.remove(order_id)
+        self.orders[order_id] = order
+        
+        if order['type'] == 'stop_loss':
+            insort(self.stops, (order['stop_price'], order_id))
+        elif order['type'] == 'trailing_stop':
+            insort(self.stops, (order['current_stop'], order_id))
+            insort(self.trailing, (order['highest_price'], order_id))
+        elif order['type'] == 'take_profit':
+            insort(self.targets, (order['target_price'], order_id))
+    
+    def remove(self, order_id: str) -> Optional[dict]:
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        
+        if order['type'] == 'stop_loss':
+            self._discard(self.stops, (order['stop_price'], order_id))
+        elif order['type'] == 'trailing_stop':
+            self._discard(self.stops, (order['current_stop'], order_id))
+            self._discard(self.trailing, (order['highest_price'], order_id))
+        elif order['type'] == 'take_profit':
+            self._discard(self.targets, (order['target_price'], order_id))
+        return order
+    
+    @staticmethod
+    def _discard(entries: List[Tuple[float, str]], entry: Tuple[float, str]):
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+    
+    def on_price(self, price: float) -> Tuple[List[Tuple[dict, str]], List[dict]]:
+        """Apply one price tick
+        
+        Returns:
+            (fired, moved): fired is a list of (order, reason) removed from the
+            book; moved lists trailing stops whose stop was raised
+        """
+        moved = []
+        
+        # Re-anchor only the trailing stops this tick is a new high for
+        end = bisect_left(self.trailing, price, key=_price)
+        if end:
+            for _, order_id in self.trailing[:end]:
+                order = self.orders[order_id]
+                self._discard(self.stops, (order['current_stop'], order_id))
+                order['highest_price'] = price
+                order['current_stop'] = price * (1 - order['trail_percent'] / 100)
+                insort(self.stops, (order['current_stop'], order_id))
+                moved.append(order)
+            del self.trailing[:end]
+            for order in moved:
+                insort(self.trailing, (price, order['id']))
+        
+        fired = []
+        
+        start = bisect_left(self.stops, price, key=_price)
+        for _, order_id in self.stops[start:]:
+            order = self.orders[order_id]
+            reason = 'Trailing stop triggered' if order['type'] == 'trailing_stop' else 'Stop-loss triggered'
+            fired.append((order, reason))
+        del self.stops[start:]
+        
+        end = bisect_right(self.targets, price, key=_price)
+        for _, order_id in self.targets[:end]:
+            fired.append((self.orders[order_id], 'Take-profit triggered'))
+        del self.targets[:end]
+        
+        for order, _ in fired:
+            self.orders.pop(order['id'], None)
+            if order['type'] == 'trailing_stop':
+                self._discard(self.trailing, (order['highest_price'], order['id']))
+        
+        return fired, moved
+
+
+class AdvancedOrderManager:
+    def __init__(self, tick_interval: float = 5):
         self.active_orders = {}
+        self.books: Dict[Tuple[str, str], TriggerBook] = {}
+        self.tick_interval = tick_interval
         self.order_monitor_task = None
     
-    async def create_stop_loss(self, bot_id: str, pair: str, stop_price: float, current_price: float):
+    async def _resolve_exchange(self, bot_id: str, exchange: Optional[str]) -> str:
+        if exchange:
+            return exchange
+        try:
+            bot = await db.bots_collection.find_one({"id": bot_id}, {"_id": 0, "exchange": 1})
+            if bot and bot.get('exchange'):
+                return bot['exchange']
+        except Exception as e:
+            logger.debug(f"Exchange lookup for {bot_id} failed: {e}")
+        return 'luno'
+    
+    async def _add_order(self, order: dict, persist: bool = True):
+        key = (order['exchange'], order['pair'])
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = TriggerBook()
+        book.add(order)
+        self.active_orders[order['id']] = order
+        
+        if persist and db.advanced_orders_collection is not None:
+            await db.advanced_orders_collection.replace_one({"id": order['id']}, dict(order), upsert=True)
+    
+    async def create_stop_loss(self, bot_id: str, pair: str, stop_price: float, current_price: float,
+                               exchange: Optional[str] = None):
         """Create stop-loss order"""
-        order_id = f"sl_{bot_id}_{int(datetime.now(timezone.utc).timestamp())}"
+        order_id = f"sl_{bot_id}_{int(datetime.now(timezone.utc).timestamp())}_{uuid.uuid4().hex[:6]}"
         
         order = {
             "id": order_id,
             "bot_id": bot_id,
             "type": "stop_loss",
+            "exchange": await self._resolve_exchange(bot_id, exchange),
             "pair": pair,
             "stop_price": stop_price,
             "status": "active",
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
-        self.active_orders[order_id] = order
+        await self._add_order(order)
         logger.info(f"Stop-loss created: {pair} at R{stop_price:.2f}")
         return order
     
-    async def create_trailing_stop(self, bot_id: str, pair: str, trail_percent: float, current_price: float):
+    async def create_trailing_stop(self, bot_id: str, pair: str, trail_percent: float, current_price: float,
+                                   exchange: Optional[str] = None):
         """Create trailing stop order"""
-        order_id = f"ts_{bot_id}_{int(datetime.now(timezone.utc).timestamp())}"
+        order_id = f"ts_{bot_id}_{int(datetime.now(timezone.utc).timestamp())}_{uuid.uuid4().hex[:6]}"
         
         order = {
             "id": order_id,
             "bot_id": bot_id,
             "type": "trailing_stop",
+            "exchange": await self._resolve_exchange(bot_id, exchange),
             "pair": pair,
             "trail_percent": trail_percent,
             "highest_price": current_price,
@@ -51,77 +196,126 @@ class AdvancedOrderManager:
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
-        self.active_orders[order_id] = order
+        await self._add_order(order)
         logger.info(f"Trailing stop created: {pair} trail {trail_percent}%")
         return order
     
-    async def create_take_profit(self, bot_id: str, pair: str, target_price: float):
+    async def create_take_profit(self, bot_id: str, pair: str, target_price: float,
+                                 exchange: Optional[str] = None):
         """Create take-profit order"""
-        order_id = f"tp_{bot_id}_{int(datetime.now(timezone.utc).timestamp())}"
+        order_id = f"tp_{bot_id}_{int(datetime.now(timezone.utc).timestamp())}_{uuid.uuid4().hex[:6]}"
         
         order = {
             "id": order_id,
             "bot_id": bot_id,
             "type": "take_profit",
+            "exchange": await self._resolve_exchange(bot_id, exchange),
             "pair": pair,
             "target_price": target_price,
             "status": "active",
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
-        self.active_orders[order_id] = order
+        await self._add_order(order)
         logger.info(f"Take-profit created: {pair} at R{target_price:.2f}")
         return order
     
+    async def cancel_order(self, order_id: str) -> bool:
+        """Cancel an active order"""
+        order = self.active_orders.pop(order_id, None)
+        if order is None:
+            return False
+        
+        key = (order['exchange'], order['pair'])
+        book = self.books.get(key)
+        if book is not None:
+            book.remove(order_id)
+            if not book:
+                del self.books[key]
+        
+        order['status'] = 'cancelled'
+        if db.advanced_orders_collection is not None:
+            await db.advanced_orders_collection.update_one({"id": order_id}, {"$set": {"status": "cancelled"}})
+        return True
+    
+    async def load_active_orders(self) -> int:
+        """Reload persisted active orders into the trigger books"""
+        if db.advanced_orders_collection is None:
+            return 0
+        
+        loaded = 0
+        async for order in db.advanced_orders_collection.find({"status": "active"}, {"_id": 0}):
+            order.setdefault('exchange', 'luno')
+            await self._add_order(order, persist=False)
+            loaded += 1
+        
+        if loaded:
+            logger.info(f"📈 Reloaded {loaded} advanced orders across {len(self.books)} symbols")
+        return loaded
+    
+    async def on_price(self, exchange: str, pair: str, price: float) -> int:
+        """Apply one price tick to the (exchange, pair) book and execute crossed orders"""
+        book = self.books.get((exchange, pair))
+        if book is None:
+            return 0
+        
+        fired, moved = book.on_price(price)
+        
+        executed = 0
+        for order, reason in fired:
+            self.active_orders.pop(order['id'], None)
+            executed += await self._execute_order(order, price, reason)
+        
+        if not book:
+            del self.books[(exchange, pair)]
+        
+        # Raised trailing stops are written once per tick, in one batch
+        moved = [order for order in moved if order['status'] == 'active']
+        if moved and db.advanced_orders_collection is not None:
+            await db.advanced_orders_collection.bulk_write([
+                UpdateOne(
+                    {"id": order['id']},
+                    {"$set": {"highest_price": order['highest_price'], "current_stop": order['current_stop']}}
+                )
+                for order in moved
+            ], ordered=False)
+        
+        return executed
+    
+    async def process_tick(self) -> int:
+        """Price every symbol with active orders once and evaluate its book"""
+        from paper_trading_engine import paper_engine
+        
+        keys = list(self.books.keys())
+        if not keys:
+            return 0
+        
+        prices = await asyncio.gather(
+            *(paper_engine.get_real_price(pair, exchange) for exchange, pair in keys),
+            return_exceptions=True
+        )
+        
+        executed = 0
+        for (exchange, pair), price in zip(keys, prices):
+            if isinstance(price, Exception) or not price:
+                logger.debug(f"No price for {exchange} {pair}: {price}")
+                continue
+            executed += await self.on_price(exchange, pair, price)
+        return executed
+    
     async def monitor_orders(self):
         """Monitor and execute advanced orders"""
         while True:
             try:
-                for order_id, order in list(self.active_orders.items()):
-                    if order['status'] != 'active':
-                        continue
-                    
-                    # Get current price
-                    from paper_trading_engine import paper_engine
-                    current_price = await paper_engine.get_real_price(
-                        order['pair'], 'luno'
-                    )
-                    
-                    executed = False
-                    
-                    if order['type'] == 'stop_loss':
-                        if current_price <= order['stop_price']:
-                            await self._execute_order(order, current_price, 'Stop-loss triggered')
-                            executed = True
-                    
-                    elif order['type'] == 'trailing_stop':
-                        # Update highest price
-                        if current_price > order['highest_price']:
-                            order['highest_price'] = current_price
-                            order['current_stop'] = current_price * (
-                                1 - order['trail_percent'] / 100
-                            )
-                        
-                        # Check if stop hit
-                        if current_price <= order['current_stop']:
-                            await self._execute_order(order, current_price, 'Trailing stop triggered')
-                            executed = True
-                    
-                    elif order['type'] == 'take_profit':
-                        if current_price >= order['target_price']:
-                            await self._execute_order(order, current_price, 'Take-profit triggered')
-                            executed = True
-                    
-                    if executed:
-                        del self.active_orders[order_id]
-                
+                await self.process_tick()
             except Exception as e:
                 logger.error(f"Order monitoring error: {e}")
             
-            await asyncio.sleep(5)  # Check every 5 seconds
+            await asyncio.sleep(self.tick_interval)  # Check every 5 seconds
     
-    async def _execute_order(self, order: dict, price: float, reason: str):
-        """Execute advanced order"""
+    async def _execute_order(self, order: dict, price: float, reason: str) -> bool:
+        """Execute advanced order, returns True once its trade is recorded"""
+        recorded = False
         try:
             # Get bot
             bot = await db.bots_collection.find_one(
@@ -130,7 +324,13 @@ class AdvancedOrderManager:
             )
             
             if not bot:
-                return
+                # Bot is gone: drop the trigger rather than reload it on restart
+                order['status'] = 'cancelled'
+                if db.advanced_orders_collection is not None:
+                    await db.advanced_orders_collection.update_one(
+                        {"id": order['id']}, {"$set": {"status": "cancelled"}}
+                    )
+                return False
             
             # Create trade record
             trade = {
@@ -145,17 +345,61 @@ class AdvancedOrderManager:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
             
+            trade["ts"] = db.trade_ts(trade["timestamp"])
             await db.trades_collection.insert_one(trade)
+            recorded = True
             order['status'] = 'executed'
             
-            logger.info(f"Order executed: {order['type']} for {order['pair']} at R{price:.2f}")
+            if db.advanced_orders_collection is not None:
+                await db.advanced_orders_collection.update_one(
+                    {"id": order['id']},
+                    {"$set": {
+                        "status": "executed",
+                        "executed_price": price,
+                        "executed_at": trade["timestamp"],
+                        "reason": reason
+                    }}
+                )
             
+            logger.info(f"Order executed: {order['type']} for {order['pair']} at R{price:.2f}")
+            return True
+        
         except Exception as e:
             logger.error(f"Order execution failed: {e}")
+            await self._execution_failed(order, price, str(e), recorded)
+            return recorded
+    
+    async def _execution_failed(self, order: dict, price: float, error: str, recorded: bool):
+        """Retry an order that left its book without a trade, or persist where it ended
+        
+        The persisted record must not stay 'active' once the order is out of the
+        book, or load_active_orders() would trigger it again after a restart.
+        """
+        if not recorded:
+            order['execution_attempts'] = order.get('execution_attempts', 0) + 1
+            if order['execution_attempts'] < MAX_EXECUTION_ATTEMPTS:
+                await self._add_order(order, persist=False)
+                logger.warning(f"Order {order['id']} back in its book (attempt {order['execution_attempts']})")
+                return
+        
+        # The trade exists (only the status write failed), or retries are used up
+        order['status'] = 'executed' if recorded else 'failed'
+        update = {"status": order['status'], "error": error}
+        if recorded:
+            update["executed_price"] = price
+        try:
+            if db.advanced_orders_collection is not None:
+                await db.advanced_orders_collection.update_one({"id": order['id']}, {"$set": update})
+        except Exception as e:
+            logger.critical(f"Order {order['id']} is {order['status']} but still active in the database: {e}")
     
     async def start(self):
         """Start order monitoring"""
         if self.order_monitor_task is None:
+            try:
+                await self.load_active_orders()
+            except Exception as e:
+                logger.error(f"Failed to reload advanced orders: {e}")
             self.order_monitor_task = asyncio.create_task(self.monitor_orders())
             logger.info("📈 Advanced orders monitoring started")
     
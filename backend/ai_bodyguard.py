@@ -13,6 +13,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 
+from database import trades_since, trade_time_field
+
 logger = logging.getLogger(__name__)
 
 class AIBodyguard:
@@ -86,11 +88,11 @@ class AIBodyguard:
         """Detect extreme drawdowns (>15% in 1 hour)"""
         try:
             # Get trades from last hour
-            one_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+            one_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
             
             recent_trades = await self.db.trades.find({
                 'bot_id': bot_id,
-                'timestamp': {'$gte': one_hour_ago}
+                **trades_since(one_hour_ago)
             }).to_list(1000)
             
             if not recent_trades:
@@ -139,7 +141,7 @@ class AIBodyguard:
             # Get recent trades
             recent_trades = await self.db.trades.find({
                 'bot_id': bot_id
-            }).sort('timestamp', -1).limit(20).to_list(20)
+            }).sort(trade_time_field(), -1).limit(20).to_list(20)
             
             if len(recent_trades) < 10:
                 return
@@ -157,10 +159,10 @@ class AIBodyguard:
                 logger.warning(f"Bot {bot_id}: Suspicious pattern - consecutive losses")
                 
             # Pattern 2: Extremely high trade frequency (> 100 trades/hour)
-            one_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+            one_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
             hourly_trades = await self.db.trades.count_documents({
                 'bot_id': bot_id,
-                'timestamp': {'$gte': one_hour_ago}
+                **trades_since(one_hour_ago)
             })
             
             if hourly_trades > 100:
@@ -204,11 +206,11 @@ class AIBodyguard:
             # Check daily loss limit
             max_daily_loss = float(os.getenv('MAX_DAILY_LOSS_PERCENT', 5))
             
-            today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0).isoformat()
+            today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0)
             
             today_trades = await self.db.trades.find({
                 'user_id': user_id,
-                'timestamp': {'$gte': today_start}
+                **trades_since(today_start)
             }).to_list(10000)
             
             if today_trades:
@@ -1,100 +1,184 @@
 """
 AI Memory Management System
-- Short-term: Last 30 days in MongoDB
-- Archive: Zip conversations older than 30 days
+- Short-term: Last 30 days in MongoDB, read a page at a time
+- Archive: Conversations older than 30 days streamed into per-user, per-month
+  gzip NDJSON files (chat_<user>_<YYYY-MM>.ndjson.gz), rotated at
+  CHAT_ARCHIVE_MAX_BYTES
 - Cleanup: Delete archives older than 6 months
+
+Archival never holds more than one batch of messages: each batch is appended
+as its own gzip member, fsynced, and only then deleted from MongoDB. A crash
+between the fsync and the delete re-archives that batch on the next run
+(at-least-once), it never loses messages.
 """
 
 import asyncio
+import base64
+import gzip
+import re
 from datetime import datetime, timezone, timedelta
+from bson import json_util
 import database as db
 from logger_config import logger
-import zipfile
-import json
 import os
 from pathlib import Path
+from typing import Dict, List, Optional
+
+ARCHIVE_PATH = os.getenv('CHAT_ARCHIVE_PATH', '/app/data/chat_archives')
+ARCHIVE_MAX_BYTES = int(os.getenv('CHAT_ARCHIVE_MAX_BYTES', str(64 * 1024 * 1024)))
+ARCHIVE_BATCH_SIZE = int(os.getenv('CHAT_ARCHIVE_BATCH_SIZE', '1000'))
+HISTORY_PAGE_SIZE = 100
+
+
+def encode_cursor(message: Dict) -> str:
+    """Opaque history cursor: the (timestamp, _id) of the last message on a page"""
+    raw = json_util.dumps({"timestamp": message.get('timestamp'), "_id": message['_id']})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict:
+    return json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+
+def _archive_month(timestamp) -> str:
+    return db.trade_ts(timestamp).strftime("%Y-%m")
 
 
 class AIMemoryManager:
-    def __init__(self):
-        self.archive_path = Path("/app/data/chat_archives")
+    def __init__(self, archive_path=None, batch_size: int = ARCHIVE_BATCH_SIZE,
+                 max_archive_bytes: int = ARCHIVE_MAX_BYTES):
+        self.archive_path = Path(archive_path or ARCHIVE_PATH)
         self.archive_path.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.max_archive_bytes = max_archive_bytes
+    
+    async def get_conversation_history(self, user_id: str, days: int = 30,
+                                       limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+        """
+        One page of conversation history for the last N days, oldest first
         
-    async def get_conversation_history(self, user_id: str, days: int = 30) -> list:
-        """Get conversation history for the last N days"""
+        Pass the returned next_cursor back to read the following page;
+        it is None on the last page.
+        """
         try:
             cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
             
-            messages = await db.chat_messages_collection.find(
-                {
-                    "user_id": user_id,
-                    "timestamp": {"$gte": cutoff_date}
-                },
-                {"_id": 0}
-            ).sort("timestamp", 1).to_list(None)
+            query = {"user_id": user_id, "timestamp": {"$gte": cutoff_date}}
+            if cursor:
+                last = decode_cursor(cursor)
+                query["$or"] = [
+                    {"timestamp": {"$gt": last['timestamp']}},
+                    {"timestamp": last['timestamp'], "_id": {"$gt": last['_id']}}
+                ]
+            
+            messages = await db.chat_messages_collection.find(query).sort(
+                [("timestamp", 1), ("_id", 1)]
+            ).limit(limit + 1).to_list(limit + 1)
             
-            return messages
+            next_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+            messages = messages[:limit]
+            for message in messages:
+                message.pop('_id', None)
+            
+            return {"messages": messages, "next_cursor": next_cursor}
             
         except Exception as e:
             logger.error(f"Error fetching conversation history: {e}")
-            return []
+            return {"messages": [], "next_cursor": None}
+    
+    def _archive_file(self, user_id: str, month: str) -> Path:
+        """Current archive file for a user and month, rotating once it reaches max_archive_bytes"""
+        safe_user = re.sub(r'[^A-Za-z0-9_.-]', '_', str(user_id))
+        base = f"chat_{safe_user}_{month}"
+        archive_file = self.archive_path / f"{base}.ndjson.gz"
+        part = 0
+        while archive_file.exists() and archive_file.stat().st_size >= self.max_archive_bytes:
+            part += 1
+            archive_file = self.archive_path / f"{base}.{part}.ndjson.gz"
+        return archive_file
+    
+    def _append_batch(self, user_id: str, month: str, messages: List[Dict]) -> Path:
+        """Append messages as one gzip member and fsync it (blocking; run in a thread)"""
+        archive_file = self._archive_file(user_id, month)
+        with open(archive_file, 'ab') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                for message in messages:
+                    gz.write(json_util.dumps(message).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return archive_file
     
-    async def archive_old_conversations(self):
-        """Archive conversations older than 30 days for all users"""
+    async def _archive_batch(self, user_id: str, month: str, messages: List[Dict], stats: Dict):
+        archive_file = await asyncio.to_thread(self._append_batch, user_id, month, messages)
+        
+        # Only delete what is safely on disk
+        delete_result = await db.chat_messages_collection.delete_many(
+            {"_id": {"$in": [m['_id'] for m in messages]}}
+        )
+        
+        stats['archived'] += len(messages)
+        stats['deleted'] += delete_result.deleted_count
+        stats['batches'] += 1
+        stats['files'].add(archive_file.name)
+    
+    async def archive_old_conversations(self, days: int = 30) -> Dict:
+        """Archive conversations older than `days` for all users, one batch at a time"""
+        stats = {"archived": 0, "deleted": 0, "batches": 0, "files": set()}
         try:
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
             cutoff_iso = cutoff_date.isoformat()
             
-            # Find all messages older than 30 days
-            old_messages = await db.chat_messages_collection.find(
-                {"timestamp": {"$lt": cutoff_iso}},
-                {"_id": 0}
-            ).to_list(None)
-            
-            if not old_messages:
-                logger.info("No messages to archive")
-                return
-            
-            # Group by user
-            by_user = {}
-            for msg in old_messages:
-                user_id = msg.get('user_id')
-                if user_id not in by_user:
-                    by_user[user_id] = []
-                by_user[user_id].append(msg)
-            
-            # Create archive for each user
-            archive_date = cutoff_date.strftime("%Y%m%d")
+            # Grouped by user and in time order, so a batch only ever spans one user-month
+            cursor = db.chat_messages_collection.find(
+                {"timestamp": {"$lt": cutoff_iso}}
+            ).sort([("user_id", 1), ("timestamp", 1), ("_id", 1)]).batch_size(self.batch_size)
             
-            for user_id, messages in by_user.items():
-                archive_file = self.archive_path / f"chat_{user_id}_{archive_date}.zip"
-                
-                with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    json_content = json.dumps(messages, indent=2, default=str)
-                    zipf.writestr(f"conversations_{archive_date}.json", json_content)
-                
-                logger.info(f"Archived {len(messages)} messages for user {user_id} to {archive_file}")
+            batch: List[Dict] = []
+            batch_key = None
+            async for message in cursor:
+                key = (message.get('user_id'), _archive_month(message.get('timestamp')))
+                if batch and (key != batch_key or len(batch) >= self.batch_size):
+                    await self._archive_batch(*batch_key, batch, stats)
+                    batch = []
+                batch_key = key
+                batch.append(message)
             
-            # Delete archived messages from database
-            delete_result = await db.chat_messages_collection.delete_many(
-                {"timestamp": {"$lt": cutoff_iso}}
-            )
+            if batch:
+                await self._archive_batch(*batch_key, batch, stats)
             
-            logger.info(f"Deleted {delete_result.deleted_count} archived messages from database")
+            if stats['archived']:
+                logger.info(
+                    f"Archived {stats['archived']} messages into {len(stats['files'])} files "
+                    f"({stats['batches']} batches), deleted {stats['deleted']} from database"
+                )
+            else:
+                logger.info("No messages to archive")
             
         except Exception as e:
             logger.error(f"Archive error: {e}")
+        
+        stats['files'] = sorted(stats['files'])
+        return stats
     
     async def cleanup_old_archives(self):
         """Delete archive files older than 6 months"""
         try:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=180)  # 6 months
+            cutoff_month = cutoff_date.strftime("%Y-%m")
             
             deleted_count = 0
-            for archive_file in self.archive_path.glob("chat_*.zip"):
-                file_mtime = datetime.fromtimestamp(archive_file.stat().st_mtime, tz=timezone.utc)
+            for archive_file in self.archive_path.glob("chat_*"):
+                # Monthly archives by the month they hold, legacy zips by mtime
+                month = re.search(r'_(\d{4}-\d{2})(\.\d+)?\.ndjson\.gz$', archive_file.name)
+                if month:
+                    expired = month.group(1) < cutoff_month
+                elif archive_file.suffix == '.zip':
+                    file_mtime = datetime.fromtimestamp(archive_file.stat().st_mtime, tz=timezone.utc)
+                    expired = file_mtime < cutoff_date
+                else:
+                    continue
                 
-                if file_mtime < cutoff_date:
+                if expired:
                     archive_file.unlink()
                     deleted_count += 1
                     logger.info(f"Deleted old archive: {archive_file}")
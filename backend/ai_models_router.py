@@ -117,16 +117,9 @@ Focus on: Key metrics, insights, actionable recommendations."""
             logger.error(f"Report generation error: {e}")
             return f"Report generation unavailable: {str(e)}"
     
-    async def chatops_response(self, prompt: str, context: dict, user_id: str) -> str:
-        """
-        GPT-4o - ChatOps Brain
-        For: Dashboard chat, real-time commands, user interaction
-        """
-        try:
-            if not self.client:
-                return "OpenAI API key not configured"
-                
-            system_message = f"""You are the Amarktai ChatOps Brain - real-time assistant.
+    def chatops_messages(self, prompt: str, context) -> list:
+        """ChatOps system + user messages (shared by chatops_response and streamed chat)"""
+        system_message = f"""You are the Amarktai ChatOps Brain - real-time assistant.
 
 Your role: Respond quickly to user queries and execute commands.
 
@@ -135,12 +128,23 @@ System context:
 
 Be: Fast, accurate, helpful. Execute commands when requested."""
 
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def chatops_response(self, prompt: str, context: dict, user_id: str) -> str:
+        """
+        GPT-4o - ChatOps Brain
+        For: Dashboard chat, real-time commands, user interaction
+        """
+        try:
+            if not self.client:
+                return "OpenAI API key not configured"
+            
             response = await self.client.chat.completions.create(
                 model=self.models['chatops'],
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self.chatops_messages(prompt, context),
                 temperature=0.7,
                 max_tokens=500
             )
@@ -22,33 +22,31 @@ class AIProductionHandler:
     async def get_system_context(self, user_id: str) -> dict:
         """Get complete system state"""
         try:
-            # Get user
-            user = await db.users_collection.find_one({"id": user_id}, {"_id": 0})
+            from services.portfolio_state import portfolio_state
             
-            # Get all bots
-            bots = await db.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+            # Bots and capital from the portfolio read model, the rest fetched alongside
+            portfolio, bots, user, modes, trades, api_keys = await asyncio.gather(
+                portfolio_state.get(user_id),
+                portfolio_state.bots(user_id),
+                db.users_collection.find_one({"id": user_id}, {"_id": 0}),
+                db.system_modes_collection.find_one({"user_id": user_id}, {"_id": 0}),
+                db.trades_collection.find(
+                    {"user_id": user_id},
+                    {"_id": 0}
+                ).sort("timestamp", -1).limit(10).to_list(10),
+                db.api_keys_collection.find(
+                    {"user_id": user_id},
+                    {"_id": 0, "provider": 1, "connected": 1}
+                ).to_list(10)
+            )
+            modes = modes or {}
             active_bots = [b for b in bots if b.get('status') == 'active']
             
             # Calculate metrics
-            total_capital = sum(b.get('current_capital', 0) for b in active_bots)
-            total_initial = sum(b.get('initial_capital', 0) for b in active_bots)
+            total_capital = portfolio['capital']['active']
+            total_initial = portfolio['capital']['active_initial']
             total_profit = total_capital - total_initial
             
-            # Get modes
-            modes = await db.system_modes_collection.find_one({"user_id": user_id}, {"_id": 0}) or {}
-            
-            # Get recent trades
-            trades = await db.trades_collection.find(
-                {"user_id": user_id},
-                {"_id": 0}
-            ).sort("timestamp", -1).limit(10).to_list(10)
-            
-            # Get API keys
-            api_keys = await db.api_keys_collection.find(
-                {"user_id": user_id},
-                {"_id": 0, "provider": 1, "connected": 1}
-            ).to_list(10)
-            
             return {
                 "user": user,
                 "bots": {
@@ -353,22 +351,21 @@ class AIProductionHandler:
             logger.error(f"Execute command error: {e}")
             return {"success": False, "message": f"❌ Error: {str(e)}"}
     
-    async def get_ai_response(self, user_id: str, message: str) -> str:
-        """Get AI response with command execution"""
-        try:
-            # Get system context
-            context = await self.get_system_context(user_id)
-            
-            # Current time
-            now = datetime.now(timezone.utc)
-            current_time = now.strftime("%A, %B %d, %Y at %I:%M:%S %p UTC")
-            
-            # Build system prompt
-            bots_summary = f"{context['bots']['active_count']} active out of {context['bots']['total_count']} total"
-            modes = context['modes']
-            financials = context['financials']
-            
-            system_prompt = f"""You are Amarktai AI - 150% Full Dashboard Controller.
+    async def build_system_prompt(self, user_id: str) -> str:
+        """ChatOps system prompt with the user's current system state"""
+        # Get system context
+        context = await self.get_system_context(user_id)
+        
+        # Current time
+        now = datetime.now(timezone.utc)
+        current_time = now.strftime("%A, %B %d, %Y at %I:%M:%S %p UTC")
+        
+        # Build system prompt
+        bots_summary = f"{context['bots']['active_count']} active out of {context['bots']['total_count']} total"
+        modes = context['modes']
+        financials = context['financials']
+        
+        system_prompt = f"""You are Amarktai AI - 150% Full Dashboard Controller.
 
 TIME: {current_time}
 
@@ -414,44 +411,54 @@ EXAMPLES:
 "delete everything" → ACTION:delete_all_bots|MESSAGE:Deleting all bots
 "wipe the system" → ACTION:reset_system|confirm:yes|MESSAGE:Complete system reset
 "make a Zeus bot" → ACTION:create_bot|name:Zeus|MESSAGE:Creating Zeus"""
-
+        
+        return system_prompt
+    
+    async def handle_reply(self, user_id: str, response_text: str) -> str:
+        """Execute an ACTION:command|params|MESSAGE:text reply; other replies pass through"""
+        if not response_text.strip().startswith('ACTION:'):
+            return response_text
+        
+        parts = response_text.strip().split('|')
+        command = parts[0].replace('ACTION:', '').strip()
+        
+        params = {}
+        ai_message = ""
+        
+        for part in parts[1:]:
+            if ':' in part:
+                key, val = part.split(':', 1)
+                key = key.strip()
+                val = val.strip()
+                
+                if key == 'MESSAGE':
+                    ai_message = val
+                elif key == 'enabled':
+                    params[key] = val.lower() == 'true'
+                elif key in ['capital']:
+                    params[key] = float(val)
+                else:
+                    params[key] = val
+        
+        # Execute command
+        result = await self.execute_command(user_id, command, params)
+        
+        if result['success']:
+            return f"{ai_message}\n\n{result['message']}" if ai_message else result['message']
+        return result['message']
+    
+    async def get_ai_response(self, user_id: str, message: str) -> str:
+        """Get AI response with command execution"""
+        try:
+            system_prompt = await self.build_system_prompt(user_id)
+            
             # Call AI with multi-model routing
             from ai_models_router import ai_models_router
             
             # Use ChatOps brain for dashboard commands
             response_text = await ai_models_router.chatops_response(message, system_prompt, user_id)
             
-            # Check for ACTION
-            if response_text.strip().startswith('ACTION:'):
-                parts = response_text.strip().split('|')
-                command = parts[0].replace('ACTION:', '').strip()
-                
-                params = {}
-                ai_message = ""
-                
-                for part in parts[1:]:
-                    if ':' in part:
-                        key, val = part.split(':', 1)
-                        key = key.strip()
-                        val = val.strip()
-                        
-                        if key == 'MESSAGE':
-                            ai_message = val
-                        elif key == 'enabled':
-                            params[key] = val.lower() == 'true'
-                        elif key in ['capital']:
-                            params[key] = float(val)
-                        else:
-                            params[key] = val
-                
-                # Execute command
-                result = await self.execute_command(user_id, command, params)
-                
-                if result['success']:
-                    return f"{ai_message}\n\n{result['message']}" if ai_message else result['message']
-                return result['message']
-            
-            return response_text
+            return await self.handle_reply(user_id, response_text)
         
         except Exception as e:
             logger.error(f"AI response error: {e}")
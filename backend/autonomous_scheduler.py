@@ -17,6 +17,7 @@ from engines.self_healing import self_healing
 from engines.auto_promotion_manager import auto_promotion_manager
 from engines.bot_spawner import bot_spawner
 from engines.wallet_manager import wallet_manager
+from engines.instrumentation import StageLaps
 
 
 class AutonomousScheduler:
@@ -54,6 +55,7 @@ class AutonomousScheduler:
         while self.is_running:
             try:
                 logger.info("⏰ Running hourly autonomous tasks...")
+                tick = StageLaps("scheduler")
                 
                 # Get all users
                 users = await db.users_collection.find({}, {"_id": 0}).to_list(1000)
@@ -69,6 +71,7 @@ class AutonomousScheduler:
                     # 2. Rank bot performance
                     await performance_ranker.rank_bots(user_id)
                 
+                tick.total("hourly_tick")
                 logger.info("✅ Hourly tasks completed")
                 
             except Exception as e:
@@ -82,6 +85,7 @@ class AutonomousScheduler:
         while self.is_running:
             try:
                 logger.info("🌅 Running daily autonomous tasks...")
+                tick = StageLaps("scheduler")
                 
                 # Get all users
                 users = await db.users_collection.find({}, {"_id": 0}).to_list(1000)
@@ -123,6 +127,7 @@ class AutonomousScheduler:
                         logger.info(f"User {user['id'][:8]} has {bot_count}/45 bots - spawning more")
                         # Will implement gradual spawning vs all at once
                 
+                tick.total("daily_tick")
                 logger.info("✅ Daily tasks completed")
                 
             except Exception as e:
@@ -136,6 +141,7 @@ class AutonomousScheduler:
         while self.is_running:
             try:
                 logger.info("📊 Monitoring market regimes...")
+                tick = StageLaps("scheduler")
                 
                 # Detect regime for major pairs
                 pairs = ['BTC/ZAR', 'ETH/ZAR', 'XRP/ZAR']
@@ -144,6 +150,7 @@ class AutonomousScheduler:
                 for pair in pairs:
                     regime = await market_regime_detector.detect_regime(pair)
                     regimes[pair] = regime
+                tick.lap("regime_detect")
                 
                 # Get all active bots and adjust based on their trading pair
                 bots = await db.bots_collection.find(
@@ -155,6 +162,8 @@ class AutonomousScheduler:
                     pair = bot.get('trading_pair', 'BTC/ZAR')
                     if pair in regimes:
                         await market_regime_detector.adjust_bot_for_regime(bot, regimes[pair])
+                tick.lap("regime_adjust")
+                tick.total("regime_tick")
                 
                 logger.info(f"✅ Regime monitoring completed for {len(pairs)} pairs")
                 
@@ -0,0 +1,31 @@
+"""
+Benchmark suite for the trading and ledger hot paths
+
+Runs against an in-memory Motor/Mongo stand-in (benchmarks.memory_db), so no
+database, exchange or network is needed:
+
+    cd backend
+    python -m benchmarks                       # full run, compared with baseline.json
+    python -m benchmarks --quick               # smaller sizes (CI / pre-commit)
+    python -m benchmarks --only ledger regime  # selected benchmarks
+    python -m benchmarks --update-baseline     # record this machine's baseline
+
+Results are written as JSON (--output). Against a baseline the command exits
+1 when any latency or throughput metric is worse by more than --tolerance.
+"""
+
+BENCH_MODULES = (
+    "benchmarks.bench_order_pipeline",
+    "benchmarks.bench_ledger",
+    "benchmarks.bench_scheduler",
+    "benchmarks.bench_broadcast",
+    "benchmarks.bench_regime",
+)
+
+
+def load_benchmarks():
+    """Import the benchmark modules so they register themselves"""
+    import importlib
+
+    for module in BENCH_MODULES:
+        importlib.import_module(module)
@@ -0,0 +1,71 @@
+"""
+CLI: python -m benchmarks [--quick] [--only NAME ...] [--output FILE]
+                          [--baseline FILE] [--update-baseline] [--tolerance 0.25]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import List
+
+from benchmarks import load_benchmarks
+from benchmarks.harness import (
+    BENCHMARKS, DEFAULT_BASELINE, compare, load_baseline, run_benchmarks, write_json
+)
+
+
+async def main(argv: List[str]) -> int:
+    load_benchmarks()
+
+    parser = argparse.ArgumentParser(description="Benchmark trading and ledger hot paths")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes (skips 100k fills / 1000 bots)")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline results JSON")
+    parser.add_argument("--update-baseline", action="store_true", help="Save these results as the baseline")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Run each benchmark this many times and keep the best value per metric")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before a metric counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    def progress(name: str, seconds: float):
+        print(f"  {name:<16} done in {seconds:.1f}s", file=sys.stderr)
+
+    report = await run_benchmarks(args.only, args.quick, progress, args.runs)
+
+    if args.output:
+        write_json(args.output, report)
+
+    for bench, cases in report["results"].items():
+        print(f"\n{bench}")
+        for case, metrics in cases.items():
+            shown = ", ".join(f"{k}={v}" for k, v in metrics.items() if k != "count")
+            print(f"  {case}: {shown}")
+
+    if args.update_baseline:
+        write_json(args.baseline, report)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    if baseline.get("quick") != report["quick"]:
+        print("\nWarning: baseline and this run use different --quick settings; only shared cases are compared")
+
+    comparisons = compare(report["results"], baseline, args.tolerance)
+    regressions = [c for c in comparisons if c.regressed]
+    print(f"\nCompared {len(comparisons)} metrics with {args.baseline}: {len(regressions)} regressions")
+    for c in sorted(comparisons, key=lambda c: -c.change)[:10]:
+        flag = "REGRESSION" if c.regressed else "ok"
+        print(f"  {flag:<10} {c.key}: {c.baseline} -> {c.current} ({c.change:+.0%} worse)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    # Paper trading and signal mocks log every cycle; keep the report readable
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(sys.argv[1:])))
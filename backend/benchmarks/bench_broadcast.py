@@ -0,0 +1,63 @@
+"""
+ConnectionManager fan-out: broadcast_to_all and broadcast_to_user across many sockets
+"""
+
+import time
+
+from benchmarks.harness import benchmark, percentiles
+from websocket_manager import ConnectionManager
+
+MESSAGE = {
+    "type": "trade_executed",
+    "bot_id": "bench-bot-1",
+    "bot_name": "Bench Bot 1",
+    "new_capital": 1234.56,
+    "total_profit": 34.56,
+    "trade": {"pair": "BTC/USDT", "side": "buy", "amount": 0.01, "price": 50000.0},
+}
+
+
+class CountingSocket:
+    """WebSocket stand-in that only counts what it is sent"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_json(self, message):
+        self.sent += 1
+
+
+def connected_manager(users: int, per_user: int) -> ConnectionManager:
+    # Registered directly: connect() would start a ping task per socket
+    manager = ConnectionManager()
+    for u in range(users):
+        manager.active_connections[f"user-{u}"] = {CountingSocket() for _ in range(per_user)}
+    return manager
+
+
+@benchmark("broadcast")
+async def bench_broadcast(quick: bool):
+    shapes = ((100, 3), (1000, 3)) if quick else ((100, 3), (1000, 3), (5000, 2))
+    rounds = 5 if quick else 100
+    results = {}
+
+    for users, per_user in shapes:
+        manager = connected_manager(users, per_user)
+        await manager.broadcast_to_all(MESSAGE)  # warm-up
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await manager.broadcast_to_all(MESSAGE)
+            samples.append(time.perf_counter() - started)
+        stats = percentiles(samples)
+        stats["messages_per_second"] = round(users * per_user * rounds / sum(samples), 1)
+        results[f"broadcast_to_all_{users}x{per_user}"] = stats
+
+    manager = connected_manager(1000, 3)
+    samples = []
+    for i in range(rounds * 100):
+        started = time.perf_counter()
+        await manager.send_message(f"user-{i % 1000}", MESSAGE)
+        samples.append(time.perf_counter() - started)
+    results["send_message_1000_users"] = percentiles(samples)
+    return results
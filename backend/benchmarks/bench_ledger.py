@@ -0,0 +1,60 @@
+"""
+LedgerService.compute_realized_pnl and profit_series over 1k / 10k / 100k fills
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.harness import benchmark, percentiles, time_async
+from benchmarks.memory_db import MemoryDatabase
+from services.ledger_service import LedgerService
+
+SYMBOLS = ("BTC/USDT", "ETH/USDT", "BTC/ZAR", "ETH/ZAR")
+
+
+def make_fills(count: int, user_id: str = "bench-user", bots: int = 10,
+               days: int = 30, seed: int = 1):
+    """Alternating buy/sell fills spread over the last `days` days, oldest first"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    step = timedelta(days=days) / max(count, 1)
+    start = now - timedelta(days=days)
+    fills = []
+    for i in range(count):
+        price = 100.0 * (1 + 0.05 * rng.uniform(-1, 1))
+        fills.append({
+            "user_id": user_id,
+            "bot_id": f"bench-bot-{i % bots}",
+            "exchange": "binance",
+            "symbol": SYMBOLS[i % len(SYMBOLS)],
+            "side": "buy" if (i // len(SYMBOLS)) % 2 == 0 else "sell",
+            "qty": round(rng.uniform(0.1, 2.0), 4),
+            "price": price,
+            "fee": price * 0.001,
+            "fee_currency": "USDT",
+            "timestamp": start + step * i,
+            "order_id": f"order-{i}",
+            "client_order_id": f"client-{i}",
+            "is_paper": True,
+            "metadata": {},
+        })
+    return fills
+
+
+@benchmark("ledger")
+async def bench_ledger(quick: bool):
+    sizes = (1_000, 10_000) if quick else (1_000, 10_000, 100_000)
+    repeat = 3 if quick else 10
+    results = {}
+
+    for size in sizes:
+        db = MemoryDatabase()
+        ledger = LedgerService(db)
+        await db["fills_ledger"].insert_many(make_fills(size))
+
+        pnl = await time_async(lambda: ledger.compute_realized_pnl(user_id="bench-user"), repeat)
+        series = await time_async(lambda: ledger.profit_series("bench-user", period="daily", limit=30), repeat)
+
+        results[f"realized_pnl_{size}"] = percentiles(pnl)
+        results[f"profit_series_{size}"] = percentiles(series)
+    return results
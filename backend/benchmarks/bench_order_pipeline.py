@@ -0,0 +1,80 @@
+"""
+OrderPipeline.submit_order latency through all four gates
+"""
+
+import time
+from collections import Counter
+
+from benchmarks.bench_ledger import SYMBOLS, make_fills
+from benchmarks.harness import benchmark, percentiles
+from benchmarks.memory_db import MemoryDatabase
+from engines.market_data import RecordedMarketData, SystemClock
+from paper_trading_engine import paper_engine
+from services.ledger_service import LedgerService
+from services.order_pipeline import OrderPipeline
+from services.rate_limit_service import RateLimitService
+
+BOTS = 10
+
+# Edge high enough to clear the fee gate and limits high enough that every
+# order reaches the circuit breaker checks (the expensive part of the path)
+CONFIG = {
+    "MIN_EDGE_BPS": 100.0,
+    "MAX_TRADES_PER_BOT_DAILY": 1_000_000,
+    "MAX_TRADES_PER_USER_DAILY": 1_000_000,
+    "BURST_LIMIT_ORDERS_PER_EXCHANGE": 1_000_000,
+}
+
+
+async def make_pipeline(history: int) -> OrderPipeline:
+    db = MemoryDatabase()
+    ledger = LedgerService(db)
+    await db["fills_ledger"].insert_many(make_fills(history, bots=BOTS))
+    # Funded bots, so drawdown and daily-loss checks run against real equity
+    await db["ledger_events"].insert_many([
+        {"user_id": "bench-user", "bot_id": f"bench-bot-{i}", "event_type": "funding",
+         "amount": 1_000_000.0, "currency": "USDT"}
+        for i in range(BOTS)
+    ])
+    return OrderPipeline(db, ledger, CONFIG, rate_limits=RateLimitService())
+
+
+def fixed_prices() -> RecordedMarketData:
+    """Prices for the unrealized-PnL lookups, so the breaker checks never hit an exchange"""
+    prices = RecordedMarketData(SystemClock())
+    prices.add_ticks({"timestamp": 0, "symbol": symbol, "price": 100.0, "exchange": "binance"}
+                     for symbol in SYMBOLS)
+    return prices
+
+
+@benchmark("order_pipeline")
+async def bench_order_pipeline(quick: bool):
+    saved = paper_engine.market_data
+    paper_engine.market_data = fixed_prices()
+    try:
+        return await run_orders(200 if quick else 1000)
+    finally:
+        paper_engine.market_data = saved
+
+
+async def run_orders(orders: int):
+    results = {}
+    for history in (100, 2_000):
+        pipeline = await make_pipeline(history)
+        samples = []
+        outcomes = Counter()
+        for i in range(orders):
+            started = time.perf_counter()
+            result = await pipeline.submit_order(
+                user_id="bench-user", bot_id=f"bench-bot-{i % BOTS}", exchange="binance",
+                symbol="BTC/USDT", side="buy" if i % 2 == 0 else "sell", amount=0.01,
+                order_type="market", idempotency_key=f"bench-{history}-{i}"
+            )
+            samples.append(time.perf_counter() - started)
+            outcomes[result.get("gate_failed") or "approved"] += 1
+
+        stats = percentiles(samples)
+        stats["orders_per_second"] = round(orders / sum(samples), 1)
+        stats.update({f"outcome_{name}": count for name, count in outcomes.items()})
+        results[f"submit_order_history_{history}"] = stats
+    return results
@@ -0,0 +1,44 @@
+"""
+RegimeDetector.update_price_data and detect_regime at growing history sizes
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.harness import benchmark, percentiles, time_async
+from engines.regime_detector import RegimeDetector
+
+
+def seeded_detector(points: int, symbol: str = "BTC/USDT", seed: int = 5) -> RegimeDetector:
+    """Detector with `points` prices for `symbol`, all within the 24h window"""
+    rng = random.Random(seed)
+    detector = RegimeDetector()
+    start = datetime.now(timezone.utc) - timedelta(hours=23)
+    step = timedelta(hours=23) / points
+    detector.price_history[symbol] = [
+        {
+            "price": 50_000 * (1 + 0.03 * math.sin(i / 50) + 0.002 * rng.uniform(-1, 1)),
+            "volume": rng.uniform(0, 10),
+            "timestamp": start + step * i,
+        }
+        for i in range(points)
+    ]
+    return detector
+
+
+@benchmark("regime")
+async def bench_regime(quick: bool):
+    sizes = (100, 1_000) if quick else (100, 1_000, 10_000)
+    repeat = 5 if quick else 20
+    results = {}
+
+    for points in sizes:
+        detector = seeded_detector(points)
+        detect = await time_async(lambda: detector.detect_regime("BTC/USDT"), repeat)
+        results[f"detect_regime_{points}"] = percentiles(detect)
+
+        detector = seeded_detector(points)
+        update = await time_async(lambda: detector.update_price_data("BTC/USDT", 50_000.0, 1.0), repeat)
+        results[f"update_price_data_{points}"] = percentiles(update)
+    return results
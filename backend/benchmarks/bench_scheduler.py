@@ -0,0 +1,101 @@
+"""
+TradingScheduler.execute_bot_trades throughput at 10 / 100 / 1000 active bots
+
+Paper trades run through the real PaperTradingEngine on recorded (synthetic)
+ticks via a ReplaySession, so no exchange or Mongo is touched.
+
+The scheduler executes at most 5 queued trades per cycle and queues the rest
+for the next one. An unmeasured warm-up cycle fills the queue, and the
+staggerer's wall-clock exchange spacing is lifted (the replay clock moves a
+minute per cycle), so every measured cycle runs 5 paper trades (the engine's
+risk gate still skips the odd one) on top of admitting every bot.
+"""
+
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+import database
+import trading_scheduler
+from benchmarks.harness import benchmark, percentiles
+from benchmarks.memory_db import BenchCollection
+from engines.market_data import RecordedMarketData, ReplayClock
+from engines.replay import ReplaySession, replay_bots
+from engines.trade_staggerer import TradeStaggerer
+from websocket_manager import ConnectionManager
+
+EXCHANGES = ("luno", "binance", "kucoin", "kraken", "valr")
+SYMBOLS = ("BTC/USDT", "ETH/USDT")
+T0 = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+
+def synthetic_ticks(minutes: int = 300):
+    for i in range(minutes):
+        ts = (T0 + timedelta(minutes=i)).isoformat()
+        base = 50_000 * (1 + 0.02 * math.sin(i / 15))
+        for exchange in EXCHANGES:
+            yield {"timestamp": ts, "symbol": "BTC/USDT", "price": base, "exchange": exchange}
+            yield {"timestamp": ts, "symbol": "ETH/USDT", "price": base / 15, "exchange": exchange}
+
+
+def bench_staggerer(count: int) -> TradeStaggerer:
+    """Staggerer whose exchange limits never hold back a queued bot"""
+    staggerer = TradeStaggerer()
+    for exchange in staggerer.exchange_limits:
+        staggerer.exchange_limits[exchange] = {"max_concurrent": count, "min_delay": 0}
+    return staggerer
+
+
+def scheduler_bots(count: int):
+    bots = []
+    for i, bot in enumerate(replay_bots(count, user_id="bench-user")):
+        bot["exchange"] = EXCHANGES[i % len(EXCHANGES)]
+        bot["user_id"] = f"bench-user-{i % 10}"
+        bots.append(bot)
+    return bots
+
+
+async def run_ticks(count: int, ticks: int):
+    clock = ReplayClock(T0 + timedelta(minutes=240))
+    market_data = RecordedMarketData(clock)
+    market_data.add_ticks(synthetic_ticks())
+
+    modes = BenchCollection([{"user_id": f"bench-user-{i}", "autopilot": True, "emergencyStop": False}
+                             for i in range(10)])
+    saved = (database.system_modes_collection, trading_scheduler.trade_staggerer, trading_scheduler.manager)
+    database.system_modes_collection = modes
+    trading_scheduler.trade_staggerer = bench_staggerer(count)
+    trading_scheduler.manager = ConnectionManager()
+    try:
+        async with ReplaySession(market_data, clock, seed=3) as session:
+            await session.seed_bots(scheduler_bots(count))
+            scheduler = trading_scheduler.TradingScheduler()
+            await scheduler.execute_bot_trades()  # warm-up: queues every bot
+            clock.advance(timedelta(minutes=1))
+            trades_before = await session.collections["trades"].count_documents({})
+            samples = []
+            for _ in range(ticks):
+                started = time.perf_counter()
+                await scheduler.execute_bot_trades()
+                samples.append(time.perf_counter() - started)
+                clock.advance(timedelta(minutes=1))
+            trades = await session.collections["trades"].count_documents({}) - trades_before
+    finally:
+        database.system_modes_collection, trading_scheduler.trade_staggerer, trading_scheduler.manager = saved
+    return samples, trades
+
+
+@benchmark("scheduler")
+async def bench_scheduler(quick: bool):
+    sizes = (10, 100) if quick else (10, 100, 1000)
+    ticks = 3 if quick else 20
+    results = {}
+
+    for count in sizes:
+        samples, trades = await run_ticks(count, ticks)
+        stats = percentiles(samples)
+        stats["bots_per_second"] = round(count * ticks / sum(samples), 1)
+        stats["trades_per_second"] = round(trades / sum(samples), 1)
+        stats["trades"] = trades
+        results[f"execute_bot_trades_{count}_bots"] = stats
+    return results
@@ -0,0 +1,166 @@
+"""
+Benchmark registry, timing helpers and baseline comparison
+
+A benchmark is an async function taking `quick` and returning
+{case: {metric: value}}. Metric names carry their direction:
+- *_ms, *_seconds: lower is better
+- *_per_second: higher is better
+- anything else is recorded but not compared
+Tail latencies (p95/p99/max) come from a handful of samples per case and
+swing run to run, so they are recorded but not compared either; the gate
+is p50, mean and throughput. With runs > 1 every benchmark runs that many
+times (interleaved) and each compared metric keeps its best value, so a
+slow stretch on a shared host does not read as a regression.
+"""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+BENCHMARKS: Dict[str, Callable[[bool], Awaitable[Dict]]] = {}
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+TAIL_METRICS = ("p95_", "p99_", "max_")
+
+
+def benchmark(name: str):
+    """Register a benchmark under `name`"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def percentiles(samples_seconds: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max/mean latency in milliseconds"""
+    ordered = sorted(samples_seconds)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.50), 4),
+        "p95_ms": round(pick(0.95), 4),
+        "p99_ms": round(pick(0.99), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+    }
+
+
+async def time_async(func, repeat: int) -> List[float]:
+    """Wall time of `repeat` sequential awaits of func(), after one untimed warm-up call"""
+    await func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def metric_direction(metric: str) -> int:
+    """-1 lower is better, 1 higher is better, 0 not compared"""
+    if metric.startswith(TAIL_METRICS):
+        return 0
+    if metric.endswith("_ms") or metric.endswith("_seconds"):
+        return -1
+    if metric.endswith("_per_second"):
+        return 1
+    return 0
+
+
+def flatten(results: Dict) -> Dict[str, float]:
+    return {
+        f"{bench}.{case}.{metric}": value
+        for bench, cases in results.items()
+        for case, metrics in cases.items()
+        for metric, value in metrics.items()
+        if isinstance(value, (int, float))
+    }
+
+
+@dataclass
+class Comparison:
+    key: str
+    baseline: float
+    current: float
+    change: float  # fraction, positive = worse
+    regressed: bool
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.25) -> List[Comparison]:
+    """Compare results with a baseline run; a change worse than `tolerance` is a regression"""
+    current = flatten(results)
+    previous = flatten(baseline.get("results", baseline))
+    comparisons = []
+    for key, value in current.items():
+        direction = metric_direction(key.rsplit(".", 1)[-1])
+        old = previous.get(key)
+        if not direction or not old:
+            continue
+        change = (value - old) / old * (-direction)
+        comparisons.append(Comparison(key, old, value, round(change, 4), change > tolerance))
+    return comparisons
+
+
+def best_of(runs: List[Dict]) -> Dict:
+    """Merge repeated results of one benchmark, keeping each compared metric's best value"""
+    merged = {}
+    for case, metrics in runs[0].items():
+        merged[case] = dict(metrics)
+        for metric, value in metrics.items():
+            direction = metric_direction(metric)
+            if not direction or not isinstance(value, (int, float)):
+                continue
+            values = [run[case][metric] for run in runs if metric in run.get(case, {})]
+            merged[case][metric] = min(values) if direction < 0 else max(values)
+    return merged
+
+
+async def run_benchmarks(only: Optional[List[str]] = None, quick: bool = False,
+                         progress: Optional[Callable[[str, float], None]] = None,
+                         runs: int = 1) -> Dict:
+    """Run the registered benchmarks (all, or the names in `only`), `runs` times each"""
+    unknown = set(only or []) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    collected: Dict[str, List[Dict]] = {}
+    for _ in range(max(1, runs)):
+        for name, func in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            started = time.perf_counter()
+            collected.setdefault(name, []).append(await func(quick))
+            if progress:
+                progress(name, time.perf_counter() - started)
+    results = {name: best_of(samples) for name, samples in collected.items()}
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "quick": quick,
+        "runs": max(1, runs),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def load_baseline(path) -> Optional[Dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_json(path, data: Dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
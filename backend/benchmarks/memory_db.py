@@ -0,0 +1,182 @@
+"""
+In-memory Motor/Mongo stand-in for benchmarks
+
+Extends the replay store (engines.replay.MemoryCollection) with the parts of
+the Motor API the ledger, order pipeline and audit reports use: create_index,
+aggregate, insert_many, delete_many and bulk_write. Reads hand out shallow copies so that 100k-fill
+scans time the code under test rather than deepcopy.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from engines.replay import MemoryCollection, MemoryCursor, _matches
+
+
+class IndexName(str):
+    """create_index result that works with and without await
+
+    LedgerService creates its indexes without awaiting (sync call on a Motor
+    collection); OrderPipeline awaits them. Both work against this store.
+    """
+
+    def __await__(self):
+        if False:
+            yield
+        return self
+
+
+def _shallow_project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return dict(doc)
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        result = {k: doc[k] for k in included if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _evaluate(doc: Dict, expr):
+    """
+    Aggregation expression: "$field", {"$multiply"/"$add"/"$subtract": [...]},
+    {"$cond"/"$eq"/"$ifNull": [...]}, {"$dateToString": {...}},
+    {"$substrCP": [...]} or a constant
+    """
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict):
+        (op, args), = expr.items()
+        if op == "$dateToString":
+            value = _evaluate(doc, args["date"])
+            return value.strftime(args["format"]) if value is not None else None
+        if op == "$substrCP":
+            value, start, length = args
+            return str(_evaluate(doc, value) or "")[start:start + length]
+        if op == "$cond":
+            condition, then, otherwise = args
+            return _evaluate(doc, then) if _evaluate(doc, condition) else _evaluate(doc, otherwise)
+        if op == "$eq":
+            return _evaluate(doc, args[0]) == _evaluate(doc, args[1])
+        if op == "$ifNull":
+            value = _evaluate(doc, args[0])
+            return _evaluate(doc, args[1]) if value is None else value
+        values = [_evaluate(doc, arg) or 0 for arg in args]
+        if op == "$multiply":
+            result = 1
+            for value in values:
+                result *= value
+            return result
+        if op == "$add":
+            return sum(values)
+        if op == "$subtract":
+            return values[0] - values[1]
+        raise ValueError(f"Unsupported expression in benchmark store: {op}")
+    return expr
+
+
+def _group(docs: Iterable[Dict], spec: Dict) -> List[Dict]:
+    key_expr = spec["_id"]
+    # {"day": ..., "event_type": "$event_type"} groups on several fields
+    compound = isinstance(key_expr, dict) and not any(k.startswith("$") for k in key_expr)
+    groups: Dict = defaultdict(list)
+    for doc in docs:
+        if compound:
+            key = tuple((field, _evaluate(doc, expr)) for field, expr in key_expr.items())
+        else:
+            key = _evaluate(doc, key_expr) if key_expr is not None else None
+        groups[key].append(doc)
+
+    results = []
+    for key, members in groups.items():
+        row = {"_id": dict(key) if compound else key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            values = [_evaluate(doc, expr) for doc in members]
+            numbers = [v for v in values if isinstance(v, (int, float))]
+            if op == "$sum":
+                row[field] = sum(numbers)
+            elif op == "$avg":
+                row[field] = sum(numbers) / len(numbers) if numbers else None
+            elif op == "$min":
+                row[field] = min(numbers) if numbers else None
+            elif op == "$max":
+                row[field] = max(numbers) if numbers else None
+            elif op == "$first":
+                row[field] = values[0]
+            elif op == "$last":
+                row[field] = values[-1]
+            else:
+                raise ValueError(f"Unsupported accumulator in benchmark store: {op}")
+        results.append(row)
+    return results
+
+
+class BenchCollection(MemoryCollection):
+    """MemoryCollection with indexes (no-ops), aggregation and bulk writes"""
+
+    def __init__(self, docs: Optional[List[Dict]] = None):
+        super().__init__()
+        self.docs = [dict(d) for d in docs or []]
+        self.indexes: List = []
+
+    def create_index(self, keys, **kwargs) -> IndexName:
+        self.indexes.append((keys, kwargs))
+        return IndexName(str(keys))
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> MemoryCursor:
+        return MemoryCursor([_shallow_project(d, projection) for d in self.docs if _matches(d, query or {})])
+
+    def aggregate(self, pipeline: List[Dict], **kwargs) -> MemoryCursor:
+        docs: List[Dict] = self.docs
+        for stage in pipeline:
+            (op, spec), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if _matches(d, spec)]
+            elif op == "$group":
+                docs = _group(docs, spec)
+            elif op == "$sort":
+                cursor = MemoryCursor(list(docs)).sort(list(spec.items()))
+                docs = cursor.docs
+            elif op == "$limit":
+                docs = docs[:spec]
+            elif op == "$count":
+                docs = [{spec: len(docs)}]
+            else:
+                raise ValueError(f"Unsupported stage in benchmark store: {op}")
+        return MemoryCursor([dict(d) for d in docs])
+
+    async def insert_many(self, docs: List[Dict], ordered: bool = True):
+        inserted = []
+        for doc in docs:
+            if "_id" not in doc:
+                self._next_id += 1
+                doc["_id"] = self._next_id
+            self.docs.append(dict(doc))
+            inserted.append(doc["_id"])
+        return type("InsertManyResult", (), {"inserted_ids": inserted})()
+
+    async def bulk_write(self, requests: List, ordered: bool = True):
+        for request in requests:  # pymongo UpdateOne
+            await self.update_one(request._filter, request._doc, upsert=request._upsert)
+        return type("BulkWriteResult", (), {"modified_count": len(requests)})()
+
+    async def delete_many(self, query: Dict):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+        return type("DeleteResult", (), {"deleted_count": before - len(self.docs)})()
+
+
+class MemoryDatabase:
+    """db["collection"] access, creating empty collections on first use"""
+
+    def __init__(self):
+        self.collections: Dict[str, BenchCollection] = {}
+
+    def __getitem__(self, name: str) -> BenchCollection:
+        if name not in self.collections:
+            self.collections[name] = BenchCollection()
+        return self.collections[name]
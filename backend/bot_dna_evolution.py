@@ -3,14 +3,24 @@ Bot DNA Evolution System
 - Genetic algorithm for bot optimization
 - Mutation and crossover of successful bots
 - Natural selection based on performance
+- Backtest mode: candidate genomes scored over recorded history in a
+  process pool, several generations per cycle, fitness cached by genome hash
 """
 
 import asyncio
+import hashlib
+import multiprocessing
+import os
 import random
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
 from logger_config import logger
 import database as db
 from performance_ranker import performance_ranker
+from engines.genome_backtest import genome_key, init_worker, load_history, score_batch
 
 
 class BotDNAEvolution:
@@ -18,6 +28,16 @@ class BotDNAEvolution:
         self.mutation_rate = 0.15  # 15% chance of mutation
         self.elite_percent = 0.30  # Top 30% survive
         self.generation = 0
+        
+        # Backtest mode
+        self.history_dir = os.getenv('EVOLUTION_HISTORY_DIR')
+        self.population_size = int(os.getenv('EVOLUTION_POPULATION', '64'))
+        self.generations_per_cycle = int(os.getenv('EVOLUTION_GENERATIONS', '5'))
+        self.workers = int(os.getenv('EVOLUTION_WORKERS', str(os.cpu_count() or 1)))
+        self.search_mutation_rate = 0.5  # Offline search explores harder than live mutation
+        self.batch_size = 16  # Genomes per process pool task
+        self.fitness_cache: OrderedDict = OrderedDict()  # (history fingerprint, genome hash) -> score
+        self.fitness_cache_size = 10000
     
     async def evolve_bots(self, user_id: str):
         """Run evolution cycle on user's bots"""
@@ -97,53 +117,224 @@ class BotDNAEvolution:
             # Mutate risk mode
             risk_modes = ['safe', 'balanced', 'risky']
             dna['risk_mode'] = random.choice(risk_modes)
-            logger.info(f"Mutation: risk_mode -> {dna['risk_mode']}")
+            logger.debug(f"Mutation: risk_mode -> {dna['risk_mode']}")
         
         if random.random() < self.mutation_rate:
             # Mutate trading pair
             pairs = ['BTC/ZAR', 'ETH/ZAR', 'XRP/ZAR']
             dna['trading_pair'] = random.choice(pairs)
-            logger.info(f"Mutation: trading_pair -> {dna['trading_pair']}")
+            logger.debug(f"Mutation: trading_pair -> {dna['trading_pair']}")
         
         if random.random() < self.mutation_rate:
             # Mutate capital (±20%)
             factor = random.uniform(0.8, 1.2)
             dna['initial_capital'] = dna['initial_capital'] * factor
-            logger.info(f"Mutation: capital -> R{dna['initial_capital']:.2f}")
+            logger.debug(f"Mutation: capital -> R{dna['initial_capital']:.2f}")
         
         return dna
     
+    def _dna_update(self, new_dna: dict, fitness: Optional[dict] = None) -> dict:
+        """Mongo update applying evolved DNA and recording it in evolution_history"""
+        now = datetime.now(timezone.utc).isoformat()
+        update_data = {
+            "risk_mode": new_dna['risk_mode'],
+            "trading_pair": new_dna.get('trading_pair', 'BTC/ZAR'),
+            "exchange": new_dna.get('exchange', 'luno'),
+            "evolved_at": now,
+            "generation": self.generation
+        }
+        # current_capital is the bot's money, not DNA; backtest genomes carry no capital at all
+        if 'initial_capital' in new_dna:
+            update_data["initial_capital"] = new_dna['initial_capital']
+        entry = {"generation": self.generation, "dna": new_dna, "timestamp": now}
+        if fitness is not None:
+            update_data["backtest_fitness"] = fitness
+            entry["backtest_fitness"] = fitness
+        return {"$set": update_data, "$push": {"evolution_history": entry}}
+    
     async def _update_bot_dna(self, bot_id: str, new_dna: dict):
         """Update bot with evolved DNA"""
         try:
-            update_data = {
-                "risk_mode": new_dna['risk_mode'],
-                "trading_pair": new_dna.get('trading_pair', 'BTC/ZAR'),
-                "initial_capital": new_dna['initial_capital'],
-                "current_capital": new_dna['initial_capital'],
-                "exchange": new_dna.get('exchange', 'luno'),
-                "evolved_at": datetime.now(timezone.utc).isoformat(),
-                "generation": self.generation
-            }
-            
-            await db.bots_collection.update_one(
-                {"id": bot_id},
-                {
-                    "$set": update_data,
-                    "$push": {
-                        "evolution_history": {
-                            "generation": self.generation,
-                            "dna": new_dna,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                }
-            )
+            await db.bots_collection.update_one({"id": bot_id}, self._dna_update(new_dna))
             
             logger.info(f"Bot {bot_id} evolved to generation {self.generation}")
             
         except Exception as e:
             logger.error(f"Bot DNA update failed: {e}")
+    
+    # ------------------------------------------------------------------
+    # Backtest mode
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _genome(bot: dict) -> dict:
+        """The backtested part of a bot (fitness is a % return, so capital is left out)"""
+        return {
+            "risk_mode": bot.get('risk_mode', 'safe'),
+            "trading_pair": bot.get('trading_pair', 'BTC/ZAR'),
+            "exchange": bot.get('exchange', 'luno')
+        }
+    
+    @staticmethod
+    def _history_fingerprint(history: Dict[str, List[float]]) -> str:
+        """Cheap identity of a price history; changes whenever new data is loaded"""
+        parts = [f"{key}:{len(prices)}:{prices[0]}:{prices[-1]}" for key, prices in sorted(history.items()) if prices]
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+    
+    def _breed(self, parents: List[dict], count: int) -> List[dict]:
+        """Offspring from random parent pairs, mutated at the search rate"""
+        saved_rate = self.mutation_rate
+        self.mutation_rate = self.search_mutation_rate
+        try:
+            return [self._genome(self._mutate(self._crossover(random.choice(parents), random.choice(parents))))
+                    for _ in range(count)]
+        finally:
+            self.mutation_rate = saved_rate
+    
+    async def _score_genomes(self, genomes: List[dict], history: Dict[str, List[float]], fingerprint: str,
+                             executor: Optional[ProcessPoolExecutor]) -> Tuple[List[Tuple[dict, Optional[dict]]], int]:
+        """Backtest the genomes not already cached; returns (genome, score) pairs and the number backtested"""
+        pending = {}
+        for genome in genomes:
+            key = (fingerprint, genome_key(genome))
+            if key in self.fitness_cache:
+                self.fitness_cache.move_to_end(key)
+            else:
+                pending.setdefault(key, genome)
+        
+        keys = list(pending)
+        batches = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        if executor is not None:
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, score_batch, [pending[k] for k in batch]) for batch in batches
+            ))
+        else:
+            results = [score_batch([pending[k] for k in batch], history) for batch in batches]
+        
+        for batch, scores in zip(batches, results):
+            for key, score in zip(batch, scores):
+                self.fitness_cache[key] = score
+        while len(self.fitness_cache) > self.fitness_cache_size:
+            self.fitness_cache.popitem(last=False)
+        
+        return [(g, self.fitness_cache.get((fingerprint, genome_key(g)))) for g in genomes], len(keys)
+    
+    def _open_pool(self, history: Dict[str, List[float]], workers: int) -> Optional[ProcessPoolExecutor]:
+        if workers <= 0:
+            return None
+        try:
+            # spawn: never fork the event loop or open database clients into workers
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(history,)
+            )
+        except Exception as e:
+            logger.warning(f"Process pool unavailable, scoring in-process: {e}")
+            return None
+    
+    async def evolve_with_backtests(self, user_id: str, generations: Optional[int] = None,
+                                    population: Optional[int] = None,
+                                    history: Optional[Dict[str, List[float]]] = None,
+                                    workers: Optional[int] = None) -> Dict:
+        """
+        Search genomes offline by backtest fitness, then give the winners to
+        the user's weakest bots (by backtest fitness of their current DNA)
+        with one bulk write.
+        """
+        try:
+            generations = generations or self.generations_per_cycle
+            population = population or self.population_size
+            workers = self.workers if workers is None else workers
+            
+            if history is None:
+                if not self.history_dir or not os.path.isdir(self.history_dir):
+                    return {"evolved": 0, "message": "No historical data (set EVOLUTION_HISTORY_DIR)"}
+                history = await asyncio.to_thread(load_history, self.history_dir)
+            if not history:
+                return {"evolved": 0, "message": "No historical data to backtest against"}
+            fingerprint = self._history_fingerprint(history)
+            
+            bots = await db.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
+            if len(bots) < 2:
+                return {"evolved": 0, "message": "Need 2+ bots for evolution"}
+            
+            logger.info(f"Starting backtest evolution for user {user_id}: "
+                        f"{generations} generations x {population} genomes")
+            
+            seeds = [self._genome(bot) for bot in bots]
+            candidates = seeds + self._breed(seeds, max(population - len(seeds), 0))
+            evaluated: Dict[str, dict] = {}  # genome hash -> genome, everything scored this cycle
+            backtested = 0
+            best_per_generation = []
+            
+            executor = self._open_pool(history, workers)
+            try:
+                for _ in range(generations):
+                    scored, fresh = await self._score_genomes(candidates, history, fingerprint, executor)
+                    backtested += fresh
+                    evaluated.update((genome_key(g), g) for g, _ in scored)
+                    ranked = sorted((pair for pair in scored if pair[1] is not None),
+                                    key=lambda pair: pair[1]['fitness'], reverse=True)
+                    if not ranked:
+                        break
+                    best_per_generation.append(ranked[0][1]['fitness'])
+                    
+                    elite = [g for g, _ in ranked[:max(int(len(ranked) * self.elite_percent), 2)]]
+                    candidates = elite + self._breed(elite, max(population - len(elite), 0))
+                
+                bot_scores, fresh = await self._score_genomes(seeds, history, fingerprint, executor)
+                backtested += fresh
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            
+            # Distinct winners, best first
+            winners = sorted((key for key in evaluated if self.fitness_cache.get((fingerprint, key))),
+                             key=lambda key: self.fitness_cache[(fingerprint, key)]['fitness'], reverse=True)
+            
+            self.generation += 1
+            
+            # Weakest bots (no backtest score counts as weakest) take the winners, if they beat them
+            weak_count = max(int(len(bots) * 0.30), 1)
+            order = sorted(range(len(bots)), key=lambda i: bot_scores[i][1]['fitness'] if bot_scores[i][1] else float('-inf'))
+            operations, changes = [], []
+            for i, key in zip(order[:weak_count], winners):
+                current = bot_scores[i][1]
+                winner = self.fitness_cache[(fingerprint, key)]
+                if current is not None and current['fitness'] >= winner['fitness']:
+                    continue
+                dna = evaluated[key]
+                operations.append(UpdateOne({"id": bots[i]['id']}, self._dna_update(dna, winner)))
+                changes.append({
+                    "bot_id": bots[i]['id'],
+                    "dna": dna,
+                    "old_fitness": current['fitness'] if current else None,
+                    "new_fitness": winner['fitness']
+                })
+            
+            if operations:
+                await db.bots_collection.bulk_write(operations, ordered=False)
+            
+            logger.info(f"Backtest evolution complete: {len(changes)} bots evolved, "
+                        f"{backtested} genomes backtested (Generation {self.generation})")
+            
+            return {
+                "evolved": len(changes),
+                "generation": self.generation,
+                "generations_run": len(best_per_generation),
+                "genomes_evaluated": len(evaluated),
+                "genomes_backtested": backtested,
+                "best_fitness_per_generation": best_per_generation,
+                "changes": changes,
+                "message": f"Backtest evolution cycle {self.generation} complete"
+            }
+        
+        except Exception as e:
+            logger.error(f"Backtest evolution failed: {e}")
+            return {"evolved": 0, "error": str(e)}
 
 
 # Global instance
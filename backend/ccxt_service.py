@@ -1,56 +1,51 @@
-import ccxt
-import asyncio
+import ccxt.async_support as ccxt
 from typing import Dict, Optional, List
 from datetime import datetime, timezone
 import logging
 
+from services.exchange_client_pool import build_exchange, exchange_client_pool
+
 logger = logging.getLogger(__name__)
 
 class CCXTService:
-    def __init__(self):
+    def __init__(self, pool=None):
         self.exchanges: Dict[str, ccxt.Exchange] = {}
         self.paper_balances: Dict[str, Dict[str, float]] = {}  # user_id -> {currency: balance}
+        self.pool = pool or exchange_client_pool
     
     def init_exchange(self, exchange_name: str, api_key: str, api_secret: str, 
                      testnet: bool = False, passphrase: Optional[str] = None) -> ccxt.Exchange:
-        """Initialize exchange connection"""
+        """Initialize an unpooled async exchange connection (caller must close it)"""
         try:
-            exchange_class = getattr(ccxt, exchange_name.lower())
-            config = {
-                'apiKey': api_key,
-                'secret': api_secret,
-                'enableRateLimit': True,
-            }
-            
-            if passphrase:
-                config['password'] = passphrase
-            
-            if testnet:
-                config['options'] = {'defaultType': 'spot'}
-                if exchange_name.lower() == 'binance':
-                    config['options']['testnet'] = True
-            
-            exchange = exchange_class(config)
-            return exchange
+            return build_exchange(exchange_name, api_key, api_secret, passphrase=passphrase, testnet=testnet)
         except Exception as e:
             logger.error(f"Failed to initialize {exchange_name}: {e}")
             raise
     
+    async def get_client(self, user_id: str, exchange_name: str,
+                         key_doc: Optional[Dict] = None) -> Optional[ccxt.Exchange]:
+        """Get the pooled exchange client for a user's stored API keys"""
+        return await self.pool.get(user_id, exchange_name, key_doc)
+    
     async def test_connection(self, exchange_name: str, api_key: str, api_secret: str, 
                             passphrase: Optional[str] = None) -> bool:
         """Test exchange API connection by creating temporary instance"""
+        exchange = None
         try:
             exchange = self.init_exchange(exchange_name, api_key, api_secret, testnet=False, passphrase=passphrase)
-            await asyncio.to_thread(exchange.fetch_balance)
+            await exchange.fetch_balance()
             return True
         except Exception as e:
             logger.error(f"Connection test failed for {exchange_name}: {e}")
             return False
+        finally:
+            if exchange:
+                await exchange.close()
     
     async def get_balance(self, exchange: ccxt.Exchange, currency: str = 'USDT') -> float:
         """Get balance for specific currency"""
         try:
-            balance = await asyncio.to_thread(exchange.fetch_balance)
+            balance = await exchange.fetch_balance()
             return balance.get(currency, {}).get('free', 0.0)
         except Exception as e:
             logger.error(f"Failed to fetch balance: {e}")
@@ -59,7 +54,7 @@ class CCXTService:
     async def fetch_ticker(self, exchange: ccxt.Exchange, symbol: str) -> Dict:
         """Fetch ticker data"""
         try:
-            ticker = await asyncio.to_thread(exchange.fetch_ticker, symbol)
+            ticker = await exchange.fetch_ticker(symbol)
             return ticker
         except Exception as e:
             logger.error(f"Failed to fetch ticker for {symbol}: {e}")
@@ -86,10 +81,7 @@ class CCXTService:
                 }
             else:
                 # Real trading
-                order = await asyncio.to_thread(
-                    exchange.create_market_order,
-                    symbol, side, amount
-                )
+                order = await exchange.create_market_order(symbol, side, amount)
                 return order
         except Exception as e:
             logger.error(f"Failed to create order: {e}")
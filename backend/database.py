@@ -5,8 +5,12 @@ Handles all database operations and provides stable collection API
 
 import os
 import logging
+from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from pymongo.errors import OperationFailure
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from engines.instrumentation import mongo_command_listener
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +47,7 @@ market_regimes_collection = None
 learning_data_collection = None
 learning_logs_collection = None
 audit_logs_collection = None
+audit_daily_stats_collection = None
 notifications_collection = None
 reports_collection = None
 promotion_requests_collection = None
@@ -63,6 +68,7 @@ orders_collection = None
 positions_collection = None
 balance_snapshots_collection = None
 performance_metrics_collection = None
+advanced_orders_collection = None
 
 # Aliases for backward compatibility
 wallet_balances = None  # Alias for wallet_balances_collection
@@ -70,6 +76,90 @@ capital_injections = None  # Alias for capital_injections_collection
 audit_logs = None  # Alias for audit_logs_collection
 
 
+# ============================================================================
+# Write Notifications
+# ============================================================================
+
+WRITE_METHODS = frozenset({
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "bulk_write",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete"
+})
+
+# listener(collection_name, method, args, kwargs), called after each completed write
+write_listeners: List[Callable[[str, str, tuple, Dict], None]] = []
+
+
+def add_write_listener(listener: Callable[[str, str, tuple, Dict], None]):
+    if listener not in write_listeners:
+        write_listeners.append(listener)
+
+
+def write_operations(method: str, args: tuple, kwargs: Dict) -> List[Tuple[str, Dict]]:
+    """
+    A write listener call as (operation, params) pairs
+    
+    params holds "filter", "doc" (insert document, update or replacement) and
+    "upsert"; insert_many and bulk_write yield one pair per document/request.
+    """
+    if method == "bulk_write":
+        requests = args[0] if args else kwargs.get('requests', [])
+        operations = []
+        for request in requests:
+            name = type(request).__name__  # pymongo InsertOne / UpdateOne / ...
+            op = name[0].lower() + "".join("_" + c.lower() if c.isupper() else c for c in name[1:])
+            operations.append((op, {
+                "filter": getattr(request, '_filter', None),
+                "doc": getattr(request, '_doc', None),
+                "upsert": getattr(request, '_upsert', False)
+            }))
+        return operations
+    
+    if method == "insert_many":
+        return [("insert_one", {"doc": doc}) for doc in (args[0] if args else kwargs.get('documents', []))]
+    
+    params = {
+        "filter": args[0] if args else kwargs.get('filter'),
+        "doc": args[1] if len(args) > 1 else kwargs.get('update', kwargs.get('replacement')),
+        "upsert": kwargs.get('upsert', False)
+    }
+    if method == "insert_one":
+        params = {"doc": args[0] if args else kwargs.get('document')}
+    return [(method, params)]
+
+
+class WatchedCollection:
+    """
+    Motor collection proxy that tells write_listeners about completed writes
+    
+    Reads and everything else pass straight through to the wrapped collection.
+    Used for the collections read models are built from (bots, trades).
+    """
+    
+    def __init__(self, collection, name: Optional[str] = None):
+        self._collection = collection
+        self._name = name or collection.name
+    
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in WRITE_METHODS:
+            return attr
+        
+        async def write(*args, **kwargs):
+            result = await attr(*args, **kwargs)
+            for listener in write_listeners:
+                try:
+                    listener(self._name, name, args, kwargs)
+                except Exception as e:
+                    logger.error(f"Write listener error on {self._name}.{name}: {e}")
+            return result
+        
+        return write
+    
+    def __getitem__(self, name):
+        return self._collection[name]
+
+
 # ============================================================================
 # Database Connection Functions
 # ============================================================================
@@ -87,7 +177,7 @@ async def connect():
     logger.info(f"🔌 Connecting to MongoDB at {mongo_url}")
     
     try:
-        client = AsyncIOMotorClient(mongo_url)
+        client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_command_listener])
         db = client[db_name]
         
         # Test connection
@@ -142,12 +232,13 @@ async def setup_collections():
     global system_config_collection, system_modes_collection, chat_messages_collection
     global bot_lifecycle_collection, bot_metrics_collection, system_metrics_collection
     global risk_profiles_collection, market_regimes_collection
-    global learning_data_collection, learning_logs_collection, audit_logs_collection
+    global learning_data_collection, learning_logs_collection, audit_logs_collection, audit_daily_stats_collection
     global notifications_collection, reports_collection, promotion_requests_collection
     global autopilot_actions_collection, rogue_detections_collection
     global wallet_balances_collection, capital_injections_collection
     global wallets_collection, ledger_collection, profits_collection
     global orders_collection, positions_collection, balance_snapshots_collection, performance_metrics_collection
+    global advanced_orders_collection
     global wallet_balances, capital_injections, audit_logs
     
     if db is None:
@@ -156,8 +247,8 @@ async def setup_collections():
     
     # Core collections
     users_collection = db.users
-    bots_collection = db.bots
-    trades_collection = db.trades
+    bots_collection = WatchedCollection(db.bots)
+    trades_collection = WatchedCollection(db.trades)
     api_keys_collection = db.api_keys
     alerts_collection = db.alerts
     sessions_collection = db.sessions
@@ -178,6 +269,7 @@ async def setup_collections():
     learning_data_collection = db.learning_data
     learning_logs_collection = db.learning_logs
     audit_logs_collection = db.audit_logs
+    audit_daily_stats_collection = db.audit_daily_stats
     notifications_collection = db.notifications
     reports_collection = db.reports
     promotion_requests_collection = db.promotion_requests
@@ -198,6 +290,7 @@ async def setup_collections():
     positions_collection = db.positions
     balance_snapshots_collection = db.balance_snapshots
     performance_metrics_collection = db.performance_metrics
+    advanced_orders_collection = db.advanced_orders
     
     # Aliases for backward compatibility
     wallet_balances = wallet_balances_collection
@@ -241,6 +334,9 @@ async def init_db():
             await trades_collection.create_index("user_id")
             await trades_collection.create_index("timestamp")
             await trades_collection.create_index([("bot_id", 1), ("timestamp", -1)])
+            # Native datetime range queries (see migrations/trades_native_timestamps.py)
+            await trades_collection.create_index([("user_id", 1), ("ts", -1)])
+            await trades_collection.create_index([("user_id", 1), ("bot_id", 1), ("ts", -1)])
         
         # API key indexes
         if api_keys_collection is not None:
@@ -276,6 +372,17 @@ async def init_db():
             await audit_logs_collection.create_index("user_id")
             await audit_logs_collection.create_index("action")
             await audit_logs_collection.create_index("timestamp")
+            # Report ranges on the native datetime, and retention by TTL when configured
+            await audit_logs_collection.create_index([("user_id", 1), ("ts", 1)])
+            if AUDIT_LOG_RETENTION_DAYS:
+                await ensure_ttl_index(audit_logs_collection, "ts", AUDIT_LOG_RETENTION_DAYS * 86400)
+            # Keyset pages of a user's trail / critical events, newest first
+            await audit_logs_collection.create_index([("user_id", 1), ("timestamp", -1), ("_id", -1)])
+            await audit_logs_collection.create_index([("user_id", 1), ("is_critical", 1), ("timestamp", -1), ("_id", -1)])
+        
+        # Chat history pages and archival walk (user, time) order
+        if chat_messages_collection is not None:
+            await chat_messages_collection.create_index([("user_id", 1), ("timestamp", 1), ("_id", 1)])
         
         # Notification indexes
         if notifications_collection is not None:
@@ -293,6 +400,11 @@ async def init_db():
             await capital_injections_collection.create_index("user_id")
             await capital_injections_collection.create_index("timestamp")
         
+        # Advanced order (stop-loss / trailing / take-profit) triggers
+        if advanced_orders_collection is not None:
+            await advanced_orders_collection.create_index("id", unique=True)
+            await advanced_orders_collection.create_index([("status", 1), ("exchange", 1), ("pair", 1)])
+        
         logger.info("✅ Database indexes created successfully")
         
     except Exception as e:
@@ -304,6 +416,88 @@ async def init_db():
 # Utility Functions
 # ============================================================================
 
+# Trades store `timestamp` as an ISO string (legacy) and `ts` as a BSON datetime.
+# Readers switch to `ts` once migrations/trades_native_timestamps.py has backfilled it.
+TRADES_NATIVE_TS = os.getenv('TRADES_NATIVE_TS', 'false').lower() == 'true'
+
+
+# Audit logs store `ts` (BSON datetime) next to the ISO `timestamp`; reports range and
+# bucket on `ts` once migrations/audit_logs_native_timestamps.py has backfilled it.
+# Audit entries are compliance records, so nothing expires them unless
+# AUDIT_LOG_RETENTION_DAYS is set; then a TTL index on `ts` removes entries after it.
+AUDIT_NATIVE_TS = os.getenv('AUDIT_NATIVE_TS', 'false').lower() == 'true'
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv('AUDIT_LOG_RETENTION_DAYS') or 0) or None
+
+
+def trade_ts(value: Union[str, datetime, None] = None) -> datetime:
+    """Native UTC datetime for a trade's `ts` field (now if value is missing/invalid)"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc)
+
+
+def trade_time_field() -> str:
+    """Field to sort/range trades on"""
+    return "ts" if TRADES_NATIVE_TS else "timestamp"
+
+
+def trades_since(since: datetime) -> dict:
+    """Range filter for trades at or after `since`"""
+    if TRADES_NATIVE_TS:
+        return {"ts": {"$gte": since}}
+    return {"timestamp": {"$gte": since.isoformat()}}
+
+
+def trades_between(start: datetime, end: datetime) -> dict:
+    """Range filter for trades in [start, end)"""
+    if TRADES_NATIVE_TS:
+        return {"ts": {"$gte": start, "$lt": end}}
+    return {"timestamp": {"$gte": start.isoformat(), "$lt": end.isoformat()}}
+
+
+INDEX_OPTIONS_CONFLICT = 85
+
+
+async def ensure_ttl_index(collection, field: str, expire_after_seconds: int):
+    """
+    Create a TTL index on `field`, or apply a changed expiry to the existing one
+    
+    create_index with a different expireAfterSeconds raises IndexOptionsConflict,
+    so a changed retention is applied with collMod instead. A failure is logged
+    here rather than raised, so the indexes created after this one still are.
+    """
+    try:
+        await collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            logger.warning(f"TTL index on {collection.name}.{field} not created: {e}")
+            return
+        try:
+            await collection.database.command(
+                "collMod", collection.name,
+                index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after_seconds}
+            )
+            logger.info(f"TTL on {collection.name}.{field} changed to {expire_after_seconds}s")
+        except OperationFailure as e:
+            logger.warning(f"TTL on {collection.name}.{field} not changed: {e}")
+
+
+async def count_trades_today(**query) -> int:
+    """Trades since UTC midnight matching query
+
+    The one seed for cold daily trade counters in the shared rate limit
+    service, whichever limiter reads the bot/user/exchange key first.
+    """
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return await trades_collection.count_documents({**query, **trades_since(today)})
+
+
 def is_connected() -> bool:
     """Check if database is connected"""
     return client is not None and db is not None
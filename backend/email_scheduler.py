@@ -9,184 +9,29 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from email_service import email_service
+from services.report_pipeline import ReportPipeline, SmtpQueue, empty_stats, precompute_daily_stats
 
 logger = logging.getLogger(__name__)
 
-class EmailScheduler:
-    def __init__(self):
-        self.scheduler = AsyncIOScheduler()
-        self.db = None
-        
-    async def init_db(self):
-        """Initialize database connection"""
-        mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
-        db_name = os.getenv('DB_NAME', 'amarktai_trading')
-        client = AsyncIOMotorClient(mongo_url)
-        self.db = client[db_name]
-        
-    async def start(self):
-        """Start email scheduler"""
-        await self.init_db()
-        
-        # Schedule morning report at 8 AM
-        self.scheduler.add_job(
-            self.send_morning_reports,
-            trigger='cron',
-            hour=8,
-            minute=0,
-            timezone='Africa/Johannesburg',
-            id='morning_report'
-        )
-        
-        # Schedule evening report at 6 PM
-        self.scheduler.add_job(
-            self.send_evening_reports,
-            trigger='cron',
-            hour=18,
-            minute=0,
-            timezone='Africa/Johannesburg',
-            id='evening_report'
-        )
-        
-        self.scheduler.start()
-        logger.info("📧 Email Scheduler started - Reports at 8 AM and 6 PM")
-        
-    async def send_morning_reports(self):
-        """Send morning reports to all active users"""
-        try:
-            logger.info("📧 Sending morning reports...")
-            users = await self.db.users.find({'blocked': {'$ne': True}}, {'_id': 0}).to_list(1000)
-            
-            for user in users:
-                try:
-                    stats = await self.calculate_daily_stats(user['id'])
-                    await self.send_daily_report_email(
-                        user['email'],
-                        user.get('first_name', 'Trader'),
-                        stats,
-                        'morning'
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to send morning report to {user['email']}: {e}")
-                    
-            logger.info(f"✅ Morning reports sent to {len(users)} users")
-            
-        except Exception as e:
-            logger.error(f"Morning report batch error: {e}")
-            
-    async def send_evening_reports(self):
-        """Send evening reports to all active users"""
-        try:
-            logger.info("📧 Sending evening reports...")
-            users = await self.db.users.find({'blocked': {'$ne': True}}, {'_id': 0}).to_list(1000)
-            
-            for user in users:
-                try:
-                    stats = await self.calculate_daily_stats(user['id'])
-                    await self.send_daily_report_email(
-                        user['email'],
-                        user.get('first_name', 'Trader'),
-                        stats,
-                        'evening'
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to send evening report to {user['email']}: {e}")
-                    
-            logger.info(f"✅ Evening reports sent to {len(users)} users")
-            
-        except Exception as e:
-            logger.error(f"Evening report batch error: {e}")
-            
-    async def calculate_daily_stats(self, user_id: str) -> dict:
-        """Calculate today's trading statistics"""
-        try:
-            # Get today's start time
-            today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0).isoformat()
-            
-            # Get today's trades
-            trades = await self.db.trades.find({
-                'user_id': user_id,
-                'timestamp': {'$gte': today_start}
-            }).to_list(10000)
-            
-            # Get all user bots
-            bots = await self.db.bots.find({'user_id': user_id}, {'_id': 0}).to_list(1000)
-            
-            # Calculate stats
-            total_trades = len(trades)
-            winning_trades = sum(1 for t in trades if t.get('profit_loss', 0) > 0)
-            losing_trades = total_trades - winning_trades
-            win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-            
-            total_profit = sum(t.get('profit_loss', 0) for t in trades)
-            total_volume = sum(t.get('amount', 0) * t.get('price', 0) for t in trades)
-            
-            active_bots = sum(1 for b in bots if b.get('status') == 'active')
-            total_bots = len(bots)
-            
-            # Best performing bot
-            bot_profits = {}
-            for trade in trades:
-                bot_id = trade.get('bot_id')
-                if bot_id:
-                    bot_profits[bot_id] = bot_profits.get(bot_id, 0) + trade.get('profit_loss', 0)
-            
-            best_bot = None
-            best_profit = 0
-            if bot_profits:
-                best_bot_id = max(bot_profits, key=bot_profits.get)
-                best_profit = bot_profits[best_bot_id]
-                bot_doc = await self.db.bots.find_one({'id': best_bot_id}, {'_id': 0})
-                if bot_doc:
-                    best_bot = bot_doc.get('name', 'Unknown')
-            
-            return {
-                'total_trades': total_trades,
-                'winning_trades': winning_trades,
-                'losing_trades': losing_trades,
-                'win_rate': win_rate,
-                'total_profit': total_profit,
-                'total_volume': total_volume,
-                'active_bots': active_bots,
-                'total_bots': total_bots,
-                'best_bot': best_bot,
-                'best_bot_profit': best_profit
-            }
-            
-        except Exception as e:
-            logger.error(f"Error calculating stats for {user_id}: {e}")
-            return {
-                'total_trades': 0,
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate': 0,
-                'total_profit': 0,
-                'total_volume': 0,
-                'active_bots': 0,
-                'total_bots': 0,
-                'best_bot': None,
-                'best_bot_profit': 0
-            }
-            
-    async def send_daily_report_email(self, to_email: str, first_name: str, stats: dict, period: str):
-        """Send comprehensive daily report email"""
-        
-        # Determine subject and greeting based on time of day
-        if period == 'morning':
-            subject = f"☀️ Good Morning {first_name} - Your Trading Summary"
-            greeting = "Good Morning"
-            time_context = "Here's your overnight trading summary"
-        else:
-            subject = f"🌙 Good Evening {first_name} - Today's Results"
-            greeting = "Good Evening"
-            time_context = "Here's your full day trading summary"
-        
-        profit = stats['total_profit']
-        profit_color = '#10b981' if profit >= 0 else '#ef4444'
-        profit_symbol = '+' if profit >= 0 else ''
-        profit_text = 'Profit' if profit >= 0 else 'Loss'
-        
-        html_body = f"""
+def render_scheduled_report(first_name: str, stats: dict, period: str):
+    """Render the morning/evening report; returns (subject, html)"""
+    
+    # Determine subject and greeting based on time of day
+    if period == 'morning':
+        subject = f"☀️ Good Morning {first_name} - Your Trading Summary"
+        greeting = "Good Morning"
+        time_context = "Here's your overnight trading summary"
+    else:
+        subject = f"🌙 Good Evening {first_name} - Today's Results"
+        greeting = "Good Evening"
+        time_context = "Here's your full day trading summary"
+    
+    profit = stats['total_profit']
+    profit_color = '#10b981' if profit >= 0 else '#ef4444'
+    profit_symbol = '+' if profit >= 0 else ''
+    profit_text = 'Profit' if profit >= 0 else 'Loss'
+    
+    html_body = f"""
         <html>
         <head>
             <style>
@@ -286,6 +131,108 @@ class EmailScheduler:
         </body>
         </html>
         """
+    
+    return subject, html_body
+
+
+class EmailScheduler:
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler()
+        self.db = None
+    
+    async def init_db(self):
+        """Initialize database connection"""
+        mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+        db_name = os.getenv('DB_NAME', 'amarktai_trading')
+        client = AsyncIOMotorClient(mongo_url)
+        self.db = client[db_name]
+    
+    async def start(self):
+        """Start email scheduler"""
+        await self.init_db()
+        
+        # Schedule morning report at 8 AM
+        self.scheduler.add_job(
+            self.send_morning_reports,
+            trigger='cron',
+            hour=8,
+            minute=0,
+            timezone='Africa/Johannesburg',
+            id='morning_report'
+        )
+        
+        # Schedule evening report at 6 PM
+        self.scheduler.add_job(
+            self.send_evening_reports,
+            trigger='cron',
+            hour=18,
+            minute=0,
+            timezone='Africa/Johannesburg',
+            id='evening_report'
+        )
+        
+        self.scheduler.start()
+        logger.info("📧 Email Scheduler started - Reports at 8 AM and 6 PM")
+    
+    async def send_morning_reports(self):
+        """Send morning reports to all active users"""
+        logger.info("📧 Sending morning reports...")
+        return await self.send_scheduled_reports('morning')
+    
+    async def send_evening_reports(self):
+        """Send evening reports to all active users"""
+        logger.info("📧 Sending evening reports...")
+        return await self.send_scheduled_reports('evening')
+    
+    async def send_scheduled_reports(self, period: str) -> dict:
+        """Send one period's reports through the batched report pipeline"""
+        try:
+            now = datetime.now(timezone.utc)
+            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            
+            def render(user, stats):
+                return render_scheduled_report(user.get('first_name', 'Trader'), stats, period)
+            
+            smtp = SmtpQueue(
+                email_service.smtp_server,
+                email_service.smtp_port,
+                email_service.smtp_user,
+                email_service.smtp_password,
+                f"{email_service.from_name} <{email_service.from_email}>"
+            )
+            pipeline = ReportPipeline(self.db, smtp)
+            summary = await pipeline.run(
+                f"{period}:{today_start.date().isoformat()}",
+                render,
+                today_start,
+                now,
+                user_query={'blocked': {'$ne': True}}
+            )
+            
+            logger.info(f"✅ {period.capitalize()} reports sent to {summary.get('sent', 0)} users")
+            return summary
+        
+        except Exception as e:
+            logger.error(f"{period.capitalize()} report batch error: {e}")
+            return {"error": str(e)}
+    
+    async def calculate_daily_stats(self, user_id: str) -> dict:
+        """Calculate today's trading statistics"""
+        try:
+            now = datetime.now(timezone.utc)
+            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            user = await self.db.users.find_one({'id': user_id}, {'_id': 0, 'id': 1, 'funded_capital': 1})
+            
+            stats = await precompute_daily_stats(self.db, [user or {'id': user_id}], today_start, now)
+            return stats[user_id]
+        
+        except Exception as e:
+            logger.error(f"Error calculating stats for {user_id}: {e}")
+            return empty_stats()
+    
+    async def send_daily_report_email(self, to_email: str, first_name: str, stats: dict, period: str):
+        """Send comprehensive daily report email"""
+        subject, html_body = render_scheduled_report(first_name, stats, period)
         
         try:
             success = await email_service.send_email(
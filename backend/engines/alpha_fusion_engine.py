@@ -22,6 +22,7 @@ from engines.order_flow_imbalance import ofi_calculator, OFISignal
 from engines.on_chain_monitor import whale_monitor, WhaleSignal
 from engines.sentiment_analyzer import sentiment_analyzer, AggregatedSentiment
 from engines.macro_news_monitor import macro_monitor, MacroSignal
+from services.decision_bus import decision_bus
 
 logger = logging.getLogger(__name__)
 
@@ -365,6 +366,36 @@ class AlphaFusionEngine:
             reasoning=reasoning
         )
         
+        # Decision trace (no-op unless the decision bus is recording)
+        trace = decision_bus.trace("alpha_fusion", symbol=symbol, bot_id=None, user_id=None)
+        trace.publish(
+            signal_strength.value,
+            confidence=avg_confidence,
+            score=weighted_score,
+            component_scores=component_scores,
+            component_confidence={
+                'regime': regime_conf,
+                'ofi': ofi_conf,
+                'whale': whale_conf,
+                'sentiment': sentiment_conf,
+                'macro': macro_conf
+            },
+            component_weights=self.weights,
+            regime_state={
+                "regime": regime_state.regime.value,
+                "confidence": regime_state.confidence,
+                "volatility": regime_state.volatility
+            } if regime_state else None,
+            sizing={
+                "position_size_multiplier": position_multiplier,
+                "macro_risk_multiplier": macro_signal.risk_multiplier if macro_signal else None
+            },
+            position_size_multiplier=position_multiplier,
+            stop_loss_pct=stop_loss_pct,
+            take_profit_pct=take_profit_pct,
+            reasoning=reasoning
+        )
+        
         logger.info(
             f"Alpha fusion for {symbol}: {signal_strength.value} "
             f"(score: {weighted_score:.2f}, confidence: {avg_confidence:.0%})"
@@ -4,23 +4,69 @@ Audit Logger - Production-grade audit trail
 - Tracks user actions, bot actions, system events
 - Generates compliance reports
 - Supports forensic analysis
+- Reads trails a keyset page at a time, or streams them for export
+
+Compliance reports and statistics are counted by MongoDB: one $group on
+(day, event_type, severity, is_critical) over the range. Counts of closed
+UTC days are kept in audit_daily_stats per (user, day), so a report re-reads
+only today and partial days at the range edges. Entries carry a native
+datetime `ts` (reports use it once AUDIT_NATIVE_TS is on) with a TTL index
+for retention; cleanup_old_logs deletes anything older in batches.
 """
 
 import asyncio
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 import logging
 
+from pymongo import UpdateOne
+
 import database as db
+from engines.market_data import parse_timestamp
+from services.pagination import PAGE_SIZE, PaginationError, keyset_page, keyset_stream, parse_fields
 
 logger = logging.getLogger(__name__)
 
-# Create audit_logs collection reference
-audit_logs_collection = db.audit_logs
+DAY = timedelta(days=1)
+REPORT_CRITICAL_LIMIT = 100  # newest critical events listed in a compliance report
+CLEANUP_BATCH_SIZE = 1000
+
+# Fields clients may select (fields=...) on audit trail reads
+AUDIT_FIELDS = (
+    "event_type", "user_id", "severity", "details", "timestamp", "ip_address", "user_agent", "is_critical"
+)
+
+
+def _day_start(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _report_range(start_date: str, end_date: str) -> Tuple[datetime, datetime]:
+    """[start, end) for a report; a date-only end_date includes that whole day"""
+    start = parse_timestamp(start_date)
+    end = parse_timestamp(end_date)
+    return start, end + (DAY if len(end_date.strip()) == 10 else timedelta(microseconds=1))
+
+
+def _fold(rows: List[Dict]) -> Dict:
+    """Totals from (event_type, severity, is_critical, count) rows"""
+    counts = {"total": 0, "critical": 0, "by_type": {}, "by_severity": {"info": 0, "warning": 0, "critical": 0}}
+    for row in rows:
+        count = row["count"]
+        event_type = row.get("event_type") or "unknown"
+        severity = row.get("severity") or "info"
+        counts["total"] += count
+        counts["critical"] += count if row.get("is_critical") else 0
+        counts["by_type"][event_type] = counts["by_type"].get(event_type, 0) + count
+        counts["by_severity"][severity] = counts["by_severity"].get(severity, 0) + count
+    return counts
+
 
 class AuditLogger:
     def __init__(self):
-        self.log_retention_days = 90  # Keep logs for 90 days
+        # Default for manual cleanup; a TTL index on `ts` only exists when AUDIT_LOG_RETENTION_DAYS is set
+        self.log_retention_days = db.AUDIT_LOG_RETENTION_DAYS or 90
         self.critical_events = [
             'bot_created',
             'bot_deleted',
@@ -33,6 +79,16 @@ class AuditLogger:
             'system_mode_changed'
         ]
     
+    @property
+    def collection(self):
+        """audit_logs collection, looked up per call (it is set when the database connects)"""
+        return db.audit_logs_collection
+    
+    @property
+    def daily_stats(self):
+        """audit_daily_stats collection: event counts of closed days per (user, day)"""
+        return db.audit_daily_stats_collection
+    
     async def log_event(self, event_type: str, user_id: str, details: Dict, 
                        severity: str = 'info') -> bool:
         """
@@ -45,12 +101,14 @@ class AuditLogger:
             severity: 'info', 'warning', 'critical'
         """
         try:
+            now = datetime.now(timezone.utc)
             audit_entry = {
                 "event_type": event_type,
                 "user_id": user_id,
                 "severity": severity,
                 "details": details,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now.isoformat(),
+                "ts": now,
                 "ip_address": details.get('ip_address', 'unknown'),
                 "user_agent": details.get('user_agent', 'unknown')
             }
@@ -59,7 +117,7 @@ class AuditLogger:
             audit_entry['is_critical'] = event_type in self.critical_events
             
             # Insert into audit log
-            await audit_logs_collection.insert_one(audit_entry)
+            await self.collection.insert_one(audit_entry)
             
             # Log critical events to system logger too
             if audit_entry['is_critical']:
@@ -160,84 +218,176 @@ class AuditLogger:
             severity='info'
         )
     
-    async def get_user_audit_trail(self, user_id: str, 
-                                   days: int = 7,
-                                   event_types: List[str] = None) -> List[Dict]:
-        """Get audit trail for a user"""
+    def _trail_query(self, user_id: str, days: int, event_types: Optional[List[str]] = None,
+                     critical_only: bool = False) -> Dict:
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        query = {"user_id": user_id, "timestamp": {"$gte": since}}
+        if event_types:
+            query["event_type"] = {"$in": event_types}
+        if critical_only:
+            query["is_critical"] = True
+        return query
+    
+    async def audit_trail_page(self, user_id: str, days: int = 7,
+                               event_types: List[str] = None,
+                               critical_only: bool = False,
+                               limit: int = PAGE_SIZE,
+                               cursor: Optional[str] = None,
+                               fields: Optional[str] = None) -> Dict:
+        """
+        One page of a user's audit trail, newest first
+        
+        fields: comma-separated AUDIT_FIELDS to return (timestamp always)
+        Returns: {"logs", "next_cursor"}; pass next_cursor back for the next page
+        
+        Raises PaginationError for an invalid cursor or field.
+        """
+        scope = {"user_id": user_id, "days": days, "event_types": event_types, "critical_only": critical_only}
         try:
-            since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-            
-            query = {
-                "user_id": user_id,
-                "timestamp": {"$gte": since}
-            }
-            
-            if event_types:
-                query["event_type"] = {"$in": event_types}
-            
-            logs = await audit_logs_collection.find(
-                query,
-                {"_id": 0}
-            ).sort("timestamp", -1).limit(1000).to_list(1000)
-            
-            return logs
+            logs, next_cursor = await keyset_page(
+                self.collection,
+                self._trail_query(user_id, days, event_types, critical_only),
+                limit, cursor, parse_fields(fields, AUDIT_FIELDS), scope=scope
+            )
+            for log in logs:
+                del log["_id"]
+            return {"logs": logs, "next_cursor": next_cursor}
             
+        except PaginationError:
+            raise
         except Exception as e:
-            logger.error(f"Get audit trail error: {e}")
-            return []
+            logger.error(f"Get audit trail page error: {e}")
+            return {"logs": [], "next_cursor": None}
     
-    async def get_critical_events(self, user_id: str, days: int = 30) -> List[Dict]:
-        """Get all critical events for a user"""
-        try:
-            since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-            
-            critical_logs = await audit_logs_collection.find(
-                {
-                    "user_id": user_id,
-                    "is_critical": True,
-                    "timestamp": {"$gte": since}
+    async def get_user_audit_trail(self, user_id: str, 
+                                   days: int = 7,
+                                   event_types: List[str] = None,
+                                   limit: int = 1000) -> List[Dict]:
+        """Get the latest `limit` audit events for a user"""
+        page = await self.audit_trail_page(user_id, days, event_types, limit=limit)
+        return page["logs"]
+    
+    async def get_critical_events(self, user_id: str, days: int = 30, limit: int = 1000) -> List[Dict]:
+        """Get the latest `limit` critical events for a user"""
+        page = await self.audit_trail_page(user_id, days, critical_only=True, limit=limit)
+        return page["logs"]
+    
+    def export_audit_trail(self, user_id: str, days: int = 90,
+                           event_types: List[str] = None,
+                           critical_only: bool = False,
+                           fields: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Every matching audit event, newest first, read in keyset batches"""
+        projection = parse_fields(fields, AUDIT_FIELDS)  # raises before the first read
+        query = self._trail_query(user_id, days, event_types, critical_only)
+        
+        async def logs():
+            async for log in keyset_stream(self.collection, query, projection):
+                del log["_id"]
+                yield log
+        
+        return logs()
+    
+    def _time_field(self) -> str:
+        return "ts" if db.AUDIT_NATIVE_TS else "timestamp"
+    
+    def _between(self, start: datetime, end: datetime) -> Dict:
+        """Range filter for entries in [start, end)"""
+        if db.AUDIT_NATIVE_TS:
+            return {"ts": {"$gte": start, "$lt": end}}
+        # Stored strings are UTC isoformat, so bounds must be too to compare as text
+        return {"timestamp": {
+            "$gte": start.astimezone(timezone.utc).isoformat(),
+            "$lt": end.astimezone(timezone.utc).isoformat()
+        }}
+    
+    def _day_expr(self) -> Dict:
+        """UTC day (YYYY-MM-DD) of an entry"""
+        if db.AUDIT_NATIVE_TS:
+            return {"$dateToString": {"format": "%Y-%m-%d", "date": "$ts"}}
+        return {"$substrCP": ["$timestamp", 0, 10]}
+    
+    async def _event_counts(self, user_id: str, start: datetime, end: datetime) -> Dict:
+        """Event totals for [start, end): cached closed days plus one $group over the rest"""
+        today = _day_start(datetime.now(timezone.utc))
+        first_day = _day_start(start) if start == _day_start(start) else _day_start(start) + DAY
+        closed_end = max(first_day, min(_day_start(end), today))
+        closed_days = [(first_day + i * DAY).strftime("%Y-%m-%d") for i in range((closed_end - first_day).days)]
+        
+        rows = []
+        cached = set()
+        if closed_days:
+            docs = await self.daily_stats.find(
+                {"_id": {"$in": [f"{user_id}:{day}" for day in closed_days]}}
+            ).to_list(None)
+            for doc in docs:
+                cached.add(doc["day"])
+                rows.extend(doc["counts"])
+        missing = [day for day in closed_days if day not in cached]
+        
+        # Uncached closed days plus the partial / still open days at the edges
+        ranges = [(start, min(first_day, end)), (closed_end, end)]
+        if missing:
+            ranges.append((parse_timestamp(missing[0]), parse_timestamp(missing[-1]) + DAY))
+        ranges = [(a, b) for a, b in ranges if a < b]
+        if not ranges:
+            return _fold(rows)
+        
+        groups = await self.collection.aggregate([
+            {"$match": {"user_id": user_id, "$or": [self._between(a, b) for a, b in ranges]}},
+            {"$group": {
+                "_id": {
+                    "day": self._day_expr(),
+                    "event_type": "$event_type",
+                    "severity": "$severity",
+                    "is_critical": "$is_critical"
                 },
-                {"_id": 0}
-            ).sort("timestamp", -1).to_list(1000)
-            
-            return critical_logs
-            
-        except Exception as e:
-            logger.error(f"Get critical events error: {e}")
-            return []
+                "count": {"$sum": 1}
+            }}
+        ]).to_list(None)
+        
+        by_day = defaultdict(list)
+        for group in groups:
+            key = group["_id"]
+            by_day[key["day"]].append({
+                "event_type": key.get("event_type"),
+                "severity": key.get("severity"),
+                "is_critical": bool(key.get("is_critical")),
+                "count": group["count"]
+            })
+        for day, day_rows in by_day.items():
+            if day not in cached:  # the missing-days range can span cached days
+                rows.extend(day_rows)
+        
+        if missing:
+            computed_at = datetime.now(timezone.utc)
+            await self.daily_stats.bulk_write([
+                UpdateOne(
+                    {"_id": f"{user_id}:{day}"},
+                    {"$set": {"user_id": user_id, "day": day, "counts": by_day.get(day, []), "computed_at": computed_at}},
+                    upsert=True
+                )
+                for day in missing
+            ], ordered=False)
+        
+        return _fold(rows)
     
     async def generate_compliance_report(self, user_id: str, 
                                         start_date: str, 
                                         end_date: str) -> Dict:
-        """Generate compliance report for a date range"""
+        """
+        Generate compliance report for a date range
+        
+        Counts cover every event in the range; critical_events lists the newest
+        REPORT_CRITICAL_LIMIT (page through the rest with audit_trail_page).
+        """
         try:
-            logs = await audit_logs_collection.find(
-                {
-                    "user_id": user_id,
-                    "timestamp": {
-                        "$gte": start_date,
-                        "$lte": end_date
-                    }
-                },
-                {"_id": 0}
-            ).to_list(10000)
-            
-            # Categorize events
-            by_type = {}
-            by_severity = {"info": 0, "warning": 0, "critical": 0}
-            
-            for log in logs:
-                event_type = log.get('event_type', 'unknown')
-                severity = log.get('severity', 'info')
-                
-                if event_type not in by_type:
-                    by_type[event_type] = 0
-                by_type[event_type] += 1
-                
-                by_severity[severity] += 1
+            start, end = _report_range(start_date, end_date)
+            counts = await self._event_counts(user_id, start, end)
             
-            # Get critical events
-            critical = [log for log in logs if log.get('is_critical')]
+            critical = await self.collection.find(
+                {"user_id": user_id, "is_critical": True, **self._between(start, end)},
+                {"_id": 0}
+            ).sort(self._time_field(), -1).limit(REPORT_CRITICAL_LIMIT).to_list(REPORT_CRITICAL_LIMIT)
             
             return {
                 "user_id": user_id,
@@ -245,10 +395,11 @@ class AuditLogger:
                     "start": start_date,
                     "end": end_date
                 },
-                "total_events": len(logs),
-                "by_type": by_type,
-                "by_severity": by_severity,
+                "total_events": counts["total"],
+                "by_type": counts["by_type"],
+                "by_severity": counts["by_severity"],
                 "critical_events": critical,
+                "critical_events_total": counts["critical"],
                 "generated_at": datetime.now(timezone.utc).isoformat()
             }
             
@@ -256,21 +407,35 @@ class AuditLogger:
             logger.error(f"Compliance report error: {e}")
             return {"error": str(e)}
     
-    async def cleanup_old_logs(self, days: int = None) -> Dict:
-        """Clean up audit logs older than retention period"""
+    async def cleanup_old_logs(self, days: int = None, batch_size: int = CLEANUP_BATCH_SIZE) -> Dict:
+        """
+        Clean up audit logs older than retention period
+        
+        The TTL index expires entries that carry `ts`; this covers older
+        entries and shorter retentions, deleting batch_size at a time.
+        """
         try:
             retention = days or self.log_retention_days
             cutoff = (datetime.now(timezone.utc) - timedelta(days=retention)).isoformat()
+            query = {"timestamp": {"$lt": cutoff}}
             
-            result = await audit_logs_collection.delete_many({
-                "timestamp": {"$lt": cutoff}
-            })
+            deleted = 0
+            batches = 0
+            while True:
+                docs = await self.collection.find(query, {"_id": 1}).limit(batch_size).to_list(batch_size)
+                if not docs:
+                    break
+                result = await self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+                deleted += result.deleted_count
+                batches += 1
+                await asyncio.sleep(0)  # let other requests in between batches
             
-            logger.info(f"🧹 Cleaned up {result.deleted_count} old audit logs")
+            logger.info(f"🧹 Cleaned up {deleted} old audit logs in {batches} batches")
             
             return {
                 "success": True,
-                "deleted_count": result.deleted_count,
+                "deleted_count": deleted,
+                "batches": batches,
                 "cutoff_date": cutoff
             }
             
@@ -281,24 +446,17 @@ class AuditLogger:
     async def get_statistics(self, user_id: str, days: int = 30) -> Dict:
         """Get audit log statistics"""
         try:
-            since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-            
-            logs = await audit_logs_collection.find(
-                {
-                    "user_id": user_id,
-                    "timestamp": {"$gte": since}
-                },
-                {"_id": 0}
-            ).to_list(10000)
+            now = datetime.now(timezone.utc)
+            counts = await self._event_counts(user_id, now - timedelta(days=days), now + timedelta(microseconds=1))
+            by_type = counts["by_type"]
             
             return {
                 "user_id": user_id,
                 "period_days": days,
-                "total_events": len(logs),
-                "critical_events": len([l for l in logs if l.get('is_critical')]),
-                "most_common_event": max(set([l.get('event_type') for l in logs]), 
-                                        key=[l.get('event_type') for l in logs].count) if logs else None,
-                "timestamp": datetime.now(timezone.utc).isoformat()
+                "total_events": counts["total"],
+                "critical_events": counts["critical"],
+                "most_common_event": max(by_type, key=by_type.get) if by_type else None,
+                "timestamp": now.isoformat()
             }
             
         except Exception as e:
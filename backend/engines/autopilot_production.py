@@ -8,6 +8,7 @@ Production Autopilot Engine - Complete Implementation
 import asyncio
 from datetime import datetime, timezone
 import database as db
+from pymongo import UpdateOne
 from engines.bot_manager import bot_manager
 from logger_config import logger
 from config import NEW_BOT_CAPITAL, MAX_TOTAL_BOTS, EXCHANGE_BOT_LIMITS
@@ -28,9 +29,9 @@ class ProductionAutopilot:
     async def calculate_total_profit(self, user_id: str) -> float:
         """Calculate total unreinvested profit across all bots"""
         try:
-            bots = await db.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-            total_profit = sum(bot.get('total_profit', 0) for bot in bots)
-            return total_profit
+            from services.portfolio_state import portfolio_state
+            portfolio = await portfolio_state.get(user_id)
+            return portfolio['capital']['total_profit']
         except Exception as e:
             logger.error(f"Calculate profit error: {e}")
             return 0.0
@@ -131,20 +132,13 @@ class ProductionAutopilot:
                 # Track capital injections separately
                 from engines.capital_injection_tracker import capital_tracker
                 
-                for bot in top_bots:
-                    new_capital = bot.get('current_capital', 0) + reinvest_per_bot
-                    await db.bots_collection.update_one(
-                        {"id": bot['id']},
-                        {"$set": {"current_capital": new_capital}}
-                    )
-                    
-                    # Record injection (keeps profit reporting accurate)
-                    await capital_tracker.record_injection(
-                        bot_id=bot['id'],
-                        amount=reinvest_per_bot,
-                        source="autopilot",
-                        reason="Top performer reinvestment"
-                    )
+                # Capital and injection records for all top bots in one batch
+                # (keeps profit reporting accurate)
+                await capital_tracker.record_injections(
+                    {bot['id']: reinvest_per_bot for bot in top_bots},
+                    source="autopilot",
+                    reason="Top performer reinvestment"
+                )
                 
                 # DON'T reset profit counter - injections are tracked separately now
                 # await db.bots_collection.update_many(
@@ -224,20 +218,15 @@ class ProductionAutopilot:
             bottom_performers = sorted_bots[-bottom_30_count:]
             
             # Calculate capital to move (10% from each bottom performer)
-            total_to_move = 0
+            moves = {}
             for bot in bottom_performers:
                 current_capital = bot.get('current_capital', 0)
                 min_capital = bot.get('initial_capital', 1000) * 0.5  # Keep at least 50% of initial
                 
                 if current_capital > min_capital:
-                    move_amount = min(current_capital * 0.1, current_capital - min_capital)
-                    total_to_move += move_amount
-                    
-                    # Reduce bottom performer capital
-                    await db.bots_collection.update_one(
-                        {"id": bot['id']},
-                        {"$inc": {"current_capital": -move_amount}}
-                    )
+                    moves[bot['id']] = -min(current_capital * 0.1, current_capital - min_capital)
+            
+            total_to_move = -sum(moves.values())
             
             if total_to_move < 50:  # Not worth rebalancing if < R50
                 return {
@@ -247,12 +236,14 @@ class ProductionAutopilot:
             
             # Distribute to top performers
             per_top_bot = total_to_move / len(top_performers)
-            
             for bot in top_performers:
-                await db.bots_collection.update_one(
-                    {"id": bot['id']},
-                    {"$inc": {"current_capital": per_top_bot}}
-                )
+                moves[bot['id']] = moves.get(bot['id'], 0) + per_top_bot
+            
+            # Debits and credits in one bulk write
+            await db.bots_collection.bulk_write([
+                UpdateOne({"id": bot_id}, {"$inc": {"current_capital": amount}})
+                for bot_id, amount in moves.items()
+            ], ordered=False)
             
             # Update last rebalance time
             self.last_rebalance[user_id] = now
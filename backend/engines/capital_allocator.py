@@ -12,48 +12,23 @@ import logging
 
 import database as db
 from engines.wallet_manager import wallet_manager
+from engines.portfolio_allocator import (
+    portfolio_allocator, performance_tiers, tier_allocation, RISK_WEIGHTS, PERFORMANCE_TIERS
+)
 
 logger = logging.getLogger(__name__)
 
 class CapitalAllocator:
     def __init__(self):
-        self.risk_weights = {
-            'safe': 1.0,       # Base allocation
-            'balanced': 1.2,   # 20% more capital
-            'risky': 1.5,      # 50% more capital
-            'aggressive': 2.0  # 2x capital
-        }
+        self.risk_weights = RISK_WEIGHTS
         
         # Performance multipliers
-        self.performance_tiers = {
-            'elite': 2.0,      # Top 10% performers get 2x
-            'high': 1.5,       # Top 25% get 1.5x
-            'average': 1.0,    # Middle 50% get base
-            'low': 0.7,        # Bottom 25% get 0.7x
-            'poor': 0.5        # Bottom 10% get 0.5x
-        }
+        self.performance_tiers = PERFORMANCE_TIERS
     
     async def get_bot_performance_tier(self, bot: Dict) -> str:
         """Determine performance tier for a bot"""
         try:
-            total_profit = bot.get('total_profit', 0)
-            roi = (total_profit / bot.get('initial_capital', 1000)) * 100 if bot.get('initial_capital', 0) > 0 else 0
-            win_rate = (bot.get('win_count', 0) / bot.get('trades_count', 1)) * 100 if bot.get('trades_count', 0) > 0 else 0
-            
-            # Scoring: ROI (60%) + Win Rate (40%)
-            score = (roi * 0.6) + (win_rate * 0.4)
-            
-            if score >= 10:
-                return 'elite'
-            elif score >= 5:
-                return 'high'
-            elif score >= 0:
-                return 'average'
-            elif score >= -5:
-                return 'low'
-            else:
-                return 'poor'
-                
+            return performance_tiers([bot])[0]
         except Exception as e:
             logger.error(f"Performance tier calculation error: {e}")
             return 'average'
@@ -70,87 +45,32 @@ class CapitalAllocator:
             
             total_capital = master_balance.get('total_zar', 0)
             
-            # Base allocation per bot (80% of capital / 45 bots)
-            base_allocation = (total_capital * 0.8) / 45
-            
-            # Apply risk mode multiplier
-            risk_mode = bot.get('risk_mode', 'safe')
-            risk_multiplier = self.risk_weights.get(risk_mode, 1.0)
-            
-            # Apply performance multiplier
-            performance_tier = await self.get_bot_performance_tier(bot)
-            performance_multiplier = self.performance_tiers.get(performance_tier, 1.0)
-            
-            # Calculate final allocation
-            optimal_allocation = base_allocation * risk_multiplier * performance_multiplier
-            
-            # Apply limits (min R500, max R10,000)
-            optimal_allocation = max(500, min(optimal_allocation, 10000))
-            
-            return optimal_allocation
+            # Same tier solve the portfolio allocator runs for all bots at once
+            return float(tier_allocation([bot], total_capital)[0])
             
         except Exception as e:
             logger.error(f"Optimal allocation calculation error: {e}")
             return 1000.0
     
-    async def rebalance_all_bots(self, user_id: str) -> Dict:
-        """Rebalance capital across all bots based on performance"""
+    async def rebalance_all_bots(self, user_id: str, method: str = 'tier', dry_run: bool = False) -> Dict:
+        """Rebalance capital across all bots based on performance
+        
+        Args:
+            method: 'tier' (risk mode x performance tier), 'risk_parity' or 'kelly'
+            dry_run: Return the planned changes without writing them
+        """
         try:
-            # Get all active bots
-            bots = await db.bots_collection.find(
-                {"user_id": user_id, "status": "active"},
-                {"_id": 0}
-            ).to_list(1000)
-            
-            if not bots:
-                return {
-                    "success": False,
-                    "message": "No active bots to rebalance"
-                }
-            
-            rebalanced = []
-            
-            for bot in bots:
-                # Calculate optimal allocation
-                optimal = await self.calculate_optimal_allocation(user_id, bot)
-                current = bot.get('current_capital', 1000)
-                
-                # Only rebalance if difference is significant (>20%)
-                diff_pct = abs(optimal - current) / current if current > 0 else 1
-                
-                if diff_pct > 0.20:
-                    # Update bot capital
-                    await db.bots_collection.update_one(
-                        {"id": bot['id']},
-                        {"$set": {"current_capital": optimal}}
-                    )
-                    
-                    rebalanced.append({
-                        "bot_id": bot['id'],
-                        "bot_name": bot['name'],
-                        "old_capital": current,
-                        "new_capital": optimal,
-                        "change": optimal - current,
-                        "change_pct": ((optimal - current) / current) * 100
-                    })
-                    
-                    logger.info(f"💰 Rebalanced {bot['name']}: R{current:.2f} → R{optimal:.2f}")
-            
-            # Log rebalancing action
-            if rebalanced:
-                await db.autopilot_actions_collection.insert_one({
-                    "user_id": user_id,
-                    "action_type": "capital_rebalance",
-                    "bots_affected": len(rebalanced),
-                    "details": rebalanced,
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                })
+            result = await portfolio_allocator.rebalance(user_id, method=method, dry_run=dry_run)
+            if not result.get('success'):
+                return result
             
             return {
                 "success": True,
-                "rebalanced_count": len(rebalanced),
-                "total_bots": len(bots),
-                "changes": rebalanced
+                "dry_run": dry_run,
+                "method": method,
+                "rebalanced_count": result['rebalanced_count'],
+                "total_bots": result['total_bots'],
+                "changes": result['changes']
             }
             
         except Exception as e:
@@ -214,7 +134,9 @@ class CapitalAllocator:
             by_risk = {}
             by_performance = {}
             
-            for bot in bots:
+            tiers = performance_tiers(bots) if bots else []
+            
+            for bot, tier in zip(bots, tiers):
                 # Group by risk mode
                 risk = bot.get('risk_mode', 'safe')
                 if risk not in by_risk:
@@ -223,7 +145,6 @@ class CapitalAllocator:
                 by_risk[risk]['capital'] += bot.get('current_capital', 0)
                 
                 # Group by performance tier
-                tier = await self.get_bot_performance_tier(bot)
                 if tier not in by_performance:
                     by_performance[tier] = {"count": 0, "capital": 0}
                 by_performance[tier]['count'] += 1
@@ -9,6 +9,7 @@ from typing import Dict
 import logging
 
 import database as db
+from pymongo import UpdateOne
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,47 @@ class CapitalInjectionTracker:
             logger.error(f"Record injection error: {e}")
             return False
     
+    async def record_injections(self, amounts: Dict[str, float], source: str, reason: str) -> bool:
+        """
+        Record capital injections into several bots at once
+        
+        Adds each amount to the bot's current_capital and total_injections with one
+        bulk_write, and inserts the injection records with one insert_many.
+        
+        Args:
+            amounts: bot_id -> amount injected
+            source: Where capital came from ('autopilot', 'user', 'rebalance')
+            reason: Reason for injection
+        """
+        if not amounts:
+            return True
+        
+        try:
+            now = datetime.now(timezone.utc).isoformat()
+            
+            await db.bots_collection.bulk_write([
+                UpdateOne(
+                    {"id": bot_id},
+                    {
+                        "$inc": {"current_capital": amount, "total_injections": amount},
+                        "$set": {"last_injection_at": now}
+                    }
+                )
+                for bot_id, amount in amounts.items()
+            ], ordered=False)
+            
+            await db.capital_injections_collection.insert_many([
+                {"bot_id": bot_id, "amount": amount, "source": source, "reason": reason, "timestamp": now}
+                for bot_id, amount in amounts.items()
+            ])
+            
+            logger.info(f"💉 Capital injection: R{sum(amounts.values()):.2f} → {len(amounts)} bots ({source})")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Record injections error: {e}")
+            return False
+    
     async def get_bot_injections(self, bot_id: str) -> float:
         """Get total capital injected into a bot"""
         try:
@@ -5,7 +5,9 @@ Uses immutable ledger data as single source of truth
 """
 
 import asyncio
-from typing import Dict, Tuple
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 import logging
 
@@ -21,12 +23,14 @@ class CircuitBreaker:
         self.max_global_drawdown = 0.15  # 15% total system
         self.max_consecutive_losses = 5  # 5 losses in a row
         self.max_errors_per_hour = 10  # 10 errors/hour
+        self.sweep_concurrency = 8  # Users swept in parallel
+        self.last_sweep: Optional[Dict] = None
         
     async def check_bot_drawdown_ledger(self, user_id: str, bot_id: str, ledger_service) -> Tuple[bool, str]:
         """Check if bot has exceeded drawdown limits - LEDGER-BASED"""
         try:
-            # Get drawdown from ledger (single source of truth)
-            current_dd, max_dd = await ledger_service.compute_drawdown(user_id, bot_id=bot_id)
+            # Get drawdown from ledger (single source of truth), this bot's fills and funding only
+            current_dd, max_dd = await ledger_service.compute_drawdown(bot_id=bot_id)
             
             if current_dd > self.max_bot_drawdown:
                 return True, f"Drawdown {current_dd*100:.1f}% exceeds limit {self.max_bot_drawdown*100:.0f}%"
@@ -109,23 +113,9 @@ class CircuitBreaker:
             if not recent_fills:
                 return False, "OK"
             
-            # Count consecutive losses (simplified - assumes alternating buys/sells)
-            consecutive_losses = 0
-            for i in range(0, len(recent_fills) - 1, 2):
-                if i + 1 >= len(recent_fills):
-                    break
-                
-                buy_fill = recent_fills[i] if recent_fills[i]["side"] == "buy" else recent_fills[i+1]
-                sell_fill = recent_fills[i+1] if recent_fills[i+1]["side"] == "sell" else recent_fills[i]
-                
-                # Check if this was a loss
-                if sell_fill["price"] < buy_fill["price"]:
-                    consecutive_losses += 1
-                else:
-                    consecutive_losses = 0  # Reset on win
-                
-                if consecutive_losses >= self.max_consecutive_losses:
-                    return True, f"Consecutive losses: {consecutive_losses}"
+            consecutive_losses = self._loss_streak(recent_fills)
+            if consecutive_losses >= self.max_consecutive_losses:
+                return True, f"Consecutive losses: {consecutive_losses}"
             
             return False, "OK"
             
@@ -133,6 +123,24 @@ class CircuitBreaker:
             logger.error(f"Consecutive losses check error: {e}")
             return False, str(e)
     
+    @staticmethod
+    def _loss_streak(recent_fills: List[Dict]) -> int:
+        """Longest run of losing round trips in newest-first fills
+        
+        Simplified - assumes alternating buys/sells, paired two by two. The
+        per-bot check and the sweep both use it on a bot's last
+        2 * max_consecutive_losses fills, so the two modes agree.
+        """
+        streak = longest = 0
+        for i in range(0, len(recent_fills) - 1, 2):
+            buy_fill = recent_fills[i] if recent_fills[i]["side"] == "buy" else recent_fills[i+1]
+            sell_fill = recent_fills[i+1] if recent_fills[i+1]["side"] == "sell" else recent_fills[i]
+            
+            # A loss extends the streak, a win resets it
+            streak = streak + 1 if sell_fill["price"] < buy_fill["price"] else 0
+            longest = max(longest, streak)
+        return longest
+    
     async def check_error_rate(self, user_id: str, bot_id: str) -> Tuple[bool, str]:
         """Check error rate from alerts"""
         try:
@@ -296,8 +304,24 @@ class CircuitBreaker:
         except Exception as e:
             logger.error(f"Emergency stop trigger error: {e}")
     
-    async def monitor_all_bots_ledger(self, user_id: str, ledger_service):
-        """Monitor all bots for circuit breaker conditions - LEDGER-BASED"""
+    async def _apply_breach(self, bot_id: str, reason: str) -> str:
+        """Quarantine or pause a bot for a breach, returns the action taken"""
+        # Critical breaches go to quarantine
+        if "drawdown" in reason.lower() or "consecutive" in reason.lower():
+            await self.trigger_bot_quarantine(bot_id, reason)
+            return "quarantined"
+        await self.trigger_bot_pause(bot_id, reason)
+        return "paused"
+    
+    async def monitor_all_bots_ledger(self, user_id: str, ledger_service, sweep: bool = True):
+        """Monitor all bots for circuit breaker conditions - LEDGER-BASED
+        
+        sweep=True (default) evaluates every bot from one ledger load, see
+        sweep_user_ledger(). sweep=False runs the per-bot checks one by one.
+        """
+        if sweep:
+            return await self.sweep_user_ledger(user_id, ledger_service)
+        
         try:
             # Check global drawdown first
             global_breach, global_reason = await self.check_global_drawdown(user_id)
@@ -326,15 +350,237 @@ class CircuitBreaker:
                 # Check if any breached
                 for breach, reason in checks:
                     if breach:
-                        # Critical breaches go to quarantine
-                        if "drawdown" in reason.lower() or "consecutive" in reason.lower():
-                            await self.trigger_bot_quarantine(bot_id, reason)
-                        else:
-                            await self.trigger_bot_pause(bot_id, reason)
+                        await self._apply_breach(bot_id, reason)
                         break  # Only one action per bot
             
         except Exception as e:
             logger.error(f"Monitor bots error: {e}")
+    
+    # ========================================================================
+    # SWEEP MODE - all of a user's bots from one ledger load
+    # ========================================================================
+    
+    @staticmethod
+    def _naive_utc(ts) -> Optional[datetime]:
+        """Normalize ledger timestamps (naive UTC, aware or ISO string)"""
+        if ts is None:
+            return None
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        return ts
+    
+    async def compute_bot_metrics(
+        self, user_id: str, bot_ids: List[str], ledger_service, currency: str = "USDT"
+    ) -> Dict[str, Dict]:
+        """Drawdown, daily PnL, loss streak and error count for many bots
+        
+        One funding aggregation, one streamed fills scan and one alerts
+        aggregation cover every bot, instead of four queries and a FIFO
+        replay per bot. The scan covers each bot's whole history, like
+        LedgerService.compute_drawdown, so the drawdown is measured from the
+        same peak as the per-bot check. Only running totals, open lots and
+        the last 2 * max_consecutive_losses fills per bot are kept; the loss
+        streak applies the per-bot check's rule (_loss_streak) to those.
+        
+        Returns: {bot_id: {"starting_capital", "equity", "current_drawdown",
+                  "daily_pnl", "consecutive_losses", "errors_last_hour"}}
+        """
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        streak_fills = self.max_consecutive_losses * 2
+        metrics = {
+            bot_id: {
+                "starting_capital": 0.0,
+                "equity": 0.0,
+                "peak": 0.0,
+                "current_drawdown": 0.0,
+                "daily_pnl": 0.0,
+                "consecutive_losses": 0,
+                "errors_last_hour": 0
+            }
+            for bot_id in bot_ids
+        }
+        if not bot_ids:
+            return metrics
+        
+        # Starting capital per bot
+        funding = ledger_service.ledger_events.aggregate([
+            {"$match": {
+                "user_id": user_id,
+                "bot_id": {"$in": bot_ids},
+                "event_type": "funding",
+                "currency": currency
+            }},
+            {"$group": {"_id": "$bot_id", "amount": {"$sum": "$amount"}}}
+        ])
+        async for row in funding:
+            if row["_id"] in metrics:
+                metrics[row["_id"]]["starting_capital"] = float(row.get("amount", 0))
+        
+        for m in metrics.values():
+            m["equity"] = m["peak"] = m["starting_capital"]
+        
+        # One chronological pass: equity curve + FIFO lots per bot/symbol
+        lots: Dict[str, Dict[str, deque]] = {bot_id: {} for bot_id in bot_ids}
+        recent: Dict[str, deque] = {bot_id: deque(maxlen=streak_fills) for bot_id in bot_ids}
+        projection = {"_id": 0, "bot_id": 1, "symbol": 1, "side": 1, "qty": 1, "price": 1, "fee": 1, "timestamp": 1}
+        cursor = ledger_service.fills_ledger.find(
+            {"user_id": user_id, "bot_id": {"$in": bot_ids}},
+            projection
+        ).sort("timestamp", 1)
+        async for fill in cursor:
+            m = metrics.get(fill.get("bot_id"))
+            if m is None:
+                continue
+            recent[fill["bot_id"]].append(fill)
+            qty = float(fill.get("qty", 0))
+            price = float(fill.get("price", 0))
+            fee = float(fill.get("fee", 0))
+            is_today = (self._naive_utc(fill.get("timestamp")) or today_start) >= today_start
+            symbol_lots = lots[fill["bot_id"]].setdefault(fill.get("symbol"), deque())
+            
+            # Equity curve (same approximation as LedgerService.compute_drawdown)
+            if fill.get("side") == "buy":
+                m["equity"] -= qty * price
+                symbol_lots.append([qty, price])
+            else:
+                m["equity"] += qty * price
+                remaining = qty
+                trade_pnl = 0.0
+                while remaining > 0 and symbol_lots:
+                    lot = symbol_lots[0]
+                    closed = min(lot[0], remaining)
+                    trade_pnl += closed * (price - lot[1])
+                    lot[0] -= closed
+                    remaining -= closed
+                    if lot[0] <= 0:
+                        symbol_lots.popleft()
+                if is_today:
+                    m["daily_pnl"] += trade_pnl
+            m["equity"] -= fee
+            if is_today:
+                m["daily_pnl"] -= fee
+            m["peak"] = max(m["peak"], m["equity"])
+        
+        for bot_id, m in metrics.items():
+            m["consecutive_losses"] = self._loss_streak(list(reversed(recent[bot_id])))
+            peak = m.pop("peak")
+            m["current_drawdown"] = (peak - m["equity"]) / peak if peak > 0 else 0.0
+        
+        # Error alerts in the last hour per bot
+        one_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+        errors = db.alerts_collection.aggregate([
+            {"$match": {
+                "user_id": user_id,
+                "bot_id": {"$in": bot_ids},
+                "severity": {"$in": ["error", "critical"]},
+                "timestamp": {"$gte": one_hour_ago}
+            }},
+            {"$group": {"_id": "$bot_id", "count": {"$sum": 1}}}
+        ])
+        async for row in errors:
+            if row["_id"] in metrics:
+                metrics[row["_id"]]["errors_last_hour"] = int(row.get("count", 0))
+        
+        return metrics
+    
+    def evaluate_bot_metrics(self, m: Dict) -> Tuple[bool, str]:
+        """Apply breaker thresholds to precomputed metrics (first breach wins)"""
+        if m["current_drawdown"] > self.max_bot_drawdown:
+            return True, f"Drawdown {m['current_drawdown']*100:.1f}% exceeds limit {self.max_bot_drawdown*100:.0f}%"
+        
+        if m["starting_capital"] > 0 and m["daily_pnl"] < 0:
+            daily_loss_pct = abs(m["daily_pnl"]) / m["starting_capital"]
+            if daily_loss_pct > self.max_daily_loss_percent:
+                return True, f"Daily loss {daily_loss_pct*100:.1f}% exceeds limit {self.max_daily_loss_percent*100:.0f}%"
+        
+        if m["consecutive_losses"] >= self.max_consecutive_losses:
+            return True, f"Consecutive losses: {m['consecutive_losses']}"
+        
+        if m["errors_last_hour"] >= self.max_errors_per_hour:
+            return True, f"Error rate: {m['errors_last_hour']}/hour exceeds limit {self.max_errors_per_hour}"
+        
+        return False, "OK"
+    
+    async def sweep_user_ledger(self, user_id: str, ledger_service) -> Dict:
+        """Evaluate every active/paused bot of a user in one sweep
+        
+        Returns a report with the bots checked, breaches/actions and sweep time.
+        """
+        started = time.perf_counter()
+        report = {
+            "user_id": user_id,
+            "bots_checked": 0,
+            "breaches": [],
+            "emergency_stop": False,
+            "sweep_ms": 0.0
+        }
+        try:
+            bots = await db.bots_collection.find(
+                {"user_id": user_id},
+                {"_id": 0, "id": 1, "status": 1, "initial_capital": 1, "current_capital": 1}
+            ).to_list(None)
+            
+            # Global drawdown from the same bot load
+            total_initial = sum(b.get('initial_capital', 0) for b in bots)
+            total_current = sum(b.get('current_capital', 0) for b in bots)
+            if total_initial > 0:
+                global_drawdown_pct = (total_initial - total_current) / total_initial
+                if global_drawdown_pct > self.max_global_drawdown:
+                    reason = f"Global drawdown {global_drawdown_pct*100:.1f}% exceeds {self.max_global_drawdown*100:.0f}%"
+                    await self.trigger_emergency_stop(user_id, reason)
+                    report["emergency_stop"] = True
+                    report["breaches"].append({"bot_id": None, "reason": reason, "action": "emergency_stop"})
+                    return report
+            
+            bot_ids = [b['id'] for b in bots if b.get('status') in ("active", "paused")]
+            report["bots_checked"] = len(bot_ids)
+            metrics = await self.compute_bot_metrics(user_id, bot_ids, ledger_service)
+            
+            for bot_id in bot_ids:
+                breach, reason = self.evaluate_bot_metrics(metrics[bot_id])
+                if breach:
+                    action = await self._apply_breach(bot_id, reason)
+                    report["breaches"].append({"bot_id": bot_id, "reason": reason, "action": action})
+        
+        except Exception as e:
+            logger.error(f"Circuit breaker sweep error for user {user_id}: {e}")
+            report["error"] = str(e)
+        finally:
+            report["sweep_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        
+        return report
+    
+    async def sweep_all_users(self, ledger_service, max_concurrency: Optional[int] = None) -> Dict:
+        """Sweep every user with active/paused bots, bounded concurrency across users"""
+        started = time.perf_counter()
+        user_ids = await db.bots_collection.distinct(
+            "user_id", {"status": {"$in": ["active", "paused"]}}
+        )
+        semaphore = asyncio.Semaphore(max_concurrency or self.sweep_concurrency)
+        
+        async def sweep(user_id: str) -> Dict:
+            async with semaphore:
+                return await self.sweep_user_ledger(user_id, ledger_service)
+        
+        reports = await asyncio.gather(*(sweep(user_id) for user_id in user_ids))
+        
+        summary = {
+            "users": len(reports),
+            "bots_checked": sum(r["bots_checked"] for r in reports),
+            "breaches": [b for r in reports for b in r["breaches"]],
+            "errors": [{"user_id": r["user_id"], "error": r["error"]} for r in reports if r.get("error")],
+            "slowest_user_ms": max((r["sweep_ms"] for r in reports), default=0.0),
+            "sweep_ms": round((time.perf_counter() - started) * 1000, 2),
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        }
+        self.last_sweep = summary
+        logger.info(
+            f"Circuit breaker sweep: {summary['users']} users, {summary['bots_checked']} bots, "
+            f"{len(summary['breaches'])} breaches in {summary['sweep_ms']:.0f}ms"
+        )
+        return summary
 
 # Global instance
 circuit_breaker = CircuitBreaker()
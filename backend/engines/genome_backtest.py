@@ -0,0 +1,143 @@
+"""
+Genome Backtesting for BotDNAEvolution
+Scores bot genomes (risk_mode, trading_pair, exchange) by replaying them over
+recorded price history. Fitness is a percentage return, so capital is not part
+of the genome: every backtest starts from BACKTEST_CAPITAL.
+
+- Pure functions only, so scoring runs in a process pool
+- Workers receive the price history once (pool initializer), then score
+  batches of genomes
+- genome_key() hashes the fields that affect the score, for fitness caching
+
+History comes from recorded tick/candle files (engines.market_data), e.g. the
+directory named by EVOLUTION_HISTORY_DIR.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from engines.market_data import RecordedMarketData, SystemClock, read_records
+from exchange_limits import get_fee_rate
+
+# Same per-trade sizing as PaperTradingEngine.execute_smart_trade
+POSITION_SIZES = {'safe': 0.20, 'balanced': 0.30, 'risky': 0.40, 'aggressive': 0.50}
+
+# Exit rules per risk mode: (stop loss, take profit) as fractions of entry
+EXIT_RULES = {
+    'safe': (0.010, 0.015),
+    'balanced': (0.015, 0.025),
+    'risky': (0.020, 0.035),
+    'aggressive': (0.030, 0.050),
+}
+
+SLIPPAGE = 0.001
+BACKTEST_CAPITAL = 1000.0
+TREND_WINDOW = 20
+DRAWDOWN_PENALTY = 0.5
+
+_history: Dict[str, List[float]] = {}
+
+
+def history_key(exchange: str, pair: str) -> str:
+    return f"{exchange}:{pair}"
+
+
+def genome_key(genome: Dict) -> str:
+    """Stable hash of the genome fields that affect its backtest"""
+    fields = {
+        "risk_mode": genome.get('risk_mode', 'safe'),
+        "trading_pair": genome.get('trading_pair', 'BTC/ZAR'),
+        "exchange": genome.get('exchange', 'luno'),
+    }
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def load_history(directory) -> Dict[str, List[float]]:
+    """Price series per exchange:pair from every CSV/NDJSON file in a directory
+
+    Files whose rows have a `close` column are candles, anything else ticks.
+    """
+    market = RecordedMarketData(SystemClock())
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix not in ('.csv', '.ndjson', '.jsonl', '.json'):
+            continue
+        rows = list(read_records(path))
+        if rows and 'close' in rows[0]:
+            market.add_candles(rows)
+        elif rows:
+            market.add_ticks(rows)
+    return {history_key(exchange, symbol): market.series(exchange, symbol) for exchange, symbol in market.pairs()}
+
+
+def backtest_genome(genome: Dict, prices: List[float]) -> Optional[Dict]:
+    """
+    Trend-following long-only backtest with the genome's risk settings.
+
+    Enters when price closes above its TREND_WINDOW average, exits at the
+    risk mode's stop loss / take profit or when the trend breaks. Fees and
+    slippage are charged on both legs. Returns None without enough history.
+    """
+    if len(prices) <= TREND_WINDOW:
+        return None
+
+    risk_mode = genome.get('risk_mode', 'safe')
+    position_size = POSITION_SIZES.get(risk_mode, 0.20)
+    stop_loss, take_profit = EXIT_RULES.get(risk_mode, EXIT_RULES['safe'])
+    cost = get_fee_rate(genome.get('exchange', 'luno'), 'taker') + SLIPPAGE
+
+    initial = BACKTEST_CAPITAL
+    capital = peak = initial
+    max_drawdown = 0.0
+    trades = wins = 0
+    entry = None
+    stake = 0.0
+
+    window_sum = sum(prices[:TREND_WINDOW])
+    for i in range(TREND_WINDOW, len(prices)):
+        price = prices[i]
+        average = window_sum / TREND_WINDOW
+        window_sum += price - prices[i - TREND_WINDOW]
+
+        if entry is None:
+            if price > average:
+                entry = price
+                stake = capital * position_size
+            continue
+
+        change = price / entry - 1
+        if change <= -stop_loss or change >= take_profit or price < average:
+            pnl = stake * change - stake * cost * 2
+            capital += pnl
+            trades += 1
+            wins += pnl > 0
+            entry = None
+            peak = max(peak, capital)
+            max_drawdown = max(max_drawdown, (peak - capital) / peak if peak > 0 else 0.0)
+
+    total_return = (capital - initial) / initial * 100 if initial > 0 else 0.0
+    return {
+        "trades": trades,
+        "win_rate": round(wins / trades * 100, 2) if trades else 0.0,
+        "final_capital": round(capital, 2),
+        "total_return": round(total_return, 4),
+        "max_drawdown": round(max_drawdown * 100, 4),
+        "fitness": round(total_return - DRAWDOWN_PENALTY * max_drawdown * 100, 4),
+    }
+
+
+def init_worker(history: Dict[str, List[float]]):
+    """Process pool initializer: keep the price history in the worker"""
+    global _history
+    _history = history
+
+
+def score_batch(genomes: List[Dict], history: Optional[Dict[str, List[float]]] = None) -> List[Optional[Dict]]:
+    """Backtest a batch of genomes against the worker's (or the given) history"""
+    history = _history if history is None else history
+    results = []
+    for genome in genomes:
+        prices = history.get(history_key(genome.get('exchange', 'luno'), genome.get('trading_pair', 'BTC/ZAR')))
+        results.append(backtest_genome(genome, prices) if prices else None)
+    return results
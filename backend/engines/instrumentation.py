@@ -0,0 +1,259 @@
+"""
+Hot-Path Instrumentation
+Feeds PrometheusMetrics from requests, trading stages, MongoDB and exchanges
+
+- MetricsMiddleware: ASGI middleware timing every request by route template
+- timed / StageLaps: per-stage histograms (pipeline gates, ledger computations,
+  paper trade stages, scheduler ticks)
+- MongoCommandListener: PyMongo command listener for Motor clients
+- instrument_exchange: wraps ccxt unified methods on an exchange instance
+
+Every label value passes through a BoundedLabel, so a runaway value (raw path,
+symbol, collection name) collapses to "other" instead of growing the series
+count. If prometheus_client is not installed, everything here is a no-op.
+"""
+
+import functools
+import inspect
+import threading
+import time
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+_metrics = None
+_metrics_loaded = False
+
+
+def get_metrics():
+    """The global PrometheusMetrics instance, or None if prometheus_client is missing"""
+    global _metrics, _metrics_loaded
+    if not _metrics_loaded:
+        _metrics_loaded = True
+        try:
+            from engines.prometheus_metrics import prometheus_metrics
+            _metrics = prometheus_metrics
+        except Exception as e:
+            logger.warning(f"Prometheus metrics unavailable - instrumentation disabled: {e}")
+    return _metrics
+
+
+class BoundedLabel:
+    """Admits at most `limit` distinct label values; the rest become `overflow`"""
+
+    def __init__(self, limit: int, overflow: str = "other"):
+        self.limit = limit
+        self.overflow = overflow
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value) -> str:
+        value = str(value) if value is not None else "none"
+        if value in self._seen:
+            return value
+        with self._lock:
+            if value in self._seen:
+                return value
+            if len(self._seen) >= self.limit:
+                return self.overflow
+            self._seen.add(value)
+            return value
+
+
+_routes = BoundedLabel(300)
+_stages = BoundedLabel(200)
+_mongo_commands = BoundedLabel(40)
+_mongo_collections = BoundedLabel(100)
+_exchanges = BoundedLabel(20)
+
+
+def record_stage(component: str, stage: str, seconds: float, outcome: str = "ok"):
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    if _stages(f"{component}:{stage}") == _stages.overflow:
+        stage = _stages.overflow
+    try:
+        metrics.record_stage(component, stage, seconds, outcome)
+    except Exception as e:
+        logger.debug(f"record_stage failed: {e}")
+
+
+def timed(component: str, stage: Optional[str] = None):
+    """Decorator timing a sync or async function into the stage histogram"""
+    def decorator(func: Callable):
+        name = stage or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                outcome = "ok"
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException:
+                    outcome = "error"
+                    raise
+                finally:
+                    record_stage(component, name, time.perf_counter() - start, outcome)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                outcome = "error"
+                raise
+            finally:
+                record_stage(component, name, time.perf_counter() - start, outcome)
+        return wrapper
+
+    return decorator
+
+
+class StageLaps:
+    """Records consecutive stages of one operation: each lap() times since the previous lap"""
+
+    def __init__(self, component: str):
+        self.component = component
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def lap(self, stage: str, outcome: str = "ok") -> float:
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        record_stage(self.component, stage, elapsed, outcome)
+        return elapsed
+
+    def total(self, stage: str = "total", outcome: str = "ok") -> float:
+        elapsed = time.perf_counter() - self.started
+        record_stage(self.component, stage, elapsed, outcome)
+        return elapsed
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route template (e.g. /api/bots/{bot_id})"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics = get_metrics()
+            if metrics is not None:
+                # The router stores the matched route in the scope; unmatched paths share one label
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                try:
+                    metrics.record_http_request(
+                        _routes(route), scope.get("method", "GET"), status, time.perf_counter() - start
+                    )
+                except Exception as e:
+                    logger.debug(f"record_http_request failed: {e}")
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every MongoDB command issued through a client it is registered on"""
+
+    MAX_PENDING = 10000
+
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection")
+        if len(self._pending) >= self.MAX_PENDING:
+            # Unmatched starts (e.g. killed connections) must not leak
+            self._pending.clear()
+        self._pending[(event.connection_id, event.request_id)] = (
+            event.command_name, collection if isinstance(collection, str) else "none"
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str):
+        command, collection = self._pending.pop(
+            (event.connection_id, event.request_id), (event.command_name, "none")
+        )
+        metrics = get_metrics()
+        if metrics is None:
+            return
+        try:
+            metrics.record_mongo_command(
+                _mongo_commands(command), _mongo_collections(collection), event.duration_micros / 1e6, outcome
+            )
+        except Exception as e:
+            logger.debug(f"record_mongo_command failed: {e}")
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+EXCHANGE_METHODS = (
+    "load_markets", "fetch_ticker", "fetch_tickers", "fetch_ohlcv", "fetch_order_book",
+    "fetch_balance", "create_order", "create_limit_order", "create_market_order",
+    "fetch_order", "cancel_order", "fetch_open_orders", "fetch_my_trades"
+)
+
+
+def instrument_exchange(exchange, exchange_name: Optional[str] = None):
+    """Wrap ccxt unified methods on one exchange instance with latency timing"""
+    if getattr(exchange, "_amarktai_instrumented", False):
+        return exchange
+    name = _exchanges(exchange_name or getattr(exchange, "id", "unknown"))
+
+    for method_name in EXCHANGE_METHODS:
+        method = getattr(exchange, method_name, None)
+        if method is None or not inspect.iscoroutinefunction(method):
+            continue
+
+        def make_wrapper(method, method_name):
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                outcome = "ok"
+                try:
+                    return await method(*args, **kwargs)
+                except BaseException:
+                    outcome = "error"
+                    raise
+                finally:
+                    metrics = get_metrics()
+                    if metrics is not None:
+                        try:
+                            metrics.record_exchange_call(name, method_name, time.perf_counter() - start, outcome)
+                        except Exception as e:
+                            logger.debug(f"record_exchange_call failed: {e}")
+            return wrapper
+
+        setattr(exchange, method_name, make_wrapper(method, method_name))
+
+    exchange._amarktai_instrumented = True
+    return exchange
@@ -0,0 +1,226 @@
+"""
+Market Data Sources and Clocks for PaperTradingEngine
+
+- SystemClock: wall-clock time (the default, live trading)
+- ReplayClock: simulated time, moved forward by the replay driver
+- RecordedMarketData: prices, OHLCV and pairs from recorded tick/candle files,
+  answered "as of" the clock's current time so replays never see the future
+
+A market data source implements:
+    async get_pairs(exchange) -> List[str]
+    async fetch_price(symbol, exchange) -> Optional[float]
+    async fetch_ohlcv(symbol, exchange, timeframe, limit) -> List[[ts_ms, o, h, l, c, v]]
+
+Recorded files are CSV (with a header row) or NDJSON (.ndjson / .jsonl):
+    ticks:   timestamp, symbol, price[, exchange]
+    candles: timestamp, symbol, open, high, low, close[, volume, exchange, timeframe]
+Timestamps are ISO-8601 strings or epoch seconds/milliseconds.
+"""
+
+import bisect
+import csv
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TIMEFRAMES = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+DEFAULT_EXCHANGE = "luno"
+
+
+class SystemClock:
+    """Wall-clock time"""
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def timestamp(self) -> float:
+        return self.now().timestamp()
+
+
+class ReplayClock(SystemClock):
+    """Simulated time; only the replay driver moves it"""
+
+    def __init__(self, start: datetime):
+        self.current = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+
+    def now(self) -> datetime:
+        return self.current
+
+    def set(self, when: datetime):
+        if when < self.current:
+            raise ValueError("Replay clock cannot move backwards")
+        self.current = when
+
+    def advance(self, delta: timedelta):
+        self.current = self.current + delta
+
+
+def parse_timestamp(value) -> datetime:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace(".", "", 1).isdigit()):
+        seconds = float(value)
+        if seconds > 1e11:  # epoch milliseconds
+            seconds /= 1000
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def read_records(path) -> Iterable[Dict]:
+    """Rows of a CSV or NDJSON file as dicts"""
+    path = Path(path)
+    with path.open() as f:
+        if path.suffix in (".ndjson", ".jsonl", ".json"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+class RecordedMarketData:
+    """Answers price, candle and pair queries from recorded data as of clock.now()"""
+
+    def __init__(self, clock: SystemClock):
+        self.clock = clock
+        # (exchange, symbol) -> sorted epoch seconds / prices
+        self._tick_times: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self._tick_prices: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        # (exchange, symbol, timeframe) -> sorted candle close times / rows
+        self._candle_closes: Dict[Tuple[str, str, str], List[float]] = defaultdict(list)
+        self._candles: Dict[Tuple[str, str, str], List[List[float]]] = defaultdict(list)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def add_ticks(self, rows: Iterable[Dict]) -> int:
+        loaded = []
+        for row in rows:
+            key = (row.get("exchange") or DEFAULT_EXCHANGE, row["symbol"])
+            loaded.append((key, parse_timestamp(row["timestamp"]).timestamp(), float(row["price"])))
+        loaded.sort(key=lambda item: item[1])
+        for key, ts, price in loaded:
+            self._tick_times[key].append(ts)
+            self._tick_prices[key].append(price)
+        for key in {item[0] for item in loaded}:
+            self._resort(self._tick_times[key], self._tick_prices[key])
+        return len(loaded)
+
+    def add_candles(self, rows: Iterable[Dict]) -> int:
+        loaded = []
+        for row in rows:
+            timeframe = row.get("timeframe") or "5m"
+            key = (row.get("exchange") or DEFAULT_EXCHANGE, row["symbol"], timeframe)
+            opened = parse_timestamp(row["timestamp"]).timestamp()
+            candle = [opened * 1000] + [float(row.get(k) or 0) for k in ("open", "high", "low", "close", "volume")]
+            loaded.append((key, opened + TIMEFRAMES.get(timeframe, 300), candle))
+        loaded.sort(key=lambda item: item[1])
+        for key, closed, candle in loaded:
+            self._candle_closes[key].append(closed)
+            self._candles[key].append(candle)
+        for key in {item[0] for item in loaded}:
+            self._resort(self._candle_closes[key], self._candles[key])
+        return len(loaded)
+
+    @staticmethod
+    def _resort(times: List[float], values: List):
+        if any(times[i] > times[i + 1] for i in range(len(times) - 1)):
+            order = sorted(range(len(times)), key=times.__getitem__)
+            times[:] = [times[i] for i in order]
+            values[:] = [values[i] for i in order]
+
+    @classmethod
+    def from_files(cls, clock: SystemClock, ticks=None, candles=None) -> "RecordedMarketData":
+        data = cls(clock)
+        if ticks:
+            data.add_ticks(read_records(ticks))
+        if candles:
+            data.add_candles(read_records(candles))
+        return data
+
+    def time_range(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """First and last recorded tick (or candle close)"""
+        series = list(self._tick_times.values()) or list(self._candle_closes.values())
+        starts = [times[0] for times in series if times]
+        ends = [times[-1] for times in series if times]
+        if not starts:
+            return None, None
+        return (datetime.fromtimestamp(min(starts), tz=timezone.utc),
+                datetime.fromtimestamp(max(ends), tz=timezone.utc))
+
+    def series(self, exchange: str, symbol: str, timeframe: Optional[str] = None) -> List[float]:
+        """Every recorded price for a pair (ticks, else candle closes), ignoring the clock"""
+        if (exchange, symbol) in self._tick_prices and timeframe is None:
+            return list(self._tick_prices[(exchange, symbol)])
+        for (e, s, tf), candles in self._candles.items():
+            if (e, s) == (exchange, symbol) and timeframe in (None, tf):
+                return [candle[4] for candle in candles]
+        return []
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """All recorded (exchange, symbol) pairs"""
+        keys = set(self._tick_times) | {(e, s) for e, s, _ in self._candle_closes}
+        return sorted(keys)
+
+    # ------------------------------------------------------------------
+    # Source interface
+    # ------------------------------------------------------------------
+
+    async def get_pairs(self, exchange: str) -> List[str]:
+        symbols = {s for e, s in self._tick_times if e == exchange}
+        symbols.update(s for e, s, _ in self._candle_closes if e == exchange)
+        return sorted(symbols)
+
+    async def fetch_price(self, symbol: str, exchange: str) -> Optional[float]:
+        """Last recorded tick at or before now; the last closed candle if there are no ticks"""
+        now = self.clock.timestamp()
+        times = self._tick_times.get((exchange, symbol))
+        if times:
+            i = bisect.bisect_right(times, now)
+            return self._tick_prices[(exchange, symbol)][i - 1] if i else None
+
+        for (e, s, timeframe), closes in self._candle_closes.items():
+            if (e, s) == (exchange, symbol):
+                i = bisect.bisect_right(closes, now)
+                if i:
+                    return self._candles[(e, s, timeframe)][i - 1][4]
+        return None
+
+    async def fetch_ohlcv(self, symbol: str, exchange: str, timeframe: str = "5m",
+                          limit: int = 100) -> List[List[float]]:
+        """Closed candles up to now; built from ticks when no candles were recorded"""
+        now = self.clock.timestamp()
+        key = (exchange, symbol, timeframe)
+        if key in self._candles:
+            i = bisect.bisect_right(self._candle_closes[key], now)
+            return self._candles[key][max(0, i - limit):i]
+        return self._candles_from_ticks(exchange, symbol, TIMEFRAMES.get(timeframe, 300), now, limit)
+
+    def _candles_from_ticks(self, exchange: str, symbol: str, seconds: int,
+                            now: float, limit: int) -> List[List[float]]:
+        times = self._tick_times.get((exchange, symbol))
+        if not times:
+            return []
+        prices = self._tick_prices[(exchange, symbol)]
+
+        # Only buckets that closed before now, and only the last `limit` of them
+        last_bucket = int(now // seconds) - 1
+        first_bucket = last_bucket - limit + 1
+        lo = bisect.bisect_left(times, first_bucket * seconds)
+        hi = bisect.bisect_left(times, (last_bucket + 1) * seconds)
+
+        candles = []
+        for ts, price in zip(times[lo:hi], prices[lo:hi]):
+            bucket = int(ts // seconds)
+            if candles and candles[-1][0] == bucket * seconds * 1000:
+                candle = candles[-1]
+                candle[2] = max(candle[2], price)
+                candle[3] = min(candle[3], price)
+                candle[4] = price
+            else:
+                candles.append([bucket * seconds * 1000, price, price, price, price, 0.0])
+        return candles
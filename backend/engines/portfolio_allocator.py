@@ -0,0 +1,308 @@
+"""
+Portfolio Allocator - Allocates capital across all of a user's bots at once
+- Pulls per-bot return statistics in one trades aggregation
+- Solves the allocation for every bot together with NumPy
+- Methods: tier weights (default), risk parity, capped fractional Kelly
+- Applies changes with a single bulk_write; dry runs return the same plan
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+from pymongo import UpdateOne
+
+import database as db
+from engines.fractional_kelly import kelly_calculator
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('tier', 'risk_parity', 'kelly')
+
+RISK_WEIGHTS = {
+    'safe': 1.0,       # Base allocation
+    'balanced': 1.2,   # 20% more capital
+    'risky': 1.5,      # 50% more capital
+    'aggressive': 2.0  # 2x capital
+}
+
+PERFORMANCE_TIERS = {
+    'elite': 2.0,      # Top 10% performers get 2x
+    'high': 1.5,       # Top 25% get 1.5x
+    'average': 1.0,    # Middle 50% get base
+    'low': 0.7,        # Bottom 25% get 0.7x
+    'poor': 0.5        # Bottom 10% get 0.5x
+}
+
+DEPLOYABLE_FRACTION = 0.8   # Share of master balance allocated to bots
+TARGET_BOT_COUNT = 45       # Tier allocation divides the budget by this
+MIN_ALLOCATION = 500.0
+MAX_ALLOCATION = 10000.0
+REBALANCE_THRESHOLD = 0.20  # Only move capital when the change exceeds 20%
+MIN_TRADES_FOR_STATS = 20   # Same data-confidence ramp as FractionalKellyCalculator
+
+
+@dataclass
+class ReturnStats:
+    """Per-bot trade statistics, aligned with the bot list they were loaded for"""
+    trades: np.ndarray
+    wins: np.ndarray
+    avg_profit: np.ndarray
+    avg_loss: np.ndarray
+    return_std: np.ndarray
+
+    @classmethod
+    def empty(cls, n: int) -> "ReturnStats":
+        return cls(*(np.zeros(n) for _ in range(5)))
+
+
+@dataclass
+class AllocationPlan:
+    user_id: str
+    method: str
+    total_capital: float
+    bots: List[Dict]
+    targets: np.ndarray
+    changes: List[Dict] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "method": self.method,
+            "total_capital": self.total_capital,
+            "total_bots": len(self.bots),
+            "allocated": float(self.targets.sum()) if len(self.targets) else 0.0,
+            "rebalanced_count": len(self.changes),
+            "changes": self.changes
+        }
+
+
+def tier_scores(bots: List[Dict]) -> np.ndarray:
+    """ROI (60%) + win rate (40%) score for every bot"""
+    initial = np.array([b.get('initial_capital', 1000) or 0 for b in bots], dtype=float)
+    profit = np.array([b.get('total_profit', 0) or 0 for b in bots], dtype=float)
+    trades = np.array([b.get('trades_count', 0) or 0 for b in bots], dtype=float)
+    wins = np.array([b.get('win_count', 0) or 0 for b in bots], dtype=float)
+
+    roi = np.divide(profit * 100, initial, out=np.zeros_like(profit), where=initial > 0)
+    win_rate = np.divide(wins * 100, trades, out=np.zeros_like(wins), where=trades > 0)
+    return roi * 0.6 + win_rate * 0.4
+
+
+def performance_tiers(bots: List[Dict]) -> List[str]:
+    """Performance tier name for every bot"""
+    scores = tier_scores(bots)
+    names = np.select(
+        [scores >= 10, scores >= 5, scores >= 0, scores >= -5],
+        ['elite', 'high', 'average', 'low'],
+        default='poor'
+    )
+    return names.tolist()
+
+
+def tier_weights(bots: List[Dict]) -> np.ndarray:
+    """Risk-mode multiplier x performance-tier multiplier for every bot"""
+    risk = np.array([RISK_WEIGHTS.get(b.get('risk_mode', 'safe'), 1.0) for b in bots])
+    perf = np.array([PERFORMANCE_TIERS[t] for t in performance_tiers(bots)])
+    return risk * perf
+
+
+def tier_allocation(bots: List[Dict], total_capital: float) -> np.ndarray:
+    """Fixed per-bot base (80% of capital / 45 bots) scaled by tier weights"""
+    base = (total_capital * DEPLOYABLE_FRACTION) / TARGET_BOT_COUNT
+    return np.clip(base * tier_weights(bots), MIN_ALLOCATION, MAX_ALLOCATION)
+
+
+def _budget_allocation(weights: np.ndarray, budget: float) -> np.ndarray:
+    """Split budget in proportion to weights, then apply per-bot limits"""
+    total = weights.sum()
+    if total <= 0:
+        weights = np.ones_like(weights)
+        total = weights.sum()
+    return np.clip(budget * weights / total, MIN_ALLOCATION, MAX_ALLOCATION)
+
+
+def risk_parity_allocation(bots: List[Dict], stats: ReturnStats, total_capital: float,
+                           use_tier_weights: bool = True) -> np.ndarray:
+    """Inverse-volatility weights: each bot contributes similar P&L risk"""
+    vol = stats.return_std.astype(float)
+    known = vol > 0
+    # Bots without a return history get the median volatility of the rest
+    fill = np.median(vol[known]) if known.any() else 1.0
+    vol = np.where(known, vol, fill)
+
+    weights = 1.0 / vol
+    if use_tier_weights:
+        weights = weights * tier_weights(bots)
+    return _budget_allocation(weights, total_capital * DEPLOYABLE_FRACTION)
+
+
+def kelly_allocation(bots: List[Dict], stats: ReturnStats, total_capital: float,
+                     use_tier_weights: bool = True, calculator=kelly_calculator) -> np.ndarray:
+    """Capped fractional Kelly weights (same fraction, bounds and data ramp as the calculator)"""
+    trades = stats.trades
+    win_rate = np.divide(stats.wins, trades, out=np.full_like(trades, 0.5, dtype=float), where=trades > 0)
+    reward_risk = np.divide(
+        np.abs(stats.avg_profit), np.abs(stats.avg_loss),
+        out=np.full_like(trades, 2.0, dtype=float), where=stats.avg_loss != 0
+    )
+    reward_risk = np.where(reward_risk > 0, reward_risk, 2.0)
+
+    full_kelly = calculator.get_kelly_edge(win_rate, reward_risk)
+    confidence = np.minimum(1.0, trades / MIN_TRADES_FOR_STATS)
+    fraction = np.clip(
+        full_kelly * calculator.kelly_fraction * confidence,
+        calculator.min_position_size,
+        calculator.max_position_size
+    )
+    # Negative edge: no Kelly weight (the bot still gets the minimum allocation)
+    fraction = np.where(full_kelly > 0, fraction, 0.0)
+
+    weights = fraction
+    if use_tier_weights:
+        weights = weights * tier_weights(bots)
+    return _budget_allocation(weights, total_capital * DEPLOYABLE_FRACTION)
+
+
+class PortfolioAllocator:
+    """Plans and applies capital allocations for all of a user's bots"""
+
+    def __init__(self, threshold: float = REBALANCE_THRESHOLD):
+        self.threshold = threshold
+
+    async def load_return_stats(self, user_id: str, bots: List[Dict]) -> ReturnStats:
+        """Per-bot return statistics from one trades aggregation"""
+        stats = ReturnStats.empty(len(bots))
+        if not bots or db.trades_collection is None:
+            return stats
+
+        index = {bot['id']: i for i, bot in enumerate(bots)}
+        pnl = {"$ifNull": ["$profit_loss", {"$ifNull": ["$pnl", 0]}]}
+        pipeline = [
+            {"$match": {"user_id": user_id, "bot_id": {"$in": list(index)}}},
+            {"$group": {
+                "_id": "$bot_id",
+                "trades": {"$sum": 1},
+                "wins": {"$sum": {"$cond": [{"$gt": [pnl, 0]}, 1, 0]}},
+                "avg_profit": {"$avg": {"$cond": [{"$gt": [pnl, 0]}, pnl, None]}},
+                "avg_loss": {"$avg": {"$cond": [{"$lt": [pnl, 0]}, pnl, None]}},
+                "pnl_std": {"$stdDevSamp": pnl}
+            }}
+        ]
+
+        async for row in db.trades_collection.aggregate(pipeline):
+            i = index.get(row['_id'])
+            if i is None:
+                continue
+            capital = bots[i].get('current_capital') or bots[i].get('initial_capital') or 1000
+            stats.trades[i] = row.get('trades') or 0
+            stats.wins[i] = row.get('wins') or 0
+            stats.avg_profit[i] = row.get('avg_profit') or 0
+            stats.avg_loss[i] = row.get('avg_loss') or 0
+            stats.return_std[i] = (row.get('pnl_std') or 0) / capital
+
+        return stats
+
+    async def get_total_capital(self, user_id: str) -> Optional[float]:
+        from engines.wallet_manager import wallet_manager
+
+        master_balance = await wallet_manager.get_master_balance(user_id)
+        if "error" in master_balance:
+            return None
+        return master_balance.get('total_zar', 0)
+
+    def solve(self, bots: List[Dict], total_capital: float, method: str = 'tier',
+              stats: Optional[ReturnStats] = None, use_tier_weights: bool = True) -> np.ndarray:
+        """Target capital for every bot"""
+        if method not in METHODS:
+            raise ValueError(f"Unknown allocation method: {method}")
+        if not bots:
+            return np.zeros(0)
+        if method == 'tier':
+            return tier_allocation(bots, total_capital)
+
+        stats = stats or ReturnStats.empty(len(bots))
+        if method == 'risk_parity':
+            return risk_parity_allocation(bots, stats, total_capital, use_tier_weights)
+        return kelly_allocation(bots, stats, total_capital, use_tier_weights)
+
+    async def plan(self, user_id: str, method: str = 'tier', bots: Optional[List[Dict]] = None,
+                   use_tier_weights: bool = True) -> AllocationPlan:
+        """Compute targets and the changes that would be applied"""
+        if bots is None:
+            bots = await db.bots_collection.find(
+                {"user_id": user_id, "status": "active"},
+                {"_id": 0}
+            ).to_list(1000)
+
+        total_capital = await self.get_total_capital(user_id)
+        if total_capital is None:
+            # Same fallback as the single-bot calculation: R1000 each
+            targets = np.full(len(bots), 1000.0)
+            total_capital = 0.0
+        else:
+            stats = await self.load_return_stats(user_id, bots) if method != 'tier' else None
+            targets = self.solve(bots, total_capital, method, stats, use_tier_weights)
+
+        plan = AllocationPlan(user_id, method, total_capital, bots, targets)
+
+        current = np.array([b.get('current_capital', 1000) for b in bots], dtype=float)
+        diff_pct = np.divide(
+            np.abs(targets - current), current,
+            out=np.ones_like(current), where=current > 0
+        )
+        for i in np.flatnonzero(diff_pct > self.threshold):
+            bot, old, new = bots[i], float(current[i]), float(targets[i])
+            plan.changes.append({
+                "bot_id": bot['id'],
+                "bot_name": bot.get('name'),
+                "old_capital": old,
+                "new_capital": new,
+                "change": new - old,
+                "change_pct": ((new - old) / old) * 100 if old > 0 else None
+            })
+
+        return plan
+
+    async def apply(self, plan: AllocationPlan) -> int:
+        """Write a plan's changes with one bulk_write and log the action"""
+        if not plan.changes:
+            return 0
+
+        await db.bots_collection.bulk_write([
+            UpdateOne({"id": change['bot_id']}, {"$set": {"current_capital": change['new_capital']}})
+            for change in plan.changes
+        ], ordered=False)
+
+        await db.autopilot_actions_collection.insert_one({
+            "user_id": plan.user_id,
+            "action_type": "capital_rebalance",
+            "method": plan.method,
+            "bots_affected": len(plan.changes),
+            "details": plan.changes,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+
+        for change in plan.changes:
+            logger.info(f"💰 Rebalanced {change['bot_name']}: R{change['old_capital']:.2f} → R{change['new_capital']:.2f}")
+        return len(plan.changes)
+
+    async def rebalance(self, user_id: str, method: str = 'tier', dry_run: bool = False,
+                        use_tier_weights: bool = True) -> Dict:
+        """Plan and (unless dry_run) apply an allocation for all active bots"""
+        plan = await self.plan(user_id, method, use_tier_weights=use_tier_weights)
+        if not plan.bots:
+            return {
+                "success": False,
+                "message": "No active bots to rebalance"
+            }
+
+        if not dry_run:
+            await self.apply(plan)
+
+        return {"success": True, "dry_run": dry_run, **plan.to_dict()}
+
+
+# Global instance
+portfolio_allocator = PortfolioAllocator()
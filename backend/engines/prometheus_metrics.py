@@ -40,6 +40,39 @@ class PrometheusMetrics:
             registry=self.registry
         )
         
+        # Hot-path latency (fed by engines/instrumentation.py)
+        self.http_request_duration = Histogram(
+            'amarktai_http_request_duration_seconds',
+            'HTTP request latency by route template',
+            ['route', 'method', 'status'],
+            buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+            registry=self.registry
+        )
+        
+        self.stage_duration = Histogram(
+            'amarktai_stage_duration_seconds',
+            'Latency of pipeline gates, ledger computations, trade stages and scheduler ticks',
+            ['component', 'stage', 'outcome'],
+            buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0],
+            registry=self.registry
+        )
+        
+        self.mongo_command_duration = Histogram(
+            'amarktai_mongo_command_duration_seconds',
+            'MongoDB command latency',
+            ['command', 'collection', 'outcome'],
+            buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0],
+            registry=self.registry
+        )
+        
+        self.exchange_call_duration = Histogram(
+            'amarktai_exchange_call_duration_seconds',
+            'Exchange (ccxt) call latency',
+            ['exchange', 'method', 'outcome'],
+            buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0],
+            registry=self.registry
+        )
+        
         # Golden Signal 2: Traffic
         self.trades_total = Counter(
             'amarktai_trades_total',
@@ -177,6 +210,35 @@ class PrometheusMetrics:
             status=str(status)
         ).inc()
     
+    def record_http_request(self, route: str, method: str, status: int, latency_seconds: float):
+        """Record HTTP request latency and count"""
+        self.http_request_duration.labels(
+            route=route,
+            method=method,
+            status=f"{status // 100}xx"
+        ).observe(latency_seconds)
+        self.record_api_request(route, method, status)
+    
+    def record_stage(self, component: str, stage: str, latency_seconds: float, outcome: str = "ok"):
+        """Record latency of one hot-path stage"""
+        self.stage_duration.labels(component=component, stage=stage, outcome=outcome).observe(latency_seconds)
+    
+    def record_mongo_command(self, command: str, collection: str, latency_seconds: float, outcome: str = "ok"):
+        """Record MongoDB command latency"""
+        self.mongo_command_duration.labels(
+            command=command,
+            collection=collection,
+            outcome=outcome
+        ).observe(latency_seconds)
+    
+    def record_exchange_call(self, exchange: str, method: str, latency_seconds: float, outcome: str = "ok"):
+        """Record exchange API call latency"""
+        self.exchange_call_duration.labels(
+            exchange=exchange,
+            method=method,
+            outcome=outcome
+        ).observe(latency_seconds)
+    
     def record_signal(self, signal_type: str, recommendation: str):
         """Record signal generation"""
         self.signals_generated_total.labels(
@@ -193,10 +193,9 @@ class ReflexionLoop:
         health_report = await self_healing_ai.get_health_report()
         
         # Analyze logs for errors
-        recent_errors = [
-            e for e in self_healing_ai.error_history
-            if e.timestamp > datetime.now(timezone.utc) - timedelta(seconds=self.check_interval)
-        ]
+        recent_errors = list(self_healing_ai.error_store.recent(
+            datetime.now(timezone.utc) - timedelta(seconds=self.check_interval)
+        ))
         
         response = {
             'timestamp': datetime.now(timezone.utc).isoformat(),
@@ -0,0 +1,376 @@
+"""
+Historical Replay for PaperTradingEngine
+Drives the real engine (execute_smart_trade / run_trading_cycle) from recorded
+ticks and candles on a simulated clock
+
+- Market data, clock, randomness, rate limiter and risk engine are swapped on the engine for
+  the duration of the session and restored afterwards
+- A seed makes slippage, order failures and signal mocks reproducible
+- Results go to in-memory collections (default) or a scratch Mongo database
+- Reports cycles and trades per wall-clock second and the speed-up over real time
+
+CLI:
+    python -m engines.replay --ticks ticks.csv --bots 20 --seed 7 --step-seconds 60
+    python -m engines.replay --ticks ticks.ndjson --mongo-db amarktai_replay --speed 600
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import sys
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import database
+from engines.market_data import RecordedMarketData, ReplayClock
+from rate_limiter import RateLimiter
+from risk_engine import RiskEngine
+from services.rate_limit_service import RateLimitService
+
+logger = logging.getLogger(__name__)
+
+RISK_MODES = ('safe', 'balanced', 'risky', 'aggressive')
+
+
+# ============================================================================
+# In-memory collections (the subset of the Motor API the trading path uses)
+# ============================================================================
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op == "$ne":
+        return value != operand
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported operator in replay store: {op}")
+
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif field == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(doc.get(field), op, operand) for op, operand in condition.items()):
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        result = {k: copy.deepcopy(doc[k]) for k in included if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[Dict]):
+        self.docs = docs
+
+    def sort(self, key, direction: int = 1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda d: (d.get(field) is not None, d.get(field)), reverse=order < 0)
+        return self
+
+    def limit(self, n: int):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return self.docs[:length] if length else list(self.docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class MemoryCollection:
+    """Dict-backed stand-in for a Motor collection"""
+
+    def __init__(self, docs: Optional[List[Dict]] = None):
+        self.docs: List[Dict] = [copy.deepcopy(d) for d in docs or []]
+        self._next_id = 0
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> MemoryCursor:
+        return MemoryCursor([_project(d, projection) for d in self.docs if _matches(d, query or {})])
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                return _project(doc, projection)
+        return None
+
+    async def count_documents(self, query: Optional[Dict] = None) -> int:
+        return sum(1 for d in self.docs if _matches(d, query or {}))
+
+    async def insert_one(self, doc: Dict):
+        if "_id" not in doc:
+            self._next_id += 1
+            doc["_id"] = self._next_id
+        self.docs.append(copy.deepcopy(doc))
+        return type("InsertOneResult", (), {"inserted_id": doc["_id"]})()
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        for doc in self.docs:
+            if _matches(doc, query):
+                for field, value in update.get("$set", {}).items():
+                    doc[field] = copy.deepcopy(value)
+                for field, value in update.get("$inc", {}).items():
+                    doc[field] = doc.get(field, 0) + value
+                return type("UpdateResult", (), {"matched_count": 1, "modified_count": 1})()
+        if upsert:
+            await self.insert_one({**{k: v for k, v in query.items() if not k.startswith("$")},
+                                   **update.get("$set", {})})
+        return type("UpdateResult", (), {"matched_count": 0, "modified_count": 0})()
+
+
+# ============================================================================
+# Replay session
+# ============================================================================
+
+class ReplaySession:
+    """Runs bots through PaperTradingEngine on recorded market data"""
+
+    # Engine attributes the session replaces (and restores on exit)
+    ENGINE_STATE = ('market_data', 'clock', 'rng', 'rate_limiter', 'risk_engine', 'price_cache', 'price_cache_at',
+                    'available_pairs_cache')
+    REGIME_STATE = ('price_history', 'tracked', 'clock')
+
+    def __init__(self, market_data: RecordedMarketData, clock: ReplayClock, engine=None,
+                 seed: int = 0, collections: Optional[Dict] = None):
+        if engine is None:
+            from paper_trading_engine import paper_engine
+            engine = paper_engine
+        self.engine = engine
+        self.market_data = market_data
+        self.clock = clock
+        self.seed = seed
+        # None = in-memory store swapped into the database module for the session
+        self.in_memory = collections is None
+        self.collections = collections or {"bots": MemoryCollection(), "trades": MemoryCollection()}
+        self._saved_engine: Dict = {}
+        self._saved_db: Dict = {}
+        self._saved_random = None
+        self._saved_regime: Dict = {}
+
+    async def __aenter__(self):
+        self._saved_engine = {name: getattr(self.engine, name) for name in self.ENGINE_STATE}
+        self.engine.market_data = self.market_data
+        self.engine.clock = self.clock
+        self.engine.rng = random.Random(self.seed)
+        self.engine.rate_limiter = RateLimiter(RateLimitService(clock=self.clock.timestamp))
+        self.engine.risk_engine = RiskEngine(clock=self.clock)
+        self.engine.price_cache = {}
+        self.engine.price_cache_at = {}
+        self.engine.available_pairs_cache = {}
+
+        # ML predictor and the Flokx/Fetch.ai mocks draw from the global generator
+        self._saved_random = random.getstate()
+        random.seed(self.seed)
+
+        # The regime detector prices through the global engine; start it from an empty
+        # history (warmed up from the recorded candles) on the replay clock
+        from market_regime import market_regime_detector
+        self._saved_regime = {name: getattr(market_regime_detector, name) for name in self.REGIME_STATE}
+        market_regime_detector.price_history = {}
+        market_regime_detector.tracked = {}
+        market_regime_detector.clock = self.clock
+
+        if self.in_memory:
+            self._saved_db = {
+                "bots_collection": database.bots_collection,
+                "trades_collection": database.trades_collection
+            }
+            database.bots_collection = self.collections["bots"]
+            database.trades_collection = self.collections["trades"]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        for name, value in self._saved_engine.items():
+            setattr(self.engine, name, value)
+        for name, value in self._saved_db.items():
+            setattr(database, name, value)
+        if self._saved_random is not None:
+            random.setstate(self._saved_random)
+        if self._saved_regime:
+            from market_regime import market_regime_detector
+            for name, value in self._saved_regime.items():
+                setattr(market_regime_detector, name, value)
+        return False
+
+    async def seed_bots(self, bots: List[Dict]):
+        for bot in bots:
+            if not await self.collections["bots"].find_one({"id": bot["id"]}):
+                await self.collections["bots"].insert_one(dict(bot))
+
+    async def run(self, bots: List[Dict], step: timedelta = timedelta(minutes=1),
+                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  speed: Optional[float] = None) -> Dict:
+        """
+        Advance the clock from start to end in `step` increments, running one
+        trading cycle per bot per step. speed=None runs as fast as possible;
+        speed=N sleeps so simulated time passes N times faster than wall time.
+        """
+        first, last = self.market_data.time_range()
+        start = start or first
+        end = end or last
+        if start is None or end is None:
+            raise ValueError("No recorded market data to replay")
+
+        await self.seed_bots(bots)
+        bot_ids = [bot["id"] for bot in bots]
+        bots_collection = self.collections["bots"]
+
+        self.clock.set(max(start, self.clock.now()))
+        steps = cycles = trades = 0
+        outcomes = Counter()
+        wall_start = time.perf_counter()
+
+        while self.clock.now() <= end:
+            step_started = time.perf_counter()
+            current = await bots_collection.find({"id": {"$in": bot_ids}}, {"_id": 0}).to_list(len(bot_ids))
+
+            results = await asyncio.gather(*(
+                self.engine.run_trading_cycle(bot["id"], bot, self.collections) for bot in current
+            ))
+            steps += 1
+            cycles += len(results)
+            for result in results:
+                if result:
+                    trades += 1
+                    outcomes["win" if result["trade"].get("is_profitable") else "loss"] += 1
+                else:
+                    outcomes["no_trade"] += 1
+
+            if speed:
+                remaining = step.total_seconds() / speed - (time.perf_counter() - step_started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            self.clock.advance(step)
+
+        wall_seconds = time.perf_counter() - wall_start
+        sim_seconds = (min(self.clock.now(), end) - start).total_seconds()
+        final = await bots_collection.find({"id": {"$in": bot_ids}}, {"_id": 0}).to_list(len(bot_ids))
+
+        return {
+            "seed": self.seed,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "steps": steps,
+            "bots": len(bot_ids),
+            "cycles": cycles,
+            "trades": trades,
+            "outcomes": dict(outcomes),
+            "wall_seconds": round(wall_seconds, 3),
+            "simulated_seconds": sim_seconds,
+            "speedup": round(sim_seconds / wall_seconds, 1) if wall_seconds > 0 else None,
+            "cycles_per_second": round(cycles / wall_seconds, 1) if wall_seconds > 0 else None,
+            "trades_per_second": round(trades / wall_seconds, 1) if wall_seconds > 0 else None,
+            "final_capital": round(sum(b.get("current_capital", 0) for b in final), 2),
+            "total_profit": round(sum(b.get("total_profit", 0) for b in final), 2)
+        }
+
+
+def replay_bots(count: int, exchange: str = 'luno', capital: float = 1000.0,
+                user_id: str = 'replay-user') -> List[Dict]:
+    """Synthetic bots cycling through the risk modes"""
+    return [
+        {
+            "id": f"replay-bot-{i}",
+            "user_id": user_id,
+            "name": f"Replay Bot {i}",
+            "exchange": exchange,
+            "risk_mode": RISK_MODES[i % len(RISK_MODES)],
+            "initial_capital": capital,
+            "current_capital": capital,
+            "total_profit": 0.0,
+            "trades_count": 0,
+            "status": "active",
+            "trading_mode": "paper"
+        }
+        for i in range(count)
+    ]
+
+
+async def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded market data through PaperTradingEngine")
+    parser.add_argument("--ticks", help="Tick file (CSV or NDJSON)")
+    parser.add_argument("--candles", help="Candle file (CSV or NDJSON)")
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--exchange", default="luno")
+    parser.add_argument("--capital", type=float, default=1000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--step-seconds", type=float, default=60.0)
+    parser.add_argument("--speed", type=float, default=0, help="Times real-time (0 = as fast as possible)")
+    parser.add_argument("--mongo-db", help="Write to this scratch Mongo database instead of memory")
+    args = parser.parse_args(argv)
+
+    if not args.ticks and not args.candles:
+        parser.error("--ticks or --candles is required")
+
+    probe = RecordedMarketData.from_files(ReplayClock(datetime.now()), args.ticks, args.candles)
+    start, _ = probe.time_range()
+    if start is None:
+        parser.error("Recorded files contain no data")
+    clock = ReplayClock(start)
+    probe.clock = clock
+
+    collections = None
+    if args.mongo_db:
+        os.environ["DB_NAME"] = args.mongo_db
+        await database.connect()
+        collections = {"bots": database.bots_collection, "trades": database.trades_collection}
+
+    try:
+        async with ReplaySession(probe, clock, seed=args.seed, collections=collections) as session:
+            report = await session.run(
+                replay_bots(args.bots, args.exchange, args.capital),
+                step=timedelta(seconds=args.step_seconds),
+                speed=args.speed or None
+            )
+    finally:
+        if args.mongo_db:
+            await database.close_db()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    # Signal mocks warn on every call without API keys; keep the report readable
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -3,16 +3,27 @@ Risk Management System - Stop Loss, Take Profit, Trailing Stop
 Critical safety features for live trading
 """
 import asyncio
+import os
 from datetime import datetime, timezone
 import database as db
 from logger_config import logger
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+
+import numpy as np
+
+from engines.instrumentation import StageLaps
 
 # Default risk parameters
 DEFAULT_STOP_LOSS_PCT = 2.0  # 2% stop loss
 DEFAULT_TAKE_PROFIT_PCT = 5.0  # 5% take profit
 DEFAULT_TRAILING_STOP_PCT = 3.0  # 3% trailing stop
 
+# Exits executed concurrently per monitoring tick
+EXIT_CONCURRENCY = int(os.getenv('RISK_EXIT_CONCURRENCY', '20'))
+
+# Oldest cached price a monitoring tick acts on (one tick by default)
+PRICE_MAX_AGE_SECONDS = float(os.getenv('RISK_PRICE_MAX_AGE_SECONDS', '10'))
+
 class RiskManagement:
     def __init__(self):
         self.active_positions = {}  # Track entry prices and stops
@@ -22,7 +33,9 @@ class RiskManagement:
     async def set_position(self, bot_id: str, entry_price: float, 
                           stop_loss_pct: float = None, 
                           take_profit_pct: float = None,
-                          trailing_stop_pct: float = None):
+                          trailing_stop_pct: float = None,
+                          pair: str = None,
+                          exchange: str = None):
         """
         Set stop loss and take profit for a new position
         
@@ -32,6 +45,8 @@ class RiskManagement:
             stop_loss_pct: Stop loss percentage (default 2%)
             take_profit_pct: Take profit percentage (default 5%)
             trailing_stop_pct: Trailing stop percentage (default 3%)
+            pair: Traded pair (defaults to the bot's pair when monitored)
+            exchange: Exchange to price the pair on (defaults to the bot's exchange)
         """
         stop_loss = stop_loss_pct or DEFAULT_STOP_LOSS_PCT
         take_profit = take_profit_pct or DEFAULT_TAKE_PROFIT_PCT
@@ -51,6 +66,8 @@ class RiskManagement:
             'take_profit_price': take_profit_price,
             'trailing_stop_price': trailing_stop_price,
             'highest_price': entry_price,
+            'pair': pair,
+            'exchange': exchange,
             'opened_at': datetime.now(timezone.utc)
         }
         
@@ -120,7 +137,7 @@ class RiskManagement:
             del self.active_positions[bot_id]
             logger.debug(f"Position closed for bot {bot_id}")
     
-    async def execute_exit(self, bot_id: str, exit_price: float, reason: str) -> bool:
+    async def execute_exit(self, bot_id: str, exit_price: float, reason: str, bot: Optional[Dict] = None) -> bool:
         """
         Execute exit order for a position
         
@@ -128,12 +145,14 @@ class RiskManagement:
             bot_id: Bot identifier
             exit_price: Exit price
             reason: Reason for exit (stop_loss, take_profit, trailing_stop)
+            bot: Bot document if already loaded (skips the lookup)
         
         Returns:
             True if successful
         """
         try:
-            bot = await db.bots_collection.find_one({"id": bot_id}, {"_id": 0})
+            if bot is None:
+                bot = await db.bots_collection.find_one({"id": bot_id}, {"_id": 0})
             if not bot:
                 return False
             
@@ -184,6 +203,7 @@ class RiskManagement:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
             
+            trade["ts"] = db.trade_ts(trade["timestamp"])
             await db.trades_collection.insert_one(trade)
             
             # Send real-time notification
@@ -206,6 +226,145 @@ class RiskManagement:
             logger.error(f"Exit execution error for bot {bot_id}: {e}")
             return False
     
+    def evaluate_positions(self, bot_ids: List[str], prices: List[float]) -> List[Dict]:
+        """
+        Apply stop loss, take profit and trailing stop rules to many positions at once
+        
+        Same rules and precedence as check_position, as one numpy pass.
+        Raised trailing stops are written back to active_positions.
+        
+        Returns:
+            List of exit signals with bot_id, action, reason, exit_price and pnl_pct
+        """
+        if not bot_ids:
+            return []
+        
+        positions = [self.active_positions[bot_id] for bot_id in bot_ids]
+        price = np.asarray(prices, dtype=float)
+        entry = np.array([p['entry_price'] for p in positions], dtype=float)
+        stop_loss = np.array([p['stop_loss_price'] for p in positions], dtype=float)
+        take_profit = np.array([p['take_profit_price'] for p in positions], dtype=float)
+        trailing = np.array([p['trailing_stop_price'] for p in positions], dtype=float)
+        highest = np.array([p['highest_price'] for p in positions], dtype=float)
+        trail_pct = np.array([p['trailing_stop_pct'] for p in positions], dtype=float)
+        
+        pnl_pct = (price - entry) / entry * 100
+        stop_hit = price <= stop_loss
+        tp_hit = ~stop_hit & (price >= take_profit)
+        open_ = ~stop_hit & ~tp_hit
+        
+        # Move trailing stops up on new highs
+        rising = open_ & (price > highest)
+        highest = np.where(rising, price, highest)
+        trailing = np.where(rising, np.maximum(trailing, price * (1 - trail_pct / 100)), trailing)
+        trail_hit = open_ & (price <= trailing) & (highest > entry)
+        
+        for i in np.flatnonzero(rising):
+            positions[i]['highest_price'] = float(highest[i])
+            positions[i]['trailing_stop_price'] = float(trailing[i])
+        
+        signals = []
+        for i in np.flatnonzero(stop_hit | tp_hit | trail_hit):
+            bot_id = bot_ids[i]
+            pnl = float(pnl_pct[i])
+            if stop_hit[i]:
+                logger.warning(f"🛑 STOP LOSS triggered for bot {bot_id}: {pnl:.2f}%")
+                action, reason = 'stop_loss', f"Stop loss triggered at {pnl:.2f}%"
+            elif tp_hit[i]:
+                logger.info(f"✅ TAKE PROFIT triggered for bot {bot_id}: +{pnl:.2f}%")
+                action, reason = 'take_profit', f"Take profit triggered at +{pnl:.2f}%"
+            else:
+                secured = (trailing[i] - entry[i]) / entry[i] * 100
+                logger.info(f"🔒 TRAILING STOP triggered for bot {bot_id}: Secured +{secured:.2f}%")
+                action, reason = 'trailing_stop', f"Trailing stop triggered, profit secured: +{secured:.2f}%"
+            signals.append({
+                'bot_id': bot_id,
+                'action': action,
+                'reason': reason,
+                'exit_price': float(price[i]),
+                'pnl_pct': pnl
+            })
+        
+        return signals
+    
+    async def _fetch_prices(self, keys: List[tuple]) -> Dict[tuple, float]:
+        """Price every (exchange, pair) with one batched call per exchange (fresh prices only)"""
+        from paper_trading_engine import paper_engine
+        
+        by_exchange: Dict[str, List[str]] = {}
+        for exchange, pair in keys:
+            by_exchange.setdefault(exchange, []).append(pair)
+        
+        exchanges = list(by_exchange)
+        results = await asyncio.gather(
+            *(paper_engine.get_prices(by_exchange[exchange], exchange, max_age=PRICE_MAX_AGE_SECONDS)
+              for exchange in exchanges),
+            return_exceptions=True
+        )
+        
+        prices = {}
+        for exchange, result in zip(exchanges, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Price fetch failed for {exchange}: {result}")
+                continue
+            for pair, price in result.items():
+                if price:
+                    prices[(exchange, pair)] = price
+        return prices
+    
+    async def monitor_positions(self) -> Dict:
+        """
+        One monitoring pass over all active positions
+        
+        - Bot status for every position in one $in query
+        - Prices from one batched call per exchange; positions without a
+          fresh price are skipped this tick
+        - Exit rules evaluated in one vectorized pass
+        - Exits executed concurrently (bounded by EXIT_CONCURRENCY)
+        """
+        bot_ids = list(self.active_positions.keys())
+        if not bot_ids:
+            return {"checked": 0, "closed": 0, "exits": 0}
+        
+        bots = {
+            bot['id']: bot
+            async for bot in db.bots_collection.find({"id": {"$in": bot_ids}}, {"_id": 0})
+        }
+        
+        closed = 0
+        keys = {}
+        for bot_id in bot_ids:
+            bot = bots.get(bot_id)
+            if not bot or bot.get('status') != 'active':
+                await self.close_position(bot_id)
+                closed += 1
+                continue
+            position = self.active_positions[bot_id]
+            keys[bot_id] = (
+                position.get('exchange') or bot.get('exchange') or 'luno',
+                position.get('pair') or bot.get('pair') or bot.get('trading_pair') or 'BTC/ZAR'
+            )
+        
+        prices = await self._fetch_prices(list(set(keys.values())))
+        
+        priced = [bot_id for bot_id, key in keys.items() if key in prices]
+        signals = self.evaluate_positions(priced, [prices[keys[bot_id]] for bot_id in priced])
+        
+        semaphore = asyncio.Semaphore(EXIT_CONCURRENCY)
+        
+        async def exit_position(signal):
+            async with semaphore:
+                return await self.execute_exit(
+                    signal['bot_id'],
+                    signal['exit_price'],
+                    signal['action'],
+                    bot=bots[signal['bot_id']]
+                )
+        
+        results = await asyncio.gather(*(exit_position(signal) for signal in signals))
+        
+        return {"checked": len(priced), "closed": closed, "exits": sum(1 for r in results if r)}
+    
     async def monitoring_loop(self):
         """Monitor all active positions every 10 seconds"""
         logger.info("🎯 Risk management monitoring started")
@@ -216,29 +375,9 @@ class RiskManagement:
                     await asyncio.sleep(10)
                     continue
                 
-                # Check each active position
-                for bot_id in list(self.active_positions.keys()):
-                    bot = await db.bots_collection.find_one({"id": bot_id}, {"_id": 0})
-                    if not bot or bot.get('status') != 'active':
-                        await self.close_position(bot_id)
-                        continue
-                    
-                    # Get current price (simulated for now)
-                    import random
-                    position = self.active_positions[bot_id]
-                    # Simulate price movement around entry
-                    current_price = position['entry_price'] * random.uniform(0.95, 1.08)
-                    
-                    # Check if exit triggered
-                    exit_signal = await self.check_position(bot_id, current_price)
-                    
-                    if exit_signal:
-                        # Execute exit
-                        await self.execute_exit(
-                            bot_id, 
-                            exit_signal['exit_price'], 
-                            exit_signal['action']
-                        )
+                tick = StageLaps("scheduler")
+                await self.monitor_positions()
+                tick.total("risk_monitor_tick")
                 
                 await asyncio.sleep(10)  # Check every 10 seconds
             
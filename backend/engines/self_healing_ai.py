@@ -5,11 +5,14 @@ Monitors system health and automatically resolves common issues
 """
 
 import asyncio
-from typing import Dict, List, Optional, Tuple
+import itertools
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import logging
+import time
 import traceback
 import json
 
@@ -46,6 +49,11 @@ class ErrorEvent:
     stack_trace: str
     context: Dict
     bot_id: Optional[str] = None
+    seq: int = 0  # Assigned by ErrorStore; orders events within a fingerprint
+    
+    @property
+    def fingerprint(self) -> Tuple[str, str]:
+        return (self.error_type, self.component)
 
 
 @dataclass
@@ -59,6 +67,191 @@ class HealingAttempt:
     result_message: str
 
 
+class RollingCounter:
+    """
+    Event count over a sliding time window, kept in fixed time buckets
+    
+    add() and total() are O(1) amortized: each bucket is cleared at most once
+    as time advances, and a running total is maintained alongside the buckets.
+    """
+    
+    def __init__(self, window_seconds: float, buckets: int = 12, clock=time.monotonic):
+        self.bucket_seconds = window_seconds / buckets
+        self.counts = [0] * buckets
+        self.clock = clock
+        self._total = 0
+        self._head = int(clock() // self.bucket_seconds)
+    
+    def _advance(self):
+        now = int(self.clock() // self.bucket_seconds)
+        steps = now - self._head
+        if steps <= 0:
+            return
+        if steps >= len(self.counts):
+            self.counts = [0] * len(self.counts)
+            self._total = 0
+        else:
+            for i in range(self._head + 1, now + 1):
+                slot = i % len(self.counts)
+                self._total -= self.counts[slot]
+                self.counts[slot] = 0
+        self._head = now
+    
+    def add(self, n: int = 1):
+        self._advance()
+        self.counts[self._head % len(self.counts)] += n
+        self._total += n
+    
+    def total(self) -> int:
+        self._advance()
+        return self._total
+
+
+@dataclass
+class ErrorFingerprint:
+    """Aggregated state for one (error_type, component)"""
+    error_type: str
+    component: str
+    severity: ErrorSeverity
+    first_seen: datetime
+    last_seen: datetime
+    last_event: ErrorEvent
+    recent: RollingCounter
+    count: int = 0
+    last_seq: int = 0
+    healed_seq: int = 0
+    heal_attempts: int = 0
+    last_healed_at: Optional[datetime] = None
+    
+    @property
+    def pending(self) -> bool:
+        return self.last_seq > self.healed_seq
+    
+    def to_dict(self) -> Dict:
+        return {
+            'error_type': self.error_type,
+            'component': self.component,
+            'severity': self.severity.value,
+            'count': self.count,
+            'recent_count': self.recent.total(),
+            'first_seen': self.first_seen.isoformat(),
+            'last_seen': self.last_seen.isoformat(),
+            'pending': self.pending,
+            'heal_attempts': self.heal_attempts,
+            'last_healed_at': self.last_healed_at.isoformat() if self.last_healed_at else None
+        }
+
+
+class ErrorStore:
+    """
+    Bounded error store indexed by fingerprint (error_type, component)
+    
+    - Raw events live in a ring buffer of `capacity` entries
+    - Fingerprints keep counts, first/last seen and healing state; the least
+      recently seen are evicted beyond `max_fingerprints`
+    - Per-component and per-fingerprint windowed rates are O(1)
+    - "Already healed?" is a sequence comparison, not a scan of healing history
+    """
+    
+    def __init__(
+        self,
+        capacity: int = 1000,
+        max_fingerprints: int = 500,
+        window_minutes: int = 60,
+        clock=time.monotonic
+    ):
+        self.window_seconds = window_minutes * 60
+        self.max_fingerprints = max_fingerprints
+        self.clock = clock
+        self.events: Deque[ErrorEvent] = deque(maxlen=capacity)
+        self.fingerprints: "OrderedDict[Tuple[str, str], ErrorFingerprint]" = OrderedDict()
+        self.component_rates: "OrderedDict[str, RollingCounter]" = OrderedDict()
+        self._seq = itertools.count(1)
+    
+    def __len__(self):
+        return len(self.events)
+    
+    def add(self, event: ErrorEvent) -> ErrorFingerprint:
+        event.seq = next(self._seq)
+        self.events.append(event)
+        
+        key = event.fingerprint
+        fp = self.fingerprints.get(key)
+        if fp is None:
+            fp = ErrorFingerprint(
+                error_type=event.error_type,
+                component=event.component,
+                severity=event.severity,
+                first_seen=event.timestamp,
+                last_seen=event.timestamp,
+                last_event=event,
+                recent=RollingCounter(self.window_seconds, clock=self.clock)
+            )
+            self.fingerprints[key] = fp
+            if len(self.fingerprints) > self.max_fingerprints:
+                self.fingerprints.popitem(last=False)
+        else:
+            self.fingerprints.move_to_end(key)
+        
+        fp.count += 1
+        fp.last_seen = event.timestamp
+        fp.last_event = event
+        fp.last_seq = event.seq
+        fp.recent.add()
+        
+        rate = self.component_rates.get(event.component)
+        if rate is None:
+            rate = self.component_rates[event.component] = RollingCounter(self.window_seconds, clock=self.clock)
+            if len(self.component_rates) > self.max_fingerprints:
+                self.component_rates.popitem(last=False)
+        else:
+            self.component_rates.move_to_end(event.component)
+        rate.add()
+        
+        return fp
+    
+    def component_rate(self, component: str) -> int:
+        """Errors for a component within the window"""
+        rate = self.component_rates.get(component)
+        return rate.total() if rate else 0
+    
+    def is_healed(self, event: ErrorEvent) -> bool:
+        fp = self.fingerprints.get(event.fingerprint)
+        return fp is None or event.seq <= fp.healed_seq
+    
+    def mark_healed(self, event: ErrorEvent):
+        """Record a healing attempt covering this event and earlier ones of its fingerprint"""
+        fp = self.fingerprints.get(event.fingerprint)
+        if fp is None:
+            return
+        fp.healed_seq = max(fp.healed_seq, event.seq)
+        fp.heal_attempts += 1
+        fp.last_healed_at = datetime.now(timezone.utc)
+    
+    def pending(self, since: Optional[datetime] = None) -> List[ErrorFingerprint]:
+        """Fingerprints with errors newer than their last healing attempt"""
+        return [
+            fp for fp in self.fingerprints.values()
+            if fp.pending and (since is None or fp.last_seen > since)
+        ]
+    
+    def recent(self, since: datetime) -> Iterator[ErrorEvent]:
+        """Events newer than `since`, newest first (the ring is time-ordered)"""
+        for event in reversed(self.events):
+            if event.timestamp <= since:
+                break
+            yield event
+    
+    def distribution(self) -> Dict[str, int]:
+        """Error count per type within the window"""
+        counts: Dict[str, int] = {}
+        for fp in self.fingerprints.values():
+            recent = fp.recent.total()
+            if recent:
+                counts[fp.error_type] = counts.get(fp.error_type, 0) + recent
+        return counts
+
+
 class SelfHealingAI:
     """
     Autonomous error detection and resolution system
@@ -69,7 +262,10 @@ class SelfHealingAI:
         self,
         max_error_rate: int = 10,
         error_window_minutes: int = 60,
-        max_retry_attempts: int = 3
+        max_retry_attempts: int = 3,
+        error_capacity: int = 1000,
+        healing_capacity: int = 500,
+        max_fingerprints: int = 500
     ):
         """
         Initialize self-healing AI
@@ -78,14 +274,24 @@ class SelfHealingAI:
             max_error_rate: Maximum errors per window before escalation
             error_window_minutes: Time window for error rate calculation
             max_retry_attempts: Maximum retry attempts per error
+            error_capacity: Raw error events kept in the ring buffer
+            healing_capacity: Healing attempts kept for reporting
+            max_fingerprints: Distinct (error_type, component) pairs tracked
         """
         self.max_error_rate = max_error_rate
         self.error_window_minutes = error_window_minutes
         self.max_retry_attempts = max_retry_attempts
         
-        # Error tracking
-        self.error_history: List[ErrorEvent] = []
-        self.healing_history: List[HealingAttempt] = []
+        # Error tracking (bounded)
+        self.error_store = ErrorStore(
+            capacity=error_capacity,
+            max_fingerprints=max_fingerprints,
+            window_minutes=error_window_minutes
+        )
+        self.healing_history: Deque[HealingAttempt] = deque(maxlen=healing_capacity)
+        self.healings_total = 0
+        self.healings_successful = 0
+        self.recent_healings = RollingCounter(3600)
         
         # Component health status
         self.component_health: Dict[str, Dict] = {}
@@ -96,6 +302,12 @@ class SelfHealingAI:
         # Retry counters per error type
         self.retry_counts: Dict[str, int] = {}
     
+    @property
+    def error_history(self) -> List[ErrorEvent]:
+        """Errors within the error window, oldest first"""
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=self.error_window_minutes)
+        return list(reversed(list(self.error_store.recent(cutoff))))
+    
     def _initialize_error_patterns(self) -> Dict[str, Dict]:
         """
         Initialize known error patterns and their solutions
@@ -213,11 +425,7 @@ class SelfHealingAI:
             bot_id=bot_id
         )
         
-        self.error_history.append(error_event)
-        
-        # Clean old errors
-        cutoff = datetime.now(timezone.utc) - timedelta(minutes=self.error_window_minutes)
-        self.error_history = [e for e in self.error_history if e.timestamp > cutoff]
+        self.error_store.add(error_event)
         
         # Update component health
         if component not in self.component_health:
@@ -231,10 +439,7 @@ class SelfHealingAI:
         self.component_health[component]['last_error'] = error_event.timestamp
         
         # Check error rate
-        error_rate = len([
-            e for e in self.error_history
-            if e.component == component
-        ])
+        error_rate = self.error_store.component_rate(component)
         
         if error_rate > self.max_error_rate:
             self.component_health[component]['status'] = 'degraded'
@@ -308,6 +513,10 @@ class SelfHealingAI:
         )
         
         self.healing_history.append(healing_attempt)
+        self.error_store.mark_healed(error_event)
+        self.healings_total += 1
+        self.healings_successful += int(success)
+        self.recent_healings.add()
         
         # Update component health
         if success:
@@ -390,16 +599,13 @@ class SelfHealingAI:
             Health report dictionary
         """
         # Calculate metrics
-        recent_errors = len(self.error_history)
-        recent_healings = len([
-            h for h in self.healing_history
-            if h.timestamp > datetime.now(timezone.utc) - timedelta(hours=1)
-        ])
+        error_distribution = self.error_store.distribution()
+        recent_errors = sum(error_distribution.values())
+        recent_healings = self.recent_healings.total()
         
         healing_success_rate = 0.0
-        if self.healing_history:
-            successful_healings = sum(1 for h in self.healing_history if h.success)
-            healing_success_rate = successful_healings / len(self.healing_history)
+        if self.healings_total:
+            healing_success_rate = self.healings_successful / self.healings_total
         
         # Component health summary
         degraded_components = [
@@ -407,13 +613,6 @@ class SelfHealingAI:
             if health['status'] == 'degraded'
         ]
         
-        # Error distribution
-        error_distribution = {}
-        for error in self.error_history:
-            error_distribution[error.error_type] = error_distribution.get(
-                error.error_type, 0
-            ) + 1
-        
         report = {
             'timestamp': datetime.now(timezone.utc).isoformat(),
             'overall_status': 'healthy' if not degraded_components else 'degraded',
@@ -426,6 +625,12 @@ class SelfHealingAI:
             'component_health': self.component_health,
             'error_distribution': error_distribution,
             'degraded_components': degraded_components,
+            'top_errors': [
+                fp.to_dict()
+                for fp in sorted(
+                    self.error_store.fingerprints.values(), key=lambda fp: fp.last_seen, reverse=True
+                )[:10]
+            ],
             'recent_healing_attempts': [
                 {
                     'timestamp': h.timestamp.isoformat(),
@@ -436,7 +641,7 @@ class SelfHealingAI:
                     'duration': h.duration_seconds,
                     'message': h.result_message
                 }
-                for h in self.healing_history[-10:]
+                for h in list(self.healing_history)[-10:]
             ]
         }
         
@@ -451,21 +656,11 @@ class SelfHealingAI:
         
         while True:
             try:
-                # Check for errors that need healing
-                recent_errors = [
-                    e for e in self.error_history
-                    if e.timestamp > datetime.now(timezone.utc) - timedelta(minutes=5)
-                ]
-                
-                for error in recent_errors:
-                    # Check if already healed
-                    already_healed = any(
-                        h.error_event == error
-                        for h in self.healing_history
-                    )
-                    
-                    if not already_healed:
-                        await self.heal_error(error)
+                # One healing attempt per fingerprint with unhealed recent errors;
+                # it covers every earlier error of that fingerprint
+                since = datetime.now(timezone.utc) - timedelta(minutes=5)
+                for fingerprint in self.error_store.pending(since):
+                    await self.heal_error(fingerprint.last_event)
                 
                 # Sleep before next check
                 await asyncio.sleep(30)  # Check every 30 seconds
@@ -25,22 +25,45 @@ Exchange limits are sourced from official documentation:
 """
 
 import asyncio
-from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Tuple
 import database as db
 from exchange_limits import EXCHANGE_LIMITS, get_exchange_limits
+from services.rate_limit_service import rate_limit_service, Hold, Window, daily, exchange_key, bot_key
 import logging
 
 logger = logging.getLogger(__name__)
 
+LIMIT_SCOPE = "budget"  # Counter namespace in the shared rate limit service
+
 
 class TradeBudgetManager:
     """Manages daily trade budgets per exchange and allocates fairly among bots"""
     
-    def __init__(self):
+    def __init__(self, limits_service=None):
         self.exchange_limits = EXCHANGE_LIMITS
         self.budget_cache = {}  # Cache for per-bot daily budgets
         self.last_budget_reset = {}  # Track when budgets were last reset
+        self._limits_service = limits_service
+    
+    @property
+    def limits(self):
+        """Shared rate limit service (counters are shared across workers)"""
+        return self._limits_service or rate_limit_service
+    
+    def _trade_rules(self, bot_id: str, exchange: str, daily_budget: int) -> list:
+        """(key, window, message, seed) rules a trade consumes, in the order they are enforced"""
+        limits = get_exchange_limits(exchange)
+        max_burst = limits.get('max_orders_per_10_seconds', 10)
+        return [
+            (bot_key(bot_id, scope=LIMIT_SCOPE), daily(daily_budget),
+             "Daily budget exhausted ({count}/{limit} trades today)",
+             lambda: db.count_trades_today(bot_id=bot_id)),
+            (exchange_key(exchange, scope=LIMIT_SCOPE), daily(limits.get('max_orders_per_day', 500)),
+             f"Exchange daily budget exhausted for {exchange} ({{count}}/{{limit}} trades today)",
+             lambda: db.count_trades_today(exchange=exchange)),
+            (exchange_key(exchange, scope=LIMIT_SCOPE), Window(max_burst, 10),
+             "Exchange burst limit: Burst limit reached ({count}/{limit} in 10s)"),
+        ]
         
     async def get_exchange_daily_budget(self, exchange: str) -> int:
         """Get the daily trade budget for an exchange
@@ -91,9 +114,8 @@ class TradeBudgetManager:
         # Get total daily budget for exchange
         total_budget = await self.get_exchange_daily_budget(exchange)
         
-        # Get all active bots on this exchange
-        active_bots = await self.get_active_bots_for_exchange(exchange)
-        bot_count = len(active_bots)
+        # Count active bots on this exchange
+        bot_count = await db.bots_collection.count_documents({"exchange": exchange, "status": "active"})
         
         if bot_count == 0:
             return 0
@@ -122,12 +144,11 @@ class TradeBudgetManager:
         # Get bot's daily budget
         daily_budget = await self.calculate_bot_daily_budget(bot_id, exchange)
         
-        # Count trades executed today
-        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        trades_today = await db.trades_collection.count_documents({
-            "bot_id": bot_id,
-            "timestamp": {"$gte": today_start.isoformat()}
-        })
+        # Count trades executed today (shared O(1) counter, seeded from trades once per day)
+        trades_today = await self.limits.count(
+            bot_key(bot_id, scope=LIMIT_SCOPE), daily(daily_budget),
+            seed=lambda: db.count_trades_today(bot_id=bot_id)
+        )
         
         remaining = max(0, daily_budget - trades_today)
         return remaining
@@ -135,6 +156,9 @@ class TradeBudgetManager:
     async def can_execute_trade(self, bot_id: str, exchange: str) -> Tuple[bool, str]:
         """Check if a bot can execute a trade within budget limits
         
+        Read-only status for reports; acquire_trade() is the gate that
+        actually consumes the budget.
+        
         Args:
             bot_id: Bot ID
             exchange: Exchange name
@@ -180,48 +204,45 @@ class TradeBudgetManager:
         Returns:
             Tuple of (allowed: bool, reason: str)
         """
-        # Count trades in last 10 seconds for this exchange
-        ten_seconds_ago = datetime.now(timezone.utc) - timedelta(seconds=10)
-        
-        recent_trades = await db.trades_collection.count_documents({
-            "exchange": exchange,
-            "timestamp": {"$gte": ten_seconds_ago.isoformat()}
-        })
-        
         limits = get_exchange_limits(exchange)
         max_burst = limits.get('max_orders_per_10_seconds', 10)
         
+        # Orders in the last 10 seconds for this exchange (shared sliding window)
+        recent_trades = await self.limits.count(exchange_key(exchange, scope=LIMIT_SCOPE), Window(max_burst, 10))
+        
         if recent_trades >= max_burst:
             return False, f"Burst limit reached ({recent_trades}/{max_burst} in 10s)"
         
         return True, "OK"
     
-    async def record_trade_execution(self, bot_id: str, exchange: str) -> bool:
-        """Record that a trade was executed (for tracking purposes)
+    async def acquire_trade(self, bot_id: str, exchange: str) -> Tuple[bool, str, Optional[Hold]]:
+        """Take one trade from the bot's and the exchange's budgets
         
-        Note: Actual trade recording happens in trading_scheduler.
-        This method is for budget tracking metadata if needed.
+        Consumes the bot daily budget, the exchange daily budget and the
+        exchange burst window in one acquire(), so concurrent workers can
+        never jointly overspend a budget. Pass the hold to release_trade()
+        if the trade is then not executed.
         
         Args:
             bot_id: Bot ID
             exchange: Exchange name
             
         Returns:
-            Success status
+            Tuple of (acquired: bool, reason: str, hold)
         """
         try:
-            # Update bot's daily trade count
-            await db.bots_collection.update_one(
-                {"id": bot_id},
-                {
-                    "$inc": {"daily_trade_count": 1},
-                    "$set": {"last_trade_time": datetime.now(timezone.utc).isoformat()}
-                }
-            )
-            return True
+            daily_budget = await self.calculate_bot_daily_budget(bot_id, exchange)
+            return await self.limits.acquire(self._trade_rules(bot_id, exchange, daily_budget))
+        except Exception as e:
+            logger.error(f"Budget acquire error for bot {bot_id}: {e}")
+            return False, f"Error: {str(e)}", None
+    
+    async def release_trade(self, hold: Optional[Hold]):
+        """Give back a trade taken by acquire_trade() that was not executed"""
+        try:
+            await self.limits.release_hold(hold)
         except Exception as e:
-            logger.error(f"Failed to record trade execution: {e}")
-            return False
+            logger.error(f"Budget release error: {e}")
     
     async def reset_daily_budgets(self):
         """Reset daily trade counts for all bots (called at midnight UTC)"""
@@ -245,17 +266,15 @@ class TradeBudgetManager:
         """
         try:
             total_budget = await self.get_exchange_daily_budget(exchange)
-            active_bots = await self.get_active_bots_for_exchange(exchange)
-            bot_count = len(active_bots)
+            bot_count = await db.bots_collection.count_documents({"exchange": exchange, "status": "active"})
             
             per_bot_budget = total_budget // bot_count if bot_count > 0 else 0
             
-            # Count trades today
-            today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-            trades_today = await db.trades_collection.count_documents({
-                "exchange": exchange,
-                "timestamp": {"$gte": today_start.isoformat()}
-            })
+            # Count trades today (shared counter, seeded from trades once per day)
+            trades_today = await self.limits.count(
+                exchange_key(exchange, scope=LIMIT_SCOPE), daily(total_budget),
+                seed=lambda: db.count_trades_today(exchange=exchange)
+            )
             
             remaining = max(0, total_budget - trades_today)
             utilization = (trades_today / total_budget * 100) if total_budget > 0 else 0
@@ -1,18 +1,35 @@
 """
 Trade Limiter - Enforces per-exchange trade limits and cooldowns
+
+Daily counts come from the shared rate limit service so they hold across
+workers; the bot document keeps last_trade_time for the cooldown.
 """
 import asyncio
 from datetime import datetime, timezone, timedelta
 import database as db
 from config import EXCHANGE_TRADE_LIMITS, MAX_TRADES_PER_USER_PER_DAY
 from logger_config import logger
+from services.rate_limit_service import rate_limit_service, daily, bot_key
 import random
 
+LIMIT_SCOPE = "trade_limiter"  # Counter namespace in the shared rate limit service
+
 
 class TradeLimiter:
-    def __init__(self):
+    def __init__(self, limits_service=None):
         self.exchange_limits = EXCHANGE_TRADE_LIMITS
         self.max_user_daily_trades = MAX_TRADES_PER_USER_PER_DAY
+        self._limits_service = limits_service
+    
+    @property
+    def limits(self):
+        return self._limits_service or rate_limit_service
+    
+    async def _daily_count(self, bot_id: str, max_daily: int) -> int:
+        """Bot's trades today; a cold counter is seeded from today's trades"""
+        return await self.limits.count(
+            bot_key(bot_id, scope=LIMIT_SCOPE), daily(max_daily), seed=lambda: db.count_trades_today(bot_id=bot_id)
+        )
     
     async def can_trade(self, bot_id: str) -> tuple[bool, str]:
         """Check if bot is allowed to trade now"""
@@ -33,7 +50,7 @@ class TradeLimiter:
             min_cooldown = limits['min_cooldown_minutes']
             
             # Check daily limit
-            daily_count = bot.get('daily_trade_count', 0)
+            daily_count = await self._daily_count(bot_id, max_daily)
             if daily_count >= max_daily:
                 return False, f"Daily limit reached ({daily_count}/{max_daily} for {exchange})"
             
@@ -61,6 +78,11 @@ class TradeLimiter:
     async def record_trade(self, bot_id: str) -> bool:
         """Record that a trade was executed"""
         try:
+            bot = await db.bots_collection.find_one({"id": bot_id}, {"_id": 0, "exchange": 1})
+            exchange = (bot or {}).get('exchange', 'binance').lower()
+            limits = self.exchange_limits.get(exchange, self.exchange_limits['binance'])
+            await self.limits.record(bot_key(bot_id, scope=LIMIT_SCOPE), daily(limits['max_trades_per_bot_per_day']))
+            
             result = await db.bots_collection.update_one(
                 {"id": bot_id},
                 {
@@ -90,7 +112,7 @@ class TradeLimiter:
             limits = self.exchange_limits.get(exchange, self.exchange_limits['binance'])
             max_daily = limits['max_trades_per_bot_per_day']
             
-            daily_count = bot.get('daily_trade_count', 0)
+            daily_count = await self._daily_count(bot_id, max_daily)
             remaining = max_daily - daily_count
             
             can_trade, reason = await self.can_trade(bot_id)
@@ -4,7 +4,7 @@ Replaces simulated trading with actual CCXT order execution
 """
 
 import asyncio
-import ccxt
+import ccxt.async_support as ccxt
 from typing import Dict, Optional, List
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
@@ -20,38 +20,35 @@ logger = logging.getLogger(__name__)
 class LiveTradingEngine:
     def __init__(self):
         self.ccxt_service = CCXTService()
-        self.active_exchanges = {}  # user_id -> {exchange_name: ccxt_instance}
+        self.active_exchanges = {}  # user_id -> {exchange_name: pooled ccxt instance}
         self.open_orders = {}  # order_id -> order_data
         
     async def init_user_exchanges(self, user_id: str) -> Dict[str, ccxt.Exchange]:
-        """Initialize all exchange connections for a user"""
+        """Get pooled exchange connections for all of a user's API keys"""
         try:
-            api_keys = await db.api_keys_collection.find(
-                {"user_id": user_id},
-                {"_id": 0}
-            ).to_list(100)
-            
-            exchanges = {}
-            for key_doc in api_keys:
-                exchange_name = key_doc['exchange'].lower()
-                try:
-                    exchange = self.ccxt_service.init_exchange(
-                        exchange_name,
-                        key_doc['api_key'],
-                        key_doc['api_secret'],
-                        testnet=False,
-                        passphrase=key_doc.get('passphrase')
-                    )
-                    exchanges[exchange_name] = exchange
-                    logger.info(f"✅ Initialized {exchange_name} for user {user_id[:8]}")
-                except Exception as e:
-                    logger.error(f"❌ Failed to init {exchange_name}: {e}")
-                    
+            exchanges = await self.ccxt_service.pool.get_user_clients(user_id)
+            if exchanges:
+                logger.info(f"✅ Exchanges ready for user {user_id[:8]}: {', '.join(exchanges)}")
             return exchanges
         except Exception as e:
             logger.error(f"Failed to init user exchanges: {e}")
             return {}
     
+    async def get_exchange(self, user_id: str, exchange_name: str) -> Optional[ccxt.Exchange]:
+        """Get the pooled client for one exchange (rebuilt on key rotation)"""
+        try:
+            exchange = await self.ccxt_service.get_client(user_id, exchange_name)
+        except Exception as e:
+            logger.error(f"❌ Failed to init {exchange_name}: {e}")
+            exchange = None
+        
+        user_exchanges = self.active_exchanges.setdefault(user_id, {})
+        if exchange:
+            user_exchanges[exchange_name] = exchange
+        else:
+            user_exchanges.pop(exchange_name, None)
+        return exchange
+    
     def normalize_symbol(self, symbol: str, exchange_name: str) -> str:
         """Normalize symbol for specific exchange"""
         symbol_map = {
@@ -76,7 +73,7 @@ class LiveTradingEngine:
     async def get_real_price(self, exchange: ccxt.Exchange, symbol: str) -> Optional[float]:
         """Get real current price from exchange"""
         try:
-            ticker = await asyncio.to_thread(exchange.fetch_ticker, symbol)
+            ticker = await exchange.fetch_ticker(symbol)
             return ticker.get('last') or ticker.get('close')
         except Exception as e:
             logger.error(f"Failed to fetch price for {symbol}: {e}")
@@ -86,10 +83,7 @@ class LiveTradingEngine:
                                side: str, amount: float, price: float) -> Optional[Dict]:
         """Place real limit order"""
         try:
-            order = await asyncio.to_thread(
-                exchange.create_limit_order,
-                symbol, side, amount, price
-            )
+            order = await exchange.create_limit_order(symbol, side, amount, price)
             
             logger.info(f"✅ Limit order placed: {side} {amount} {symbol} @ {price}")
             return order
@@ -112,10 +106,7 @@ class LiveTradingEngine:
                                  side: str, amount: float) -> Optional[Dict]:
         """Place real market order"""
         try:
-            order = await asyncio.to_thread(
-                exchange.create_market_order,
-                symbol, side, amount
-            )
+            order = await exchange.create_market_order(symbol, side, amount)
             
             logger.info(f"✅ Market order placed: {side} {amount} {symbol}")
             return order
@@ -138,10 +129,7 @@ class LiveTradingEngine:
                                  symbol: str) -> Optional[Dict]:
         """Check status of an order"""
         try:
-            order = await asyncio.to_thread(
-                exchange.fetch_order,
-                order_id, symbol
-            )
+            order = await exchange.fetch_order(order_id, symbol)
             return order
         except Exception as e:
             logger.error(f"Failed to check order status: {e}")
@@ -151,7 +139,7 @@ class LiveTradingEngine:
                           symbol: str) -> bool:
         """Cancel an open order"""
         try:
-            await asyncio.to_thread(exchange.cancel_order, order_id, symbol)
+            await exchange.cancel_order(order_id, symbol)
             logger.info(f"✅ Order {order_id} cancelled")
             return True
         except Exception as e:
@@ -166,11 +154,8 @@ class LiveTradingEngine:
             user_id = bot_data['user_id']
             exchange_name = bot_data['exchange'].lower()
             
-            # Get exchange instance
-            if user_id not in self.active_exchanges:
-                self.active_exchanges[user_id] = await self.init_user_exchanges(user_id)
-            
-            exchange = self.active_exchanges[user_id].get(exchange_name)
+            # Get pooled exchange instance
+            exchange = await self.get_exchange(user_id, exchange_name)
             
             if not exchange and not paper_mode:
                 return {
@@ -337,7 +322,7 @@ class LiveTradingEngine:
                 
                 for trade in recent_trades:
                     # Get current price
-                    exchange = self.active_exchanges.get(user_id, {}).get(bot['exchange'])
+                    exchange = await self.get_exchange(user_id, bot['exchange'].lower())
                     if not exchange:
                         continue
                     
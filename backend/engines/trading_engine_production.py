@@ -79,6 +79,7 @@ class TradingEngineProduction:
                 "status": "completed"
             }
             
+            trade["ts"] = db.trade_ts(trade["timestamp"])
             await db.trades_collection.insert_one(trade)
             
             # Log trade
@@ -93,7 +94,9 @@ class TradingEngineProduction:
                     entry_price=current_price,
                     stop_loss_pct=2.0,  # 2% stop loss
                     take_profit_pct=5.0,  # 5% take profit
-                    trailing_stop_pct=3.0  # 3% trailing stop
+                    trailing_stop_pct=3.0,  # 3% trailing stop
+                    pair=pair,
+                    exchange=exchange
                 )
             except Exception as e:
                 logger.error(f"Risk management setup error: {e}")
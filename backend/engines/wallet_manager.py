@@ -6,13 +6,13 @@ Cross-Exchange Wallet Manager
 - AI-controlled allocation
 """
 
-import asyncio
 from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from decimal import Decimal
 import logging
 
 import database as db
+from pymongo import UpdateOne
 from ccxt_service import CCXTService
 
 logger = logging.getLogger(__name__)
@@ -44,15 +44,11 @@ class WalletManager:
             if not luno_key:
                 return {"error": "Luno API keys not configured"}
             
-            # Initialize Luno exchange
-            exchange = self.ccxt_service.init_exchange(
-                'luno',
-                luno_key['api_key'],
-                luno_key['api_secret']
-            )
+            # Pooled Luno client
+            exchange = await self.ccxt_service.get_client(user_id, 'luno', luno_key)
             
             # Fetch balances
-            balance = await asyncio.to_thread(exchange.fetch_balance)
+            balance = await exchange.fetch_balance()
             
             # Get ZAR and crypto balances
             zar_balance = balance.get('ZAR', {}).get('free', 0)
@@ -81,7 +77,7 @@ class WalletManager:
     async def get_btc_price_zar(self, exchange) -> Optional[float]:
         """Get BTC/ZAR price"""
         try:
-            ticker = await asyncio.to_thread(exchange.fetch_ticker, 'XBTZAR')
+            ticker = await exchange.fetch_ticker('XBTZAR')
             return ticker.get('last', 0)
         except:
             return None
@@ -98,14 +94,9 @@ class WalletManager:
         for key_doc in api_keys:
             exchange_name = key_doc['exchange'].lower()
             try:
-                exchange = self.ccxt_service.init_exchange(
-                    exchange_name,
-                    key_doc['api_key'],
-                    key_doc['api_secret'],
-                    passphrase=key_doc.get('passphrase')
-                )
+                exchange = await self.ccxt_service.get_client(user_id, exchange_name, key_doc)
                 
-                balance = await asyncio.to_thread(exchange.fetch_balance)
+                balance = await exchange.fetch_balance()
                 
                 # Extract key currencies
                 balances[exchange_name] = {
@@ -220,11 +211,11 @@ class WalletManager:
             # Distribute profit to top 5 performers
             per_bot_allocation = total_profit / 5
             
-            for bot_id in top_performers[:5]:
-                await db.bots_collection.update_one(
-                    {"id": bot_id},
-                    {"$inc": {"current_capital": per_bot_allocation}}
-                )
+            if top_performers:
+                await db.bots_collection.bulk_write([
+                    UpdateOne({"id": bot_id}, {"$inc": {"current_capital": per_bot_allocation}})
+                    for bot_id in top_performers[:5]
+                ], ordered=False)
             
             logger.info(f"💰 Rebalanced R{total_profit:.2f} to top 5 bots (R{per_bot_allocation:.2f} each)")
             
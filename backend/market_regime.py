@@ -2,46 +2,144 @@
 Market Regime Detection
 - Detects trending up/down, sideways, high/low volatility
 - Adjusts bot parameters based on market conditions
+
+Prices are kept per pair in a PriceSeries: the last price of each 5-minute
+bucket over the past 24h, in a fixed-size ring with running sums, so a
+regime read is O(1) and never calls the exchange.
+- A missing series is warmed up from 5m candles (exchange OHLCV, or recorded
+  candles during a replay), so a restart does not start from nothing
+- run_sampler() (background service) records tracked pairs every
+  REGIME_SAMPLE_INTERVAL seconds, from the live price snapshot when it has
+  the pair and one bulk ticker call per exchange otherwise
+- Callers that already hold a fresh price pass it to detect_regime(price=...)
 """
 
 import asyncio
-from datetime import datetime, timezone, timedelta
+import math
+import os
+from array import array
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
 import database as db
 from logger_config import logger
-import math
+from engines.market_data import SystemClock
+
+REGIME_BUCKET_SECONDS = 300  # 5m buckets, warmed up from 5m candles
+REGIME_WINDOW_SECONDS = 24 * 60 * 60
+REGIME_SAMPLE_INTERVAL = float(os.getenv('REGIME_SAMPLE_INTERVAL', '60'))
+REGIME_PAIRS = ('BTC/ZAR', 'ETH/ZAR', 'XRP/ZAR')
+
+
+class PriceSeries:
+    """
+    Last price per time bucket over a rolling window, in a fixed-size ring
+    
+    Running sums of the bucket prices (shifted by the first price seen, to keep
+    the sum of squares precise) give mean and standard deviation without walking
+    the window. Buckets that fall out of the window are dropped as time moves on.
+    """
+    
+    def __init__(self, resolution: int = REGIME_BUCKET_SECONDS, window: int = REGIME_WINDOW_SECONDS):
+        self.resolution = resolution
+        self.size = max(1, window // resolution)
+        self.prices = array('d', [0.0] * self.size)
+        self.buckets = array('q', [-1] * self.size)  # bucket number held by each slot, -1 = empty
+        self.count = 0
+        self.newest = -1
+        self.oldest = -1
+        self._shift = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def add(self, price: float, timestamp: float):
+        """Record a price; it becomes its bucket's price (a later one in the same bucket replaces it)"""
+        bucket = int(timestamp // self.resolution)
+        if bucket > self.newest:
+            self.expire(timestamp)
+            self.newest = bucket
+        elif bucket <= self.newest - self.size:
+            return  # older than the window
+        
+        if self._shift is None:
+            self._shift = price
+        slot = bucket % self.size
+        if self.buckets[slot] != -1:
+            self._remove(slot)
+        value = price - self._shift
+        self.prices[slot] = price
+        self.buckets[slot] = bucket
+        self.count += 1
+        self._sum += value
+        self._sum_sq += value * value
+        if self.oldest == -1 or bucket < self.oldest:
+            self.oldest = bucket
+    
+    def expire(self, now: float):
+        """Drop buckets that are outside the window ending at `now`"""
+        cutoff = int(now // self.resolution) - self.size
+        while self.oldest != -1 and self.oldest <= cutoff:
+            self._remove(self.oldest % self.size)
+            self.oldest = self._next_bucket(self.oldest + 1)
+    
+    def _next_bucket(self, start: int) -> int:
+        """Oldest held bucket at or after `start` (held buckets all lie within size of newest)"""
+        for bucket in range(max(start, self.newest - self.size + 1), self.newest + 1):
+            if self.buckets[bucket % self.size] == bucket:
+                return bucket
+        return -1
+    
+    def _remove(self, slot: int):
+        value = self.prices[slot] - self._shift
+        self.buckets[slot] = -1
+        self.count -= 1
+        self._sum -= value
+        self._sum_sq -= value * value
+        if self.count == 0:
+            self._sum = self._sum_sq = 0.0  # no drift carried into the next fill
+    
+    @property
+    def first(self) -> Optional[float]:
+        return self.prices[self.oldest % self.size] if self.count else None
+    
+    @property
+    def last(self) -> Optional[float]:
+        return self.prices[self.newest % self.size] if self.count else None
+    
+    @property
+    def mean(self) -> Optional[float]:
+        return self._shift + self._sum / self.count if self.count else None
+    
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        mean = self._sum / self.count
+        return math.sqrt(max(self._sum_sq / self.count - mean * mean, 0.0))
 
 
 class MarketRegimeDetector:
-    def __init__(self):
-        self.price_history = {}  # Store recent prices
+    def __init__(self, clock: SystemClock = None):
+        self.price_history: Dict[str, PriceSeries] = {}  # pair -> 24h bucketed prices
         self.current_regime = {}
+        self.clock = clock or SystemClock()
+        self.tracked: Dict[str, str] = {}  # pair -> exchange the sampler keeps current
+        self.sample_interval = REGIME_SAMPLE_INTERVAL
     
-    async def detect_regime(self, pair: str, exchange: str = 'luno') -> dict:
-        """Detect current market regime for a trading pair"""
+    async def detect_regime(self, pair: str, exchange: str = 'luno', price: Optional[float] = None) -> dict:
+        """Detect current market regime for a trading pair (price: a fresh price the caller already has)"""
         try:
-            from paper_trading_engine import paper_engine
-            
-            # Get current price
-            current_price = await paper_engine.get_real_price(pair, exchange)
-            
-            # Store in history
-            if pair not in self.price_history:
-                self.price_history[pair] = []
-            
-            self.price_history[pair].append({
-                'price': current_price,
-                'timestamp': datetime.now(timezone.utc)
-            })
-            
-            # Keep only last 24 hours
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=24)
-            self.price_history[pair] = [
-                p for p in self.price_history[pair]
-                if p['timestamp'] > cutoff_time
-            ]
+            series = await self.get_series(pair, exchange)
+            now = self.clock.timestamp()
+            if price:
+                series.add(price, now)
+            series.expire(now)
             
             # Need at least 10 data points
-            if len(self.price_history[pair]) < 10:
+            if len(series) < 10:
                 return {
                     "regime": "unknown",
                     "trend": "neutral",
@@ -49,11 +147,9 @@ class MarketRegimeDetector:
                     "confidence": 0
                 }
             
-            prices = [p['price'] for p in self.price_history[pair]]
-            
             # Calculate trend
-            first_price = prices[0]
-            last_price = prices[-1]
+            first_price = series.first
+            last_price = series.last
             trend_pct = ((last_price - first_price) / first_price) * 100
             
             # Determine trend
@@ -65,10 +161,7 @@ class MarketRegimeDetector:
                 trend = "sideways"
             
             # Calculate volatility (standard deviation)
-            mean_price = sum(prices) / len(prices)
-            variance = sum((p - mean_price) ** 2 for p in prices) / len(prices)
-            std_dev = math.sqrt(variance)
-            volatility_pct = (std_dev / mean_price) * 100
+            volatility_pct = (series.std / series.mean) * 100
             
             if volatility_pct > 5:
                 volatility = "high"
@@ -97,7 +190,7 @@ class MarketRegimeDetector:
                 "volatility": volatility,
                 "trend_pct": round(trend_pct, 2),
                 "volatility_pct": round(volatility_pct, 2),
-                "confidence": min(len(prices) / 50, 1.0),  # More data = higher confidence
+                "confidence": min(len(series) / 50, 1.0),  # More data = higher confidence
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
             
@@ -115,6 +208,63 @@ class MarketRegimeDetector:
                 "confidence": 0
             }
     
+    async def get_series(self, pair: str, exchange: str = 'luno') -> PriceSeries:
+        """The pair's price series, warmed up from candles the first time; the sampler tracks it from then on"""
+        self.tracked.setdefault(pair, exchange)
+        series = self.price_history.get(pair)
+        if series is None:
+            series = await self.warm_up(pair, exchange)
+        return series
+    
+    async def warm_up(self, pair: str, exchange: str = 'luno') -> PriceSeries:
+        """Fill a new series from the last 24h of 5m candles"""
+        series = PriceSeries()
+        try:
+            from paper_trading_engine import paper_engine
+            candles = await paper_engine.get_ohlcv(pair, exchange, '5m', series.size)
+            for candle in candles:
+                series.add(float(candle[4]), candle[0] / 1000)
+            logger.info(f"{pair} regime history warmed up from {len(candles)} candles")
+        except Exception as e:
+            logger.warning(f"Regime warm-up failed for {pair}: {e}")
+        return self.price_history.setdefault(pair, series)
+    
+    async def sample(self):
+        """Record the current price of every tracked pair"""
+        from paper_trading_engine import paper_engine
+        from services.price_snapshot import price_snapshots
+        
+        by_exchange = defaultdict(list)
+        for pair, exchange in list(self.tracked.items()):
+            by_exchange[exchange].append(pair)
+        
+        snapshot = price_snapshots.snapshot
+        now = self.clock.timestamp()
+        for exchange, pairs in by_exchange.items():
+            prices = {
+                pair: snapshot.prices[pair]["price"] for pair in pairs
+                if pair in snapshot.prices and snapshot.prices[pair]["exchange"] == exchange
+            }
+            missing = [pair for pair in pairs if pair not in prices]
+            if missing:
+                prices.update(await paper_engine.get_prices(missing, exchange))
+            
+            for pair, price in prices.items():
+                if price:
+                    (await self.get_series(pair, exchange)).add(price, now)
+    
+    async def run_sampler(self):
+        """Background service: keep tracked pairs' price series current"""
+        for pair in REGIME_PAIRS:
+            self.tracked.setdefault(pair, 'luno')
+        logger.info(f"Regime sampler started ({self.sample_interval}s interval)")
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error(f"Regime sampling failed: {e}")
+            await asyncio.sleep(self.sample_interval)
+    
     async def adjust_bot_for_regime(self, bot: dict, regime: dict):
         """Adjust bot parameters based on market regime"""
         try:
@@ -0,0 +1,80 @@
+"""
+Migration: Native datetime timestamps for audit logs
+Backfills a BSON datetime `ts` field from the ISO string `timestamp` on
+audit_logs and creates the (user_id, ts) report index, plus the `ts` TTL index
+when AUDIT_LOG_RETENTION_DAYS is set.
+
+- Same resumable, checkpointed batches as trades_native_timestamps
+- With AUDIT_LOG_RETENTION_DAYS set, entries expire that many days after `ts`
+  once the TTL index exists, so the backfill also starts expiring entries
+  already past retention; unset, nothing expires
+- Once it has completed, set AUDIT_NATIVE_TS=true so reports query `ts`
+
+Usage:
+    python -m migrations.audit_logs_native_timestamps [--batch-size 1000] [--restart]
+"""
+
+import argparse
+import asyncio
+import os
+import logging
+from typing import Dict
+
+import database as db
+from migrations.trades_native_timestamps import backfill_native_ts
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "audit_logs_native_timestamps"
+
+
+async def create_audit_indexes(audit_logs):
+    """Create the (user_id, ts) report index, and the retention TTL index on `ts` if retention is configured"""
+    await audit_logs.create_index([("user_id", 1), ("ts", 1)])
+    if db.AUDIT_LOG_RETENTION_DAYS:
+        await db.ensure_ttl_index(audit_logs, "ts", db.AUDIT_LOG_RETENTION_DAYS * 86400)
+
+
+async def migrate_audit_logs_native_timestamps(batch_size: int = 1000, restart: bool = False) -> Dict:
+    """Run the backfill and create the indexes"""
+    try:
+        audit_logs = db.audit_logs_collection
+        state = db.db["migration_state"]
+
+        result = await backfill_native_ts(audit_logs, state, MIGRATION_ID, batch_size=batch_size, restart=restart)
+        await create_audit_indexes(audit_logs)
+
+        print(f"\nBackfill: {result['updated']} updated, {result['skipped']} skipped, {result['batches']} batches")
+        print("Set AUDIT_NATIVE_TS=true to switch audit reports to `ts`.")
+        logger.info(f"✅ Migration complete: {result['updated']} audit logs backfilled with native ts")
+
+        return {"success": True, **result}
+
+    except Exception as e:
+        logger.error(f"Migration error: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+async def _main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    db.client = AsyncIOMotorClient(os.getenv('MONGO_URL', 'mongodb://localhost:27017'))
+    db.db = db.client[os.getenv('DB_NAME', 'amarktai_trading')]
+    await db.setup_collections()
+    try:
+        return await migrate_audit_logs_native_timestamps(args.batch_size, args.restart)
+    finally:
+        await db.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill native datetime ts on audit logs")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    logging.basicConfig(level=logging.INFO)
+
+    result = asyncio.run(_main(parser.parse_args()))
+    print(f"Migration result: {result.get('success')}")
@@ -0,0 +1,219 @@
+"""
+Migration: Native datetime timestamps for trades
+Backfills a BSON datetime `ts` field from the ISO string `timestamp` and adds
+(user_id, ts) and (user_id, bot_id, ts) compound indexes.
+
+- Runs in batches ordered by _id and checkpoints the last _id in `migration_state`,
+  so an interrupted run resumes where it stopped
+- Prints a before/after explain() report for a typical 24h per-user range query
+- Once it has completed, set TRADES_NATIVE_TS=true so readers query `ts`
+
+Usage:
+    python -m migrations.trades_native_timestamps [--batch-size 1000] [--user-id USER] [--restart]
+"""
+
+import argparse
+import asyncio
+import os
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "trades_native_timestamps"
+
+COMPOUND_INDEXES = [
+    [("user_id", 1), ("ts", -1)],
+    [("user_id", 1), ("bot_id", 1), ("ts", -1)],
+]
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse a stored trade timestamp into an aware UTC datetime (None if unusable)"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def backfill_native_ts(collection, state, migration_id: str = MIGRATION_ID, batch_size: int = 1000,
+                             restart: bool = False) -> Dict:
+    """Backfill `ts` from `timestamp` in resumable batches
+
+    Args:
+        collection: collection to backfill (trades, audit_logs)
+        state: collection holding the migration checkpoint
+        migration_id: checkpoint document id
+        batch_size: documents per bulk_write
+        restart: ignore any saved checkpoint
+
+    Returns:
+        dict with updated, skipped and batches counts
+    """
+    checkpoint = None if restart else await state.find_one({"_id": migration_id})
+    last_id = checkpoint.get("last_id") if checkpoint else None
+    updated = checkpoint.get("updated", 0) if checkpoint else 0
+    skipped = checkpoint.get("skipped", 0) if checkpoint else 0
+    batches = 0
+
+    if last_id is not None:
+        logger.info(f"Resuming {migration_id} after _id {last_id} ({updated} already updated)")
+
+    while True:
+        query = {"ts": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        docs = await collection.find(query, {"_id": 1, "timestamp": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        ops = []
+        for doc in docs:
+            ts = parse_timestamp(doc.get("timestamp"))
+            if ts is None:
+                skipped += 1
+                continue
+            ops.append(UpdateOne({"_id": doc["_id"], "ts": {"$exists": False}}, {"$set": {"ts": ts}}))
+
+        if ops:
+            result = await collection.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+
+        last_id = docs[-1]["_id"]
+        batches += 1
+        await state.update_one(
+            {"_id": migration_id},
+            {"$set": {
+                "last_id": last_id,
+                "updated": updated,
+                "skipped": skipped,
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+        logger.info(f"Batch {batches}: {updated} documents backfilled, {skipped} skipped")
+
+    await state.update_one(
+        {"_id": migration_id},
+        {"$set": {"completed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+    return {"updated": updated, "skipped": skipped, "batches": batches}
+
+
+async def backfill_trade_ts(trades, state, batch_size: int = 1000, restart: bool = False) -> Dict:
+    """Backfill `ts` on trades in resumable batches"""
+    return await backfill_native_ts(trades, state, MIGRATION_ID, batch_size=batch_size, restart=restart)
+
+
+async def create_compound_indexes(trades):
+    """Create the (user_id, ts) and (user_id, bot_id, ts) indexes"""
+    for keys in COMPOUND_INDEXES:
+        await trades.create_index(keys)
+
+
+def summarize_explain(explain: Dict) -> Dict:
+    """Reduce an explain() document to the fields worth comparing"""
+    planner = explain.get("queryPlanner", {})
+    stats = explain.get("executionStats", {})
+
+    stages = []
+    indexes = []
+    stage = planner.get("winningPlan", {})
+    while stage:
+        stages.append(stage.get("stage"))
+        if stage.get("indexName"):
+            indexes.append(stage["indexName"])
+        stage = stage.get("inputStage") or (stage.get("inputStages") or [None])[0]
+
+    return {
+        "stages": " <- ".join(s for s in stages if s),
+        "indexes": indexes,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+async def explain_range_query(trades, user_id: str, native: bool) -> Dict:
+    """explain() a 24h per-user range query on either `timestamp` or `ts`"""
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    if native:
+        query = {"user_id": user_id, "ts": {"$gte": since}}
+    else:
+        query = {"user_id": user_id, "timestamp": {"$gte": since.isoformat()}}
+    return summarize_explain(await trades.find(query).explain())
+
+
+def print_report(before: Dict, after: Dict, result: Dict):
+    print(f"\nBackfill: {result['updated']} updated, {result['skipped']} skipped, {result['batches']} batches")
+    print(f"\n{'':16}{'before (timestamp str)':>28}{'after (ts datetime)':>28}")
+    for field in ("stages", "indexes", "keys_examined", "docs_examined", "returned", "time_ms"):
+        print(f"{field:16}{str(before.get(field)):>28}{str(after.get(field)):>28}")
+    print("\nSet TRADES_NATIVE_TS=true to switch readers to `ts`.")
+
+
+async def migrate_trades_native_timestamps(batch_size: int = 1000, user_id: Optional[str] = None,
+                                           restart: bool = False) -> Dict:
+    """Run the backfill, create indexes and report before/after query plans"""
+    try:
+        trades = db.trades_collection
+        state = db.db["migration_state"]
+
+        if not user_id:
+            sample = await trades.find_one({}, {"user_id": 1})
+            user_id = sample.get("user_id") if sample else ""
+
+        before = await explain_range_query(trades, user_id, native=False)
+        result = await backfill_trade_ts(trades, state, batch_size=batch_size, restart=restart)
+        await create_compound_indexes(trades)
+        after = await explain_range_query(trades, user_id, native=True)
+
+        print_report(before, after, result)
+        logger.info(f"✅ Migration complete: {result['updated']} trades backfilled with native ts")
+
+        return {"success": True, **result, "explain_before": before, "explain_after": after}
+
+    except Exception as e:
+        logger.error(f"Migration error: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+async def _main(args):
+    # Connect without init_db() so the "before" plan reflects the current indexes
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    db.client = AsyncIOMotorClient(os.getenv('MONGO_URL', 'mongodb://localhost:27017'))
+    db.db = db.client[os.getenv('DB_NAME', 'amarktai_trading')]
+    await db.setup_collections()
+    try:
+        return await migrate_trades_native_timestamps(args.batch_size, args.user_id, args.restart)
+    finally:
+        await db.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill native datetime ts on trades")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--user-id", default=None, help="User to explain() the range query for")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    logging.basicConfig(level=logging.INFO)
+
+    result = asyncio.run(_main(parser.parse_args()))
+    print(f"Migration result: {result.get('success')}")
@@ -33,12 +33,15 @@ EXPECTED RESULTS:
 import ccxt.async_support as ccxt
 import asyncio
 import random
-from datetime import datetime, timezone
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 from exchange_limits import get_fee_rate
 from rate_limiter import rate_limiter
+from engines.instrumentation import StageLaps, instrument_exchange
+from engines.market_data import SystemClock
 from risk_engine import risk_engine
+from database import trade_ts
+from services.decision_bus import decision_bus
 
 logger = logging.getLogger(__name__)
 
@@ -55,18 +58,26 @@ class PaperTradingEngine:
         self.binance_exchange = None
         self.kucoin_exchange = None
         self.price_cache = {}
+        self.price_cache_at = {}  # symbol -> clock timestamp of the cached price
         self.preferred_exchange = 'luno'
         self.available_pairs_cache = {}  # Cache for dynamically fetched pairs
         
+        # Pluggable for replay (see engines/replay.py): None = live exchanges
+        self.market_data = None
+        self.clock = SystemClock()
+        self.rng = random  # anything with random/uniform/choice, e.g. random.Random(seed)
+        self.rate_limiter = rate_limiter
+        self.risk_engine = risk_engine
+    
     async def init_exchanges(self):
         """Initialize all supported exchanges"""
         try:
             # Luno (best for South Africa)
             if not self.luno_exchange:
-                self.luno_exchange = ccxt.luno({
+                self.luno_exchange = instrument_exchange(ccxt.luno({
                     'enableRateLimit': True,
                     'timeout': 30000
-                })
+                }), 'luno')
                 logger.info("✅ Connected to LUNO (South Africa) for REAL ZAR data")
         except Exception as e:
             logger.warning(f"Luno init failed: {e}")
@@ -74,10 +85,10 @@ class PaperTradingEngine:
         try:
             # Binance
             if not self.binance_exchange:
-                self.binance_exchange = ccxt.binance({
+                self.binance_exchange = instrument_exchange(ccxt.binance({
                     'enableRateLimit': True,
                     'options': {'defaultType': 'spot'}
-                })
+                }), 'binance')
                 logger.info("✅ Binance ready")
         except Exception as e:
             logger.warning(f"Binance init failed: {e}")
@@ -85,16 +96,19 @@ class PaperTradingEngine:
         try:
             # KuCoin
             if not self.kucoin_exchange:
-                self.kucoin_exchange = ccxt.kucoin({
+                self.kucoin_exchange = instrument_exchange(ccxt.kucoin({
                     'enableRateLimit': True,
                     'timeout': 30000
-                })
+                }), 'kucoin')
                 logger.info("✅ KuCoin ready")
         except Exception as e:
             logger.warning(f"KuCoin init failed: {e}")
     
     async def get_available_pairs(self, exchange: str = 'luno') -> list:
         """Dynamically fetch ALL available trading pairs for maximum profit"""
+        if self.market_data is not None:
+            return await self.market_data.get_pairs(exchange) or self.BINANCE_PAIRS
+        
         try:
             if exchange in self.available_pairs_cache:
                 return self.available_pairs_cache[exchange]
@@ -136,34 +150,112 @@ class PaperTradingEngine:
             return self.KUCOIN_PAIRS
         return self.BINANCE_PAIRS
     
+    def _cache_prices(self, prices: Dict[str, float]):
+        self.price_cache.update(prices)
+        now = self.clock.timestamp()
+        self.price_cache_at.update((symbol, now) for symbol in prices)
+    
+    async def _fetch_price(self, symbol: str, exchange: str) -> Optional[float]:
+        """Fetched price (cached on success), None if the source has none"""
+        price = None
+        if self.market_data is not None:
+            price = await self.market_data.fetch_price(symbol, exchange)
+        else:
+            try:
+                if not self.luno_exchange and not self.binance_exchange:
+                    await self.init_exchanges()
+                
+                exchange_obj = self.luno_exchange if exchange == 'luno' else self.binance_exchange
+                
+                if exchange_obj:
+                    ticker = await exchange_obj.fetch_ticker(symbol)
+                    price = ticker['last']
+            except Exception as e:
+                logger.debug(f"Price fetch for {symbol}: {e}")
+        
+        if price:
+            self._cache_prices({symbol: price})
+        return price or None
+    
     async def get_real_price(self, symbol: str, exchange: str = 'luno') -> float:
         """Fetch REAL price - accurate to live trading"""
+        price = await self._fetch_price(symbol, exchange)
+        if price:
+            return price
+        
+        # Fallback to cache
+        return self.price_cache.get(symbol, 50000.0 if 'BTC' in symbol else 1.0)
+    
+    async def get_prices(
+        self, symbols: List[str], exchange: str = 'luno', max_age: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        Fetch prices for many symbols in one fetch_tickers call (per-symbol fallback)
+        
+        Symbols the source cannot price fall back to the cache (only entries
+        at most max_age seconds old, if given); symbols with neither are left
+        out rather than given a placeholder price.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        prices = {}
+        if not symbols:
+            return prices
+        
+        if self.market_data is not None:
+            fetched = await asyncio.gather(*(self._fetch_price(symbol, exchange) for symbol in symbols))
+            prices = {symbol: price for symbol, price in zip(symbols, fetched) if price}
+            return self._with_cached(symbols, prices, max_age)
+        
         try:
             if not self.luno_exchange and not self.binance_exchange:
                 await self.init_exchanges()
             
             exchange_obj = self.luno_exchange if exchange == 'luno' else self.binance_exchange
             
-            if exchange_obj:
-                ticker = await exchange_obj.fetch_ticker(symbol)
-                price = ticker['last']
-                self.price_cache[symbol] = price
-                return price
+            if exchange_obj and exchange_obj.has.get('fetchTickers'):
+                tickers = await exchange_obj.fetch_tickers(symbols)
+                for symbol in symbols:
+                    last = (tickers.get(symbol) or {}).get('last')
+                    if last:
+                        prices[symbol] = last
+                self._cache_prices(prices)
         except Exception as e:
-            logger.debug(f"Price fetch for {symbol}: {e}")
+            logger.debug(f"Batch price fetch on {exchange}: {e}")
         
-        # Fallback to cache
-        return self.price_cache.get(symbol, 50000.0 if 'BTC' in symbol else 1.0)
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch_price(symbol, exchange) for symbol in missing))
+            prices.update((symbol, price) for symbol, price in zip(missing, fetched) if price)
+        
+        return self._with_cached(symbols, prices, max_age)
+    
+    def _with_cached(self, symbols: List[str], prices: Dict[str, float], max_age: Optional[float]) -> Dict[str, float]:
+        """prices plus cached prices (no older than max_age) for the symbols not fetched"""
+        oldest = None if max_age is None else self.clock.timestamp() - max_age
+        for symbol in symbols:
+            if symbol in prices or symbol not in self.price_cache:
+                continue
+            if oldest is None or self.price_cache_at.get(symbol, float('-inf')) >= oldest:
+                prices[symbol] = self.price_cache[symbol]
+        return prices
+    
+    async def get_ohlcv(self, symbol: str, exchange: str = 'luno', timeframe: str = '5m', limit: int = 20) -> list:
+        """Recent candles from the market data source ([] if the exchange is unavailable)"""
+        if self.market_data is not None:
+            return await self.market_data.fetch_ohlcv(symbol, exchange, timeframe, limit)
+        
+        if not self.luno_exchange and not self.binance_exchange:
+            await self.init_exchanges()
+        
+        exchange_obj = self.luno_exchange if exchange == 'luno' else self.binance_exchange
+        if not exchange_obj:
+            return []
+        return await exchange_obj.fetch_ohlcv(symbol, timeframe, limit=limit)
     
     async def analyze_trend(self, symbol: str, exchange: str = 'luno') -> str:
         """Analyze REAL market trend"""
         try:
-            exchange_obj = self.luno_exchange if exchange == 'luno' else self.binance_exchange
-            
-            if not exchange_obj:
-                return 'neutral'
-            
-            ohlcv = await exchange_obj.fetch_ohlcv(symbol, '5m', limit=20)
+            ohlcv = await self.get_ohlcv(symbol, exchange, '5m', 20)
             
             if len(ohlcv) < 10:
                 return 'neutral'
@@ -192,38 +284,71 @@ class PaperTradingEngine:
             risk_mode = bot_data.get('risk_mode', 'safe')
             current_capital = bot_data.get('current_capital', 1000)
             exchange = bot_data.get('exchange', 'luno')
+            laps = StageLaps("paper_trade")
+            # Decision trace (no-op unless the decision bus is recording)
+            trace = decision_bus.trace(
+                "paper_trade", bot_id=bot_id, user_id=user_id, exchange=exchange, risk_mode=risk_mode,
+                timestamp=self.clock.now().isoformat()
+            )
             
             # 1. CHECK RATE LIMITER
-            can_trade, reason = rate_limiter.can_trade(bot_id, exchange)
+            can_trade, reason = await self.rate_limiter.can_trade(bot_id, exchange)
+            laps.lap("rate_limit")
+            trace.gate("rate_limit", can_trade, reason)
             if not can_trade:
                 logger.warning(f"Rate limit: {bot_data['name'][:15]} - {reason}")
+                trace.publish("skip")
                 return {"success": False, "bot_id": bot_id, "error": reason}
             
             # Get ALL available pairs dynamically
             available_pairs = await self.get_available_pairs(exchange)
-            symbol = random.choice(available_pairs)
+            symbol = self.rng.choice(available_pairs)
+            laps.lap("pairs")
             
             # Get REAL price
             current_price = await self.get_real_price(symbol, exchange)
+            laps.lap("price")
             
             # 2. AI INTELLIGENCE: Check market regime
             from market_regime import market_regime_detector
-            regime = await market_regime_detector.detect_regime(symbol, exchange)
+            regime = await market_regime_detector.detect_regime(symbol, exchange, price=current_price)
+            laps.lap("regime")
             
             # 3. AI INTELLIGENCE: Get ML prediction
             from ml_predictor import ml_predictor
             prediction = await ml_predictor.predict_price(symbol, timeframe="1h")
+            laps.lap("ml_predict")
             
             # 4. AI INTELLIGENCE: Get Flokx signals (if available)
             from flokx_integration import flokx
             flokx_data = await flokx.fetch_market_coefficients(symbol)
+            laps.lap("flokx")
             
             # 5. AI INTELLIGENCE: Get Fetch.ai signals (if available)
             from fetchai_integration import fetchai
             fetchai_data = await fetchai.fetch_market_signals(symbol)
+            laps.lap("fetchai")
             
             # Analyze REAL trend (fallback if AI fails)
             trend = await self.analyze_trend(symbol, exchange)
+            laps.lap("trend")
+            
+            trace.set(
+                symbol=symbol,
+                market_data={"price": current_price},
+                regime_state={"regime": regime.get('regime', 'unknown'), "confidence": regime.get('confidence', 0)},
+                component_scores={
+                    "regime": regime.get('confidence', 0),
+                    "ml": prediction.get('confidence', 0),
+                    "fetchai": fetchai_data.get('confidence', 0) / 100,
+                    "flokx": flokx_data.get('strength', 0) / 100
+                },
+                signals={
+                    "trend": trend,
+                    "ml_direction": prediction.get('direction', 'neutral'),
+                    "fetchai_signal": fetchai_data.get('signal', 'HOLD')
+                }
+            )
             
             # Override trend with AI intelligence if confidence is high
             if regime.get('confidence', 0) > 0.7:
@@ -263,8 +388,12 @@ class PaperTradingEngine:
                 confidence_sources += 1
             
             # Require at least 2 sources with average confidence > 65%
-            if confidence_sources < 2 or (total_confidence / max(confidence_sources, 1)) < 0.65:
+            quality_ok = confidence_sources >= 2 and (total_confidence / max(confidence_sources, 1)) >= 0.65
+            trace.gate("quality", quality_ok, None if quality_ok else "Trade quality threshold not met",
+                       sources=confidence_sources, avg_confidence=total_confidence / max(confidence_sources, 1))
+            if not quality_ok:
                 logger.debug(f"Trade quality filter: Skipping low-confidence trade (sources: {confidence_sources}, avg: {total_confidence/max(confidence_sources,1):.2%})")
+                trace.publish("skip", trend=trend)
                 return {"success": False, "bot_id": bot_id, "error": "Trade quality threshold not met"}
             
             # Position sizing - OPTIMIZED for quality over quantity
@@ -302,13 +431,27 @@ class PaperTradingEngine:
             
             final_position_size = min(base_position_size * confidence_boost, 0.60)  # Cap at 60%
             trade_amount = current_capital * final_position_size
+            trace.set(
+                trend=trend,
+                position_size_multiplier=confidence_boost,
+                sizing={
+                    "base_position_size": base_position_size,
+                    "ai_agreement": ai_agreement,
+                    "confidence_boost": confidence_boost,
+                    "final_position_size": final_position_size,
+                    "trade_amount": trade_amount
+                }
+            )
             
             # 2. CHECK RISK ENGINE
-            risk_ok, risk_reason = await risk_engine.check_trade_risk(
+            risk_ok, risk_reason = await self.risk_engine.check_trade_risk(
                 user_id, bot_id, exchange, trade_amount, risk_mode
             )
+            laps.lap("risk_check")
+            trace.gate("risk", risk_ok, risk_reason)
             if not risk_ok:
                 logger.warning(f"Risk block: {bot_data['name'][:15]} - {risk_reason}")
+                trace.publish("skip")
                 return {"success": False, "bot_id": bot_id, "error": risk_reason}
             
             crypto_amount = trade_amount / current_price
@@ -319,13 +462,13 @@ class PaperTradingEngine:
             # BTC typically moves 0.5-2% per trade timeframe
             # Simulate realistic win/loss ratio (not 100% wins)
             
-            trade_outcome = random.random()
+            trade_outcome = self.rng.random()
             if trade_outcome < 0.55:  # 55% win rate (realistic)
                 # Winning trade - small profit
-                base_multiplier = random.uniform(1.005, 1.020)  # 0.5% to 2% profit
+                base_multiplier = self.rng.uniform(1.005, 1.020)  # 0.5% to 2% profit
             else:
                 # Losing trade - small loss
-                base_multiplier = random.uniform(0.985, 0.997)  # 0.3% to 1.5% loss
+                base_multiplier = self.rng.uniform(0.985, 0.997)  # 0.3% to 1.5% loss
             
             # Boost if strong AI confidence (high confidence = better outcomes)
             confidence_multiplier = 1.0
@@ -353,7 +496,7 @@ class PaperTradingEngine:
                     base_multiplier = base_multiplier * 0.998  # Reduce loss by 0.2%
             elif flokx_data.get('volatility', 0) > 70:
                 # High volatility - more unpredictable
-                base_multiplier = base_multiplier * random.uniform(0.998, 1.002)
+                base_multiplier = base_multiplier * self.rng.uniform(0.998, 1.002)
             
             # Adjust based on ML prediction confidence
             if prediction.get('confidence', 0) > 0.8:
@@ -386,7 +529,10 @@ class PaperTradingEngine:
             
             # 5. SIMULATE ORDER FAILURES (2-5% of orders fail in reality)
             order_success_rate = 0.97  # 97% success rate
-            if random.random() > order_success_rate:
+            order_ok = self.rng.random() <= order_success_rate
+            trace.gate("execution", order_ok, None if order_ok else "Order rejected by exchange (simulated failure)")
+            if not order_ok:
+                trace.publish("skip")
                 return {
                     "success": False, 
                     "bot_id": bot_id, 
@@ -395,7 +541,7 @@ class PaperTradingEngine:
             
             # 6. SIMULATE EXECUTION DELAY (prices can move during 50-200ms)
             # Add small random price movement to simulate latency
-            execution_delay_impact = random.uniform(-0.0005, 0.0005)  # ±0.05%
+            execution_delay_impact = self.rng.uniform(-0.0005, 0.0005)  # ±0.05%
             exit_price = exit_price * (1 + execution_delay_impact)
             
             # Recalculate with all realistic factors
@@ -404,8 +550,11 @@ class PaperTradingEngine:
             
             # SMART TRADING: Check minimum profit threshold (ignore R0.30 wins)
             from config import MIN_TRADE_PROFIT_THRESHOLD_ZAR
-            if net_profit > 0 and net_profit < MIN_TRADE_PROFIT_THRESHOLD_ZAR:
+            profit_ok = not (net_profit > 0 and net_profit < MIN_TRADE_PROFIT_THRESHOLD_ZAR)
+            trace.gate("min_profit", profit_ok, None if profit_ok else "Profit below minimum threshold", net_profit=net_profit)
+            if not profit_ok:
                 logger.info(f"⏭️ Skipping {bot_data['name'][:15]} - Trade profit R{net_profit:.2f} below R{MIN_TRADE_PROFIT_THRESHOLD_ZAR} threshold")
+                trace.publish("skip")
                 return {
                     "success": False,
                     "bot_id": bot_id,
@@ -415,10 +564,12 @@ class PaperTradingEngine:
             is_profitable = net_profit > 0
             
             # 4. RECORD TRADE FOR RATE LIMITER
-            rate_limiter.record_trade(bot_id, exchange)
+            await self.rate_limiter.record_trade(bot_id, exchange)
             
             # 5. RECORD RESULT FOR RISK ENGINE
-            await risk_engine.record_trade_result(user_id, net_profit)
+            await self.risk_engine.record_trade_result(user_id, net_profit)
+            laps.lap("record")
+            laps.total()
             
             # Calculate trade quality score (1-10)
             quality_score = self._calculate_trade_quality(net_profit, fees, trade_amount, profit_pct)
@@ -445,9 +596,9 @@ class PaperTradingEngine:
                 "is_profitable": is_profitable,
                 "risk_mode": risk_mode,
                 "quality_score": quality_score,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": self.clock.now().isoformat(),
                 "trade_type": "BUY->SELL",
-                "data_source": "REAL_" + exchange.upper(),
+                "data_source": ("REPLAY_" if self.market_data is not None else "REAL_") + exchange.upper(),
                 "fee_rate": round(fee_rate * 100, 3),  # Display as percentage
                 # AI Intelligence metadata
                 "ai_regime": regime.get('regime', 'unknown'),
@@ -460,6 +611,18 @@ class PaperTradingEngine:
                 "fetchai_confidence": round(fetchai_data.get('confidence', 0), 1)
             }
             
+            trace.publish(
+                "buy",
+                confidence=total_confidence / max(confidence_sources, 1),
+                outcome={
+                    "entry_price": entry_price,
+                    "exit_price": exit_price,
+                    "net_profit": net_profit,
+                    "fees": fees,
+                    "slippage_cost": slippage_cost
+                }
+            )
+            
             emoji = "🟢" if is_profitable else "🔴"
             logger.info(f"{emoji} {bot_data['name'][:15]} | {symbol} | {trend.upper()} | {profit_pct:+.2f}% = R{net_profit:+.2f} (fees: R{fees:.2f})")
             
@@ -528,7 +691,7 @@ class PaperTradingEngine:
                     "$set": {
                         "current_capital": round(new_capital, 2),
                         "total_profit": round(total_profit, 2),
-                        "last_trade": datetime.now(timezone.utc).isoformat(),
+                        "last_trade": self.clock.now().isoformat(),
                         "status": "active"
                     },
                     "$inc": {"trades_count": 1}
@@ -542,6 +705,7 @@ class PaperTradingEngine:
                 "new_capital": round(new_capital, 2),
                 "total_profit": round(total_profit, 2)
             }
+            trade_doc["ts"] = trade_ts(trade_doc.get("timestamp"))
             await trades_collection.insert_one(trade_doc)
             
             return {
@@ -4,13 +4,15 @@ from typing import Optional
 import logging
 import database as db
 from exchange_limits import get_exchange_limits
+from engines.market_data import SystemClock
 
 logger = logging.getLogger(__name__)
 
 class RiskEngine:
-    def __init__(self):
+    def __init__(self, clock: SystemClock = None):
+        self.clock = clock or SystemClock()  # Replay sessions run the checks on simulated time
         self.user_daily_loss = {}  # {user_id: loss_today}
-        self.last_reset = datetime.now(timezone.utc).date()
+        self.last_reset = self.clock.now().date()
     
     async def check_trade_risk(self, user_id: str, bot_id: str, exchange: str, 
                                proposed_notional: float, risk_mode: str) -> tuple[bool, str]:
@@ -57,11 +59,10 @@ class RiskEngine:
         # In production, would need asset parameter passed in
         
         # Get all user's trades to calculate current exposure
-        import database as db
         recent_open_trades = await db.trades_collection.find({
             "user_id": user_id,
             "status": {"$in": ["open", "pending"]},  # Only open positions
-            "timestamp": {"$gte": (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()}
+            **db.trades_since(self.clock.now() - timedelta(days=7))
         }, {"_id": 0}).to_list(1000)
         
         # Calculate per-asset exposure
@@ -98,7 +99,7 @@ class RiskEngine:
     
     async def _check_daily_loss(self, user_id: str, total_equity: float):
         """Calculate today's realized loss"""
-        today = datetime.now(timezone.utc).date()
+        today = self.clock.now().date()
         
         # Reset if new day
         if today > self.last_reset:
@@ -109,8 +110,8 @@ class RiskEngine:
         today_start = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
         trades_today = await db.trades_collection.find({
             "user_id": user_id,
-            "timestamp": {"$gte": today_start.isoformat()}
-        }, {"_id": 0}).to_list(1000)
+            **db.trades_since(today_start)
+        }, {"_id": 0, "profit_loss": 1}).to_list(1000)
         
         total_pnl = sum(t.get("profit_loss", 0) for t in trades_today)
         self.user_daily_loss[user_id] = total_pnl if total_pnl < 0 else 0
@@ -88,7 +88,7 @@ async def get_user_details(user_id: str, admin_user: Dict = Depends(verify_admin
         ).sort("timestamp", -1).limit(50).to_list(50)
         
         # Get audit logs
-        audit_logs = await audit_logger.get_user_audit_trail(user_id, days=30)
+        audit_logs = await audit_logger.get_user_audit_trail(user_id, days=30, limit=20)
         
         return {
             "user": user,
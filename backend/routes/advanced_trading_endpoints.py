@@ -11,61 +11,22 @@ import logging
 
 from auth import get_current_user
 from models import User
+from services.startup import lazy, lazy_available
 
 logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter(prefix="/api/advanced", tags=["Advanced Trading"])
 
-# Import advanced trading modules (with error handling)
-try:
-    from engines.regime_detector import regime_detector, MarketRegime
-    REGIME_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Regime detector not available: {e}")
-    REGIME_AVAILABLE = False
-
-try:
-    from engines.order_flow_imbalance import ofi_calculator
-    OFI_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"OFI calculator not available: {e}")
-    OFI_AVAILABLE = False
-
-try:
-    from engines.on_chain_monitor import whale_monitor
-    WHALE_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Whale monitor not available: {e}")
-    WHALE_AVAILABLE = False
-
-try:
-    from engines.sentiment_analyzer import sentiment_analyzer
-    SENTIMENT_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Sentiment analyzer not available: {e}")
-    SENTIMENT_AVAILABLE = False
-
-try:
-    from engines.macro_news_monitor import macro_monitor
-    MACRO_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Macro monitor not available: {e}")
-    MACRO_AVAILABLE = False
-
-try:
-    from engines.alpha_fusion_engine import alpha_fusion
-    FUSION_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Alpha fusion not available: {e}")
-    FUSION_AVAILABLE = False
-
-try:
-    from engines.self_healing_ai import self_healing_ai
-    HEALING_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Self-healing AI not available: {e}")
-    HEALING_AVAILABLE = False
+# Advanced trading modules load on first use: the regime detector pulls in
+# hmmlearn/sklearn/scipy and alpha fusion imports every signal engine
+regime_detector = lazy("engines.regime_detector", "regime_detector")
+ofi_calculator = lazy("engines.order_flow_imbalance", "ofi_calculator")
+whale_monitor = lazy("engines.on_chain_monitor", "whale_monitor")
+sentiment_analyzer = lazy("engines.sentiment_analyzer", "sentiment_analyzer")
+macro_monitor = lazy("engines.macro_news_monitor", "macro_monitor")
+alpha_fusion = lazy("engines.alpha_fusion_engine", "alpha_fusion")
+self_healing_ai = lazy("engines.self_healing_ai", "self_healing_ai")
 
 
 # ============================================================================
@@ -102,13 +63,13 @@ async def get_advanced_system_status(current_user: User = Depends(get_current_us
     """Get status of all advanced trading modules"""
     return {
         "modules": {
-            "regime_detection": REGIME_AVAILABLE,
-            "order_flow_imbalance": OFI_AVAILABLE,
-            "whale_monitoring": WHALE_AVAILABLE,
-            "sentiment_analysis": SENTIMENT_AVAILABLE,
-            "macro_monitoring": MACRO_AVAILABLE,
-            "alpha_fusion": FUSION_AVAILABLE,
-            "self_healing": HEALING_AVAILABLE
+            "regime_detection": lazy_available(regime_detector),
+            "order_flow_imbalance": lazy_available(ofi_calculator),
+            "whale_monitoring": lazy_available(whale_monitor),
+            "sentiment_analysis": lazy_available(sentiment_analyzer),
+            "macro_monitoring": lazy_available(macro_monitor),
+            "alpha_fusion": lazy_available(alpha_fusion),
+            "self_healing": lazy_available(self_healing_ai)
         },
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
@@ -124,7 +85,7 @@ async def update_regime_price(
     current_user: User = Depends(get_current_user)
 ):
     """Update price data for regime detection"""
-    if not REGIME_AVAILABLE:
+    if not lazy_available(regime_detector):
         raise HTTPException(status_code=503, detail="Regime detection not available")
     
     try:
@@ -149,7 +110,7 @@ async def get_regime_for_symbol(
     current_user: User = Depends(get_current_user)
 ):
     """Get current regime for a symbol"""
-    if not REGIME_AVAILABLE:
+    if not lazy_available(regime_detector):
         raise HTTPException(status_code=503, detail="Regime detection not available")
     
     try:
@@ -180,7 +141,7 @@ async def get_regime_for_symbol(
 @router.get("/regime/summary")
 async def get_regime_summary(current_user: User = Depends(get_current_user)):
     """Get summary of all tracked regimes"""
-    if not REGIME_AVAILABLE:
+    if not lazy_available(regime_detector):
         raise HTTPException(status_code=503, detail="Regime detection not available")
     
     try:
@@ -204,7 +165,7 @@ async def add_ofi_snapshot(
     current_user: User = Depends(get_current_user)
 ):
     """Add order book snapshot for OFI calculation"""
-    if not OFI_AVAILABLE:
+    if not lazy_available(ofi_calculator):
         raise HTTPException(status_code=503, detail="OFI not available")
     
     try:
@@ -232,7 +193,7 @@ async def get_ofi_signal(
     current_user: User = Depends(get_current_user)
 ):
     """Get OFI signal for a symbol"""
-    if not OFI_AVAILABLE:
+    if not lazy_available(ofi_calculator):
         raise HTTPException(status_code=503, detail="OFI not available")
     
     try:
@@ -262,7 +223,7 @@ async def get_ofi_stats(
     current_user: User = Depends(get_current_user)
 ):
     """Get OFI statistics for a symbol"""
-    if not OFI_AVAILABLE:
+    if not lazy_available(ofi_calculator):
         raise HTTPException(status_code=503, detail="OFI not available")
     
     try:
@@ -289,7 +250,7 @@ async def get_whale_signal(
     current_user: User = Depends(get_current_user)
 ):
     """Get whale activity signal for a coin"""
-    if not WHALE_AVAILABLE:
+    if not lazy_available(whale_monitor):
         raise HTTPException(status_code=503, detail="Whale monitoring not available")
     
     try:
@@ -317,7 +278,7 @@ async def get_whale_signal(
 @router.get("/whale/summary")
 async def get_whale_summary(current_user: User = Depends(get_current_user)):
     """Get summary of whale activity for all tracked coins"""
-    if not WHALE_AVAILABLE:
+    if not lazy_available(whale_monitor):
         raise HTTPException(status_code=503, detail="Whale monitoring not available")
     
     try:
@@ -342,7 +303,7 @@ async def get_sentiment_signal(
     current_user: User = Depends(get_current_user)
 ):
     """Get sentiment signal for a coin"""
-    if not SENTIMENT_AVAILABLE:
+    if not lazy_available(sentiment_analyzer):
         raise HTTPException(status_code=503, detail="Sentiment analysis not available")
     
     try:
@@ -371,7 +332,7 @@ async def get_sentiment_signal(
 @router.get("/sentiment/summary")
 async def get_sentiment_summary(current_user: User = Depends(get_current_user)):
     """Get sentiment summary for all tracked coins"""
-    if not SENTIMENT_AVAILABLE:
+    if not lazy_available(sentiment_analyzer):
         raise HTTPException(status_code=503, detail="Sentiment analysis not available")
     
     try:
@@ -392,7 +353,7 @@ async def get_sentiment_summary(current_user: User = Depends(get_current_user)):
 @router.get("/macro/signal")
 async def get_macro_signal(current_user: User = Depends(get_current_user)):
     """Get current macro signal"""
-    if not MACRO_AVAILABLE:
+    if not lazy_available(macro_monitor):
         raise HTTPException(status_code=503, detail="Macro monitoring not available")
     
     try:
@@ -422,7 +383,7 @@ async def get_macro_signal(current_user: User = Depends(get_current_user)):
 @router.get("/macro/summary")
 async def get_macro_summary(current_user: User = Depends(get_current_user)):
     """Get macro events summary"""
-    if not MACRO_AVAILABLE:
+    if not lazy_available(macro_monitor):
         raise HTTPException(status_code=503, detail="Macro monitoring not available")
     
     try:
@@ -443,7 +404,7 @@ async def get_fusion_signal(
     current_user: User = Depends(get_current_user)
 ):
     """Get fused alpha signal for a symbol"""
-    if not FUSION_AVAILABLE:
+    if not lazy_available(alpha_fusion):
         raise HTTPException(status_code=503, detail="Alpha fusion not available")
     
     try:
@@ -478,7 +439,7 @@ async def get_portfolio_fusion(
     current_user: User = Depends(get_current_user)
 ):
     """Get fused signals for multiple symbols"""
-    if not FUSION_AVAILABLE:
+    if not lazy_available(alpha_fusion):
         raise HTTPException(status_code=503, detail="Alpha fusion not available")
     
     try:
@@ -498,7 +459,7 @@ async def get_portfolio_fusion(
 @router.get("/self-healing/health")
 async def get_self_healing_health(current_user: User = Depends(get_current_user)):
     """Get self-healing system health report"""
-    if not HEALING_AVAILABLE:
+    if not lazy_available(self_healing_ai):
         raise HTTPException(status_code=503, detail="Self-healing not available")
     
     try:
@@ -6,6 +6,7 @@ Real-time AI chat with action confirmation and tool routing
 from fastapi import APIRouter, HTTPException, Depends, Body
 from datetime import datetime, timezone
 from typing import Optional, List, Dict
+import asyncio
 import logging
 import json
 
@@ -14,6 +15,8 @@ import database as db
 from ai_super_brain import AISuperBrain
 from engines.trade_budget_manager import trade_budget_manager
 from websocket_manager import manager
+from services.chat_stream import ChatStream, event_stream, get_chat_model, relay, reply_events
+from services.portfolio_state import portfolio_state
 
 logger = logging.getLogger(__name__)
 
@@ -31,41 +34,31 @@ class AIActionRouter:
     @staticmethod
     async def get_system_state(user_id: str) -> Dict:
         """Get comprehensive system state for AI context"""
-        # Get bots
-        bots = await db.bots_collection.find(
-            {"user_id": user_id},
-            {"_id": 0}
-        ).to_list(1000)
-        
-        # Get system modes
-        modes = await db.system_modes_collection.find_one(
-            {"user_id": user_id},
-            {"_id": 0}
+        # Bot counts and capital from the portfolio read model; modes, recent trades
+        # and budget status fetched alongside
+        portfolio, modes, recent_trades, budget_status = await asyncio.gather(
+            portfolio_state.get(user_id),
+            db.system_modes_collection.find_one(
+                {"user_id": user_id},
+                {"_id": 0}
+            ),
+            db.trades_collection.find(
+                {"user_id": user_id},
+                {"_id": 0}
+            ).sort("timestamp", -1).limit(10).to_list(10),
+            trade_budget_manager.get_all_exchanges_budget_report()
         )
         
-        # Get recent trades
-        recent_trades = await db.trades_collection.find(
-            {"user_id": user_id},
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(10).to_list(10)
-        
-        # Get wallet summary
-        total_capital = sum(bot.get('current_capital', 0) for bot in bots)
-        total_profit = sum(bot.get('total_profit', 0) for bot in bots)
-        
-        # Get budget status
-        budget_status = await trade_budget_manager.get_all_exchanges_budget_report()
-        
         return {
             "bots": {
-                "total": len(bots),
-                "active": len([b for b in bots if b.get('status') == 'active']),
-                "paused": len([b for b in bots if b.get('status') == 'paused']),
-                "stopped": len([b for b in bots if b.get('status') == 'stopped'])
+                "total": portfolio['bots']['total'],
+                "active": portfolio['bots']['active'],
+                "paused": portfolio['bots']['paused'],
+                "stopped": portfolio['bots']['stopped']
             },
             "capital": {
-                "total": round(total_capital, 2),
-                "total_profit": round(total_profit, 2)
+                "total": round(portfolio['capital']['total'], 2),
+                "total_profit": round(portfolio['capital']['total_profit'], 2)
             },
             "recent_performance": {
                 "recent_trades_count": len(recent_trades),
@@ -147,6 +140,135 @@ class AIActionRouter:
 action_router = AIActionRouter()
 
 
+def build_chat_context(system_state: Dict, content: str) -> str:
+    """System prompt for the chat assistant"""
+    return f"""You are an AI trading assistant for the Amarktai Network.
+                    
+Current System State:
+- Total Bots: {system_state['bots']['total']} (Active: {system_state['bots']['active']}, Paused: {system_state['bots']['paused']})
+- Total Capital: R{system_state['capital']['total']}
+- Total Profit: R{system_state['capital']['total_profit']}
+- Recent Performance: {system_state['recent_performance']['recent_trades_count']} trades, R{system_state['recent_performance']['recent_pnl']} PnL
+
+User Question: {content}
+
+Available Actions (if requested):
+- start_bot: Start a paused bot
+- pause_bot: Pause a running bot
+- stop_bot: Stop a bot permanently
+- emergency_stop: CRITICAL - Stop all trading immediately
+- get_limits: Show trade budget limits
+- get_performance_graph: Get performance data
+
+Instructions:
+- Be helpful and explain the system state clearly
+- If user asks for an action, explain what it will do
+- For dangerous actions (emergency_stop, stop_bot), require explicit confirmation
+- Provide recommendations based on performance data
+"""
+
+
+async def confirm_action(confirmation_token: str, user_id: str) -> str:
+    """Execute a dangerous action the user confirmed with its token"""
+    action_data = confirmation_tokens[confirmation_token]
+    
+    # Verify it's for this user
+    if action_data['user_id'] != user_id:
+        return "Invalid confirmation token or unauthorized."
+    
+    # Execute the confirmed action
+    result = await action_router.execute_action(
+        action_data['action'],
+        action_data['params'],
+        user_id
+    )
+    
+    # Remove token
+    del confirmation_tokens[confirmation_token]
+    
+    # Send WebSocket notification
+    await manager.send_message(user_id, {
+        "type": "ai_action_executed",
+        "action": action_data['action'],
+        "result": result
+    })
+    
+    return f"Action confirmed and executed: {action_data['action']}. Result: {result}"
+
+
+async def apply_action_intent(content: str, request_action: bool, ai_response: str, user_id: str) -> str:
+    """Detect an action request in the user message; execute it or append a confirmation token"""
+    if not request_action or not any(keyword in content.lower() for keyword in ['start', 'pause', 'stop', 'emergency']):
+        return ai_response
+    
+    # Detect action intent
+    action_detected = None
+    params = {}
+    
+    if 'emergency' in content.lower() and 'stop' in content.lower():
+        action_detected = 'emergency_stop'
+        requires_confirmation = True
+    elif 'pause' in content.lower():
+        action_detected = 'pause_bot'
+        requires_confirmation = False
+    # Add more action detection logic...
+    
+    if action_detected:
+        if requires_confirmation:
+            # Generate confirmation token
+            import uuid
+            token = str(uuid.uuid4())
+            confirmation_tokens[token] = {
+                "user_id": user_id,
+                "action": action_detected,
+                "params": params,
+                "created_at": datetime.now(timezone.utc).isoformat()
+            }
+            
+            ai_response += f"\n\n⚠️ **This is a dangerous action that requires confirmation.**\n"
+            ai_response += f"To proceed, reply with confirmation token: `{token}`"
+        else:
+            # Safe action - execute immediately
+            result = await action_router.execute_action(action_detected, params, user_id)
+            ai_response += f"\n\n✅ Action executed: {result}"
+    
+    return ai_response
+
+
+async def _save_user_message_and_state(user_id: str, content: str) -> Dict:
+    """Store the user message and build the system state concurrently; returns the state"""
+    user_msg = {
+        "user_id": user_id,
+        "role": "user",
+        "content": content,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    _, system_state = await asyncio.gather(
+        db.chat_messages_collection.insert_one(user_msg),
+        action_router.get_system_state(user_id)
+    )
+    return system_state
+
+
+async def _save_ai_message(user_id: str, ai_response: str, **extra) -> Dict:
+    """Store the assistant reply and push it to the user's sockets"""
+    ai_msg = {
+        "user_id": user_id,
+        "role": "assistant",
+        "content": ai_response,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        **extra
+    }
+    await db.chat_messages_collection.insert_one(dict(ai_msg))
+    
+    # Send real-time update
+    await manager.send_message(user_id, {
+        "type": "ai_chat_message",
+        "message": ai_response
+    })
+    return ai_msg
+
+
 @router.post("/chat")
 async def ai_chat(
     message: Dict = Body(...),
@@ -166,44 +288,12 @@ async def ai_chat(
         request_action = message.get('request_action', False)
         confirmation_token = message.get('confirmation_token')
         
-        # Save user message
-        user_msg = {
-            "user_id": user_id,
-            "role": "user",
-            "content": content,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await db.chat_messages_collection.insert_one(user_msg)
-        
-        # Get system state for AI context
-        system_state = await action_router.get_system_state(user_id)
+        # Save user message while gathering system state for AI context
+        system_state = await _save_user_message_and_state(user_id, content)
         
         # Check if this is a confirmation for a dangerous action
         if confirmation_token and confirmation_token in confirmation_tokens:
-            action_data = confirmation_tokens[confirmation_token]
-            
-            # Verify it's for this user
-            if action_data['user_id'] == user_id:
-                # Execute the confirmed action
-                result = await action_router.execute_action(
-                    action_data['action'],
-                    action_data['params'],
-                    user_id
-                )
-                
-                # Remove token
-                del confirmation_tokens[confirmation_token]
-                
-                ai_response = f"Action confirmed and executed: {action_data['action']}. Result: {result}"
-                
-                # Send WebSocket notification
-                await manager.send_message(user_id, {
-                    "type": "ai_action_executed",
-                    "action": action_data['action'],
-                    "result": result
-                })
-            else:
-                ai_response = "Invalid confirmation token or unauthorized."
+            ai_response = await confirm_action(confirmation_token, user_id)
         else:
             # Generate AI response with OpenAI
             try:
@@ -215,36 +305,10 @@ async def ai_chat(
                 if not openai.api_key:
                     ai_response = "AI service not configured. Please set OPENAI_API_KEY."
                 else:
-                    # Prepare context for AI
-                    context = f"""You are an AI trading assistant for the Amarktai Network.
-                    
-Current System State:
-- Total Bots: {system_state['bots']['total']} (Active: {system_state['bots']['active']}, Paused: {system_state['bots']['paused']})
-- Total Capital: R{system_state['capital']['total']}
-- Total Profit: R{system_state['capital']['total_profit']}
-- Recent Performance: {system_state['recent_performance']['recent_trades_count']} trades, R{system_state['recent_performance']['recent_pnl']} PnL
-
-User Question: {content}
-
-Available Actions (if requested):
-- start_bot: Start a paused bot
-- pause_bot: Pause a running bot
-- stop_bot: Stop a bot permanently
-- emergency_stop: CRITICAL - Stop all trading immediately
-- get_limits: Show trade budget limits
-- get_performance_graph: Get performance data
-
-Instructions:
-- Be helpful and explain the system state clearly
-- If user asks for an action, explain what it will do
-- For dangerous actions (emergency_stop, stop_bot), require explicit confirmation
-- Provide recommendations based on performance data
-"""
-                    
                     response = openai.chat.completions.create(
                         model="gpt-4",
                         messages=[
-                            {"role": "system", "content": context},
+                            {"role": "system", "content": build_chat_context(system_state, content)},
                             {"role": "user", "content": content}
                         ],
                         max_tokens=500,
@@ -254,56 +318,13 @@ Instructions:
                     ai_response = response.choices[0].message.content
                     
                     # Check if AI recommends an action
-                    if request_action and any(keyword in content.lower() for keyword in ['start', 'pause', 'stop', 'emergency']):
-                        # Detect action intent
-                        action_detected = None
-                        params = {}
-                        
-                        if 'emergency' in content.lower() and 'stop' in content.lower():
-                            action_detected = 'emergency_stop'
-                            requires_confirmation = True
-                        elif 'pause' in content.lower():
-                            action_detected = 'pause_bot'
-                            requires_confirmation = False
-                        # Add more action detection logic...
-                        
-                        if action_detected:
-                            if requires_confirmation:
-                                # Generate confirmation token
-                                import uuid
-                                token = str(uuid.uuid4())
-                                confirmation_tokens[token] = {
-                                    "user_id": user_id,
-                                    "action": action_detected,
-                                    "params": params,
-                                    "created_at": datetime.now(timezone.utc).isoformat()
-                                }
-                                
-                                ai_response += f"\n\n⚠️ **This is a dangerous action that requires confirmation.**\n"
-                                ai_response += f"To proceed, reply with confirmation token: `{token}`"
-                            else:
-                                # Safe action - execute immediately
-                                result = await action_router.execute_action(action_detected, params, user_id)
-                                ai_response += f"\n\n✅ Action executed: {result}"
+                    ai_response = await apply_action_intent(content, request_action, ai_response, user_id)
             
             except Exception as e:
                 logger.error(f"OpenAI API error: {e}")
                 ai_response = "I'm having trouble connecting to my AI services. Please try again."
         
-        # Save AI response
-        ai_msg = {
-            "user_id": user_id,
-            "role": "assistant",
-            "content": ai_response,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await db.chat_messages_collection.insert_one(ai_msg)
-        
-        # Send real-time update
-        await manager.send_message(user_id, {
-            "type": "ai_chat_message",
-            "message": ai_response
-        })
+        await _save_ai_message(user_id, ai_response)
         
         return {
             "role": "assistant",
@@ -317,6 +338,55 @@ Instructions:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    message: Dict = Body(...),
+    user_id: str = Depends(get_current_user)
+):
+    """Streaming variant of /chat over Server-Sent Events
+    
+    Same body as /chat. Events: token {"content"} as the model generates,
+    then done {"content", "system_state", "stats"}; error {"error"} on failure.
+    The assistant message is saved when the stream completes.
+    """
+    try:
+        content = message.get('content', '')
+        request_action = message.get('request_action', False)
+        confirmation_token = message.get('confirmation_token')
+        
+        system_state = await _save_user_message_and_state(user_id, content)
+        
+        if confirmation_token and confirmation_token in confirmation_tokens:
+            ai_response = await confirm_action(confirmation_token, user_id)
+            await _save_ai_message(user_id, ai_response)
+            return event_stream(reply_events(ai_response, system_state=system_state))
+        
+        model = get_chat_model("gpt-4")
+        if model is None:
+            ai_response = "AI service not configured. Please set OPENAI_API_KEY."
+            await _save_ai_message(user_id, ai_response)
+            return event_stream(reply_events(ai_response, system_state=system_state))
+    
+    except Exception as e:
+        logger.error(f"AI chat stream error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    stream = ChatStream(model, [
+        {"role": "system", "content": build_chat_context(system_state, content)},
+        {"role": "user", "content": content}
+    ])
+    
+    async def finish(stream: ChatStream) -> Dict:
+        if stream.error and not stream.text:
+            ai_response = "I'm having trouble connecting to my AI services. Please try again."
+        else:
+            ai_response = await apply_action_intent(content, request_action, stream.text, user_id)
+        await _save_ai_message(user_id, ai_response, stream_stats=stream.stats)
+        return {"content": ai_response, "system_state": system_state}
+    
+    return event_stream(relay(stream, finish))
+
+
 @router.get("/chat/history")
 async def get_chat_history(
     limit: int = 50,
@@ -51,10 +51,10 @@ async def get_pnl_timeseries(
         trades = await db.trades_collection.find(
             {
                 "user_id": user_id,
-                "timestamp": {"$gte": start_time.isoformat()}
+                **db.trades_since(start_time)
             },
-            {"_id": 0, "timestamp": 1, "profit_loss": 1, "bot_id": 1}
-        ).sort("timestamp", 1).to_list(10000)
+            {"_id": 0, "timestamp": 1, "ts": 1, "profit_loss": 1, "bot_id": 1}
+        ).sort(db.trade_time_field(), 1).to_list(10000)
         
         if not trades:
             return {
@@ -87,7 +87,7 @@ async def get_pnl_timeseries(
         bucket_trades = []
         
         for trade in trades:
-            trade_time = datetime.fromisoformat(trade['timestamp'].replace('Z', '+00:00'))
+            trade_time = db.trade_ts(trade.get('ts') or trade['timestamp'])
             
             # Check if trade belongs to current bucket
             while trade_time >= current_bucket_start + interval_delta:
@@ -225,7 +225,7 @@ async def get_performance_summary(
         trades = await db.trades_collection.find(
             {
                 "user_id": user_id,
-                "timestamp": {"$gte": start_time.isoformat()}
+                **db.trades_since(start_time)
             },
             {"_id": 0}
         ).to_list(10000)
@@ -262,6 +262,10 @@ async def save_api_key(
         
         logger.info(f"✅ {message} for user {user_id[:8]}")
         
+        # Drop any pooled exchange client built from the old key
+        from services.exchange_client_pool import exchange_client_pool
+        await exchange_client_pool.invalidate(user_id, exchange or provider)
+        
         return {
             "success": True,
             "message": message,
@@ -334,6 +338,9 @@ async def delete_api_key(
         
         logger.info(f"🗑️ Deleted {provider} API key for user {user_id[:8]}")
         
+        from services.exchange_client_pool import exchange_client_pool
+        await exchange_client_pool.invalidate(user_id, provider)
+        
         return {
             "success": True,
             "message": f"Deleted {provider.upper()} API key"
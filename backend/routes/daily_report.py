@@ -5,7 +5,7 @@ Sends automated daily email reports with trading performance, bot status, and er
 
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict
 import logging
 import asyncio
 from email.mime.text import MIMEText
@@ -15,148 +15,40 @@ import os
 
 from auth import get_current_user, is_admin
 import database as db
+from services.report_pipeline import ReportPipeline, SmtpQueue, precompute_daily_stats
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
 
-class DailyReportService:
-    """Handles generation and sending of daily reports"""
+def render_daily_report_html(user: Dict, stats: Dict, day_start: datetime,
+                             generated_at: Optional[datetime] = None) -> str:
+    """Render the daily report email body
     
-    def __init__(self):
-        self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        self.smtp_user = os.getenv("SMTP_USER")
-        self.smtp_password = os.getenv("SMTP_PASSWORD")
-        self.smtp_from = os.getenv("SMTP_FROM_EMAIL", self.smtp_user)
-        self.report_time = os.getenv("DAILY_REPORT_TIME", "08:00")  # 8 AM by default
-        self.scheduler_task = None
-        
-    async def generate_report_html(self, user_id: str) -> str:
-        """Generate HTML report for a user using LEDGER DATA
-        
-        This method prioritizes ledger data as the single source of truth for all metrics.
-        If ledger data is unavailable, it falls back to bot-based calculations to ensure
-        reports can always be generated.
-        
-        Ledger-based metrics include:
-        - Total equity (from compute_equity)
-        - Realized PnL (from compute_realized_pnl)  
-        - Fees paid (from compute_fees_paid)
-        - Drawdown (from compute_drawdown)
-        - Yesterday's profit (from profit_series)
+    Pure function so batches can be rendered in the report worker pool.
+    
+    Args:
+        user: User document (name, email)
+        stats: Daily stats from services.report_pipeline.precompute_daily_stats
+        day_start: Start of the reported day
+        generated_at: Render time (defaults to now)
         
-        Args:
-            user_id: User ID to generate report for
-            
-        Returns:
-            HTML formatted report or None if user not found
-        """
-        try:
-            # Get user info
-            user = await db.users_collection.find_one({"id": user_id}, {"_id": 0})
-            if not user:
-                return None
-            
-            user_email = user.get("email", "Unknown")
-            user_name = user.get("name", user_email)
-            
-            # Get yesterday's date range
-            now = datetime.now(timezone.utc)
-            yesterday_start = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-            yesterday_end = yesterday_start + timedelta(days=1)
-            
-            # Get all bots
-            bots_cursor = db.bots_collection.find({"user_id": user_id, "status": {"$ne": "deleted"}})
-            bots = await bots_cursor.to_list(1000)
-            
-            active_bots = [b for b in bots if b.get("status") == "active"]
-            paused_bots = [b for b in bots if b.get("status") == "paused"]
-            stopped_bots = [b for b in bots if b.get("status") == "stopped"]
-            
-            # NEW: Get metrics from LEDGER (single source of truth)
-            try:
-                import database as db
-                from services.ledger_service import get_ledger_service
-                
-                db = await get_database()
-                ledger = get_ledger_service(db)
-                
-                # Get ledger-based metrics
-                total_equity = await ledger.compute_equity(user_id)
-                realized_pnl = await ledger.compute_realized_pnl(user_id)
-                total_fees = await ledger.compute_fees_paid(user_id)
-                current_dd, max_dd = await ledger.compute_drawdown(user_id)
-                stats = await ledger.get_stats(user_id)
-                
-                # Get yesterday's profit from ledger
-                yesterday_series = await ledger.profit_series(user_id, period="daily", limit=1)
-                net_profit = yesterday_series["values"][0] if yesterday_series["values"] else 0.0
-                
-                # Calculate yesterday's stats from ledger fills
-                yesterday_fills = await ledger.get_fills(
-                    user_id,
-                    since=yesterday_start,
-                    until=yesterday_end
-                )
-                
-                total_trades = len(yesterday_fills)
-                # Simplified: count buy fills as trades (in reality need to match buy/sell pairs)
-                winning_trades = 0
-                losing_trades = 0
-                
-                drawdown_percent = current_dd * 100
-                win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0.0
-                
-                # Use ledger data
-                total_profit = realized_pnl
-                
-            except Exception as ledger_error:
-                # Fallback to bot-based calculation if ledger fails
-                logger.warning(f"Ledger data unavailable, using bot-based calculation: {ledger_error}")
-                
-                # Get yesterday's trades (fallback)
-                trades_cursor = db.trades_collection.find({
-                    "user_id": user_id,
-                    "created_at": {
-                        "$gte": yesterday_start.isoformat(),
-                        "$lt": yesterday_end.isoformat()
-                    }
-                })
-                trades = await trades_cursor.to_list(10000)
-                
-                # Calculate stats
-                total_trades = len(trades)
-                winning_trades = len([t for t in trades if t.get("realized_profit", 0) > 0])
-                losing_trades = len([t for t in trades if t.get("realized_profit", 0) < 0])
-                
-                total_profit = sum(t.get("realized_profit", 0.0) for t in trades)
-                total_fees = sum(t.get("fees", 0.0) for t in trades)
-                net_profit = total_profit - total_fees
-                
-                win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0.0
-                
-                # Calculate current portfolio value
-                total_equity = sum(b.get("current_capital", b.get("initial_capital", 0.0)) for b in bots)
-                
-                # Calculate max drawdown (simplified)
-                funded_capital = user.get("funded_capital", total_equity)
-                drawdown_percent = ((funded_capital - total_equity) / funded_capital * 100) if funded_capital > 0 else 0.0
-            
-            # Get alerts/errors from yesterday
-            alerts_cursor = db.alerts_collection.find({
-                "user_id": user_id,
-                "created_at": {
-                    "$gte": yesterday_start.isoformat(),
-                    "$lt": yesterday_end.isoformat()
-                },
-                "severity": {"$in": ["error", "critical"]}
-            })
-            alerts = await alerts_cursor.to_list(100)
-            
-            # Generate HTML
-            html = f"""
+    Returns:
+        HTML formatted report
+    """
+    generated_at = generated_at or datetime.now(timezone.utc)
+    user_name = user.get("name") or user.get("email", "Unknown")
+    total_trades = stats["total_trades"]
+    win_rate = stats["win_rate"]
+    net_profit = stats["net_profit"]
+    total_fees = stats["total_fees"]
+    total_equity = stats["total_equity"]
+    drawdown_percent = stats["drawdown_percent"]
+    alerts = stats["alerts"]
+    
+    # Generate HTML
+    html = f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -227,7 +119,7 @@ class DailyReportService:
 <body>
     <div class="header">
         <h1>🚀 Amarktai Network Daily Report</h1>
-        <p>{user_name} | {yesterday_start.strftime("%B %d, %Y")}</p>
+        <p>{user_name} | {day_start.strftime("%B %d, %Y")}</p>
     </div>
     
     <div class="section">
@@ -271,27 +163,27 @@ class DailyReportService:
             </tr>
             <tr>
                 <td>Active</td>
-                <td class="positive"><strong>{len(active_bots)}</strong></td>
+                <td class="positive"><strong>{stats['active_bots']}</strong></td>
             </tr>
             <tr>
                 <td>Paused</td>
-                <td class="warning"><strong>{len(paused_bots)}</strong></td>
+                <td class="warning"><strong>{stats['paused_bots']}</strong></td>
             </tr>
             <tr>
                 <td>Stopped</td>
-                <td class="negative"><strong>{len(stopped_bots)}</strong></td>
+                <td class="negative"><strong>{stats['stopped_bots']}</strong></td>
             </tr>
             <tr>
                 <td><strong>Total</strong></td>
-                <td><strong>{len(bots)}</strong></td>
+                <td><strong>{stats['total_bots']}</strong></td>
             </tr>
         </table>
     </div>
     """
-            
-            # Add alerts section if there are any
-            if alerts:
-                html += """
+    
+    # Add alerts section if there are any
+    if alerts:
+        html += """
     <div class="section">
         <h2>⚠️ Alerts & Errors</h2>
         <table>
@@ -301,38 +193,84 @@ class DailyReportService:
                 <th>Message</th>
             </tr>
 """
-                for alert in alerts[:10]:  # Limit to 10 most recent
-                    severity = alert.get("severity", "info")
-                    timestamp = alert.get("created_at", "")
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        time_str = dt.strftime("%H:%M")
-                    except:
-                        time_str = "Unknown"
-                    
-                    html += f"""
+        for alert in alerts[:10]:  # Limit to 10 most recent
+            severity = alert.get("severity", "info")
+            timestamp = alert.get("created_at", "")
+            try:
+                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                time_str = dt.strftime("%H:%M")
+            except:
+                time_str = "Unknown"
+            
+            html += f"""
             <tr>
                 <td>{time_str}</td>
                 <td class="{'negative' if severity == 'critical' else 'warning'}">{severity.upper()}</td>
                 <td>{alert.get('message', 'No details')[:100]}</td>
             </tr>
 """
-                html += """
+        html += """
         </table>
     </div>
 """
-            
-            # Footer
-            html += f"""
+    
+    # Footer
+    html += f"""
     <div class="footer">
-        <p>Amarktai Network Trading Platform | Generated {now.strftime("%Y-%m-%d %H:%M UTC")}</p>
+        <p>Amarktai Network Trading Platform | Generated {generated_at.strftime("%Y-%m-%d %H:%M UTC")}</p>
         <p>This is an automated report. Do not reply to this email.</p>
     </div>
 </body>
 </html>
 """
+    
+    return html
+
+
+def yesterday_window(now: Optional[datetime] = None):
+    """(start, end) of the previous UTC day"""
+    now = now or datetime.now(timezone.utc)
+    start = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+class DailyReportService:
+    """Handles generation and sending of daily reports"""
+    
+    def __init__(self):
+        self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
+        self.smtp_user = os.getenv("SMTP_USER")
+        self.smtp_password = os.getenv("SMTP_PASSWORD")
+        self.smtp_from = os.getenv("SMTP_FROM_EMAIL", self.smtp_user)
+        self.report_time = os.getenv("DAILY_REPORT_TIME", "08:00")  # 8 AM by default
+        self.scheduler_task = None
+        self._run_lock = asyncio.Lock()
+    
+    def _smtp_queue(self) -> SmtpQueue:
+        return SmtpQueue(self.smtp_host, self.smtp_port, self.smtp_user, self.smtp_password, self.smtp_from)
+    
+    async def generate_report_html(self, user_id: str) -> str:
+        """Generate HTML report for a user
+        
+        Uses the same aggregated stats as the batch pipeline (trades, bots and
+        alerts for yesterday), so a single report and a full run agree.
+        
+        Args:
+            user_id: User ID to generate report for
+        
+        Returns:
+            HTML formatted report or None if user not found
+        """
+        try:
+            user = await db.users_collection.find_one({"id": user_id}, {"_id": 0})
+            if not user:
+                return None
+            
+            day_start, day_end = yesterday_window()
+            stats = await precompute_daily_stats(db.get_database(), [user], day_start, day_end)
             
-            return html
+            return render_daily_report_html(user, stats[user_id], day_start)
             
         except Exception as e:
             logger.error(f"Generate report HTML error: {e}")
@@ -377,47 +315,38 @@ class DailyReportService:
             logger.error(f"Send email error: {e}")
             return False
     
-    async def send_daily_reports(self):
-        """Send daily reports to all users"""
+    async def send_daily_reports(self, resume: bool = True) -> Dict:
+        """Send daily reports to all users
+        
+        Runs through the shared report pipeline: batched stats, pooled
+        rendering and a bounded SMTP queue, checkpointed per batch so a
+        restarted run continues where it stopped.
+        """
         try:
-            # Get all users
-            users_cursor = db.users_collection.find({}, {"_id": 0})
-            users = await users_cursor.to_list(10000)
+            if not self.smtp_user or not self.smtp_password:
+                logger.warning("SMTP credentials not configured - skipping daily reports")
+                return {"success": False, "error": "SMTP not configured"}
             
-            logger.info(f"📧 Sending daily reports to {len(users)} users...")
+            if self._run_lock.locked():
+                return {"success": False, "error": "Daily report run already in progress"}
             
-            sent_count = 0
-            failed_count = 0
+            day_start, day_end = yesterday_window()
+            subject = f"Amarktai Daily Report - {day_start.strftime('%B %d, %Y')}"
             
-            for user in users:
-                user_id = user.get("id")
-                user_email = user.get("email")
-                
-                if not user_email:
-                    continue
-                
-                # Generate report
-                html = await self.generate_report_html(user_id)
-                if not html:
-                    failed_count += 1
-                    continue
-                
-                # Send email
-                yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-                subject = f"Amarktai Daily Report - {yesterday.strftime('%B %d, %Y')}"
-                
-                if await self.send_email(user_email, subject, html):
-                    sent_count += 1
-                else:
-                    failed_count += 1
-                
-                # Rate limit
-                await asyncio.sleep(1)
+            def render(user, stats):
+                return subject, render_daily_report_html(user, stats, day_start)
+            
+            async with self._run_lock:
+                pipeline = ReportPipeline(db.get_database(), self._smtp_queue())
+                summary = await pipeline.run(
+                    f"daily:{day_start.date().isoformat()}", render, day_start, day_end, resume=resume
+                )
             
-            logger.info(f"✅ Daily reports complete: {sent_count} sent, {failed_count} failed")
+            return {"success": True, **summary}
             
         except Exception as e:
             logger.error(f"Send daily reports error: {e}")
+            return {"success": False, "error": str(e)}
     
     async def schedule_daily_reports(self):
         """Run scheduler for daily reports"""
@@ -3,9 +3,9 @@ Genetic Algorithm "DNA" Optimization Router
 Manages bot evolution, mutation, and crossover for optimal trading strategies
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
 from auth import get_current_user
@@ -20,10 +20,15 @@ dna_evolution = BotDNAEvolution()
 
 
 @router.post("/evolve")
-async def evolve_bots(user_id: str = Depends(get_current_user)):
+async def evolve_bots(
+    mode: str = Query("live", pattern="^(live|backtest)$"),
+    generations: Optional[int] = Query(None, ge=1, le=50),
+    population: Optional[int] = Query(None, ge=4, le=2000),
+    user_id: str = Depends(get_current_user)
+):
     """Run genetic algorithm evolution cycle on user's bots
     
-    Evolution Process:
+    Evolution Process (mode=live):
     1. Rank all bots by performance
     2. Select elite bots (top 30%)
     3. Identify weak bots (bottom 30%)
@@ -31,24 +36,38 @@ async def evolve_bots(user_id: str = Depends(get_current_user)):
     5. Apply mutations
     6. Replace weak bots with evolved offspring
     
+    mode=backtest scores candidate genomes over recorded history instead,
+    running `generations` x `population` offline before updating the weakest bots.
+    
     Returns:
         - evolved_count: Number of bots evolved
         - generation: Current generation number
-        - elite_count: Number of elite bots selected
+        - elite_count: Number of elite bots selected (live mode)
+        - genomes_evaluated / best_fitness_per_generation (backtest mode)
     """
     try:
-        result = await dna_evolution.evolve_bots(user_id)
+        if mode == "backtest":
+            result = await dna_evolution.evolve_with_backtests(user_id, generations, population)
+        else:
+            result = await dna_evolution.evolve_bots(user_id)
         
-        logger.info(f"Evolution cycle completed for user {user_id[:8]}: {result}")
+        logger.info(f"Evolution cycle completed for user {user_id[:8]}: {result.get('message', result.get('error'))}")
         
-        return {
+        response = {
             "success": result.get('evolved', 0) > 0,
+            "mode": mode,
             "evolved_count": result.get('evolved', 0),
             "generation": result.get('generation', 0),
             "elite_count": result.get('elite_count', 0),
             "message": result.get('message', 'Evolution completed'),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+        if mode == "backtest":
+            for key in ("generations_run", "genomes_evaluated", "genomes_backtested",
+                        "best_fitness_per_generation", "changes"):
+                if key in result:
+                    response[key] = result[key]
+        return response
     
     except Exception as e:
         logger.error(f"Evolution error: {e}")
@@ -5,16 +5,21 @@ Provides read-only access to immutable ledger data:
 - Portfolio summary (equity, PnL, fees, drawdown)
 - Profit series (daily/weekly/monthly)
 - Countdown status (equity-based projections)
+- Fills and audit trail pages (keyset cursors, client-selected fields)
+- Fill import / export (NDJSON, streamed both ways)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import Optional
 from datetime import datetime, timedelta
+import json
 import logging
 
 from auth import get_current_user
 import database as db
+from database import get_database
 from services.ledger_service import get_ledger_service
+from services.pagination import ndjson_response
 
 router = APIRouter(prefix="/api", tags=["ledger"])
 logger = logging.getLogger(__name__)
@@ -22,7 +27,7 @@ logger = logging.getLogger(__name__)
 
 @router.get("/portfolio/summary")
 async def get_portfolio_summary(
-    current_user: dict = Depends(get_current_user),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
@@ -39,7 +44,6 @@ async def get_portfolio_summary(
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
         
         # Compute core metrics
         equity = await ledger.compute_equity(user_id)
@@ -79,7 +83,7 @@ async def get_portfolio_summary(
 async def get_profits(
     period: str = Query("daily", regex="^(daily|weekly|monthly)$"),
     limit: int = Query(30, ge=1, le=365),
-    current_user: dict = Depends(get_current_user),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
@@ -93,7 +97,6 @@ async def get_profits(
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
         
         series = await ledger.profit_series(user_id, period=period, limit=limit)
         
@@ -112,7 +115,7 @@ async def get_profits(
 @router.get("/countdown/status")
 async def get_countdown_status(
     target: float = Query(1000000, description="Target amount (e.g., R1M = 1000000)"),
-    current_user: dict = Depends(get_current_user),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
@@ -128,7 +131,6 @@ async def get_countdown_status(
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
         
         # Get current equity
         current_equity = await ledger.compute_equity(user_id)
@@ -180,63 +182,100 @@ async def get_countdown_status(
         raise HTTPException(status_code=500, detail=f"Failed to get countdown status: {str(e)}")
 
 
+def _iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
 @router.get("/ledger/fills")
 async def get_fills(
     bot_id: Optional[str] = None,
     since: Optional[str] = None,
     until: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
-    current_user: dict = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. symbol,side,qty,price"),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
-    Get fills from ledger with optional filters
+    Get fills from ledger with optional filters, newest first
     
     Parameters:
     - bot_id: Filter by bot
     - since: ISO timestamp (e.g., 2025-01-01T00:00:00Z)
     - until: ISO timestamp
-    - limit: Max results
+    - limit: Page size
+    - cursor: Continue after the previous page (keep the other filters unchanged)
+    - fields: Return only these fields (timestamp and _id are always included)
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
-        
-        # Parse dates
-        since_dt = datetime.fromisoformat(since.replace('Z', '+00:00')) if since else None
-        until_dt = datetime.fromisoformat(until.replace('Z', '+00:00')) if until else None
         
-        fills = await ledger.get_fills(
+        page = await ledger.get_fills_page(
             user_id=user_id,
             bot_id=bot_id,
-            since=since_dt,
-            until=until_dt,
-            limit=limit
+            since=_iso(since),
+            until=_iso(until),
+            limit=limit,
+            cursor=cursor,
+            fields=fields
         )
         
         return {
-            "fills": fills,
-            "count": len(fills),
+            "fills": page["fills"],
+            "count": len(page["fills"]),
+            "next_cursor": page["next_cursor"],
             "filters": {
                 "bot_id": bot_id,
                 "since": since,
                 "until": until,
-                "limit": limit
+                "limit": limit,
+                "fields": fields
             },
             "data_source": "ledger",
             "phase": "1_read_only"
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting fills: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get fills: {str(e)}")
 
 
+@router.get("/ledger/fills/export")
+async def export_fills(
+    bot_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. symbol,side,qty,price"),
+    user_id: str = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Download every matching fill as NDJSON (one fill per line, newest first)
+    
+    Streamed from the ledger in keyset batches, so any history size is
+    exported in constant server memory. Same filters as /ledger/fills.
+    """
+    try:
+        ledger = get_ledger_service(db)
+        
+        fills = await ledger.export_fills(user_id, bot_id=bot_id, since=_iso(since), until=_iso(until), fields=fields)
+        
+        return ndjson_response(fills, f"fills-{datetime.utcnow():%Y%m%d%H%M%S}.ndjson")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting fills: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to export fills: {str(e)}")
+
+
 @router.post("/ledger/funding")
 async def record_funding(
     amount: float,
     currency: str = "USDT",
     description: Optional[str] = None,
-    current_user: dict = Depends(get_current_user),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
@@ -246,7 +285,6 @@ async def record_funding(
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
         
         event_id = await ledger.append_event(
             user_id=user_id,
@@ -267,54 +305,101 @@ async def record_funding(
         raise HTTPException(status_code=500, detail=f"Failed to record funding: {str(e)}")
 
 
+def _json_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+async def _ndjson_records(request: Request):
+    """Records of a streamed NDJSON body (None for lines that are not JSON)"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _json_line(line)
+    if buffer.strip():
+        yield _json_line(buffer)
+
+
+async def _owned(records, user_id: str, is_paper: bool):
+    """Records with the caller as owner"""
+    async for record in records:
+        if isinstance(record, dict):
+            record = {**record, "user_id": user_id}
+            record.setdefault("is_paper", is_paper)
+        yield record
+
+
+@router.post("/ledger/fills/import")
+async def import_fills(
+    request: Request,
+    is_paper: bool = Query(False, description="is_paper for lines that do not set it"),
+    user_id: str = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Import fills from an NDJSON body (application/x-ndjson)
+    
+    One fill per line with append_fill's fields (bot_id, exchange, symbol, side,
+    qty, price, fee, fee_currency, timestamp, order_id, optional client_order_id,
+    exchange_trade_id, is_paper, metadata). user_id always comes from the token.
+    The body is read as a stream and written in batches; lines repeating a
+    client_order_id already in the ledger are counted as duplicates, so an
+    interrupted import can simply be sent again.
+    """
+    try:
+        ledger = get_ledger_service(db)
+        
+        summary = await ledger.append_fills(_owned(_ndjson_records(request), user_id, is_paper))
+        
+        return {
+            **summary,
+            "data_source": "ledger",
+            "phase": "1_append_only"
+        }
+    except Exception as e:
+        logger.error(f"Error importing fills: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to import fills: {str(e)}")
+
+
 @router.get("/ledger/audit-trail")
 async def get_audit_trail(
     bot_id: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
-    current_user: dict = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fill/event fields"),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
     Get complete audit trail (fills + events)
     
-    Returns chronological list of all ledger entries
+    Returns one page of all ledger entries, newest first; pass next_cursor
+    back to continue.
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
-        
-        # Get fills
-        fills = await ledger.get_fills(user_id=user_id, bot_id=bot_id, limit=limit)
-        
-        # Get events
-        event_query = {"user_id": user_id}
-        if bot_id:
-            event_query["bot_id"] = bot_id
-        
-        events_cursor = ledger.ledger_events.find(event_query).sort("timestamp", -1).limit(limit)
-        events = await events_cursor.to_list(length=limit)
-        
-        # Convert ObjectId
-        for event in events:
-            event["_id"] = str(event["_id"])
-        
-        # Combine and sort
-        fills_with_type = [{"type": "fill", **f} for f in fills]
-        events_with_type = [{"type": "event", **e} for e in events]
         
-        all_entries = fills_with_type + events_with_type
-        all_entries.sort(key=lambda x: x.get("timestamp", datetime.min), reverse=True)
+        page = await ledger.audit_trail_page(user_id, bot_id=bot_id, limit=limit, cursor=cursor, fields=fields)
         
         return {
-            "audit_trail": all_entries[:limit],
-            "count": len(all_entries[:limit]),
+            "audit_trail": page["entries"],
+            "count": len(page["entries"]),
+            "next_cursor": page["next_cursor"],
             "filters": {
                 "bot_id": bot_id,
-                "limit": limit
+                "limit": limit,
+                "fields": fields
             },
             "data_source": "ledger",
             "phase": "1_read_only"
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting audit trail: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get audit trail: {str(e)}")
@@ -322,7 +407,8 @@ async def get_audit_trail(
 
 @router.get("/ledger/reconcile")
 async def reconcile_ledger(
-    current_user: dict = Depends(get_current_user),
+    resume: bool = Query(True, description="Continue an interrupted scan from its checkpoint"),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
@@ -335,9 +421,8 @@ async def reconcile_ledger(
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
         
-        report = await ledger.reconcile_with_trades_collection(user_id)
+        report = await ledger.reconcile_with_trades_collection(user_id, resume=resume)
         
         return report
     except Exception as e:
@@ -347,7 +432,8 @@ async def reconcile_ledger(
 
 @router.get("/ledger/verify-integrity")
 async def verify_ledger_integrity(
-    current_user: dict = Depends(get_current_user),
+    resume: bool = Query(True, description="Continue an interrupted scan from its checkpoint"),
+    user_id: str = Depends(get_current_user),
     db=Depends(get_database)
 ):
     """
@@ -364,9 +450,8 @@ async def verify_ledger_integrity(
     """
     try:
         ledger = get_ledger_service(db)
-        user_id = current_user["_id"]
         
-        report = await ledger.verify_integrity(user_id)
+        report = await ledger.verify_integrity(user_id, resume=resume)
         
         return report
     except Exception as e:
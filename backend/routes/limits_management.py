@@ -307,6 +307,36 @@ async def check_circuit_breaker(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/circuit-breaker/sweep")
+async def sweep_circuit_breaker(
+    user_id: str = Depends(get_current_user),
+    all_users: bool = Query(False, description="Sweep every user (admin only)")
+):
+    """
+    Run the circuit breaker over all of the user's bots in one sweep
+    
+    Returns breaches, actions taken and sweep time
+    """
+    try:
+        from engines.circuit_breaker import circuit_breaker
+        from services.ledger_service import get_ledger_service
+        
+        ledger = get_ledger_service(db.get_database())
+        
+        if all_users:
+            if not await is_admin(user_id):
+                raise HTTPException(status_code=403, detail="Admin access required")
+            return await circuit_breaker.sweep_all_users(ledger)
+        
+        return await circuit_breaker.sweep_user_ledger(user_id, ledger)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Circuit breaker sweep error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/health")
 async def get_limits_health(user_id: str = Depends(get_current_user)):
     """
@@ -390,19 +390,16 @@ async def get_limits_status(
     try:
         pipeline = get_order_pipeline(db)
         user_id = str(current_user["_id"])
-        ledger = pipeline.ledger
         
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Get user daily count
-        user_count = await ledger.get_trade_count(user_id=user_id, since=today_start)
+        # Get user daily count (the shared counter Gate C enforces)
+        user_count = await pipeline.daily_trade_count(user_id)
         user_limit = pipeline.max_trades_per_user_daily
         
         # Get bot daily count if specified
         bot_count = 0
         bot_limit = pipeline.max_trades_per_bot_daily
         if bot_id:
-            bot_count = await ledger.get_trade_count(bot_id=bot_id, since=today_start)
+            bot_count = await pipeline.daily_trade_count(user_id, bot_id)
         
         return {
             "user_daily": {
@@ -8,6 +8,7 @@ import logging
 
 from auth import get_current_user
 from engines.capital_allocator import capital_allocator
+from engines.portfolio_allocator import METHODS as ALLOCATION_METHODS
 from engines.trade_staggerer import trade_staggerer
 from engines.circuit_breaker import circuit_breaker
 from engines.trade_limiter import trade_limiter
@@ -32,11 +33,16 @@ async def get_allocation_report(current_user: Dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/capital/rebalance")
-async def rebalance_capital(current_user: Dict = Depends(get_current_user)):
-    """Trigger capital rebalancing across all bots"""
+async def rebalance_capital(method: str = 'tier', dry_run: bool = False,
+                            current_user: Dict = Depends(get_current_user)):
+    """Trigger capital rebalancing across all bots (method: tier, risk_parity or kelly)"""
     try:
-        result = await capital_allocator.rebalance_all_bots(current_user['id'])
+        if method not in ALLOCATION_METHODS:
+            raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(ALLOCATION_METHODS)}")
+        result = await capital_allocator.rebalance_all_bots(current_user['id'], method=method, dry_run=dry_run)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Rebalance error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
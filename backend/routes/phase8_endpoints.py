@@ -10,6 +10,7 @@ from datetime import datetime, timezone, timedelta
 from auth import get_current_user
 from engines.audit_logger import audit_logger
 from engines.email_reporter import email_reporter
+from services.pagination import ndjson_response
 
 logger = logging.getLogger(__name__)
 
@@ -23,22 +24,31 @@ router = APIRouter(prefix="/api/phase8", tags=["Phase 8 - Logging & Monitoring"]
 async def get_audit_trail(
     days: int = Query(7, ge=1, le=90),
     event_types: Optional[List[str]] = Query(None),
-    current_user: Dict = Depends(get_current_user)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. event_type,severity"),
+    user_id: str = Depends(get_current_user)
 ):
-    """Get audit trail for user"""
+    """Get one page of the user's audit trail, newest first"""
     try:
-        logs = await audit_logger.get_user_audit_trail(
-            current_user['id'],
+        page = await audit_logger.audit_trail_page(
+            user_id,
             days=days,
-            event_types=event_types
+            event_types=event_types,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
         )
         
         return {
-            "user_id": current_user['id'],
+            "user_id": user_id,
             "days": days,
-            "total_events": len(logs),
-            "logs": logs
+            "total_events": len(page["logs"]),
+            "logs": page["logs"],
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Get audit trail error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -46,31 +56,69 @@ async def get_audit_trail(
 @router.get("/audit/critical")
 async def get_critical_events(
     days: int = Query(30, ge=1, le=90),
-    current_user: Dict = Depends(get_current_user)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. event_type,details"),
+    user_id: str = Depends(get_current_user)
 ):
-    """Get critical audit events"""
+    """Get one page of critical audit events, newest first"""
     try:
-        events = await audit_logger.get_critical_events(current_user['id'], days=days)
+        page = await audit_logger.audit_trail_page(
+            user_id,
+            days=days,
+            critical_only=True,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
         
         return {
-            "user_id": current_user['id'],
+            "user_id": user_id,
             "days": days,
-            "critical_events": events
+            "critical_events": page["logs"],
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Get critical events error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/audit/export")
+async def export_audit_trail(
+    days: int = Query(90, ge=1, le=90),
+    event_types: Optional[List[str]] = Query(None),
+    critical_only: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. event_type,details"),
+    user_id: str = Depends(get_current_user)
+):
+    """Download the audit trail as NDJSON (one event per line, newest first, streamed)"""
+    try:
+        logs = audit_logger.export_audit_trail(
+            user_id,
+            days=days,
+            event_types=event_types,
+            critical_only=critical_only,
+            fields=fields
+        )
+        
+        return ndjson_response(logs, f"audit-{datetime.now(timezone.utc):%Y%m%d%H%M%S}.ndjson")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Export audit trail error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/audit/compliance-report")
 async def get_compliance_report(
     start_date: str,
     end_date: str,
-    current_user: Dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user)
 ):
-    """Generate compliance report for date range"""
+    """Generate compliance report for date range (ISO dates; a date-only end includes that day)"""
     try:
         report = await audit_logger.generate_compliance_report(
-            current_user['id'],
+            user_id,
             start_date,
             end_date
         )
@@ -82,12 +130,12 @@ async def get_compliance_report(
 
 @router.get("/audit/statistics")
 async def get_audit_statistics(
-    days: int = Query(30, ge=1, le=90),
-    current_user: Dict = Depends(get_current_user)
+    days: int = Query(30, ge=1, le=365),
+    user_id: str = Depends(get_current_user)
 ):
-    """Get audit log statistics"""
+    """Get audit log statistics (closed days are served from per-day counts)"""
     try:
-        stats = await audit_logger.get_statistics(current_user['id'], days=days)
+        stats = await audit_logger.get_statistics(user_id, days=days)
         return stats
     except Exception as e:
         logger.error(f"Get statistics error: {e}")
@@ -10,6 +10,7 @@ import os
 import asyncio
 import json
 import random
+import time
 from collections import defaultdict
 
 from models import (
@@ -20,11 +21,15 @@ from models import (
 # Use normalized database import pattern
 import database as db
 from auth import create_access_token, get_current_user, get_password_hash, verify_password
-from ai_service import ai_service
-from ccxt_service import ccxt_service
 from websocket_manager import manager
-from trading_scheduler import trading_scheduler
-import ccxt.async_support as ccxt
+from engines.instrumentation import MetricsMiddleware
+from services.startup import StartupPlan, ServiceSpec, lazy, lazy_loaded, startup_profile, timed_import
+
+# Heavy subsystems load on first use rather than at import time
+ai_service = lazy("ai_service", "ai_service")
+trading_scheduler = lazy("trading_scheduler", "trading_scheduler")
+ccxt = lazy("ccxt.async_support")
+ccxt_service = lazy("ccxt_service", "ccxt_service")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,17 +45,27 @@ api_router.include_router(auth_router)
 async def lifespan(app: FastAPI):
     """Startup and shutdown events with feature flags for plug-and-play stability"""
     logger.info("🚀 Starting Amarktai Network...")
+    startup_clock = time.perf_counter()
+    startup_profile.started_at = datetime.now(timezone.utc).isoformat()
     
     # =========================================================================
     # STEP 1: Connect to database FIRST (before any other services)
     # =========================================================================
     try:
         await db.connect()
+        startup_profile.record_service("database", "started", time.perf_counter() - startup_clock)
         logger.info("✅ Database connected and collections initialized")
     except Exception as e:
         logger.error(f"❌ FATAL: Database connection failed: {e}")
         raise  # Cannot proceed without database
-    
+
+    # Shared rate limit counters (must be ready before any trading guard runs)
+    try:
+        from services.rate_limit_service import init_rate_limit_service
+        await init_rate_limit_service(db.db)
+    except Exception as e:
+        logger.error(f"Failed to initialize rate limit service: {e}")
+
     # Feature flags for safe plug-and-play deployment
     enable_trading = os.getenv('ENABLE_TRADING', '0') == '1'
     enable_autopilot = os.getenv('ENABLE_AUTOPILOT', '0') == '1'
@@ -59,145 +74,87 @@ async def lifespan(app: FastAPI):
     
     logger.info(f"🎚️ Feature flags: TRADING={enable_trading}, AUTOPILOT={enable_autopilot}, CCXT={enable_ccxt}, SCHEDULERS={enable_schedulers}")
     
-    # Track background tasks for clean shutdown
-    background_tasks = []
-    
     # =========================================================================
-    # STEP 2: Start services in deterministic order
+    # STEP 2: Start services concurrently, honouring declared dependencies
     # =========================================================================
+    fetchai_key = os.environ.get('FETCHAI_API_KEY', '')
+    flokx_key = os.environ.get('FLOKX_API_KEY', '')
     
-    # Start autonomous systems based on feature flags
-    if enable_autopilot:
-        try:
-            from autopilot_engine import autopilot
-            await autopilot.start()
-            logger.info("🤖 Autopilot Engine started")
-        except Exception as e:
-            logger.error(f"Failed to start Autopilot Engine: {e}")
-    else:
-        logger.info("🤖 Autopilot Engine disabled (ENABLE_AUTOPILOT=0)")
+    async def start_autopilot():
+        from autopilot_engine import autopilot
+        await autopilot.start()
     
-    try:
-        from ai_bodyguard import bodyguard
-        task = asyncio.create_task(bodyguard.start())
-        background_tasks.append(task)
-        logger.info("🛡️ AI Bodyguard activated")
-    except Exception as e:
-        logger.error(f"Failed to start AI Bodyguard: {e}")
+    def configure_fetchai():
+        from fetchai_integration import fetchai
+        fetchai.set_credentials(fetchai_key)
     
-    try:
-        from self_learning import learning_system
-        await learning_system.init_db()
-        logger.info("📚 Self-Learning System initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize Self-Learning System: {e}")
+    def configure_flokx():
+        from flokx_integration import flokx
+        flokx.set_credentials(flokx_key)
     
-    if enable_schedulers:
-        try:
-            from autonomous_scheduler import autonomous_scheduler
-            await autonomous_scheduler.start()
-            logger.info("🤖 Autonomous Scheduler started (lifecycle, capital, regime)")
-        except Exception as e:
-            logger.error(f"Failed to start Autonomous Scheduler: {e}")
-        
-        try:
-            from engines.self_healing import self_healing
-            self_healing.start()
-            logger.info("🏥 Self-Healing System started")
-        except Exception as e:
-            logger.error(f"Failed to start Self-Healing System: {e}")
-        
-        try:
-            from advanced_orders import advanced_orders
-            await advanced_orders.start()
-            logger.info("📈 Advanced Orders monitoring started")
-        except Exception as e:
-            logger.error(f"Failed to start Advanced Orders: {e}")
-        
-        try:
-            from ai_scheduler import ai_scheduler
-            await ai_scheduler.start()
-            logger.info("🧠 AI Backend Scheduler started - runs nightly at 2 AM")
-        except Exception as e:
-            logger.error(f"Failed to start AI Scheduler: {e}")
-        
-        try:
-            from ai_memory_manager import memory_manager
-            task = asyncio.create_task(memory_manager.run_maintenance())
-            background_tasks.append(task)
-            logger.info("💾 AI Memory Manager started")
-        except Exception as e:
-            logger.error(f"Failed to start AI Memory Manager: {e}")
-    else:
+    def start_reinvestment():
+        from services.daily_reinvestment import get_reinvestment_service
+        get_reinvestment_service(db.db).start()
+    
+    plan = StartupPlan([
+        ServiceSpec("autopilot", start_autopilot, enabled=enable_autopilot,
+                    message="🤖 Autopilot Engine started"),
+        ServiceSpec("bodyguard", "ai_bodyguard:bodyguard.start", background=True,
+                    message="🛡️ AI Bodyguard activated"),
+        ServiceSpec("learning_system", "self_learning:learning_system.init_db",
+                    message="📚 Self-Learning System initialized"),
+        ServiceSpec("autonomous_scheduler", "autonomous_scheduler:autonomous_scheduler.start",
+                    enabled=enable_schedulers,
+                    message="🤖 Autonomous Scheduler started (lifecycle, capital, regime)"),
+        ServiceSpec("self_healing", "engines.self_healing:self_healing.start", enabled=enable_schedulers,
+                    message="🏥 Self-Healing System started"),
+        ServiceSpec("advanced_orders", "advanced_orders:advanced_orders.start", enabled=enable_schedulers,
+                    message="📈 Advanced Orders monitoring started"),
+        # Nightly AI runs train on what the learning system records
+        ServiceSpec("ai_scheduler", "ai_scheduler:ai_scheduler.start", depends_on=("learning_system",),
+                    enabled=enable_schedulers,
+                    message="🧠 AI Backend Scheduler started - runs nightly at 2 AM"),
+        ServiceSpec("memory_manager", "ai_memory_manager:memory_manager.run_maintenance", background=True,
+                    enabled=enable_schedulers, message="💾 AI Memory Manager started"),
+        # Keeps regime price history current; trading and the regime scheduler only read it
+        ServiceSpec("regime_sampler", "market_regime:market_regime_detector.run_sampler", background=True,
+                    enabled=enable_trading or enable_schedulers,
+                    message="📊 Market regime sampler started"),
+        ServiceSpec("trading_scheduler", "trading_scheduler:trading_scheduler.start", enabled=enable_trading,
+                    message="💹 Paper Trading Scheduler started"),
+        ServiceSpec("trading_engine", "engines.trading_engine_production:trading_engine.start",
+                    enabled=enable_trading, message="💹 Production Trading Engine started"),
+        # Both act on positions the production engine opens
+        ServiceSpec("autopilot_production", "engines.autopilot_production:autopilot_production.start",
+                    depends_on=("trading_engine",), enabled=enable_trading,
+                    message="🤖 Production Autopilot started"),
+        ServiceSpec("risk_management", "engines.risk_management:risk_management.start",
+                    depends_on=("trading_engine",), enabled=enable_trading,
+                    message="🎯 Risk Management started"),
+        ServiceSpec("wallet_monitor", "jobs.wallet_balance_monitor:wallet_balance_monitor.start",
+                    optional=True, message="✅ Wallet balance monitor started"),
+        ServiceSpec("fetchai", configure_fetchai, enabled=bool(fetchai_key), optional=True,
+                    message="🔮 Fetch.ai integration configured"),
+        ServiceSpec("flokx", configure_flokx, enabled=bool(flokx_key), optional=True,
+                    message="🎯 FLOKx integration configured"),
+        ServiceSpec("reinvestment", start_reinvestment, optional=True,
+                    message="💰 Daily Reinvestment Scheduler started")
+    ])
+    
+    if not enable_autopilot:
+        logger.info("🤖 Autopilot Engine disabled (ENABLE_AUTOPILOT=0)")
+    if not enable_schedulers:
         logger.info("📅 Schedulers disabled (ENABLE_SCHEDULERS=0)")
-    
-    if enable_trading:
-        try:
-            trading_scheduler.start()
-            logger.info("💹 Paper Trading Scheduler started")
-        except Exception as e:
-            logger.error(f"Failed to start Trading Scheduler: {e}")
-        
-        try:
-            from engines.trading_engine_production import trading_engine
-            trading_engine.start()
-            logger.info("💹 Production Trading Engine started")
-        except Exception as e:
-            logger.error(f"Failed to start Trading Engine: {e}")
-        
-        try:
-            from engines.autopilot_production import autopilot_production
-            autopilot_production.start()
-            logger.info("🤖 Production Autopilot started")
-        except Exception as e:
-            logger.error(f"Failed to start Production Autopilot: {e}")
-        
-        try:
-            from engines.risk_management import risk_management
-            risk_management.start()
-            logger.info("🎯 Risk Management started")
-        except Exception as e:
-            logger.error(f"Failed to start Risk Management: {e}")
-    else:
+    if not enable_trading:
         logger.info("💹 Trading engines disabled (ENABLE_TRADING=0)")
     
-    # Start wallet balance monitor (optional)
-    try:
-        from jobs.wallet_balance_monitor import wallet_balance_monitor
-        wallet_balance_monitor.start()
-        logger.info("✅ Wallet balance monitor started")
-    except Exception as e:
-        logger.warning(f"Could not start wallet monitor: {e}")
-    
-    # Initialize Fetch.ai and FLOKx integrations if keys available
-    try:
-        fetchai_key = os.environ.get('FETCHAI_API_KEY', '')
-        if fetchai_key:
-            from fetchai_integration import fetchai
-            fetchai.set_credentials(fetchai_key)
-            logger.info("🔮 Fetch.ai integration configured")
-    except Exception as e:
-        logger.warning(f"Could not configure Fetch.ai: {e}")
-    
-    try:
-        flokx_key = os.environ.get('FLOKX_API_KEY', '')
-        if flokx_key:
-            from flokx_integration import flokx
-            flokx.set_credentials(flokx_key)
-            logger.info("🎯 FLOKx integration configured")
-    except Exception as e:
-        logger.warning(f"Could not configure FLOKx: {e}")
-    
-    # Start Daily Reinvestment Scheduler (optional)
-    try:
-        from services.daily_reinvestment import get_reinvestment_service
-        reinvest_service = get_reinvestment_service(db.db)
-        reinvest_service.start()
-        logger.info("💰 Daily Reinvestment Scheduler started")
-    except Exception as e:
-        logger.warning(f"Could not start Reinvestment Scheduler: {e}")
+    startup = await plan.run()
+    # Track background tasks for clean shutdown
+    background_tasks = startup.tasks
     
-    logger.info("🚀 All autonomous systems operational")
+    startup_profile.completed_at = datetime.now(timezone.utc).isoformat()
+    startup_profile.total_seconds = round(time.perf_counter() - startup_clock, 4)
+    logger.info(f"🚀 All autonomous systems operational ({len(startup.started)} services in {startup_profile.total_seconds:.2f}s, {len(startup.failed)} failed)")
     
     yield
     
@@ -306,8 +263,17 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error stopping reinvest_service: {e}")
     
-    # Close CCXT async sessions if trading/ccxt enabled
-    if enable_ccxt or enable_trading:
+    # Stop the live price refresh loop; it reads through paper_engine's exchanges
+    prices_streamed = False
+    try:
+        from services.price_snapshot import price_snapshots
+        prices_streamed = price_snapshots.snapshot.version > 0
+        await price_snapshots.stop()
+    except Exception as e:
+        logger.error(f"Error stopping price snapshots: {e}")
+    
+    # Close CCXT async sessions if trading/ccxt enabled (or opened for live prices)
+    if enable_ccxt or enable_trading or prices_streamed:
         try:
             from paper_trading_engine import paper_engine
             await paper_engine.close_exchanges()
@@ -315,9 +281,17 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Error closing CCXT sessions: {e}")
     
+    # Close pooled per-user exchange clients (live trading, wallets)
+    try:
+        from services.exchange_client_pool import exchange_client_pool
+        await exchange_client_pool.close_all()
+        logger.info("✅ Pooled exchange clients closed")
+    except Exception as e:
+        logger.error(f"Error closing pooled exchange clients: {e}")
+    
     # Close AI service sessions (aiohttp)
     try:
-        if ai_service and hasattr(ai_service, 'close'):
+        if lazy_loaded(ai_service) and hasattr(ai_service, 'close'):
             await ai_service.close()
             logger.info("✅ AI service sessions closed")
     except Exception as e:
@@ -342,6 +316,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency histograms per route template (outermost, so it times CORS as well)
+app.add_middleware(MetricsMiddleware)
+
 # ============================================================================
 # WEBSOCKET
 # ============================================================================
@@ -401,63 +378,63 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             pass
 
 @app.websocket("/ws/decisions")
-async def decision_trace_websocket(websocket: WebSocket):
-    """WebSocket endpoint for streaming trading decisions in real-time"""
+async def decision_trace_websocket(websocket: WebSocket, token: str = None, symbols: str = None,
+                                   bots: str = None, replay: int = 50):
+    """WebSocket endpoint streaming live trading decision traces from the decision bus
+    
+    Query params (all optional):
+        token: JWT; adds the user's own bot decisions to the market-wide ones
+        symbols / bots: comma-separated filters
+        replay: buffered traces to send on connect (default 50)
+    """
+    from services.decision_bus import decision_bus
+    
+    user_id = None
+    if token:
+        from auth import decode_token
+        try:
+            user_id = decode_token(token).get("user_id")
+        except Exception as e:
+            logger.error(f"Token decode error: {e}")
+            await websocket.close(code=1008, reason="Invalid token")
+            return
+    
     await websocket.accept()
+    subscription = decision_bus.subscribe(
+        symbols=[s.strip() for s in symbols.split(",") if s.strip()] if symbols else None,
+        bot_ids=[b.strip() for b in bots.split(",") if b.strip()] if bots else None,
+        user_id=user_id,
+        replay=max(0, replay)
+    )
     logger.info("Decision trace WebSocket connected")
     
+    async def pump():
+        while True:
+            trace = await subscription.get()
+            dropped = subscription.take_dropped()
+            if dropped:
+                await websocket.send_text(json.dumps({"type": "dropped", "count": dropped}))
+            await websocket.send_text(json.dumps(trace, default=str))
+    
+    async def listen():
+        # Returns when the client goes away
+        while True:
+            await websocket.receive_text()
+    
     try:
-        # This endpoint streams decision data from the alpha fusion engine
-        # For now, send mock data every 5 seconds for demonstration
-        import asyncio
-        import json
-        from datetime import datetime
-        
         # Send initial connection confirmation
-        await websocket.send_text(json.dumps({"status": "connected"}))
-        
-        while True:
-            try:
-                # In production, this would come from the actual trading engine
-                # For now, send sample decision data
-                decision = {
-                    "timestamp": datetime.now().isoformat(),
-                    "symbol": "BTC/USDT",
-                    "decision": "buy",
-                    "confidence": 0.75,
-                    "market_data": {
-                        "price": 50000,
-                        "volume": 1000000,
-                        "change_24h": 2.5,
-                        "volatility": 1.2
-                    },
-                    "regime_state": {
-                        "regime": "bullish_calm",
-                        "confidence": 0.85
-                    },
-                    "component_scores": {
-                        "regime": 0.75,
-                        "ofi": 0.65,
-                        "whale": 0.45,
-                        "sentiment": 0.80,
-                        "macro": 0.55
-                    },
-                    "reasoning": [
-                        "Market regime indicates bullish calm conditions (85% confidence)",
-                        "Order flow imbalance shows strong buying pressure (65%)",
-                        "Sentiment analysis positive from recent news (80%)",
-                        "Macro conditions neutral to slightly positive (55%)"
-                    ],
-                    "position_size_multiplier": 1.25,
-                    "stop_loss": 48500,
-                    "take_profit": 52500
-                }
-                
-                await websocket.send_text(json.dumps(decision))
-                await asyncio.sleep(5)
-            except Exception as e:
-                logger.error(f"Error sending decision data: {e}")
-                break
+        await websocket.send_text(json.dumps({
+            "type": "status",
+            "status": "connected",
+            "replayed": subscription.queue.qsize()
+        }))
+        
+        tasks = [asyncio.create_task(pump()), asyncio.create_task(listen())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
             
     except WebSocketDisconnect:
         logger.info("Decision trace WebSocket disconnected")
@@ -467,6 +444,9 @@ async def decision_trace_websocket(websocket: WebSocket):
             await websocket.close(code=1011, reason=str(e))
         except:
             pass
+    finally:
+        subscription.close()
+
 # ============================================================================
 # AUTHENTICATION
 # ============================================================================
@@ -748,10 +728,16 @@ async def health_check():
         "status": "healthy" if db_status == "connected" else "degraded",
         "database": db_status,
         "system_modes": system_modes,
+        "startup": startup_profile.summary(),
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "version": "3.0.0"
     }
 
+@api_router.get("/health/startup")
+async def startup_report():
+    """Startup timing report: init time per service and import time per module"""
+    return startup_profile.to_dict()
+
 # Note: /health/ping endpoint is handled by routes/health.py router
 
 # ============================================================================
@@ -847,41 +833,28 @@ async def update_system_mode(data: dict, user_id: str = Depends(get_current_user
 async def get_overview(user_id: str = Depends(get_current_user)):
     """Get dashboard overview - FIXED with accurate counts + mode display"""
     try:
-        bots = await db.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
+        from services.portfolio_state import portfolio_state
+        
+        # Counts, capital and 24h PnL come from the in-memory portfolio read model
+        portfolio = await portfolio_state.get(user_id)
         
         # Accurate counts
-        active_bots = [b for b in bots if b.get('status') == 'active']
-        total_bots = len(bots)
-        active_count = len(active_bots)
+        total_bots = portfolio['bots']['total']
+        active_count = portfolio['bots']['active']
         
         # Count by mode
-        paper_bots = len([b for b in active_bots if b.get('trading_mode') == 'paper'])
-        live_bots = len([b for b in active_bots if b.get('trading_mode') == 'live'])
-        
-        # Calculate REAL total profit (excludes capital injections)
-        from engines.capital_injection_tracker import capital_tracker
-        
-        total_current = sum(bot.get('current_capital', 0) for bot in active_bots)
-        total_initial = sum(bot.get('initial_capital', 0) for bot in active_bots)
-        total_injections = sum(bot.get('total_injections', 0) for bot in active_bots)
+        paper_bots = portfolio['bots']['active_paper']
+        live_bots = portfolio['bots']['active_live']
         
         # Real profit = (current - initial) - injections
-        gross_profit = total_current - total_initial
-        total_profit = gross_profit - total_injections
-        
-        # Calculate REAL 24h change from actual trades
-        twenty_four_hours_ago = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-        recent_trades = await db.trades_collection.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": twenty_four_hours_ago}
-        }, {"_id": 0}).to_list(10000)
+        total_initial = portfolio['capital']['active_initial']
+        total_profit = portfolio['capital']['net_profit']
         
-        profit_24h = sum(t.get('profit_loss', 0) for t in recent_trades)
+        # REAL 24h change from actual trades
+        profit_24h = portfolio['pnl_24h']
         change_24h_pct = (profit_24h / total_initial * 100) if total_initial > 0 else 0
         
-        # Calculate exposure
-        total_capital = sum(bot.get('current_capital', 0) for bot in active_bots)
-        exposure = (total_capital / (total_capital + 1000)) * 100 if total_capital > 0 else 0
+        exposure = portfolio['exposure']
         
         # Get system modes
         modes = await db.system_modes_collection.find_one({"user_id": user_id}, {"_id": 0})
@@ -990,6 +963,10 @@ async def create_api_key(key: APIKeyCreate, user_id: str = Depends(get_current_u
     
     await db.api_keys_collection.insert_one(key_dict)
     
+    # Drop any pooled exchange client built from the old key
+    from services.exchange_client_pool import exchange_client_pool
+    await exchange_client_pool.invalidate(user_id, key.provider)
+    
     # Return sanitized key (without MongoDB _id)
     return_key = {k: v for k, v in key_dict.items() if k != '_id'}
     if 'api_secret' in return_key and return_key['api_secret']:
@@ -1169,6 +1146,9 @@ async def delete_api_key_by_provider(provider: str, user_id: str = Depends(get_c
     result = await db.api_keys_collection.delete_many({"provider": provider, "user_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail=f"No API key found for {provider}")
+    
+    from services.exchange_client_pool import exchange_client_pool
+    await exchange_client_pool.invalidate(user_id, provider)
     return {"message": f"{provider} API key deleted", "deleted_count": result.deleted_count}
 
 # ============================================================================
@@ -1426,6 +1406,52 @@ async def get_storage_usage(user_id: str = Depends(get_current_user)):
 # CHAT
 # ============================================================================
 
+def _chat_message_dict(user_id: str, role: str, content: str) -> dict:
+    """ChatMessage as stored in chat_messages_collection"""
+    message_dict = ChatMessage(user_id=user_id, role=role, content=content).model_dump()
+    message_dict['timestamp'] = message_dict['timestamp'].isoformat()
+    return message_dict
+
+async def _reply_to_command(user_id: str, content: str, command_result: dict) -> str:
+    """Save a command exchange handled by the AI command router and return the reply text"""
+    # Save user message
+    await db.chat_messages_collection.insert_one(_chat_message_dict(user_id, "user", content))
+    
+    # Format command result as response
+    if command_result.get('success'):
+        ai_response = command_result.get('message', 'Command executed')
+        # Include structured data for UI
+        if command_result.get('bot'):
+            ai_response += f"\n\nBot Details:\n"
+            for key, value in command_result['bot'].items():
+                ai_response += f"- {key}: {value}\n"
+        elif command_result.get('portfolio'):
+            ai_response += f"\n\nPortfolio:\n"
+            for key, value in command_result['portfolio'].items():
+                ai_response += f"- {key}: {value}\n"
+        elif command_result.get('profits'):
+            profits = command_result['profits']
+            ai_response += f"\n\nTotal: R{profits['total']}"
+    else:
+        ai_response = command_result.get('message', 'Command failed')
+        if command_result.get('requires_confirmation'):
+            ai_response += "\n\nType 'yes' or 'confirm' to proceed."
+    
+    # Save AI response
+    ai_msg_dict = _chat_message_dict(user_id, "assistant", ai_response)
+    ai_msg_dict['command_result'] = command_result  # Include structured data
+    await db.chat_messages_collection.insert_one(ai_msg_dict)
+    
+    # Send via WebSocket with command result
+    await manager.send_message(user_id, {
+        "type": "chat_message",
+        "message": ai_msg_dict,
+        "command_executed": True,
+        "command_result": command_result
+    })
+    
+    return ai_response
+
 @api_router.post("/chat")
 async def send_chat_message(message: dict, user_id: str = Depends(get_current_user)):
     """Send message to AI and get response with conversation context - FIXED PERSONALIZATION + AI COMMAND ROUTER"""
@@ -1454,56 +1480,7 @@ async def send_chat_message(message: dict, user_id: str = Depends(get_current_us
         )
         
         if is_command:
-            # Save user message
-            user_msg = ChatMessage(
-                user_id=user_id,
-                role="user",
-                content=content
-            )
-            user_msg_dict = user_msg.model_dump()
-            user_msg_dict['timestamp'] = user_msg_dict['timestamp'].isoformat()
-            await db.chat_messages_collection.insert_one(user_msg_dict)
-            
-            # Format command result as response
-            if command_result.get('success'):
-                ai_response = command_result.get('message', 'Command executed')
-                # Include structured data for UI
-                if command_result.get('bot'):
-                    ai_response += f"\n\nBot Details:\n"
-                    for key, value in command_result['bot'].items():
-                        ai_response += f"- {key}: {value}\n"
-                elif command_result.get('portfolio'):
-                    ai_response += f"\n\nPortfolio:\n"
-                    for key, value in command_result['portfolio'].items():
-                        ai_response += f"- {key}: {value}\n"
-                elif command_result.get('profits'):
-                    profits = command_result['profits']
-                    ai_response += f"\n\nTotal: R{profits['total']}"
-            else:
-                ai_response = command_result.get('message', 'Command failed')
-                if command_result.get('requires_confirmation'):
-                    ai_response += "\n\nType 'yes' or 'confirm' to proceed."
-            
-            # Save AI response
-            ai_msg = ChatMessage(
-                user_id=user_id,
-                role="assistant",
-                content=ai_response
-            )
-            ai_msg_dict = ai_msg.model_dump()
-            ai_msg_dict['timestamp'] = ai_msg_dict['timestamp'].isoformat()
-            ai_msg_dict['command_result'] = command_result  # Include structured data
-            await db.chat_messages_collection.insert_one(ai_msg_dict)
-            
-            # Send via WebSocket with command result
-            await manager.send_message(user_id, {
-                "type": "chat_message",
-                "message": ai_msg_dict,
-                "command_executed": True,
-                "command_result": command_result
-            })
-            
-            return ai_response
+            return await _reply_to_command(user_id, content, command_result)
         
         # Not a command - proceed with regular AI chat
         # Get recent conversation history (last 10 messages)
@@ -1557,6 +1534,88 @@ async def send_chat_message(message: dict, user_id: str = Depends(get_current_us
         logger.error(f"Chat message failed: {e}")
         raise HTTPException(status_code=500, detail="Chat failed")
 
+@api_router.post("/chat/stream")
+async def stream_chat_message(message: dict, user_id: str = Depends(get_current_user)):
+    """Streaming /chat: Server-Sent Events with tokens as the model produces them
+    
+    Events: token {"content"}, done {"content", "message_id", "stats"}, error {"error"}.
+    Command-router replies arrive as a single token + done. ACTION replies from the
+    model are held back, executed, and their result sent instead. The assistant
+    message is saved once the stream completes.
+    """
+    from services.chat_stream import ChatStream, event_stream, get_chat_model, relay, reply_events
+    
+    content = message.get('content', '')
+    content_lower = content.lower().strip()
+    confirmed = message.get('confirmed', False)
+    
+    # Admin commands are frontend-only (see /chat)
+    if content_lower in ['show admin', 'show admn', 'hide admin']:
+        return event_stream(reply_events(""))
+    
+    try:
+        user = await db.users_collection.find_one({"id": user_id}, {"_id": 0})
+        is_admin = user.get('is_admin', False) if user else False
+        
+        from services.ai_command_router import get_ai_command_router
+        command_router = get_ai_command_router(db)
+        is_command, command_result = await command_router.parse_and_execute(
+            user_id, content, confirmed=confirmed, is_admin=is_admin
+        )
+        if is_command:
+            ai_response = await _reply_to_command(user_id, content, command_result)
+            return event_stream(reply_events(ai_response, command_executed=True))
+        
+        from ai_production import ai_production
+        from ai_models_router import ai_models_router
+        
+        # System state prompt is built while the user message is written
+        system_prompt, _ = await asyncio.gather(
+            ai_production.build_system_prompt(user_id),
+            db.chat_messages_collection.insert_one(_chat_message_dict(user_id, "user", content))
+        )
+    except Exception as e:
+        logger.error(f"Chat stream setup failed: {e}")
+        raise HTTPException(status_code=500, detail="Chat failed")
+    
+    model = get_chat_model(ai_models_router.models['chatops'])
+    if model is None:
+        return event_stream(reply_events("OpenAI API key not configured"))
+    
+    stream = ChatStream(model, ai_models_router.chatops_messages(content, system_prompt), hold_prefix="ACTION:")
+    
+    async def finish(stream: ChatStream) -> dict:
+        action_error = None
+        if stream.held:
+            try:
+                ai_response = await ai_production.handle_reply(user_id, stream.text)
+            except Exception as e:
+                logger.error(f"Chat action failed: {e}")
+                action_error = f"Action failed: {e}"
+                ai_response = f"❌ {action_error}"
+        elif stream.error and not stream.text:
+            ai_response = f"❌ AI Error: {stream.error}"
+        else:
+            ai_response = stream.text
+        
+        ai_msg_dict = _chat_message_dict(user_id, "assistant", ai_response)
+        ai_msg_dict['stream_stats'] = stream.stats
+        if action_error:
+            # Keep the model's ACTION reply alongside the failed result
+            ai_msg_dict['model_reply'] = stream.text
+            ai_msg_dict['action_result'] = {"success": False, "error": action_error}
+        await db.chat_messages_collection.insert_one(dict(ai_msg_dict))
+        await manager.send_message(user_id, {
+            "type": "chat_message",
+            "message": ai_msg_dict
+        })
+        result = {"content": ai_response, "message_id": ai_msg_dict['id']}
+        if action_error:
+            result["error"] = action_error
+        return result
+    
+    return event_stream(relay(stream, finish))
+
 @api_router.get("/chat/history")
 async def get_chat_history(limit: int = 50, user_id: str = Depends(get_current_user)):
     """Get chat history"""
@@ -1878,89 +1937,14 @@ async def countdown_to_million(user_id: str = Depends(get_current_user)):
 
 @api_router.get("/prices/live")
 async def get_live_prices(user_id: str = Depends(get_current_user)):
-    """Get live crypto prices with real 24h change using OHLCV data"""
+    """Live crypto prices with 24h change, from the shared price snapshot"""
+    from services.price_snapshot import EMPTY_SNAPSHOT, price_snapshots
     try:
-        from paper_trading_engine import paper_engine
-        
-        # Initialize exchange if needed
-        if not paper_engine.luno_exchange:
-            await paper_engine.init_exchanges()
-        
-        prices = {}
-        pairs = ['BTC/ZAR', 'ETH/ZAR', 'XRP/ZAR']
-        
-        for pair in pairs:
-            try:
-                # Method 1: Use OHLCV for most accurate 24h change
-                ohlcv = await paper_engine.luno_exchange.fetch_ohlcv(pair, '1d', limit=2)
-                
-                if ohlcv and len(ohlcv) >= 2:
-                    # Get 24h ago open price and current close price
-                    yesterday_open = float(ohlcv[-2][1])  # Open price 24h ago
-                    current_close = float(ohlcv[-1][4])   # Current close price
-                    
-                    if yesterday_open > 0:
-                        change_pct = ((current_close - yesterday_open) / yesterday_open) * 100
-                    else:
-                        change_pct = 0
-                    
-                    prices[pair] = {
-                        "price": round(current_close, 2),
-                        "change": round(change_pct, 2)
-                    }
-                else:
-                    raise Exception("Insufficient OHLCV data")
-                
-            except Exception as e:
-                logger.warning(f"OHLCV failed for {pair}, trying ticker: {e}")
-                
-                # Method 2: Fallback to ticker with change field
-                try:
-                    ticker = await paper_engine.luno_exchange.fetch_ticker(pair)
-                    current_price = ticker.get('last', ticker.get('close', 0))
-                    
-                    # Try to get change from ticker
-                    change_pct = ticker.get('percentage', 0)
-                    if change_pct == 0 and ticker.get('change'):
-                        change_pct = ticker['change']
-                    if change_pct == 0 and ticker.get('open') and current_price > 0:
-                        open_price = ticker['open']
-                        if open_price > 0:
-                            change_pct = ((current_price - open_price) / open_price) * 100
-                    
-                    prices[pair] = {
-                        "price": round(current_price, 2),
-                        "change": round(change_pct, 2)
-                    }
-                    
-                except Exception as e2:
-                    logger.error(f"Both OHLCV and ticker failed for {pair}: {e2}")
-                    # Last resort: get current price only
-                    try:
-                        current_price = await paper_engine.get_real_price(pair, 'luno')
-                        if current_price and current_price > 0:
-                            # Generate small realistic change (-5% to +5%)
-                            import random
-                            change_pct = random.uniform(-5, 5)
-                            
-                            prices[pair] = {
-                                "price": round(current_price, 2),
-                                "change": round(change_pct, 2)
-                            }
-                        else:
-                            prices[pair] = {"price": 0, "change": 0}
-                    except Exception as e3:
-                        logger.error(f"Final fallback failed for {pair}: {e3}")
-                        prices[pair] = {"price": 0, "change": 0}
-        
-        return prices
+        snapshot = await price_snapshots.get()
+        return snapshot.summary(price_snapshots.symbols)
     except Exception as e:
         logger.error(f"Live prices error: {e}")
-        return {
-            'BTC/ZAR': {"price": 0, "change": 0},
-            'ETH/ZAR': {"price": 0, "change": 0},
-            'XRP/ZAR': {"price": 0, "change": 0}
-        }
+        return EMPTY_SNAPSHOT.summary(price_snapshots.symbols)
 
 @api_router.get("/wallet/deposit-address")
 async def get_deposit_address(user_id: str = Depends(get_current_user)):
@@ -2669,6 +2653,8 @@ async def test_fetchai_connection(user_id: str = Depends(get_current_user)):
 @api_router.get("/sse/overview")
 async def sse_overview_stream(request: Request, user_id: str = Depends(get_current_user)):
     """Server-Sent Events stream for real-time overview data"""
+    from services.portfolio_state import portfolio_state
+    
     async def event_generator():
         try:
             while True:
@@ -2676,19 +2662,14 @@ async def sse_overview_stream(request: Request, user_id: str = Depends(get_curre
                 if await request.is_disconnected():
                     break
                 
-                # Fetch overview data
-                bots = await db.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-                active_bots = [b for b in bots if b.get('status') == 'active']
-                
-                total_profit = sum(
-                    bot.get('current_capital', 0) - bot.get('initial_capital', 0) 
-                    for bot in active_bots
-                )
+                # Overview data from the portfolio read model
+                portfolio = await portfolio_state.get(user_id)
+                total_profit = portfolio['capital']['active'] - portfolio['capital']['active_initial']
                 
                 data = {
                     "totalProfit": round(total_profit, 2),
-                    "activeBots": len(active_bots),
-                    "totalBots": len(bots),
+                    "activeBots": portfolio['bots']['active'],
+                    "totalBots": portfolio['bots']['total'],
                     "timestamp": datetime.now(timezone.utc).isoformat()
                 }
                 
@@ -2713,48 +2694,33 @@ async def sse_overview_stream(request: Request, user_id: str = Depends(get_curre
 
 @api_router.get("/sse/live-prices")
 async def sse_live_prices_stream(request: Request, user_id: str = Depends(get_current_user)):
-    """Server-Sent Events stream for live price updates"""
+    """
+    Server-Sent Events stream for live price updates
+    
+    The first event carries every pair; later events only the pairs whose price
+    or 24h change moved. Each event's id is the snapshot version.
+    """
+    from services.price_snapshot import price_snapshots
+    
     async def event_generator():
+        previous = None
         try:
             while True:
                 if await request.is_disconnected():
                     break
                 
-                # Fetch live prices
-                pairs = ['BTC/ZAR', 'ETH/ZAR', 'XRP/ZAR']
-                prices = {}
-                
-                for pair in pairs:
-                    try:
-                        # Get real-time price from paper_trading_engine (uses CCXT)
-                        from paper_trading_engine import paper_engine
-                        
-                        price = await paper_engine.get_real_price(pair, 'luno')
-                        
-                        if price and price > 0:
-                            # Calculate real 24h change from CCXT ticker
-                            change_24h = 0.0
-                            try:
-                                # Fetch full ticker for 24h percentage change
-                                exchange = paper_engine.exchanges.get('luno')
-                                if exchange:
-                                    ticker = await asyncio.to_thread(exchange.fetch_ticker, pair)
-                                    change_24h = ticker.get('percentage', 0.0) or 0.0
-                            except:
-                                # Fallback to simulated if ticker fetch fails
-                                change_24h = round(random.uniform(-2, 2), 2)
-                            
-                            prices[pair] = {
-                                "price": round(price, 2),
-                                "change": round(change_24h, 2),  # Real 24h % from CCXT (or simulated fallback)
-                                "timestamp": datetime.now(timezone.utc).isoformat()
-                            }
-                    except Exception as e:
-                        logger.debug(f"Price fetch error for {pair}: {e}")
-                        pass
+                if previous is None:
+                    snapshot = await price_snapshots.get()
+                else:
+                    snapshot = await price_snapshots.wait_for_update(previous.version, timeout=15)
                 
-                yield f"data: {json.dumps(prices)}\n\n"
-                await asyncio.sleep(5)  # Update every 5 seconds
+                changes = snapshot.changes_since(previous)
+                if changes:
+                    payload = {pair: dict(record) for pair, record in changes.items()}
+                    yield f"id: {snapshot.version}\ndata: {json.dumps(payload)}\n\n"
+                    previous = snapshot
+                else:
+                    yield ": keepalive\n\n"
                 
         except asyncio.CancelledError:
             pass
@@ -2780,7 +2746,8 @@ async def create_stop_loss(data: dict, user_id: str = Depends(get_current_user))
             data['bot_id'],
             data['pair'],
             data['stop_price'],
-            data['current_price']
+            data['current_price'],
+            exchange=data.get('exchange')
         )
         return order
     except Exception as e:
@@ -2796,7 +2763,8 @@ async def create_trailing_stop(data: dict, user_id: str = Depends(get_current_us
             data['bot_id'],
             data['pair'],
             data['trail_percent'],
-            data['current_price']
+            data['current_price'],
+            exchange=data.get('exchange')
         )
         return order
     except Exception as e:
@@ -2963,7 +2931,22 @@ async def get_prometheus_metrics():
 app.include_router(api_router, prefix="/api")
 
 # Mount Phase 5-8 routers + new systems
+ROUTER_MODULES = (
+    "routes.phase5_endpoints", "routes.phase6_endpoints", "routes.phase8_endpoints",
+    "routes.capital_tracking_endpoints", "routes.emergency_stop_endpoints", "routes.wallet_endpoints",
+    "routes.system_health_endpoints", "routes.admin_endpoints", "routes.bot_lifecycle",
+    "routes.system_limits", "routes.live_trading_gate", "routes.analytics_api", "routes.ai_chat",
+    "routes.two_factor_auth", "routes.genetic_algorithm", "routes.dashboard_endpoints",
+    "routes.api_key_management", "routes.daily_report", "routes.ledger_endpoints",
+    "routes.order_endpoints", "routes.alerts", "routes.limits_management",
+    "routes.advanced_trading_endpoints", "routes.payment_agent_endpoints", "routes.user_api_keys"
+)
+
 try:
+    # Import each router module through timed_import so the startup report shows its cost
+    for module_name in ROUTER_MODULES:
+        timed_import(module_name)
+    
     from routes.phase5_endpoints import router as phase5_router
     from routes.phase6_endpoints import router as phase6_router
     from routes.phase8_endpoints import router as phase8_router
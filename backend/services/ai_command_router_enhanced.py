@@ -3,8 +3,10 @@ Production-Grade AI Command Router
 Version 2.0 - Enhanced with Fuzzy Matching, Synonym Support, and Tool Registry
 
 Features:
-- Fuzzy bot name matching using rapidfuzz
-- Comprehensive synonym mapping for natural language
+- Fuzzy bot name matching using rapidfuzz against a per-user bot name index
+  cached in memory (BotNameIndex; dropped on bot create / rename / delete)
+- Comprehensive synonym mapping for natural language (one compiled matcher)
+- Precompiled, ordered command grammar with named groups
 - Multi-command parsing ("pause alpha and beta")
 - Structured command output schema
 - Risk-based confirmation system
@@ -13,14 +15,34 @@ Features:
 - Full dashboard parity
 """
 
+import asyncio
+import os
 import re
+import time
 import logging
-from typing import Dict, Any, Optional, Tuple, List
+from collections import Counter, defaultdict
+from types import ModuleType
+from typing import Dict, Any, Iterable, Optional, Tuple, List
 from datetime import datetime, timezone
 from rapidfuzz import fuzz, process
 
+import database
+
 logger = logging.getLogger(__name__)
 
+BOT_NAME_INDEX_TTL = float(os.getenv('BOT_NAME_INDEX_TTL', '300'))
+
+
+def _collection(db, name: str):
+    """Collection `name` from a Motor database or from the database module"""
+    if isinstance(db, ModuleType):
+        return getattr(db, f"{name}_collection", None) or db.get_database()[name]
+    return db[name]
+
+
+def _motor_db(db):
+    return db.get_database() if isinstance(db, ModuleType) else db
+
 
 class CommandOutputSchema:
     """Standardized command output format"""
@@ -77,10 +99,10 @@ class ToolRegistry:
     
     def __init__(self, db):
         self.db = db
-        self.bots_collection = db["bots"]
-        self.users_collection = db["users"]
-        self.system_modes_collection = db["system_modes"]
-        self.trades_collection = db["trades"]
+        self.bots_collection = _collection(db, "bots")
+        self.users_collection = _collection(db, "users")
+        self.system_modes_collection = _collection(db, "system_modes")
+        self.trades_collection = _collection(db, "trades")
         self.tools = self._register_tools()
     
     def _register_tools(self) -> Dict[str, Dict[str, Any]]:
@@ -181,15 +203,15 @@ class ToolRegistry:
         """Tool: Get portfolio summary"""
         try:
             from services.ledger_service import get_ledger_service
-            ledger = get_ledger_service(self.db)
+            ledger = get_ledger_service(_motor_db(self.db))
             
             equity = await ledger.compute_equity(user_id)
             realized_pnl = await ledger.compute_realized_pnl(user_id)
             fees_total = await ledger.compute_fees_paid(user_id)
             current_dd, max_dd = await ledger.compute_drawdown(user_id)
             
-            bots = await self.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-            active_count = len([b for b in bots if b.get("status") == "active"])
+            from services.portfolio_state import portfolio_state
+            portfolio = await portfolio_state.get(user_id)
             
             return CommandOutputSchema.success(
                 "get_portfolio_summary",
@@ -201,8 +223,8 @@ class ToolRegistry:
                     "net_pnl": round(realized_pnl - fees_total, 2),
                     "drawdown_current": round(current_dd * 100, 2),
                     "drawdown_max": round(max_dd * 100, 2),
-                    "total_bots": len(bots),
-                    "active_bots": active_count
+                    "total_bots": portfolio["bots"]["total"],
+                    "active_bots": portfolio["bots"]["active"]
                 }
             )
         except Exception as e:
@@ -216,7 +238,7 @@ class ToolRegistry:
         """Tool: Get profit series"""
         try:
             from services.ledger_service import get_ledger_service
-            ledger = get_ledger_service(self.db)
+            ledger = get_ledger_service(_motor_db(self.db))
             
             series = await ledger.profit_series(user_id, period=period, limit=30)
             
@@ -445,7 +467,7 @@ class ToolRegistry:
         """Tool: Get alerts"""
         try:
             # Access alerts_collection through db parameter
-            alerts_collection = self.db["alerts"]
+            alerts_collection = _collection(self.db, "alerts")
             
             alerts = await alerts_collection.find(
                 {"user_id": user_id, "resolved": False},
@@ -491,6 +513,168 @@ class ToolRegistry:
             )
 
 
+class UserBotNames:
+    """One user's bot ids and names, with memoised fuzzy matches"""
+    
+    MAX_MATCHES = 256
+    
+    def __init__(self, bots: List[Dict]):
+        self.loaded_at = time.monotonic()
+        self.names: Dict[str, str] = {}  # id -> name
+        self.ids_by_name: Dict[str, str] = {}  # name -> id (last bot wins on duplicate names)
+        for bot in bots:
+            self.names[bot.get("id")] = bot.get("name")
+            self.ids_by_name[bot.get("name")] = bot.get("id")
+        self._matches: Dict[Tuple[str, int], Optional[Dict]] = {}
+    
+    def match(self, bot_identifier: str, threshold: int = 80) -> Optional[Dict]:
+        """{"id", "name"} of the bot an identifier refers to: exact id first, then best fuzzy name"""
+        if bot_identifier in self.names:
+            return {"id": bot_identifier, "name": self.names[bot_identifier]}
+        
+        key = (bot_identifier, threshold)
+        if key in self._matches:
+            return self._matches[key]
+        
+        # WRatio handles names and identifiers of different lengths better
+        match = process.extractOne(
+            bot_identifier,
+            self.ids_by_name.keys(),
+            scorer=fuzz.WRatio,
+            score_cutoff=threshold
+        ) if self.ids_by_name else None
+        
+        bot = None
+        if match:
+            matched_name, score, _ = match
+            logger.info(f"Fuzzy matched '{bot_identifier}' to '{matched_name}' (score: {score})")
+            bot = {"id": self.ids_by_name[matched_name], "name": matched_name}
+        
+        if len(self._matches) >= self.MAX_MATCHES:
+            self._matches.clear()
+        self._matches[key] = bot
+        return bot
+
+
+class BotNameIndex:
+    """
+    Per-user bot name index for fuzzy bot lookups, served from memory
+    
+    Loaded with one projected query per user, dropped on bot create, rename and
+    delete (database write listener on bots_collection) and reloaded after
+    BOT_NAME_INDEX_TTL seconds, which covers writes made outside the watched
+    collection.
+    """
+    
+    # Fields whose change alters a user's index
+    INDEXED_FIELDS = frozenset({"id", "name", "user_id"})
+    
+    def __init__(self, ttl: float = BOT_NAME_INDEX_TTL):
+        self.ttl = ttl
+        self.users: Dict[str, UserBotNames] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._generation = 0
+        self.stats = Counter()
+    
+    def _fresh(self, entry: Optional[UserBotNames]) -> bool:
+        return entry is not None and time.monotonic() - entry.loaded_at < self.ttl
+    
+    async def get(self, user_id: str, bots_collection) -> UserBotNames:
+        entry = self.users.get(user_id)
+        if self._fresh(entry):
+            self.stats['hits'] += 1
+            return entry
+        
+        async with self._locks[user_id]:
+            entry = self.users.get(user_id)
+            if self._fresh(entry):
+                self.stats['hits'] += 1
+                return entry
+            
+            generation = self._generation
+            bots = await bots_collection.find(
+                {"user_id": user_id}, {"_id": 0, "id": 1, "name": 1}
+            ).to_list(1000)
+            entry = UserBotNames(bots)
+            self.stats['loads'] += 1
+            # A bot write during the load may not be in it: serve it once, don't keep it
+            if generation == self._generation:
+                self.users[user_id] = entry
+            return entry
+    
+    async def resolve(self, user_id: str, bot_identifiers: Iterable[str], bots_collection,
+                      threshold: int = 80) -> Dict[str, Optional[Dict]]:
+        """Match several identifiers against one load of the user's index"""
+        entry = await self.get(user_id, bots_collection)
+        return {identifier: entry.match(identifier, threshold) for identifier in bot_identifiers}
+    
+    def invalidate(self, user_id: Optional[str] = None):
+        self._generation += 1
+        if user_id is None:
+            self.users.clear()
+        else:
+            self.users.pop(user_id, None)
+    
+    def on_write(self, collection: str, method: str, args: tuple, kwargs: Dict):
+        """database write listener: drop the index of users whose bots were created, renamed or deleted"""
+        if collection != "bots":
+            return
+        for op, params in database.write_operations(method, args, kwargs):
+            if not self._changes_index(op, params):
+                continue
+            self.stats['invalidations'] += 1
+            owners = self._owners(op, params)
+            if owners is None:
+                self.invalidate()
+            else:
+                for user_id in owners:
+                    self.invalidate(user_id)
+    
+    def _changes_index(self, op: str, params: Dict) -> bool:
+        update = params.get('doc')
+        if op not in ("update_one", "update_many", "find_one_and_update") or params.get('upsert'):
+            return True
+        if not isinstance(update, dict):
+            return True  # aggregation pipeline update
+        fields = set()
+        for operator in ("$set", "$unset", "$rename", "$setOnInsert"):
+            value = update.get(operator)
+            if isinstance(value, dict):
+                fields.update(value)
+                if operator == "$rename":
+                    fields.update(v for v in value.values() if isinstance(v, str))
+        if not any(key.startswith('$') for key in update):
+            return True  # plain replacement document
+        return bool(fields & self.INDEXED_FIELDS)
+    
+    def _owners(self, op: str, params: Dict) -> Optional[set]:
+        """Users whose index a write touches, or None if that is not known"""
+        if op == "insert_one":
+            doc = params.get('doc')
+            owner = doc.get('user_id') if isinstance(doc, dict) else None
+            return {owner} if isinstance(owner, str) else None
+        
+        query = params.get('filter')
+        if not isinstance(query, dict):
+            return None
+        if isinstance(query.get('user_id'), str):
+            owners = {query['user_id']}
+        elif isinstance(query.get('id'), str):
+            owners = {uid for uid, entry in self.users.items() if query['id'] in entry.names}
+            if not owners:
+                return None
+        else:
+            return None
+        
+        update = params.get('doc')
+        new_owner = update.get('$set', {}).get('user_id') if isinstance(update, dict) else None
+        if new_owner is not None:
+            if not isinstance(new_owner, str):
+                return None
+            owners.add(new_owner)
+        return owners
+
+
 class EnhancedAICommandRouter:
     """Enhanced AI Command Router with fuzzy matching and synonyms"""
     
@@ -522,111 +706,86 @@ class EnhancedAICommandRouter:
         "show_alerts": ConfirmationLevel.NONE,
     }
     
+    # Command grammar, tried in order; the first pattern found in the message wins.
+    # Bot commands capture the bot identifier as the last group ("bot").
+    COMMAND_GRAMMAR = tuple((name, re.compile(pattern)) for name, pattern in (
+        # Bot lifecycle - supports fuzzy bot names
+        ("pause_bot", r"(?P<verb>pause|stop|freeze|hold|disable)\s+(?:bot\s+)?(?P<bot>.+)"),
+        ("resume_bot", r"(?P<verb>resume|start|continue|unpause|enable|activate|restart)\s+(?:bot\s+)?(?P<bot>.+)"),
+        ("stop_bot", r"(?P<verb>kill|terminate|delete|remove|destroy)\s+(?:bot\s+)?(?P<bot>.+)"),
+        ("start_bot", r"(?:start|activate)\s+(?:bot\s+)?(?P<bot>.+)"),
+        
+        # Multi-bot operations
+        ("pause_multiple", r"(?:pause|stop)\s+(?:bots?\s+)?(?P<first>.+?)\s+(?:and|,)\s+(?P<bot>.+)"),
+        ("pause_all", r"(?:pause|stop)\s+(?:all|every)(?:\s+bots?)?"),
+        ("resume_all", r"(?:resume|start)\s+(?:all|every)(?:\s+bots?)?"),
+        
+        # Emergency
+        ("emergency_stop", r"emergency\s+stop|halt\s+all|stop\s+everything"),
+        
+        # Status/Info commands
+        ("bot_status", r"(?:status|info)\s+(?:of\s+)?(?:bot\s+)?(?P<bot>.+)"),
+        ("portfolio_summary", r"(?:show|display|get)\s+(?:portfolio|summary|balance)"),
+        ("profits", r"(?:show|display|get)\s+profit"),
+        ("show_health", r"(?:show|display|get)\s+(?:health|system\s+health)"),
+        ("show_alerts", r"(?:show|display|get)\s+(?:alerts|warnings)"),
+        ("show_error_rate", r"(?:show|display|get)\s+(?:error\s+rate|errors)"),
+        ("why_circuit_breaker", r"why\s+(?:did\s+)?(?:circuit\s+breaker|cb)\s+trip"),
+        
+        # Reinvest
+        ("reinvest", r"reinvest|trigger\s+reinvest|run\s+reinvest"),
+        
+        # Admin
+        ("send_test_report", r"send\s+test\s+report|test\s+email|test\s+report"),
+    ))
+    
+    command_patterns = {name: regex.pattern for name, regex in COMMAND_GRAMMAR}
+    
+    # "pause alpha and beta"
+    MULTI_COMMAND = re.compile(
+        r"(?P<action>pause|stop|resume|start)\s+(?:bots?\s+)?(?P<first>.+?)\s+(?:and|,)\s+(?P<second>.+)"
+    )
+    
+    MULTI_COMMAND_MAP = {
+        "pause": "pause_bot",
+        "stop": "stop_bot",
+        "resume": "resume_bot",
+        "start": "start_bot"
+    }
+    
     def __init__(self, db):
         self.db = db
-        self.bots_collection = db["bots"]
-        self.users_collection = db["users"]
+        self.bots_collection = _collection(db, "bots")
+        self.users_collection = _collection(db, "users")
         self.tool_registry = ToolRegistry(db)
-        
-        # Command patterns with enhanced regex
-        self.command_patterns = {
-            # Bot lifecycle - now supports fuzzy bot names
-            "pause_bot": r"(pause|stop|freeze|hold|disable)\s+(?:bot\s+)?(.+)",
-            "resume_bot": r"(resume|start|continue|unpause|enable|activate|restart)\s+(?:bot\s+)?(.+)",
-            "stop_bot": r"(kill|terminate|delete|remove|destroy)\s+(?:bot\s+)?(.+)",
-            "start_bot": r"(?:start|activate)\s+(?:bot\s+)?(.+)",
-            
-            # Multi-bot operations
-            "pause_multiple": r"(?:pause|stop)\s+(?:bots?\s+)?(.+?)\s+(?:and|,)\s+(.+)",
-            "pause_all": r"(?:pause|stop)\s+(?:all|every)(?:\s+bots?)?",
-            "resume_all": r"(?:resume|start)\s+(?:all|every)(?:\s+bots?)?",
-            
-            # Emergency
-            "emergency_stop": r"emergency\s+stop|halt\s+all|stop\s+everything",
-            
-            # Status/Info commands
-            "bot_status": r"(?:status|info)\s+(?:of\s+)?(?:bot\s+)?(.+)",
-            "portfolio_summary": r"(?:show|display|get)\s+(?:portfolio|summary|balance)",
-            "profits": r"(?:show|display|get)\s+profit",
-            "show_health": r"(?:show|display|get)\s+(?:health|system\s+health)",
-            "show_alerts": r"(?:show|display|get)\s+(?:alerts|warnings)",
-            "show_error_rate": r"(?:show|display|get)\s+(?:error\s+rate|errors)",
-            "why_circuit_breaker": r"why\s+(?:did\s+)?(?:circuit\s+breaker|cb)\s+trip",
-            
-            # Reinvest
-            "reinvest": r"reinvest|trigger\s+reinvest|run\s+reinvest",
-            
-            # Admin
-            "send_test_report": r"send\s+test\s+report|test\s+email|test\s+report",
-        }
     
     def normalize_text(self, text: str) -> str:
         """Normalize text by expanding synonyms"""
-        text_lower = text.lower()
-        
-        # Expand synonyms
-        for key, synonyms in self.SYNONYMS.items():
-            for synonym in synonyms:
-                pattern = r'\b' + re.escape(synonym) + r'\b'
-                text_lower = re.sub(pattern, key, text_lower)
-        
-        return text_lower
+        return _SYNONYM_PATTERN.sub(_expand_synonym, text.lower())
     
     async def find_bot_fuzzy(self, user_id: str, bot_identifier: str, threshold: int = 80) -> Optional[Dict]:
-        """Find bot using fuzzy matching"""
-        # Get all user's bots
-        bots = await self.bots_collection.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-        
-        if not bots:
+        """Find bot using fuzzy matching against the cached bot name index"""
+        bot = await self.resolve_bot(user_id, bot_identifier, threshold)
+        if not bot:
             return None
-        
-        # Try exact ID match first
-        for bot in bots:
-            if bot.get("id") == bot_identifier:
-                return bot
-        
-        # Try fuzzy name matching
-        bot_names = {bot.get("name"): bot for bot in bots}
-        
-        # Use rapidfuzz to find best match - WRatio for better handling of different length strings
-        match = process.extractOne(
-            bot_identifier,
-            bot_names.keys(),
-            scorer=fuzz.WRatio,  # WRatio better for strings of different lengths
-            score_cutoff=threshold
-        )
-        
-        if match:
-            matched_name, score, _ = match
-            logger.info(f"Fuzzy matched '{bot_identifier}' to '{matched_name}' (score: {score})")
-            return bot_names[matched_name]
-        
-        return None
+        return await self.bots_collection.find_one({"id": bot["id"], "user_id": user_id}, {"_id": 0})
+    
+    async def resolve_bot(self, user_id: str, bot_identifier: str, threshold: int = 80) -> Optional[Dict]:
+        """{"id", "name"} of the user's bot an identifier refers to, from the bot name index"""
+        matches = await bot_name_index.resolve(user_id, [bot_identifier], self.bots_collection, threshold)
+        return matches[bot_identifier]
     
     async def parse_multi_command(self, message: str) -> List[Tuple[str, List[str]]]:
         """Parse multi-command input like 'pause alpha and beta'"""
-        # Check for multi-bot pattern
-        pattern = r"(?:pause|stop|resume|start)\s+(?:bots?\s+)?(.+?)\s+(?:and|,)\s+(.+)"
-        match = re.search(pattern, message.lower())
+        match = self.MULTI_COMMAND.search(message.lower())
+        if not match:
+            return []
         
-        if match:
-            action = re.search(r"(pause|stop|resume|start)", message.lower()).group(1)
-            bot1 = match.group(1).strip()
-            bot2 = match.group(2).strip()
-            
-            command_map = {
-                "pause": "pause_bot",
-                "stop": "stop_bot",
-                "resume": "resume_bot",
-                "start": "start_bot"
-            }
-            
-            return [
-                (command_map.get(action, "pause_bot"), [bot1]),
-                (command_map.get(action, "pause_bot"), [bot2])
-            ]
-        
-        return []
+        command = self.MULTI_COMMAND_MAP.get(match.group("action"), "pause_bot")
+        return [
+            (command, [match.group("first").strip()]),
+            (command, [match.group("second").strip()])
+        ]
     
     async def parse_and_execute(
         self,
@@ -648,11 +807,18 @@ class EnhancedAICommandRouter:
         # Check for multi-command
         multi_commands = await self.parse_multi_command(normalized_message)
         if multi_commands:
+            # Resolve every bot named in the message against one load of the index
+            bot_refs = await bot_name_index.resolve(
+                user_id,
+                [bot_id for _, bot_identifiers in multi_commands for bot_id in bot_identifiers],
+                self.bots_collection
+            )
             results = []
             for cmd_name, bot_identifiers in multi_commands:
                 for bot_id in bot_identifiers:
                     result = await self._execute_single_command(
-                        user_id, cmd_name, (bot_id,), confirmed, confirmation_phrase, is_admin
+                        user_id, cmd_name, (bot_id,), confirmed, confirmation_phrase, is_admin,
+                        bot_ref=bot_refs.get(bot_id)
                     )
                     results.append(result)
             
@@ -663,8 +829,8 @@ class EnhancedAICommandRouter:
             }
         
         # Try to match command patterns
-        for command_name, pattern in self.command_patterns.items():
-            match = re.search(pattern, normalized_message)
+        for command_name, pattern in self.COMMAND_GRAMMAR:
+            match = pattern.search(normalized_message)
             if match:
                 result = await self._execute_single_command(
                     user_id, command_name, match.groups(), confirmed, confirmation_phrase, is_admin
@@ -681,7 +847,8 @@ class EnhancedAICommandRouter:
         match_groups: tuple,
         confirmed: bool,
         confirmation_phrase: str,
-        is_admin: bool
+        is_admin: bool,
+        bot_ref: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Execute a single parsed command with confirmation handling"""
         try:
@@ -722,7 +889,7 @@ class EnhancedAICommandRouter:
                     )
             
             # Execute command
-            return await self._execute_command_logic(user_id, command, match_groups, is_admin)
+            return await self._execute_command_logic(user_id, command, match_groups, is_admin, bot_ref)
         
         except Exception as e:
             logger.error(f"Command execution error: {e}")
@@ -737,9 +904,10 @@ class EnhancedAICommandRouter:
         user_id: str,
         command: str,
         match_groups: tuple,
-        is_admin: bool
+        is_admin: bool,
+        bot_ref: Optional[Dict] = None
     ) -> Dict[str, Any]:
-        """Execute the actual command logic"""
+        """Execute the actual command logic (bot_ref: the bot, if already resolved)"""
         
         # Bot lifecycle commands
         if command in ["pause_bot", "resume_bot", "stop_bot", "start_bot"]:
@@ -747,7 +915,7 @@ class EnhancedAICommandRouter:
             if not bot_identifier:
                 return CommandOutputSchema.error(command, "Bot identifier required", "MISSING_BOT")
             
-            bot = await self.find_bot_fuzzy(user_id, bot_identifier)
+            bot = bot_ref or await self.resolve_bot(user_id, bot_identifier)
             if not bot:
                 return CommandOutputSchema.error(
                     command,
@@ -844,6 +1012,34 @@ class EnhancedAICommandRouter:
             )
 
 
+# Synonym -> canonical word; a synonym listed under several keys maps to the first
+_SYNONYM_CANONICAL: Dict[str, str] = {}
+for _key, _synonyms in EnhancedAICommandRouter.SYNONYMS.items():
+    for _synonym in _synonyms:
+        _SYNONYM_CANONICAL.setdefault(_synonym, _key)
+    # Sequential expansion turned "trading agent" into "trading bot" and then "bot":
+    # a phrase ending in its own key also absorbs the synonyms expanded before it
+    for _index, _phrase in enumerate(_synonyms):
+        _head, _, _last = _phrase.rpartition(" ")
+        if _head and _last == _key:
+            for _synonym in _synonyms[:_index]:
+                _SYNONYM_CANONICAL.setdefault(f"{_head} {_synonym}", _key)
+
+# Longest synonyms first so "trading bot" wins over any shorter overlap
+_SYNONYM_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(s) for s in sorted(_SYNONYM_CANONICAL, key=len, reverse=True)) + r")\b"
+)
+
+
+def _expand_synonym(match: "re.Match") -> str:
+    return _SYNONYM_CANONICAL[match.group(0)]
+
+
+# Global instance
+bot_name_index = BotNameIndex()
+database.add_write_listener(bot_name_index.on_write)
+
+
 def get_enhanced_ai_command_router(db):
     """Factory function to get enhanced command router"""
     return EnhancedAICommandRouter(db)
@@ -0,0 +1,201 @@
+"""
+Chat Streaming - token-by-token AI chat responses over Server-Sent Events
+
+- ChatModel sources: OpenAIChatModel (AsyncOpenAI, stream=True) and
+  FakeChatModel (local, scripted tokens with configurable latency)
+- ChatStream: runs one completion, yields SSE events as tokens arrive and
+  measures time-to-first-token and tokens per second
+- Replies that are commands (e.g. "ACTION:...") can be held back instead of
+  streamed, so the caller executes them and sends the result
+
+SSE events:
+    event: token   data: {"content": "..."}
+    event: done    data: {"content": full reply, "stats": {...}, ...}
+    event: error   data: {"error": "..."}
+
+Set CHAT_MODEL=fake to serve chat from FakeChatModel (local development,
+load tests) without an OpenAI key.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from fastapi.responses import StreamingResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"  # Disable nginx buffering
+}
+
+
+def sse(event: str, data: Dict) -> str:
+    """One Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class OpenAIChatModel:
+    """Streams completions from an AsyncOpenAI client"""
+
+    def __init__(self, client, model: str):
+        self.client = client
+        self.model = model
+
+    async def stream(self, messages: List[Dict], max_tokens: int = 500,
+                     temperature: float = 0.7) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeChatModel:
+    """Local stand-in model: a scripted reply split into word tokens"""
+
+    def __init__(self, reply: Optional[str] = None, first_token_delay: float = 0.0,
+                 token_delay: float = 0.0):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    async def stream(self, messages: List[Dict], max_tokens: int = 500,
+                     temperature: float = 0.7) -> AsyncIterator[str]:
+        reply = self.reply
+        if reply is None:
+            last = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+            reply = f"(local model) You said: {last}"
+
+        words = reply.split(" ")[:max_tokens]
+        await asyncio.sleep(self.first_token_delay)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+def get_chat_model(model: str = "gpt-4o"):
+    """Streaming model for chat: the fake model when CHAT_MODEL=fake, else OpenAI (None if unconfigured)"""
+    if os.getenv("CHAT_MODEL", "").lower() == "fake":
+        return FakeChatModel()
+    if not os.getenv("OPENAI_API_KEY"):
+        return None
+    from ai_models_router import ai_models_router
+    if ai_models_router.client is None:
+        return None
+    return OpenAIChatModel(ai_models_router.client, model)
+
+
+class ChatStream:
+    """
+    One streamed completion.
+
+    Iterate events() for SSE frames; afterwards .text holds the full reply,
+    .held is True if it was held back as a command, and .stats has timings.
+    """
+
+    def __init__(self, model, messages: List[Dict], max_tokens: int = 500,
+                 temperature: float = 0.7, hold_prefix: Optional[str] = None,
+                 clock=time.perf_counter):
+        self.model = model
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.hold_prefix = hold_prefix
+        self.clock = clock
+        self.text = ""
+        self.held = False
+        self.error: Optional[str] = None
+        self.tokens = 0
+        self._started = None
+        self._first_token = None
+        self._finished = None
+
+    def _releasable(self) -> bool:
+        """False while the reply so far is (or may become) a held command"""
+        if not self.hold_prefix:
+            return True
+        head = self.text.lstrip()
+        if head.startswith(self.hold_prefix):
+            self.held = True
+            return False
+        return not self.hold_prefix.startswith(head)
+
+    async def events(self) -> AsyncIterator[str]:
+        self._started = self.clock()
+        sent = 0
+        try:
+            async for token in self.model.stream(self.messages, self.max_tokens, self.temperature):
+                if self._first_token is None:
+                    self._first_token = self.clock()
+                self.tokens += 1
+                self.text += token
+                if self._releasable():
+                    yield sse("token", {"content": self.text[sent:]})
+                    sent = len(self.text)
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            self.error = str(e)
+        finally:
+            self._finished = self.clock()
+
+        # A held-prefix lookalike that never became a command
+        if not self.held and sent < len(self.text):
+            yield sse("token", {"content": self.text[sent:]})
+
+    @property
+    def stats(self) -> Dict:
+        total = (self._finished or self.clock()) - (self._started or self.clock())
+        ttft = self._first_token - self._started if self._first_token is not None else None
+        generating = (self._finished - self._first_token) if self._first_token is not None and self._finished else 0
+        return {
+            "tokens": self.tokens,
+            "time_to_first_token_ms": round(ttft * 1000, 2) if ttft is not None else None,
+            "total_ms": round(total * 1000, 2),
+            "tokens_per_second": round(self.tokens / generating, 1) if generating > 0 else None
+        }
+
+
+async def relay(stream: ChatStream, finish: Callable[[ChatStream], Awaitable[Dict]]) -> AsyncIterator[str]:
+    """
+    SSE frames for a stream, then `finish(stream)` once it completes.
+
+    finish persists the reply and returns the done payload; its "content" is
+    the final reply. Text it adds beyond what was streamed (a held command's
+    result, appended notices) goes out as one last token event. An "error"
+    in the payload (a held command that failed) is sent as an error event.
+    """
+    async for frame in stream.events():
+        yield frame
+    if stream.error:
+        yield sse("error", {"error": stream.error})
+
+    result = await finish(stream)
+    error = result.pop("error", None)
+    if error:
+        yield sse("error", {"error": error})
+    content = result.get("content", "")
+    streamed = "" if stream.held else stream.text
+    if content.startswith(streamed) and len(content) > len(streamed):
+        yield sse("token", {"content": content[len(streamed):]})
+    yield sse("done", {**result, "stats": stream.stats})
+
+
+async def reply_events(content: str, **extra) -> AsyncIterator[str]:
+    """A complete (non-model) reply as the same token + done events"""
+    yield sse("token", {"content": content})
+    yield sse("done", {"content": content, **extra})
+
+
+def event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
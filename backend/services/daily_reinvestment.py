@@ -345,21 +345,11 @@ class DailyReinvestmentService:
         try:
             from routes.daily_report import daily_report_service
             
-            # Send reports to all users
-            users = await self.users_collection.find({}).to_list(10000)
+            # One batched, resumable run shared with the report scheduler;
+            # a run that already completed today is skipped via its checkpoint
+            result = await daily_report_service.send_daily_reports()
             
-            for user in users:
-                user_id = user.get("id")
-                user_email = user.get("email")
-                
-                if user_id and user_email:
-                    try:
-                        await daily_report_service.send_daily_report(user_id)
-                        logger.info(f"📧 Sent daily report to {user_email}")
-                    except Exception as e:
-                        logger.error(f"Failed to send report to {user_email}: {e}")
-            
-            logger.info("✅ Daily reports sent")
+            logger.info(f"✅ Daily reports: {result.get('sent', 0)} sent, {result.get('failed', 0)} failed")
             
         except Exception as e:
             logger.error(f"Error sending daily reports: {e}")
@@ -0,0 +1,192 @@
+"""
+Decision Trace Bus - in-process pub/sub for trading decision traces
+
+Producers (AlphaFusionEngine.fuse_signals, PaperTradingEngine.execute_smart_trade)
+publish structured traces: component scores, regime, sizing and gate outcomes.
+
+- Publishing never awaits and never blocks the trading loop
+- Traces are only recorded while someone is subscribed; otherwise
+  decision_bus.trace() hands producers a no-op builder, so tracing costs
+  one attribute check
+- Each symbol keeps a ring buffer of its last DECISION_TRACE_BUFFER traces
+  (recorded while subscribers were connected), replayed to new subscribers
+- Subscribers filter by symbol, bot and user; each has its own bounded queue
+  that drops its oldest trace when the subscriber falls behind
+
+Trace shape (what /ws/decisions sends):
+    {"type": "decision", "id", "timestamp", "source", "symbol", "bot_id", "user_id",
+     "decision", "confidence", "component_scores", "regime_state", "sizing",
+     "gates": [{"gate", "passed", "reason", ...}], "reasoning": [...], ...}
+"""
+
+import asyncio
+import itertools
+import os
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DECISION_TRACE_BUFFER = int(os.getenv('DECISION_TRACE_BUFFER', '50'))
+DECISION_TRACE_QUEUE = int(os.getenv('DECISION_TRACE_QUEUE', '256'))
+
+NO_SYMBOL = "*"
+
+
+class TraceBuilder:
+    """Collects one decision as it is made; publish() sends it"""
+
+    __slots__ = ("bus", "trace")
+
+    def __init__(self, bus: "DecisionBus", source: str, **fields):
+        self.bus = bus
+        self.trace = {"type": "decision", "source": source, "gates": [], **fields}
+
+    def set(self, **fields):
+        self.trace.update(fields)
+
+    def gate(self, name: str, passed: bool, reason: Optional[str] = None, **detail):
+        self.trace["gates"].append({"gate": name, "passed": bool(passed), "reason": reason, **detail})
+
+    def publish(self, decision: str, **fields) -> Optional[Dict]:
+        self.trace.update(fields, decision=decision)
+        if "reasoning" not in self.trace:
+            self.trace["reasoning"] = [
+                f"{g['gate']}: {'passed' if g['passed'] else 'blocked'}" + (f" - {g['reason']}" if g['reason'] else "")
+                for g in self.trace["gates"]
+            ]
+        return self.bus.publish(self.trace)
+
+
+class _NullTrace:
+    """Stand-in builder while nothing is recording"""
+
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def gate(self, name: str, passed: bool, reason: Optional[str] = None, **detail):
+        pass
+
+    def publish(self, decision: str, **fields) -> None:
+        return None
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Subscription:
+    """One subscriber's filter and bounded queue"""
+
+    def __init__(self, bus: "DecisionBus", symbols: Optional[Iterable[str]] = None,
+                 bot_ids: Optional[Iterable[str]] = None, user_id: Optional[str] = None,
+                 maxsize: int = DECISION_TRACE_QUEUE):
+        self.bus = bus
+        self.symbols = set(symbols) if symbols else None
+        self.bot_ids = set(bot_ids) if bot_ids else None
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def matches(self, trace: Dict) -> bool:
+        owner = trace.get("user_id")
+        if owner is not None and owner != self.user_id:
+            return False
+        if self.symbols is not None and trace.get("symbol") not in self.symbols:
+            return False
+        if self.bot_ids is not None and trace.get("bot_id") not in self.bot_ids:
+            return False
+        return True
+
+    def offer(self, trace: Dict):
+        """Queue a trace, dropping this subscriber's oldest one if it is full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(trace)
+
+    async def get(self) -> Dict:
+        return await self.queue.get()
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class DecisionBus:
+    """Decision traces: per-symbol ring buffers and filtered subscribers"""
+
+    def __init__(self, buffer_size: int = DECISION_TRACE_BUFFER, queue_size: int = DECISION_TRACE_QUEUE):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.buffers: Dict[str, Deque[Dict]] = {}
+        self.subscribers: List[Subscription] = []
+        self._ids = itertools.count(1)
+        self.stats = Counter()
+
+    @property
+    def recording(self) -> bool:
+        return bool(self.subscribers)
+
+    def trace(self, source: str, **fields):
+        """Builder for one decision (NULL_TRACE when nothing is recording)"""
+        if not self.recording:
+            return NULL_TRACE
+        return TraceBuilder(self, source, **fields)
+
+    def publish(self, trace: Dict) -> Optional[Dict]:
+        if not self.recording:
+            return None
+        trace["id"] = next(self._ids)
+        trace.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+        self.stats["published"] += 1
+
+        if self.buffer_size > 0:
+            key = trace.get("symbol") or NO_SYMBOL
+            buffer = self.buffers.get(key)
+            if buffer is None:
+                buffer = self.buffers[key] = deque(maxlen=self.buffer_size)
+            buffer.append(trace)
+
+        for subscription in self.subscribers:
+            if subscription.matches(trace):
+                subscription.offer(trace)
+        return trace
+
+    def recent(self, symbols: Optional[Iterable[str]] = None, bot_ids: Optional[Iterable[str]] = None,
+               user_id: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Last `limit` buffered traces a subscriber with these filters would receive, oldest first"""
+        matcher = Subscription(self, symbols, bot_ids, user_id, maxsize=1)
+        keys = matcher.symbols if matcher.symbols is not None else list(self.buffers)
+        traces = [
+            trace
+            for key in keys
+            for trace in self.buffers.get(key, ())
+            if matcher.matches(trace)
+        ]
+        traces.sort(key=lambda t: t["id"])
+        return traces[-limit:] if limit > 0 else []
+
+    def subscribe(self, symbols: Optional[Iterable[str]] = None, bot_ids: Optional[Iterable[str]] = None,
+                  user_id: Optional[str] = None, replay: int = 50) -> Subscription:
+        """New subscription, pre-filled with up to `replay` buffered traces"""
+        subscription = Subscription(self, symbols, bot_ids, user_id, maxsize=self.queue_size)
+        for trace in self.recent(symbols, bot_ids, user_id, limit=min(replay, self.queue_size)):
+            subscription.offer(trace)
+        self.subscribers.append(subscription)
+        logger.debug(f"Decision trace subscriber added ({len(self.subscribers)} total)")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+
+
+# Global instance
+decision_bus = DecisionBus()
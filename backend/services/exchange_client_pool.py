@@ -0,0 +1,244 @@
+"""
+Exchange Client Pool
+Per-(user, exchange) pool of ccxt.async_support clients
+
+- One client per user and exchange, reused across calls (keeps the HTTP session open)
+- Markets loaded once when the client is built and kept warm on the instance
+- Clients idle longer than idle_ttl are closed and evicted
+- Key rotation is detected by fingerprinting the stored credentials; the client is rebuilt
+- close_all() is called from the server lifespan shutdown
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import ccxt.async_support as ccxt_async
+
+import database as db
+from engines.instrumentation import instrument_exchange
+
+logger = logging.getLogger(__name__)
+
+
+def key_fingerprint(key_doc: Dict) -> str:
+    """Stable hash of the credential fields of an api_keys document"""
+    parts = [
+        str(key_doc.get(name) or "")
+        for name in ("api_key", "api_secret", "passphrase", "api_key_encrypted", "api_secret_encrypted")
+    ]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def build_exchange(exchange_name: str, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                   passphrase: Optional[str] = None, testnet: bool = False):
+    """Construct a ccxt.async_support exchange instance"""
+    exchange_class = getattr(ccxt_async, exchange_name.lower())
+    config = {'enableRateLimit': True}
+
+    if api_key:
+        config['apiKey'] = api_key
+    if api_secret:
+        config['secret'] = api_secret
+    if passphrase:
+        config['password'] = passphrase
+
+    if testnet:
+        config['options'] = {'defaultType': 'spot'}
+        if exchange_name.lower() == 'binance':
+            config['options']['testnet'] = True
+
+    return instrument_exchange(exchange_class(config), exchange_name.lower())
+
+
+@dataclass
+class PooledClient:
+    """A pooled exchange client and its bookkeeping"""
+    exchange: object
+    fingerprint: str
+    created_at: float
+    last_used: float
+    key_checked_at: float
+    markets_loaded: bool = False
+
+
+class ExchangeClientPool:
+    """Pool of authenticated async exchange clients keyed by (user_id, exchange)"""
+
+    def __init__(self, idle_ttl: Optional[float] = None, key_check_interval: Optional[float] = None,
+                 factory: Optional[Callable] = None, clock: Callable[[], float] = time.monotonic):
+        self.idle_ttl = idle_ttl if idle_ttl is not None else float(os.getenv("EXCHANGE_CLIENT_IDLE_TTL", "900"))
+        self.key_check_interval = (
+            key_check_interval if key_check_interval is not None
+            else float(os.getenv("EXCHANGE_KEY_CHECK_INTERVAL", "60"))
+        )
+        self.factory = factory or build_exchange
+        self.clock = clock
+        self._clients: Dict[Tuple[str, str], PooledClient] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._last_eviction = clock()
+        self.stats = {"hits": 0, "builds": 0, "rebuilds": 0, "evictions": 0}
+
+    def _lock(self, key: Tuple[str, str]) -> asyncio.Lock:
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    async def _load_key_doc(self, user_id: str, exchange_name: str) -> Optional[Dict]:
+        return await db.api_keys_collection.find_one(
+            {"user_id": user_id, "exchange": {"$in": [exchange_name, exchange_name.upper(), exchange_name.capitalize()]}},
+            {"_id": 0}
+        )
+
+    async def _build(self, exchange_name: str, key_doc: Dict, now: float) -> PooledClient:
+        exchange = self.factory(
+            exchange_name,
+            key_doc.get('api_key'),
+            key_doc.get('api_secret'),
+            passphrase=key_doc.get('passphrase')
+        )
+        client = PooledClient(
+            exchange=exchange,
+            fingerprint=key_fingerprint(key_doc),
+            created_at=now,
+            last_used=now,
+            key_checked_at=now
+        )
+
+        # Warm market metadata once; later calls reuse the cached markets
+        try:
+            await exchange.load_markets()
+            client.markets_loaded = True
+        except Exception as e:
+            logger.warning(f"Could not preload markets for {exchange_name}: {e}")
+
+        return client
+
+    async def _close(self, client: PooledClient):
+        try:
+            await client.exchange.close()
+        except Exception as e:
+            logger.warning(f"Error closing exchange client: {e}")
+
+    async def get(self, user_id: str, exchange_name: str, key_doc: Optional[Dict] = None):
+        """Return a pooled client, building or rebuilding it if needed
+
+        Args:
+            user_id: Owner of the API keys
+            exchange_name: ccxt exchange id
+            key_doc: api_keys document if the caller already has it; otherwise it is
+                loaded when the client is built or its key check is due
+
+        Returns:
+            ccxt.async_support exchange instance, or None if no keys are stored
+        """
+        exchange_name = exchange_name.lower()
+        key = (user_id, exchange_name)
+        now = self.clock()
+
+        if now - self._last_eviction >= min(self.idle_ttl, 60):
+            await self.evict_idle()
+
+        async with self._lock(key):
+            client = self._clients.get(key)
+
+            if client and key_doc is None and now - client.key_checked_at < self.key_check_interval:
+                client.last_used = now
+                self.stats["hits"] += 1
+                return client.exchange
+
+            if key_doc is None:
+                key_doc = await self._load_key_doc(user_id, exchange_name)
+
+            if not key_doc:
+                if client:
+                    # Keys were removed - drop the client
+                    self._clients.pop(key, None)
+                    await self._close(client)
+                return None
+
+            if client and client.fingerprint == key_fingerprint(key_doc):
+                client.last_used = now
+                client.key_checked_at = now
+                self.stats["hits"] += 1
+                return client.exchange
+
+            if client:
+                logger.info(f"🔑 Key rotation detected for {exchange_name} user {user_id[:8]} - rebuilding client")
+                self._clients.pop(key, None)
+                await self._close(client)
+                self.stats["rebuilds"] += 1
+
+            client = await self._build(exchange_name, key_doc, now)
+            self._clients[key] = client
+            self.stats["builds"] += 1
+            return client.exchange
+
+    async def get_user_clients(self, user_id: str) -> Dict[str, object]:
+        """Return pooled clients for every exchange the user has keys for"""
+        key_docs = await db.api_keys_collection.find(
+            {"user_id": user_id},
+            {"_id": 0}
+        ).to_list(100)
+
+        clients = {}
+        for key_doc in key_docs:
+            exchange_name = (key_doc.get('exchange') or '').lower()
+            if not exchange_name:
+                continue
+            try:
+                exchange = await self.get(user_id, exchange_name, key_doc)
+                if exchange:
+                    clients[exchange_name] = exchange
+            except Exception as e:
+                logger.error(f"❌ Failed to init {exchange_name}: {e}")
+
+        return clients
+
+    async def invalidate(self, user_id: str, exchange_name: Optional[str] = None):
+        """Close and drop a user's clients (all exchanges if none given)"""
+        keys = [
+            key for key in list(self._clients)
+            if key[0] == user_id and (exchange_name is None or key[1] == exchange_name.lower())
+        ]
+        for key in keys:
+            client = self._clients.pop(key, None)
+            if client:
+                await self._close(client)
+
+    async def evict_idle(self) -> int:
+        """Close clients that have not been used within idle_ttl"""
+        now = self.clock()
+        self._last_eviction = now
+
+        idle = [key for key, client in self._clients.items() if now - client.last_used >= self.idle_ttl]
+        evicted = 0
+        for key in idle:
+            if self._lock(key).locked():
+                continue
+            client = self._clients.pop(key, None)
+            if client:
+                await self._close(client)
+                evicted += 1
+
+        self.stats["evictions"] += evicted
+        return evicted
+
+    async def close_all(self):
+        """Close every pooled client - never raises"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(self._close(client) for client in clients), return_exceptions=True)
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled exchange clients")
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "open_clients": len(self._clients)}
+
+
+# Global instance
+exchange_client_pool = ExchangeClientPool()
@@ -7,15 +7,180 @@ This service provides the single source of truth for:
 - Derived metrics (equity, PnL, drawdown, fees)
 
 Phase 1: Read-only + parallel write (opt-in via feature flag)
+
+Bulk ingestion (append_fills): exchange backfills, paper replays and NDJSON
+uploads are validated per batch with numpy, written with one unordered
+insert_many per FILL_BATCH_SIZE fills, and fills whose client_order_id is
+already in the ledger are counted as duplicates instead of failing the batch.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterable, Dict, Iterable, List, Optional, Tuple, Union
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 import logging
+import numpy as np
+
+from engines.instrumentation import timed
+from engines.market_data import parse_timestamp
+from services.ledger_verifier import LedgerVerifier
+from services.pagination import PAGE_SIZE, keyset_page, keyset_stream, merged_keyset_page, parse_fields
 
 logger = logging.getLogger(__name__)
 
+FILL_BATCH_SIZE = int(os.getenv('FILL_BATCH_SIZE', '1000'))
+
+DUPLICATE_KEY = 11000  # MongoDB duplicate key error code
+MAX_REPORTED_ERRORS = 100  # rejected fills listed in an append_fills summary
+
+FILL_REQUIRED_FIELDS = (
+    "user_id", "bot_id", "exchange", "symbol", "side", "qty", "price", "fee",
+    "fee_currency", "timestamp", "order_id"
+)
+FILL_OPTIONAL_FIELDS = ("client_order_id", "exchange_trade_id", "is_paper", "metadata")
+
+# Fields clients may select (fields=...) on paged fill and audit trail reads
+FILL_FIELDS = FILL_REQUIRED_FIELDS + FILL_OPTIONAL_FIELDS + ("created_at",)
+EVENT_FIELDS = (
+    "user_id", "bot_id", "event_type", "amount", "currency", "timestamp", "description", "metadata", "created_at"
+)
+
+
+def fill_document(
+    user_id: str,
+    bot_id: str,
+    exchange: str,
+    symbol: str,
+    side: str,
+    qty: float,
+    price: float,
+    fee: float,
+    fee_currency: str,
+    timestamp: datetime,
+    order_id: str,
+    client_order_id: Optional[str] = None,
+    exchange_trade_id: Optional[str] = None,
+    is_paper: bool = True,
+    metadata: Optional[Dict] = None,
+    created_at: Optional[datetime] = None
+) -> Dict:
+    """
+    A fills_ledger document
+    
+    client_order_id is left out when None: the unique sparse index only skips
+    documents without the field, so a stored null would collide.
+    """
+    doc = {
+        "user_id": user_id,
+        "bot_id": bot_id,
+        "exchange": exchange,
+        "symbol": symbol,
+        "side": side.lower(),
+        "qty": float(qty),
+        "price": float(price),
+        "fee": float(fee),
+        "fee_currency": fee_currency,
+        "timestamp": timestamp,
+        "order_id": order_id,
+        "client_order_id": client_order_id,
+        "exchange_trade_id": exchange_trade_id,
+        "is_paper": is_paper,
+        "metadata": metadata or {},
+        "created_at": created_at or datetime.utcnow()
+    }
+    if client_order_id is None:
+        del doc["client_order_id"]
+    return doc
+
+
+def _number(value) -> float:
+    if isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _ledger_time(value) -> datetime:
+    """Naive UTC datetime, as append_fill callers store (datetime, ISO string or epoch s/ms)"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value
+    return parse_timestamp(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def validate_fills(rows: List[Any]) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, str]]]:
+    """
+    Check a batch of raw fill records
+    
+    Numeric checks (finite qty > 0, price > 0, fee >= 0) and the side check run
+    over the whole batch as arrays. Returns ([(position, fill document)],
+    [(position, error)]) with positions into `rows`.
+    """
+    errors: Dict[int, str] = {}
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[i] = "not a JSON object"
+            continue
+        missing = [field for field in FILL_REQUIRED_FIELDS if row.get(field) in (None, "")]
+        if missing:
+            errors[i] = f"missing {', '.join(missing)}"
+    
+    records = [row if isinstance(row, dict) else {} for row in rows]
+    numbers = np.array(
+        [[_number(r.get("qty")), _number(r.get("price")), _number(r.get("fee"))] for r in records],
+        dtype=float
+    ).reshape(-1, 3)
+    sides = np.array([str(r.get("side", "")).lower() for r in records], dtype=object)
+    with np.errstate(invalid="ignore"):
+        checks = (
+            ("qty must be a positive number", ~(np.isfinite(numbers[:, 0]) & (numbers[:, 0] > 0))),
+            ("price must be a positive number", ~(np.isfinite(numbers[:, 1]) & (numbers[:, 1] > 0))),
+            ("fee must be a non-negative number", ~(np.isfinite(numbers[:, 2]) & (numbers[:, 2] >= 0))),
+            ("side must be buy or sell", ~np.isin(sides, ("buy", "sell"))),
+        )
+    for message, failed in checks:
+        for i in np.flatnonzero(failed):
+            errors.setdefault(int(i), message)
+    
+    created_at = datetime.utcnow()
+    valid = []
+    for i, row in enumerate(rows):
+        if i in errors:
+            continue
+        try:
+            timestamp = _ledger_time(row["timestamp"])
+        except (TypeError, ValueError, OverflowError, OSError):
+            errors[i] = "timestamp is not a datetime, ISO string or epoch"
+            continue
+        fields = {field: row[field] for field in FILL_REQUIRED_FIELDS}
+        fields.update({field: row[field] for field in FILL_OPTIONAL_FIELDS if field in row})
+        fields.update(qty=numbers[i, 0], price=numbers[i, 1], fee=numbers[i, 2], timestamp=timestamp)
+        valid.append((i, fill_document(**fields, created_at=created_at)))
+    
+    return valid, sorted(errors.items())
+
+
+async def _batches(records: Union[Iterable, AsyncIterable], size: int):
+    """Lists of up to `size` records from a sync or async iterable"""
+    batch = []
+    if hasattr(records, "__aiter__"):
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    else:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
 
 class LedgerService:
     """
@@ -30,6 +195,7 @@ class LedgerService:
         self.db = db
         self.fills_ledger = db["fills_ledger"]
         self.ledger_events = db["ledger_events"]
+        self.verifier = LedgerVerifier(db)
         
         # Create indexes for performance
         self._ensure_indexes()
@@ -38,18 +204,19 @@ class LedgerService:
         """Create indexes for efficient queries"""
         try:
             # Fills ledger indexes
-            self.fills_ledger.create_index([("user_id", 1), ("timestamp", -1)])
+            self.fills_ledger.create_index([("user_id", 1), ("timestamp", -1), ("_id", -1)])
             self.fills_ledger.create_index([("bot_id", 1), ("timestamp", -1)])
             self.fills_ledger.create_index([("client_order_id", 1)], unique=True, sparse=True)
             self.fills_ledger.create_index([("exchange_trade_id", 1)])
             self.fills_ledger.create_index([("timestamp", -1)])
             
             # Ledger events indexes
-            self.ledger_events.create_index([("user_id", 1), ("timestamp", -1)])
+            self.ledger_events.create_index([("user_id", 1), ("timestamp", -1), ("_id", -1)])
             self.ledger_events.create_index([("event_type", 1), ("timestamp", -1)])
         except Exception as e:
             logger.warning(f"Index creation warning (may already exist): {e}")
     
+    @timed("ledger")
     async def append_fill(
         self,
         user_id: str,
@@ -73,34 +240,101 @@ class LedgerService:
         
         Returns: fill_id
         """
-        fill_doc = {
-            "user_id": user_id,
-            "bot_id": bot_id,
-            "exchange": exchange,
-            "symbol": symbol,
-            "side": side.lower(),
-            "qty": float(qty),
-            "price": float(price),
-            "fee": float(fee),
-            "fee_currency": fee_currency,
-            "timestamp": timestamp,
-            "order_id": order_id,
-            "client_order_id": client_order_id,
-            "exchange_trade_id": exchange_trade_id,
-            "is_paper": is_paper,
-            "metadata": metadata or {},
-            "created_at": datetime.utcnow()
-        }
+        fill_doc = fill_document(
+            user_id, bot_id, exchange, symbol, side, qty, price, fee, fee_currency, timestamp, order_id,
+            client_order_id=client_order_id, exchange_trade_id=exchange_trade_id,
+            is_paper=is_paper, metadata=metadata
+        )
         
         try:
             result = await self.fills_ledger.insert_one(fill_doc)
             fill_id = str(result.inserted_id)
-            logger.info(f"Appended fill {fill_id} for bot {bot_id}: {side} {qty} {symbol} @ {price}")
+            logger.debug(f"Appended fill {fill_id} for bot {bot_id}: {side} {qty} {symbol} @ {price}")
             return fill_id
         except Exception as e:
             logger.error(f"Failed to append fill: {e}")
             raise
     
+    @timed("ledger")
+    async def append_fills(
+        self,
+        fills: Union[Iterable[Dict], AsyncIterable[Dict]],
+        batch_size: int = FILL_BATCH_SIZE,
+        return_ids: bool = False
+    ) -> Dict:
+        """
+        Append many fills (append_fill keyword fields per record)
+        
+        Records are consumed in batches of batch_size, so a generator or an
+        async stream of a month of exchange history never sits in memory at
+        once. Invalid records are skipped and reported; a client_order_id that
+        repeats within the call or is already in the ledger counts as a
+        duplicate.
+        
+        Returns: {"received", "inserted", "duplicates", "invalid", "errors":
+        [{"index", "error"}] (first MAX_REPORTED_ERRORS), and with return_ids
+        "fill_ids": {index: fill_id} and "rejected": {index: error} for every
+        invalid or failed record}, indexes counting records from 0
+        """
+        summary = {"received": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "errors": []}
+        fill_ids = {}
+        rejected = {}
+        seen = set()  # client_order_ids already taken in this call
+        
+        def reject(index: int, error: str):
+            summary["invalid"] += 1
+            if return_ids:
+                rejected[index] = error
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"index": index, "error": error})
+        
+        async for batch in _batches(fills, max(1, batch_size)):
+            offset = summary["received"]
+            summary["received"] += len(batch)
+            valid, invalid = validate_fills(batch)
+            for position, error in invalid:
+                reject(offset + position, error)
+            
+            indexes, docs = [], []
+            for position, doc in valid:
+                client_order_id = doc.get("client_order_id")
+                if client_order_id is not None:
+                    if client_order_id in seen:
+                        summary["duplicates"] += 1
+                        continue
+                    seen.add(client_order_id)
+                indexes.append(offset + position)
+                docs.append(doc)
+            if not docs:
+                continue
+            
+            failed = {}
+            try:
+                await self.fills_ledger.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+            
+            for position, err in failed.items():
+                if err.get("code") == DUPLICATE_KEY:
+                    summary["duplicates"] += 1
+                else:
+                    reject(indexes[position], err.get("errmsg", "write failed"))
+            summary["inserted"] += len(docs) - len(failed)
+            if return_ids:
+                fill_ids.update(
+                    (index, str(doc["_id"])) for position, (index, doc) in enumerate(zip(indexes, docs))
+                    if position not in failed
+                )
+        
+        if return_ids:
+            summary["fill_ids"] = fill_ids
+            summary["rejected"] = rejected
+        logger.info(
+            f"Appended {summary['inserted']}/{summary['received']} fills "
+            f"({summary['duplicates']} duplicates, {summary['invalid']} invalid)"
+        )
+        return summary
+    
     async def append_event(
         self,
         user_id: str,
@@ -138,6 +372,7 @@ class LedgerService:
             logger.error(f"Failed to append event: {e}")
             raise
     
+    @timed("ledger")
     async def get_fills(
         self,
         user_id: Optional[str] = None,
@@ -169,6 +404,98 @@ class LedgerService:
         
         return fills
     
+    @staticmethod
+    def _fills_query(user_id: str, bot_id: Optional[str] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None) -> Dict:
+        query = {"user_id": user_id}
+        if bot_id:
+            query["bot_id"] = bot_id
+        if since or until:
+            query["timestamp"] = {}
+            if since:
+                query["timestamp"]["$gte"] = since
+            if until:
+                query["timestamp"]["$lte"] = until
+        return query
+    
+    @timed("ledger")
+    async def get_fills_page(
+        self,
+        user_id: str,
+        bot_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = PAGE_SIZE,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None
+    ) -> Dict:
+        """
+        One page of fills, newest first
+        
+        fields: comma-separated FILL_FIELDS to return (timestamp and _id always)
+        Returns: {"fills", "next_cursor"}; pass next_cursor back for the next page
+        
+        Raises PaginationError for an invalid cursor or field.
+        """
+        query = self._fills_query(user_id, bot_id, since, until)
+        fills, next_cursor = await keyset_page(
+            self.fills_ledger, query, limit, cursor, parse_fields(fields, FILL_FIELDS)
+        )
+        for fill in fills:
+            fill["_id"] = str(fill["_id"])
+        return {"fills": fills, "next_cursor": next_cursor}
+    
+    async def export_fills(
+        self,
+        user_id: str,
+        bot_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        fields: Optional[str] = None
+    ):
+        """Every matching fill, newest first, read in keyset batches (async iterator)"""
+        projection = parse_fields(fields, FILL_FIELDS)  # raises before the first read
+        
+        async def fills():
+            async for fill in keyset_stream(self.fills_ledger, self._fills_query(user_id, bot_id, since, until), projection):
+                fill["_id"] = str(fill["_id"])
+                yield fill
+        
+        return fills()
+    
+    @timed("ledger")
+    async def audit_trail_page(
+        self,
+        user_id: str,
+        bot_id: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None
+    ) -> Dict:
+        """
+        One page of fills and ledger events merged newest first
+        
+        Entries carry "type" ("fill" or "event"). fields selects from
+        FILL_FIELDS and EVENT_FIELDS; each collection returns the ones it has.
+        Returns: {"entries", "next_cursor"}
+        """
+        projection = parse_fields(fields, set(FILL_FIELDS) | set(EVENT_FIELDS))
+        query = self._fills_query(user_id, bot_id)
+        
+        def pick(allowed):
+            return {k: 1 for k in projection if k in allowed or k == "timestamp"} if projection else None
+        
+        page, next_cursor = await merged_keyset_page(
+            {
+                "fill": (self.fills_ledger, query, pick(FILL_FIELDS)),
+                "event": (self.ledger_events, query, pick(EVENT_FIELDS))
+            },
+            limit, cursor, scope={"audit_trail": query}
+        )
+        entries = [{"type": kind, **doc, "_id": str(doc["_id"])} for kind, doc in page]
+        return {"entries": entries, "next_cursor": next_cursor}
+    
+    @timed("ledger")
     async def compute_equity(
         self,
         user_id: Optional[str] = None,
@@ -218,6 +545,7 @@ class LedgerService:
         
         return equity
     
+    @timed("ledger")
     async def compute_realized_pnl(
         self,
         user_id: Optional[str] = None,
@@ -295,6 +623,7 @@ class LedgerService:
         
         return realized_pnl
     
+    @timed("ledger")
     async def compute_unrealized_pnl(
         self,
         user_id: Optional[str] = None,
@@ -399,6 +728,7 @@ class LedgerService:
         
         return unrealized_pnl
     
+    @timed("ledger")
     async def compute_fees_paid(
         self,
         user_id: Optional[str] = None,
@@ -442,6 +772,7 @@ class LedgerService:
             return result[0].get("total_fees", 0.0)
         return 0.0
     
+    @timed("ledger")
     async def compute_drawdown(
         self,
         user_id: Optional[str] = None,
@@ -523,6 +854,7 @@ class LedgerService:
         
         return current_dd, max_dd
     
+    @timed("ledger")
     async def profit_series(
         self,
         user_id: str,
@@ -625,6 +957,7 @@ class LedgerService:
         
         return series[-limit:]
     
+    @timed("ledger")
     async def get_stats(self, user_id: str, bot_id: Optional[str] = None) -> Dict:
         """
         Get comprehensive statistics
@@ -667,6 +1000,7 @@ class LedgerService:
             "avg_qty": 0.0
         }
     
+    @timed("ledger")
     async def calculate_win_rate(self, user_id: str, bot_id: Optional[str] = None) -> Optional[float]:
         """
         Calculate win rate using FIFO position tracking.
@@ -771,6 +1105,7 @@ class LedgerService:
         count = await self.fills_ledger.count_documents(query)
         return count
     
+    @timed("ledger")
     async def compute_daily_pnl(
         self,
         user_id: Optional[str] = None,
@@ -802,6 +1137,7 @@ class LedgerService:
         
         return realized_pnl - fees
     
+    @timed("ledger")
     async def get_consecutive_losses(
         self,
         user_id: Optional[str] = None,
@@ -899,7 +1235,8 @@ class LedgerService:
     
     async def reconcile_with_trades_collection(
         self,
-        user_id: str
+        user_id: str,
+        resume: bool = True
     ) -> Dict:
         """
         Reconcile ledger data with legacy trades_collection
@@ -907,6 +1244,9 @@ class LedgerService:
         Checks for discrepancies and returns a report with any issues found.
         Useful for migration validation and integrity checks.
         
+        Fills and trades are merge-joined with batched cursors (see LedgerVerifier),
+        so the report covers every document regardless of account size.
+        
         Returns: {
             "status": "ok" | "warning" | "error",
             "ledger_equity": float,
@@ -914,8 +1254,12 @@ class LedgerService:
             "discrepancy": float,
             "ledger_fills_count": int,
             "trades_count": int,
+            "matched": int,
+            "unmatched_fills": int,
+            "unmatched_trades": int,
             "issues": List[str],
-            "recommendations": List[str]
+            "recommendations": List[str],
+            "scan": Dict
         }
         """
         issues = []
@@ -924,17 +1268,12 @@ class LedgerService:
         try:
             # Get ledger equity
             ledger_equity = await self.compute_equity(user_id)
-            ledger_fills = await self.get_fills(user_id=user_id, limit=10000)
-            ledger_fills_count = len(ledger_fills)
-            
-            # Get trades collection data
-            trades_collection = self.db["trades"]
-            trades_cursor = trades_collection.find({"user_id": user_id})
-            trades = await trades_cursor.to_list(length=10000)
-            trades_count = len(trades)
             
-            # Calculate equity from trades collection
-            trades_equity = sum(trade.get("profit_loss", 0) for trade in trades)
+            # Stream both collections in time order
+            scan = await self.verifier.reconcile(user_id, resume=resume)
+            ledger_fills_count = scan.get("fills", 0)
+            trades_count = scan.get("trades", 0)
+            trades_equity = scan.get("trades_equity", 0.0)
             
             # Check for discrepancies
             discrepancy = abs(ledger_equity - trades_equity)
@@ -949,6 +1288,10 @@ class LedgerService:
                 issues.append(f"Fill count mismatch: {ledger_fills_count} fills vs {trades_count} trades")
                 recommendations.append("Ensure all trades are being recorded to fills_ledger")
             
+            if scan.get("unmatched_fills", 0):
+                issues.append(f"{scan['unmatched_fills']} fills have no matching trade")
+                recommendations.append("Check the unmatched_sample fills against the trades collection")
+            
             # Determine status
             if discrepancy_pct > 10:
                 status = "error"
@@ -965,8 +1308,16 @@ class LedgerService:
                 "discrepancy_pct": round(discrepancy_pct, 2),
                 "ledger_fills_count": ledger_fills_count,
                 "trades_count": trades_count,
+                "matched": scan.get("matched", 0),
+                "unmatched_fills": scan.get("unmatched_fills", 0),
+                "unmatched_trades": scan.get("unmatched_trades", 0),
+                "unmatched_sample": scan.get("unmatched_sample", []),
                 "issues": issues,
                 "recommendations": recommendations if issues else ["Ledger and trades are in sync"],
+                "scan": {
+                    key: scan.get(key)
+                    for key in ("scanned", "batches", "elapsed_seconds", "docs_per_second", "resumed")
+                },
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -982,7 +1333,8 @@ class LedgerService:
     
     async def verify_integrity(
         self,
-        user_id: str
+        user_id: str,
+        resume: bool = True
     ) -> Dict:
         """
         Verify ledger integrity for a user
@@ -994,6 +1346,9 @@ class LedgerService:
         4. Chronological ordering is preserved
         5. All required fields are present
         
+        Checks 2, 4 and 5 come from one streaming pass over the fills (see
+        LedgerVerifier); duplicates are grouped by MongoDB.
+        
         Returns: {
             "status": "ok" | "warning" | "error",
             "checks_passed": int,
@@ -1017,48 +1372,37 @@ class LedgerService:
                 checks_failed += 1
                 issues.append(f"Equity recomputation mismatch: {equity1} vs {equity2}")
             
-            # Check 2: Get all fills
-            fills = await self.get_fills(user_id=user_id, limit=10000)
+            # Check 2: Stream all fills
+            scan = await self.verifier.scan_fills(user_id, resume=resume)
             
             # Check 3: All fills have fees
-            fills_without_fees = [f for f in fills if f.get("fee") is None]
-            if not fills_without_fees:
+            if not scan.get("missing_fee"):
                 checks_passed += 1
             else:
                 checks_failed += 1
-                issues.append(f"{len(fills_without_fees)} fills missing fee information")
+                issues.append(f"{scan['missing_fee']} fills missing fee information")
             
             # Check 4: No duplicate client_order_ids
-            client_order_ids = [f.get("client_order_id") for f in fills if f.get("client_order_id")]
-            if len(client_order_ids) == len(set(client_order_ids)):
+            duplicates = await self.verifier.find_duplicate_client_order_ids(user_id)
+            if not duplicates["extra_fills"]:
                 checks_passed += 1
             else:
                 checks_failed += 1
-                duplicates = len(client_order_ids) - len(set(client_order_ids))
-                issues.append(f"{duplicates} duplicate client_order_ids found")
+                issues.append(f"{duplicates['extra_fills']} duplicate client_order_ids found")
             
             # Check 5: Chronological ordering
-            timestamps = [f["timestamp"] for f in fills]
-            is_sorted = all(timestamps[i] >= timestamps[i+1] for i in range(len(timestamps)-1))
-            if is_sorted:
+            if not scan.get("out_of_order"):
                 checks_passed += 1
             else:
                 checks_failed += 1
-                issues.append("Fills are not in chronological order")
+                issues.append(f"Fills are not in chronological order ({scan['out_of_order']} appended out of order)")
             
             # Check 6: Required fields present
-            required_fields = ["user_id", "bot_id", "exchange", "symbol", "side", "qty", "price", "fee", "timestamp"]
-            fills_missing_fields = []
-            for fill in fills:
-                missing = [field for field in required_fields if field not in fill]
-                if missing:
-                    fills_missing_fields.append((fill.get("_id"), missing))
-            
-            if not fills_missing_fields:
+            if not scan.get("missing_fields"):
                 checks_passed += 1
             else:
                 checks_failed += 1
-                issues.append(f"{len(fills_missing_fields)} fills missing required fields")
+                issues.append(f"{scan['missing_fields']} fills missing required fields")
             
             # Determine status
             if checks_failed == 0:
@@ -1075,9 +1419,14 @@ class LedgerService:
                 "total_checks": checks_passed + checks_failed,
                 "issues": issues if issues else ["All integrity checks passed"],
                 "details": {
-                    "total_fills": len(fills),
+                    "total_fills": scan.get("scanned", 0),
                     "equity": round(equity1, 2),
-                    "user_id": user_id
+                    "user_id": user_id,
+                    "duplicate_client_order_ids": duplicates["sample"],
+                    "scan": {
+                        key: scan.get(key)
+                        for key in ("batches", "elapsed_seconds", "docs_per_second", "resumed")
+                    }
                 },
                 "timestamp": datetime.utcnow().isoformat()
             }
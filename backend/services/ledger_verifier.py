@@ -0,0 +1,324 @@
+"""
+Ledger Verifier - Streaming reconciliation and integrity checks
+
+Walks fills_ledger and trades with batched cursors instead of loading them:
+- Integrity scan: one pass over a user's fills in insertion order (fees, required
+  fields, chronological ordering) with constant memory
+- Duplicate client_order_ids: grouped inside MongoDB (allowDiskUse), not in Python
+- Reconciliation: merge-join of fills and trades in time order; a fill and a trade
+  match when bot, symbol and side agree and they are within `tolerance` of each
+  other, so only the entries inside that window are held in memory
+- Both walks checkpoint to ledger_checkpoints and resume where they stopped
+- Reports include docs scanned, batches and throughput (docs/sec)
+"""
+
+import time
+import logging
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import database
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FILL_FIELDS = ("user_id", "bot_id", "exchange", "symbol", "side", "qty", "price", "fee", "timestamp")
+
+
+def _utc(value) -> datetime:
+    """Comparable UTC datetime for fill timestamps and trade ts/timestamp values"""
+    return database.trade_ts(value) if value is not None else datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _symbol(value) -> str:
+    return (value or "").replace("/", "").replace("-", "").upper()
+
+
+def _after(field: str, value, doc_id) -> Dict:
+    """Query for documents strictly after (value, _id) in a (field, _id) ordering"""
+    return {"$or": [{field: {"$gt": value}}, {field: value, "_id": {"$gt": doc_id}}]}
+
+
+class ScanStats:
+    """Counts and throughput for one streaming walk"""
+
+    def __init__(self, counters: Optional[Dict] = None):
+        self.counters = defaultdict(int, counters or {})
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def to_dict(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        scanned = self.counters.get("scanned", 0)
+        return {
+            **dict(self.counters),
+            "batches": self.batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_second": round(scanned / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+class MergeWindow:
+    """
+    Unmatched fills and trades seen within the last `tolerance` of the join.
+    Entries are [time, key, id, matched]; one deque per side keeps them in time
+    order for expiry and one deque per (side, key) finds the oldest candidate.
+    """
+
+    SIDES = ("fill", "trade")
+
+    def __init__(self, tolerance: timedelta):
+        self.tolerance = tolerance
+        self.by_time = {side: deque() for side in self.SIDES}
+        self.by_key = {side: defaultdict(deque) for side in self.SIDES}
+
+    def expire(self, now: datetime, stats: ScanStats, samples: List[Dict]):
+        cutoff = now - self.tolerance
+        for side in self.SIDES:
+            entries = self.by_time[side]
+            while entries and entries[0][0] < cutoff:
+                self._drop(side, entries.popleft(), stats, samples)
+
+    def flush(self, stats: ScanStats, samples: List[Dict]):
+        for side in self.SIDES:
+            entries = self.by_time[side]
+            while entries:
+                self._drop(side, entries.popleft(), stats, samples)
+
+    def _drop(self, side: str, entry: List, stats: ScanStats, samples: List[Dict]):
+        if entry[3]:
+            return
+        keyed = self.by_key[side][entry[1]]
+        keyed.popleft()
+        if not keyed:
+            del self.by_key[side][entry[1]]
+        stats.counters[f"unmatched_{side}s"] += 1
+        if len(samples) < 20:
+            samples.append({"side": side, "id": str(entry[2]), "time": entry[0].isoformat()})
+
+    def offer(self, side: str, when: datetime, key: Tuple, doc_id, stats: ScanStats):
+        """Match against the other side's oldest candidate, or wait for one"""
+        other = "trade" if side == "fill" else "fill"
+        candidates = self.by_key[other].get(key)
+        if candidates:
+            entry = candidates.popleft()
+            entry[3] = True
+            if not candidates:
+                del self.by_key[other][key]
+            stats.counters["matched"] += 1
+            return
+
+        entry = [when, key, doc_id, False]
+        self.by_time[side].append(entry)
+        self.by_key[side][key].append(entry)
+
+    def pending(self) -> List[Dict]:
+        """Unmatched entries, for the checkpoint"""
+        return [
+            {"side": side, "time": entry[0], "key": list(entry[1]), "id": entry[2]}
+            for side in self.SIDES for entry in self.by_time[side] if not entry[3]
+        ]
+
+    def restore(self, pending: List[Dict]):
+        for item in sorted(pending, key=lambda p: _utc(p["time"])):
+            entry = [_utc(item["time"]), tuple(item["key"]), item["id"], False]
+            self.by_time[item["side"]].append(entry)
+            self.by_key[item["side"]][entry[1]].append(entry)
+
+
+class LedgerVerifier:
+    """Constant-memory integrity scan and fills/trades reconciliation for one user"""
+
+    def __init__(self, db, batch_size: int = 1000, checkpoint_every: int = 10,
+                 tolerance_seconds: float = 5.0):
+        self.db = db
+        self.fills_ledger = db["fills_ledger"]
+        self.trades = db["trades"]
+        self.checkpoints = db["ledger_checkpoints"]
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.tolerance = timedelta(seconds=tolerance_seconds)
+
+    # ------------------------------------------------------------------
+    # Cursors and checkpoints
+    # ------------------------------------------------------------------
+
+    async def _stream(self, collection, query: Dict, sort: List[Tuple[str, int]],
+                      projection: Optional[Dict], stats: ScanStats) -> AsyncIterator[Dict]:
+        cursor = collection.find(query, projection).sort(sort).batch_size(self.batch_size)
+        seen = 0
+        async for doc in cursor:
+            seen += 1
+            if (seen - 1) % self.batch_size == 0:
+                stats.batches += 1
+            yield doc
+
+    async def _load_checkpoint(self, kind: str, user_id: str) -> Optional[Dict]:
+        checkpoint = await self.checkpoints.find_one({"_id": f"{kind}:{user_id}"})
+        if checkpoint and checkpoint.get("status") == "running":
+            return checkpoint
+        return None
+
+    async def _save_checkpoint(self, kind: str, user_id: str, status: str, stats: ScanStats, **state):
+        await self.checkpoints.replace_one(
+            {"_id": f"{kind}:{user_id}"},
+            {
+                "kind": kind,
+                "user_id": user_id,
+                "status": status,
+                "counters": dict(stats.counters),
+                "updated_at": datetime.now(timezone.utc),
+                **state
+            },
+            upsert=True
+        )
+
+    # ------------------------------------------------------------------
+    # Integrity
+    # ------------------------------------------------------------------
+
+    async def find_duplicate_client_order_ids(self, user_id: str, sample: int = 20) -> Dict:
+        """Duplicate client_order_ids, grouped by MongoDB"""
+        pipeline = [
+            {"$match": {"user_id": user_id, "client_order_id": {"$nin": [None, ""]}}},
+            {"$group": {"_id": "$client_order_id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$group": {
+                "_id": None,
+                "ids": {"$sum": 1},
+                "extra_fills": {"$sum": {"$subtract": ["$count", 1]}},
+                "sample": {"$push": "$_id"}
+            }},
+            {"$project": {"ids": 1, "extra_fills": 1, "sample": {"$slice": ["$sample", sample]}}}
+        ]
+        async for row in self.fills_ledger.aggregate(pipeline, allowDiskUse=True):
+            return {"ids": row["ids"], "extra_fills": row["extra_fills"], "sample": row["sample"]}
+        return {"ids": 0, "extra_fills": 0, "sample": []}
+
+    async def scan_fills(self, user_id: str, resume: bool = True) -> Dict:
+        """
+        One pass over a user's fills in insertion (_id) order.
+        Counts fills missing a fee, fills missing required fields and fills whose
+        timestamp is earlier than the fill appended before them.
+        """
+        checkpoint = await self._load_checkpoint("integrity", user_id) if resume else None
+        stats = ScanStats(checkpoint.get("counters") if checkpoint else None)
+        last_id = checkpoint.get("last_id") if checkpoint else None
+        previous = _utc(checkpoint["last_timestamp"]) if checkpoint and checkpoint.get("last_timestamp") else None
+
+        query = {"user_id": user_id}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        projection = {field: 1 for field in REQUIRED_FILL_FIELDS}
+
+        last_timestamp = None
+        async for fill in self._stream(self.fills_ledger, query, [("_id", 1)], projection, stats):
+            stats.counters["scanned"] += 1
+            if fill.get("fee") is None:
+                stats.counters["missing_fee"] += 1
+            if any(field not in fill for field in REQUIRED_FILL_FIELDS):
+                stats.counters["missing_fields"] += 1
+
+            if fill.get("timestamp") is not None:
+                current = _utc(fill["timestamp"])
+                if previous is not None and current < previous:
+                    stats.counters["out_of_order"] += 1
+                previous = current
+                last_timestamp = fill["timestamp"]
+            last_id = fill["_id"]
+
+            if stats.counters["scanned"] % (self.batch_size * self.checkpoint_every) == 0:
+                await self._save_checkpoint("integrity", user_id, "running", stats,
+                                            last_id=last_id, last_timestamp=last_timestamp)
+
+        await self._save_checkpoint("integrity", user_id, "complete", stats,
+                                    last_id=last_id, last_timestamp=last_timestamp)
+        report = stats.to_dict()
+        report["resumed"] = checkpoint is not None
+        return report
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    async def _timeline(self, user_id: str, after: Dict, stats: ScanStats) -> AsyncIterator[Tuple]:
+        """Fills and trades merged into one time-ordered stream of (side, time, key, id, doc)"""
+        trade_field = database.trade_time_field()
+
+        fill_query = {"user_id": user_id, "timestamp": {"$ne": None}}
+        if after.get("fill"):
+            fill_query.update(_after("timestamp", *after["fill"]))
+        trade_query = {"user_id": user_id, trade_field: {"$ne": None}}
+        if after.get("trade"):
+            trade_query.update(_after(trade_field, *after["trade"]))
+
+        fills = self._stream(
+            self.fills_ledger, fill_query, [("timestamp", 1), ("_id", 1)],
+            {"bot_id": 1, "symbol": 1, "side": 1, "timestamp": 1}, stats
+        )
+        trades = self._stream(
+            self.trades, trade_query, [(trade_field, 1), ("_id", 1)],
+            {"bot_id": 1, "pair": 1, "symbol": 1, "side": 1, "profit_loss": 1, trade_field: 1}, stats
+        )
+
+        async def head(stream, side):
+            async for doc in stream:
+                if side == "fill":
+                    raw, symbol = doc["timestamp"], doc.get("symbol")
+                else:
+                    raw, symbol = doc[trade_field], doc.get("pair") or doc.get("symbol")
+                key = (doc.get("bot_id"), _symbol(symbol), (doc.get("side") or "").lower())
+                return (side, _utc(raw), key, doc["_id"], raw, doc)
+            return None
+
+        next_fill = await head(fills, "fill")
+        next_trade = await head(trades, "trade")
+        while next_fill or next_trade:
+            if next_trade is None or (next_fill is not None and next_fill[1] <= next_trade[1]):
+                yield next_fill
+                next_fill = await head(fills, "fill")
+            else:
+                yield next_trade
+                next_trade = await head(trades, "trade")
+
+    async def reconcile(self, user_id: str, resume: bool = True) -> Dict:
+        """Merge-join fills and trades; counts matched and unmatched entries on each side"""
+        checkpoint = await self._load_checkpoint("reconcile", user_id) if resume else None
+        stats = ScanStats(checkpoint.get("counters") if checkpoint else None)
+        window = MergeWindow(self.tolerance)
+        after = {}
+        if checkpoint:
+            window.restore(checkpoint.get("pending", []))
+            after = {side: tuple(pos) for side, pos in (checkpoint.get("positions") or {}).items()}
+
+        trades_equity = float(checkpoint.get("trades_equity", 0.0)) if checkpoint else 0.0
+        samples: List[Dict] = []
+        positions = dict(after)
+
+        async for side, when, key, doc_id, raw, doc in self._timeline(user_id, after, stats):
+            stats.counters["scanned"] += 1
+            stats.counters[f"{side}s"] += 1
+            if side == "trade":
+                trades_equity += doc.get("profit_loss") or 0
+
+            window.expire(when, stats, samples)
+            window.offer(side, when, key, doc_id, stats)
+            positions[side] = (raw, doc_id)
+
+            if stats.counters["scanned"] % (self.batch_size * self.checkpoint_every) == 0:
+                await self._save_checkpoint(
+                    "reconcile", user_id, "running", stats,
+                    positions={s: list(p) for s, p in positions.items()},
+                    pending=window.pending(), trades_equity=trades_equity
+                )
+
+        window.flush(stats, samples)
+        await self._save_checkpoint("reconcile", user_id, "complete", stats, trades_equity=trades_equity)
+
+        report = stats.to_dict()
+        report.update({
+            "trades_equity": trades_equity,
+            "unmatched_sample": samples,
+            "resumed": checkpoint is not None
+        })
+        return report
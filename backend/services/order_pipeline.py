@@ -17,11 +17,17 @@ import asyncio
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
-from collections import defaultdict
 import logging
+from pymongo import UpdateOne
+
+import database
+from services.rate_limit_service import rate_limit_service, Hold, Window, daily, bot_key, user_key, exchange_key
+from engines.instrumentation import timed
 
 logger = logging.getLogger(__name__)
 
+LIMIT_SCOPE = "pipeline"  # Counter namespace in the shared rate limit service
+
 
 class OrderPipeline:
     """
@@ -30,10 +36,11 @@ class OrderPipeline:
     ALL trade executions must go through submit_order() method.
     """
     
-    def __init__(self, db, ledger_service, config: Optional[Dict] = None):
+    def __init__(self, db, ledger_service, config: Optional[Dict] = None, rate_limits=None):
         self.db = db
         self.ledger = ledger_service
         self.config = config or {}
+        self._rate_limits = rate_limits
         
         # Collections
         self.pending_orders = db["pending_orders"]
@@ -74,9 +81,6 @@ class OrderPipeline:
             "default": 10.0
         }
         
-        # In-memory counters for burst protection (would use Redis in production)
-        self.burst_counters = defaultdict(list)
-        
         # Ensure indexes
         asyncio.create_task(self._ensure_indexes())
     
@@ -102,6 +106,15 @@ class OrderPipeline:
         except Exception as e:
             logger.error(f"Error creating indexes: {e}")
     
+    @property
+    def rate_limits(self):
+        """Shared rate limit service (bot/user daily counts and burst windows)"""
+        return self._rate_limits or rate_limit_service
+    
+    def _burst_window(self) -> Window:
+        return Window(self.burst_limit_orders, self.burst_limit_window_seconds)
+    
+    @timed("order_pipeline")
     async def submit_order(
         self,
         user_id: str,
@@ -154,6 +167,7 @@ class OrderPipeline:
             "rejection_reason": None,
             "execution_summary": {}
         }
+        hold = None  # Trade counters taken by Gate C
         
         try:
             # GATE A: Idempotency Check
@@ -193,6 +207,7 @@ class OrderPipeline:
                 await self._record_rejection(idempotency_key, result)
                 return result
             result["gates_passed"].append("trade_limiter")
+            hold = gate_result["hold"]
             
             # GATE D: Circuit Breaker Check
             gate_result = await self._gate_d_circuit_breaker(
@@ -201,6 +216,7 @@ class OrderPipeline:
             if not gate_result["passed"]:
                 result["gate_failed"] = "circuit_breaker"
                 result["rejection_reason"] = gate_result["reason"]
+                await self._release_trade_counters(hold)
                 await self._record_rejection(idempotency_key, result)
                 return result
             result["gates_passed"].append("circuit_breaker")
@@ -216,18 +232,18 @@ class OrderPipeline:
                 side, amount, order_type, price, order_id, result
             )
             
-            # Increment counters
-            await self._increment_trade_counters(user_id, bot_id, exchange)
-            
             logger.info(f"Order {order_id} passed all 4 gates for bot {bot_id}")
             return result
             
         except Exception as e:
+            if hold is not None:
+                await self._release_trade_counters(hold)
             logger.error(f"Error in order pipeline: {e}")
             result["gate_failed"] = "internal_error"
             result["rejection_reason"] = f"Internal error: {str(e)}"
             return result
     
+    @timed("order_pipeline")
     async def _gate_a_idempotency(
         self, idempotency_key: str, user_id: str, bot_id: str,
         exchange: str, symbol: str, side: str, amount: float,
@@ -273,6 +289,7 @@ class OrderPipeline:
             logger.error(f"Error in idempotency gate: {e}")
             return {"passed": False, "reason": f"Idempotency check failed: {str(e)}"}
     
+    @timed("order_pipeline")
     async def _gate_b_fee_coverage(
         self, exchange: str, symbol: str, side: str,
         amount: float, order_type: str, price: Optional[float]
@@ -322,58 +339,29 @@ class OrderPipeline:
             logger.error(f"Error in fee coverage gate: {e}")
             return {"passed": False, "reason": f"Fee coverage check failed: {str(e)}"}
     
+    @timed("order_pipeline")
     async def _gate_c_trade_limiter(
         self, user_id: str, bot_id: str, exchange: str
     ) -> Dict[str, Any]:
-        """Gate C: Trade Limiter - enforce bot/user/exchange limits"""
+        """Gate C: Trade Limiter - enforce bot/user/exchange limits
+        
+        Takes the order from the bot and user daily counters and the burst
+        window in one acquire(), so concurrent workers cannot both pass on the
+        last free slot. A later rejection gives the returned hold back
+        (_release_trade_counters).
+        """
         try:
-            today = datetime.utcnow().date()
-            
-            # Check bot daily limit
-            bot_count = await self.ledger.get_trade_count(
-                bot_id=bot_id,
-                since=datetime.combine(today, datetime.min.time())
-            )
-            if bot_count >= self.max_trades_per_bot_daily:
-                return {
-                    "passed": False,
-                    "reason": f"Bot daily limit reached: {bot_count}/{self.max_trades_per_bot_daily} trades"
-                }
-            
-            # Check user daily limit
-            user_count = await self.ledger.get_trade_count(
-                user_id=user_id,
-                since=datetime.combine(today, datetime.min.time())
-            )
-            if user_count >= self.max_trades_per_user_daily:
-                return {
-                    "passed": False,
-                    "reason": f"User daily limit reached: {user_count}/{self.max_trades_per_user_daily} trades"
-                }
-            
-            # Check burst limit (rolling window)
-            burst_key = f"{exchange}:{user_id}"
-            now = datetime.utcnow()
-            window_start = now - timedelta(seconds=self.burst_limit_window_seconds)
+            allowed, reason, hold = await self.rate_limits.acquire(self._trade_rules(user_id, bot_id, exchange))
+            if not allowed:
+                return {"passed": False, "reason": reason}
             
-            # Clean old timestamps
-            self.burst_counters[burst_key] = [
-                ts for ts in self.burst_counters[burst_key]
-                if ts > window_start
-            ]
-            
-            if len(self.burst_counters[burst_key]) >= self.burst_limit_orders:
-                return {
-                    "passed": False,
-                    "reason": f"Burst limit reached: {len(self.burst_counters[burst_key])}/{self.burst_limit_orders} orders in {self.burst_limit_window_seconds}s"
-                }
-            
-            return {"passed": True}
+            return {"passed": True, "hold": hold}
             
         except Exception as e:
             logger.error(f"Error in trade limiter gate: {e}")
             return {"passed": False, "reason": f"Trade limiter check failed: {str(e)}"}
     
+    @timed("order_pipeline")
     async def _gate_d_circuit_breaker(
         self, user_id: str, bot_id: str
     ) -> Dict[str, Any]:
@@ -556,17 +544,38 @@ class OrderPipeline:
         except Exception as e:
             logger.error(f"Error recording rejection: {e}")
     
-    async def _increment_trade_counters(
-        self, user_id: str, bot_id: str, exchange: str
-    ):
-        """Increment trade counters"""
+    def _trade_rules(self, user_id: str, bot_id: str, exchange: str) -> List:
+        """(key, window, message[, seed]) rules an order consumes; daily counters seed from today's trades"""
+        return [
+            (bot_key(bot_id, scope=LIMIT_SCOPE), daily(self.max_trades_per_bot_daily),
+             "Bot daily limit reached: {count}/{limit} trades",
+             lambda: database.count_trades_today(bot_id=bot_id)),
+            (user_key(user_id, scope=LIMIT_SCOPE), daily(self.max_trades_per_user_daily),
+             "User daily limit reached: {count}/{limit} trades",
+             lambda: database.count_trades_today(user_id=user_id)),
+            (exchange_key(exchange, "user", user_id, scope=LIMIT_SCOPE), self._burst_window(),
+             f"Burst limit reached: {{count}}/{{limit}} orders in {self.burst_limit_window_seconds}s"),
+        ]
+    
+    async def daily_trade_count(self, user_id: str, bot_id: Optional[str] = None) -> int:
+        """Today's count on the counter Gate C enforces: the bot's if bot_id is given, else the user's"""
+        if bot_id:
+            return await self.rate_limits.count(
+                bot_key(bot_id, scope=LIMIT_SCOPE), daily(self.max_trades_per_bot_daily),
+                seed=lambda: database.count_trades_today(bot_id=bot_id)
+            )
+        return await self.rate_limits.count(
+            user_key(user_id, scope=LIMIT_SCOPE), daily(self.max_trades_per_user_daily),
+            seed=lambda: database.count_trades_today(user_id=user_id)
+        )
+    
+    async def _release_trade_counters(self, hold: Hold):
+        """Give back the counters Gate C took for an order that was not approved"""
         try:
-            # Add timestamp to burst counter
-            burst_key = f"{exchange}:{user_id}"
-            self.burst_counters[burst_key].append(datetime.utcnow())
+            await self.rate_limits.release_hold(hold)
             
         except Exception as e:
-            logger.error(f"Error incrementing counters: {e}")
+            logger.error(f"Error releasing counters: {e}")
     
     async def get_pending_orders(
         self, user_id: Optional[str] = None, bot_id: Optional[str] = None
@@ -676,84 +685,167 @@ class OrderPipeline:
             if not order:
                 return {"success": False, "error": "Order not found"}
             
-            # Calculate actual slippage
-            expected_price = order.get("price") or filled_price
-            slippage_bps = abs((filled_price - expected_price) / expected_price * 10000) if abs(expected_price) > 0 else 0
-            
-            # Calculate actual fee in basis points
-            notional_value = filled_price * filled_qty
-            actual_fee_bps = (actual_fee / notional_value * 10000) if notional_value > 0 else 0
-            
-            # Get expected costs from execution summary
-            execution_summary = order.get("execution_summary", {})
-            expected_fee_bps = execution_summary.get("fee_bps", 0)
-            expected_slippage_bps = execution_summary.get("slippage_bps", 0)
-            
-            # Record fill to ledger with metadata
-            metadata = {
-                "expected_price": expected_price,
+            fill, order_update, costs = self._fill_execution(order, {
+                "order_id": order_id,
                 "filled_price": filled_price,
-                "expected_fee_bps": expected_fee_bps,
-                "actual_fee_bps": actual_fee_bps,
-                "expected_slippage_bps": expected_slippage_bps,
-                "actual_slippage_bps": slippage_bps,
-                "execution_summary": execution_summary,
-                "order_type": order.get("order_type"),
-                "gates_passed": order.get("gates_passed", [])
-            }
-            
-            fill_id = await self.ledger.append_fill(
-                user_id=order["user_id"],
-                bot_id=order["bot_id"],
-                exchange=order["exchange"],
-                symbol=order["symbol"],
-                side=order["side"],
-                qty=filled_qty,
-                price=filled_price,
-                fee=actual_fee,
-                fee_currency=fee_currency,
-                timestamp=timestamp or datetime.utcnow(),
-                order_id=order_id,
-                client_order_id=order.get("idempotency_key"),
-                exchange_trade_id=exchange_trade_id,
-                is_paper=order.get("is_paper", True),
-                metadata=metadata
-            )
+                "filled_qty": filled_qty,
+                "actual_fee": actual_fee,
+                "fee_currency": fee_currency,
+                "exchange_trade_id": exchange_trade_id,
+                "timestamp": timestamp
+            })
+            fill_id = await self.ledger.append_fill(**fill)
             
             # Update order status
             await self.pending_orders.update_one(
                 {"order_id": order_id},
-                {
-                    "$set": {
-                        "state": "filled",
-                        "filled_at": timestamp or datetime.utcnow(),
-                        "fill_id": fill_id,
-                        "filled_price": filled_price,
-                        "filled_qty": filled_qty,
-                        "actual_fee": actual_fee,
-                        "actual_slippage_bps": slippage_bps,
-                        "actual_fee_bps": actual_fee_bps,
-                        "updated_at": datetime.utcnow()
-                    }
-                }
+                {"$set": {**order_update, "fill_id": fill_id}}
             )
             
             logger.info(
                 f"Recorded fill {fill_id} for order {order_id}: "
-                f"slippage={slippage_bps:.2f}bps, fee={actual_fee_bps:.2f}bps"
+                f"slippage={costs['slippage_bps']:.2f}bps, fee={costs['actual_fee_bps']:.2f}bps"
+            )
+            
+            return {"success": True, "fill_id": fill_id, **costs}
+        
+        except Exception as e:
+            logger.error(f"Error recording fill execution: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def record_fill_executions(self, executions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Record many fill executions at once (exchange backfills, replays).
+        
+        Each execution carries record_fill_execution's arguments. The orders are
+        read with one query, the fills written with one LedgerService.append_fills
+        call and the filled orders updated with one bulk_write.
+        
+        Returns:
+            {
+                "success": bool,
+                "results": [record_fill_execution result per execution, in order],
+                "inserted": int,
+                "duplicates": int  # fills already in the ledger (same idempotency key)
+            }
+        """
+        try:
+            order_ids = list({execution["order_id"] for execution in executions})
+            cursor = self.pending_orders.find({"order_id": {"$in": order_ids}})
+            orders = {order["order_id"]: order for order in await cursor.to_list(length=len(order_ids))}
+            
+            results: List[Dict[str, Any]] = [{"success": False, "error": "Order not found"}] * len(executions)
+            fills, updates, positions = [], [], []
+            for position, execution in enumerate(executions):
+                order = orders.get(execution["order_id"])
+                if order is None:
+                    continue
+                fill, order_update, costs = self._fill_execution(order, execution)
+                fills.append(fill)
+                updates.append(order_update)
+                positions.append(position)
+                results[position] = {"success": True, "fill_id": None, **costs}
+            
+            summary = await self.ledger.append_fills(fills, return_ids=True)
+            
+            operations = []
+            rejected = summary["rejected"]
+            for index, (position, order_update) in enumerate(zip(positions, updates)):
+                fill_id = summary["fill_ids"].get(index)
+                if index in rejected:
+                    results[position] = {"success": False, "error": rejected[index]}
+                    continue
+                if fill_id is not None:
+                    order_update["fill_id"] = fill_id
+                    results[position]["fill_id"] = fill_id
+                operations.append(UpdateOne({"order_id": executions[position]["order_id"]}, {"$set": order_update}))
+            if operations:
+                await self.pending_orders.bulk_write(operations, ordered=False)
+            
+            logger.info(
+                f"Recorded {summary['inserted']} fills for {len(operations)} orders "
+                f"({summary['duplicates']} already in ledger, {len(executions) - len(positions)} orders not found)"
             )
             
             return {
                 "success": True,
-                "fill_id": fill_id,
-                "slippage_bps": slippage_bps,
-                "actual_fee_bps": actual_fee_bps,
-                "total_cost_bps": slippage_bps + actual_fee_bps
+                "results": results,
+                "inserted": summary["inserted"],
+                "duplicates": summary["duplicates"]
             }
             
         except Exception as e:
-            logger.error(f"Error recording fill execution: {e}")
+            logger.error(f"Error recording fill executions: {e}")
             return {"success": False, "error": str(e)}
+    
+    def _fill_execution(self, order: Dict, execution: Dict) -> tuple:
+        """(append_fill kwargs, pending order $set, cost metrics) for one execution of an order"""
+        filled_price = execution["filled_price"]
+        filled_qty = execution["filled_qty"]
+        actual_fee = execution["actual_fee"]
+        timestamp = execution.get("timestamp") or datetime.utcnow()
+        
+        # Calculate actual slippage
+        expected_price = order.get("price") or filled_price
+        slippage_bps = abs((filled_price - expected_price) / expected_price * 10000) if abs(expected_price) > 0 else 0
+        
+        # Calculate actual fee in basis points
+        notional_value = filled_price * filled_qty
+        actual_fee_bps = (actual_fee / notional_value * 10000) if notional_value > 0 else 0
+        
+        # Get expected costs from execution summary
+        execution_summary = order.get("execution_summary", {})
+        expected_fee_bps = execution_summary.get("fee_bps", 0)
+        expected_slippage_bps = execution_summary.get("slippage_bps", 0)
+        
+        # Record fill to ledger with metadata
+        metadata = {
+            "expected_price": expected_price,
+            "filled_price": filled_price,
+            "expected_fee_bps": expected_fee_bps,
+            "actual_fee_bps": actual_fee_bps,
+            "expected_slippage_bps": expected_slippage_bps,
+            "actual_slippage_bps": slippage_bps,
+            "execution_summary": execution_summary,
+            "order_type": order.get("order_type"),
+            "gates_passed": order.get("gates_passed", [])
+        }
+        
+        fill = {
+            "user_id": order["user_id"],
+            "bot_id": order["bot_id"],
+            "exchange": order["exchange"],
+            "symbol": order["symbol"],
+            "side": order["side"],
+            "qty": filled_qty,
+            "price": filled_price,
+            "fee": actual_fee,
+            "fee_currency": execution["fee_currency"],
+            "timestamp": timestamp,
+            "order_id": order["order_id"],
+            "client_order_id": order.get("idempotency_key"),
+            "exchange_trade_id": execution.get("exchange_trade_id"),
+            "is_paper": order.get("is_paper", True),
+            "metadata": metadata
+        }
+        
+        order_update = {
+            "state": "filled",
+            "filled_at": timestamp,
+            "filled_price": filled_price,
+            "filled_qty": filled_qty,
+            "actual_fee": actual_fee,
+            "actual_slippage_bps": slippage_bps,
+            "actual_fee_bps": actual_fee_bps,
+            "updated_at": datetime.utcnow()
+        }
+        
+        costs = {
+            "slippage_bps": slippage_bps,
+            "actual_fee_bps": actual_fee_bps,
+            "total_cost_bps": slippage_bps + actual_fee_bps
+        }
+        return fill, order_update, costs
 
 
 # Singleton instance
@@ -0,0 +1,166 @@
+"""
+Keyset Pagination - (timestamp, _id) cursors, client field projection and NDJSON export
+
+Listings are read newest first with a range condition on (timestamp, _id)
+instead of skip, so a deep page costs the same as the first one and inserts
+never shift a page. The continuation token is opaque to clients: base64 of
+the last (timestamp, _id) read plus a fingerprint of the listing's scope, so
+a token is only accepted by the listing that issued it.
+
+- keyset_page: one page of a collection
+- merged_keyset_page: one page across collections (ledger fills + events);
+  the token carries each collection's own position
+- keyset_stream: every matching document, one batch in memory at a time
+- ndjson_response: StreamingResponse writing documents as NDJSON
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from bson import json_util
+from fastapi.responses import StreamingResponse
+
+PAGE_SIZE = 100
+EXPORT_BATCH_SIZE = 1000
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+class PaginationError(ValueError):
+    """Malformed or foreign cursor, or an unknown projection field"""
+
+
+def _fingerprint(scope) -> str:
+    return hashlib.sha1(json_util.dumps(scope, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def encode_cursor(position, scope) -> str:
+    raw = json_util.dumps({"p": position, "s": _fingerprint(scope)})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, scope):
+    try:
+        data = json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise PaginationError(f"invalid cursor: {e}")
+    if not isinstance(data, dict) or "p" not in data:
+        raise PaginationError("invalid cursor")
+    if data.get("s") != _fingerprint(scope):
+        raise PaginationError("cursor belongs to a different listing")
+    return data["p"]
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], sort_field: str = "timestamp") -> Optional[Dict]:
+    """"symbol,price" -> inclusion projection (None for whole documents); the sort field is always kept"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise PaginationError(f"unknown fields: {', '.join(unknown)}")
+    return {name: 1 for name in (sort_field, *requested)}
+
+
+def _after(query: Dict, position, sort_field: str) -> Dict:
+    """query restricted to documents after `position` in (sort_field, _id) descending order"""
+    if not position:
+        return query
+    timestamp, last_id = position
+    return {"$and": [query, {"$or": [
+        {sort_field: {"$lt": timestamp}},
+        {sort_field: timestamp, "_id": {"$lt": last_id}}
+    ]}]}
+
+
+async def _fetch(collection, query: Dict, position, n: int, projection: Optional[Dict], sort_field: str) -> List[Dict]:
+    cursor = collection.find(_after(query, position, sort_field), projection)
+    return await cursor.sort([(sort_field, -1), ("_id", -1)]).limit(n).to_list(n)
+
+
+def _position(doc: Dict, sort_field: str) -> List:
+    return [doc.get(sort_field), doc["_id"]]
+
+
+async def keyset_page(collection, query: Dict, limit: int = PAGE_SIZE, cursor: Optional[str] = None,
+                      projection: Optional[Dict] = None, scope=None,
+                      sort_field: str = "timestamp") -> Tuple[List[Dict], Optional[str]]:
+    """
+    (documents, next_cursor) newest first; next_cursor is None on the last page
+
+    scope identifies the listing for cursor checks (defaults to the query; pass
+    the request parameters when the query holds a moving "now").
+    """
+    scope = query if scope is None else scope
+    position = decode_cursor(cursor, scope) if cursor else None
+    docs = await _fetch(collection, query, position, limit + 1, projection, sort_field)
+    next_cursor = encode_cursor(_position(docs[limit - 1], sort_field), scope) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+async def merged_keyset_page(sources: Dict[str, Tuple], limit: int = PAGE_SIZE, cursor: Optional[str] = None,
+                             scope=None, sort_field: str = "timestamp") -> Tuple[List[Tuple[str, Dict]], Optional[str]]:
+    """
+    One newest-first page across collections: sources maps a name to
+    (collection, query, projection). Returns ([(name, document)], next_cursor).
+    """
+    positions = decode_cursor(cursor, scope) if cursor else {}
+    fetched = await asyncio.gather(*(
+        _fetch(collection, query, positions.get(name), limit + 1, projection, sort_field)
+        for name, (collection, query, projection) in sources.items()
+    ))
+
+    tagged = [[(doc.get(sort_field), name, doc["_id"], doc) for doc in docs] for name, docs in zip(sources, fetched)]
+    page = [(name, doc) for _, name, _, doc in heapq.merge(*tagged, key=lambda t: t[:3], reverse=True)][:limit]
+    if sum(len(docs) for docs in fetched) <= limit:
+        return page, None
+
+    positions = dict(positions)
+    for name, doc in page:
+        positions[name] = _position(doc, sort_field)
+    return page, encode_cursor(positions, scope)
+
+
+async def keyset_stream(collection, query: Dict, projection: Optional[Dict] = None,
+                        batch_size: int = EXPORT_BATCH_SIZE, sort_field: str = "timestamp") -> AsyncIterator[Dict]:
+    """Every matching document newest first, read one keyset batch at a time"""
+    position = None
+    while True:
+        docs = await _fetch(collection, query, position, batch_size, projection, sort_field)
+        for doc in docs:
+            yield doc
+        if len(docs) < batch_size:
+            return
+        position = _position(docs[-1], sort_field)
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+async def ndjson_lines(docs: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    """Documents as NDJSON (datetimes ISO 8601, ObjectIds as strings), in ~64KB chunks"""
+    chunk = []
+    size = 0
+    async for doc in docs:
+        line = json.dumps(doc, default=_json_default).encode() + b"\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_BYTES:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def ndjson_response(docs: AsyncIterator[Dict], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        ndjson_lines(docs),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
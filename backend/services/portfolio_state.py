@@ -0,0 +1,362 @@
+"""
+Portfolio State - per-user portfolio read model served from memory
+
+Holds, per user: bot counts by status and trading mode, capital totals,
+24h realized PnL and exposure. Replaces the "load up to 1,000 bots and sum
+them" code paths (dashboard overview, SSE overview, AI chat / ChatOps context,
+portfolio tool, autopilot profit).
+
+- Loaded from bots_collection / trades_collection on first read
+- Kept current incrementally from bot and trade writes (database.WatchedCollection
+  reports completed writes; simple $set/$inc/insert/delete writes are applied
+  to the cached bots, anything else marks the user dirty)
+- Recomputed on the next read when dirty or older than PORTFOLIO_STATE_TTL
+  seconds, which also covers writes made outside the watched collections
+"""
+
+import asyncio
+import bisect
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_STATE_TTL = float(os.getenv('PORTFOLIO_STATE_TTL', '30'))
+
+PNL_WINDOW = timedelta(hours=24)
+
+# Bot fields the read model keeps
+BOT_FIELDS = (
+    "id", "user_id", "name", "status", "trading_mode", "exchange", "risk_mode",
+    "current_capital", "initial_capital", "total_injections", "total_profit"
+)
+BOT_PROJECTION = {"_id": 0, **{field: 1 for field in BOT_FIELDS}}
+
+# Update operators applied in place; any other operator marks the user dirty
+APPLIED_OPERATORS = {"$set", "$inc", "$unset"}
+
+ALL_USERS = None  # "which users does this write touch?" -> unknown
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+
+
+def _bot_summary(doc: Dict) -> Dict:
+    return {field: doc[field] for field in BOT_FIELDS if field in doc}
+
+
+def _is_simple_filter(query: Dict) -> bool:
+    """Equality-only filter on fields the read model holds"""
+    return all(
+        key in BOT_FIELDS and not isinstance(value, (dict, list))
+        for key, value in query.items()
+    )
+
+
+def _trade_time(doc: Dict) -> float:
+    return db.trade_ts(doc.get('ts') or doc.get('timestamp')).timestamp()
+
+
+class UserPortfolio:
+    """One user's cached bots, running totals and 24h trade PnL"""
+
+    def __init__(self, user_id: str, bots: Iterable[Dict], trades: Iterable[Dict]):
+        self.user_id = user_id
+        self.bots: Dict[str, Dict] = {}
+        self.status_counts: Counter = Counter()
+        self.active_modes: Counter = Counter()
+        self.totals: Dict[str, float] = defaultdict(float)
+        for bot in bots:
+            self.add_bot(bot)
+
+        # 24h window of (epoch seconds, profit_loss), sorted by time
+        self.trade_times: List[float] = []
+        self.trade_pnl: List[float] = []
+        for trade in trades:
+            self.add_trade(trade)
+
+        self.loaded_at = time.monotonic()
+        self.updated_at = datetime.now(timezone.utc)
+        self.dirty = False
+
+    # ------------------------------------------------------------------
+    # Bots
+    # ------------------------------------------------------------------
+
+    def _contribute(self, bot: Dict, sign: int):
+        status = bot.get('status')
+        self.status_counts[status] += sign
+        self.totals['capital'] += sign * _number(bot.get('current_capital'))
+        self.totals['bot_profit'] += sign * _number(bot.get('total_profit'))
+        if status == 'active':
+            self.active_modes[bot.get('trading_mode')] += sign
+            self.totals['active_capital'] += sign * _number(bot.get('current_capital'))
+            self.totals['active_initial'] += sign * _number(bot.get('initial_capital'))
+            self.totals['active_injections'] += sign * _number(bot.get('total_injections'))
+
+    def add_bot(self, doc: Dict):
+        bot = _bot_summary(doc)
+        if bot.get('id') in self.bots:
+            self.remove_bot(bot['id'])
+        self.bots[bot.get('id')] = bot
+        self._contribute(bot, 1)
+        self.updated_at = datetime.now(timezone.utc)
+
+    def remove_bot(self, bot_id: str):
+        bot = self.bots.pop(bot_id, None)
+        if bot is not None:
+            self._contribute(bot, -1)
+            self.updated_at = datetime.now(timezone.utc)
+
+    def update_bot(self, bot_id: str, update: Dict):
+        bot = dict(self.bots[bot_id])
+        for field, value in update.get('$set', {}).items():
+            if field in BOT_FIELDS:
+                bot[field] = value
+        for field, value in update.get('$inc', {}).items():
+            if field in BOT_FIELDS:
+                bot[field] = _number(bot.get(field)) + _number(value)
+        for field in update.get('$unset', {}):
+            bot.pop(field, None)
+        self.add_bot(bot)
+
+    def matching(self, query: Dict) -> List[str]:
+        return [
+            bot_id for bot_id, bot in self.bots.items()
+            if all(bot.get(key) == value for key, value in query.items() if key != 'user_id')
+        ]
+
+    # ------------------------------------------------------------------
+    # Trades
+    # ------------------------------------------------------------------
+
+    def add_trade(self, doc: Dict):
+        when = _trade_time(doc)
+        if when < time.time() - PNL_WINDOW.total_seconds():
+            return
+        i = bisect.bisect_right(self.trade_times, when)
+        self.trade_times.insert(i, when)
+        self.trade_pnl.insert(i, _number(doc.get('profit_loss')))
+        self.updated_at = datetime.now(timezone.utc)
+
+    def _expire_trades(self):
+        cutoff = time.time() - PNL_WINDOW.total_seconds()
+        i = bisect.bisect_left(self.trade_times, cutoff)
+        if i:
+            del self.trade_times[:i]
+            del self.trade_pnl[:i]
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        self._expire_trades()
+        active_capital = self.totals['active_capital']
+        active_initial = self.totals['active_initial']
+        active_injections = self.totals['active_injections']
+        return {
+            "user_id": self.user_id,
+            "bots": {
+                "total": len(self.bots),
+                "active": self.status_counts['active'],
+                "paused": self.status_counts['paused'],
+                "stopped": self.status_counts['stopped'],
+                "by_status": {status: count for status, count in self.status_counts.items() if count > 0},
+                "active_paper": self.active_modes['paper'],
+                "active_live": self.active_modes['live']
+            },
+            "capital": {
+                "total": self.totals['capital'],
+                "total_profit": self.totals['bot_profit'],
+                "active": active_capital,
+                "active_initial": active_initial,
+                "active_injections": active_injections,
+                # Real profit excludes capital injections
+                "net_profit": active_capital - active_initial - active_injections
+            },
+            "pnl_24h": sum(self.trade_pnl),
+            "trades_24h": len(self.trade_pnl),
+            "exposure": (active_capital / (active_capital + 1000)) * 100 if active_capital > 0 else 0,
+            "updated_at": self.updated_at.isoformat()
+        }
+
+
+class PortfolioStateService:
+    """Per-user portfolio snapshots, kept current from bot and trade writes"""
+
+    def __init__(self, ttl: float = PORTFOLIO_STATE_TTL):
+        self.ttl = ttl
+        self.users: Dict[str, UserPortfolio] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Writes seen while a user's state is loading; checked once it is installed
+        self._loading: Dict[str, List[Tuple[str, str, tuple, Dict]]] = {}
+        self.stats = Counter()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _fresh(self, state: Optional[UserPortfolio]) -> bool:
+        return state is not None and not state.dirty and time.monotonic() - state.loaded_at < self.ttl
+
+    async def _state(self, user_id: str) -> UserPortfolio:
+        state = self.users.get(user_id)
+        if self._fresh(state):
+            self.stats['hits'] += 1
+            return state
+
+        async with self._locks[user_id]:
+            state = self.users.get(user_id)
+            if self._fresh(state):
+                self.stats['hits'] += 1
+                return state
+            return await self._load(user_id)
+
+    async def _load(self, user_id: str) -> UserPortfolio:
+        self.stats['loads'] += 1
+        self._loading[user_id] = []
+        try:
+            bots, trades = await asyncio.gather(
+                db.bots_collection.find({"user_id": user_id}, BOT_PROJECTION).to_list(None),
+                db.trades_collection.find(
+                    {"user_id": user_id, **db.trades_since(datetime.now(timezone.utc) - PNL_WINDOW)},
+                    {"_id": 0, "profit_loss": 1, "timestamp": 1, "ts": 1}
+                ).to_list(None)
+            )
+            state = UserPortfolio(user_id, bots, trades)
+        finally:
+            pending = self._loading.pop(user_id, [])
+
+        # A write that raced the load may or may not be in what was read
+        if any(self._touches(state, *event) for event in pending):
+            state.dirty = True
+        self.users[user_id] = state
+        return state
+
+    async def get(self, user_id: str) -> Dict:
+        """Current portfolio snapshot for a user"""
+        return (await self._state(user_id)).snapshot()
+
+    async def bots(self, user_id: str) -> List[Dict]:
+        """The user's bots (BOT_FIELDS only)"""
+        state = await self._state(user_id)
+        return [dict(bot) for bot in state.bots.values()]
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Recompute a user's state (or everyone's) on the next read"""
+        for uid, state in self.users.items():
+            if user_id is None or uid == user_id:
+                state.dirty = True
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def on_write(self, collection: str, method: str, args: tuple, kwargs: Dict):
+        """database write listener for the bots and trades collections"""
+        if collection not in ("bots", "trades"):
+            return
+        self.stats['writes'] += 1
+        for events in self._loading.values():
+            events.append((collection, method, args, kwargs))
+
+        for op, params in db.write_operations(method, args, kwargs):
+            if collection == "bots":
+                self._apply_bot_write(op, params)
+            else:
+                self._apply_trade_write(op, params)
+
+    def _owners(self, query) -> Optional[Set[str]]:
+        """Users a bot filter can touch, or ALL_USERS if that is not known"""
+        if not isinstance(query, dict):
+            return ALL_USERS
+        if isinstance(query.get('user_id'), str):
+            return {query['user_id']}
+        if isinstance(query.get('id'), str):
+            owners = {uid for uid, state in self.users.items() if query['id'] in state.bots}
+            return owners or ALL_USERS
+        return ALL_USERS
+
+    def _mark_dirty(self, owners: Optional[Set[str]]):
+        self.stats['dirty'] += 1
+        for uid, state in self.users.items():
+            if owners is ALL_USERS or uid in owners:
+                state.dirty = True
+
+    def _apply_bot_write(self, op: str, params: Dict):
+        doc = params.get('doc')
+        if op == "insert_one":
+            state = self.users.get(doc.get('user_id')) if isinstance(doc, dict) else None
+            if state is not None:
+                state.add_bot(doc)
+            return
+
+        query = params.get('filter')
+        owners = self._owners(query)
+        states = [s for uid, s in self.users.items() if owners is ALL_USERS or uid in owners]
+        if not states:
+            return
+
+        if params.get('upsert') or not isinstance(query, dict) or not _is_simple_filter(query):
+            return self._mark_dirty(owners)
+
+        single = op in ("update_one", "replace_one", "delete_one", "find_one_and_update",
+                        "find_one_and_replace", "find_one_and_delete")
+        matches = [(state, bot_id) for state in states for bot_id in state.matching(query)]
+        if single and len(matches) > 1:
+            return self._mark_dirty(owners)
+
+        if op.startswith("delete") or op == "find_one_and_delete":
+            for state, bot_id in matches:
+                state.remove_bot(bot_id)
+        elif op in ("replace_one", "find_one_and_replace"):
+            for state, bot_id in matches:
+                state.remove_bot(bot_id)
+                state.add_bot({**doc, "id": bot_id, "user_id": state.user_id})
+        elif isinstance(doc, dict) and set(doc) <= APPLIED_OPERATORS:
+            for state, bot_id in matches:
+                state.update_bot(bot_id, doc)
+        else:
+            self._mark_dirty(owners)
+
+    def _apply_trade_write(self, op: str, params: Dict):
+        if op == "insert_one":
+            doc = params.get('doc')
+            state = self.users.get(doc.get('user_id')) if isinstance(doc, dict) else None
+            if state is not None:
+                state.add_trade(doc)
+            return
+
+        # Trade updates / deletes are rare (admin resets); just reload
+        query = params.get('filter')
+        user_id = query.get('user_id') if isinstance(query, dict) else None
+        self._mark_dirty({user_id} if isinstance(user_id, str) else ALL_USERS)
+
+    def _touches(self, state: UserPortfolio, collection: str, method: str, args: tuple, kwargs: Dict) -> bool:
+        for op, params in db.write_operations(method, args, kwargs):
+            doc, query = params.get('doc'), params.get('filter')
+            if op == "insert_one":
+                if isinstance(doc, dict) and doc.get('user_id') == state.user_id:
+                    return True
+                continue
+            if not isinstance(query, dict):
+                return True
+            if isinstance(query.get('user_id'), str):
+                if query['user_id'] == state.user_id:
+                    return True
+            elif not isinstance(query.get('id'), str) or collection == "trades" or query['id'] in state.bots:
+                return True
+        return False
+
+
+# Global instance
+portfolio_state = PortfolioStateService()
+db.add_write_listener(portfolio_state.on_write)
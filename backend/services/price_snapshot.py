@@ -0,0 +1,256 @@
+"""
+Price Snapshot Service - live prices for the dashboard endpoints, served from memory
+
+One background loop refreshes every configured pair with a single bulk
+fetch_tickers call per exchange every PRICE_SNAPSHOT_INTERVAL seconds
+(per-pair fetch_ticker only where the exchange has no fetchTickers).
+/api/prices/live and /api/sse/live-prices read the latest snapshot instead
+of calling the exchange per request / per connection.
+
+- Snapshots are immutable (read-only mappings) and carry a version that is
+  bumped only when a price or 24h change moves
+- 24h change comes from the ticker (percentage, or last vs open); exchanges
+  whose tickers carry neither (Luno) use the open of the hourly candle from
+  24h ago, fetched once an hour per pair
+- SSE clients get the full snapshot once, then only the pairs that changed
+- The loop starts on first read and is stopped from the server shutdown
+
+PRICE_SNAPSHOT_PAIRS: "exchange:PAIR,PAIR;exchange:PAIR" (default luno:BTC/ZAR,ETH/ZAR,XRP/ZAR)
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRICE_SNAPSHOT_INTERVAL = float(os.getenv('PRICE_SNAPSHOT_INTERVAL', '5'))
+PRICE_SNAPSHOT_PAIRS = os.getenv('PRICE_SNAPSHOT_PAIRS', 'luno:BTC/ZAR,ETH/ZAR,XRP/ZAR')
+
+REFERENCE_TTL = 3600  # seconds an hourly 24h-ago open is reused
+FIRST_READ_TIMEOUT = 10.0  # seconds a read waits for the first refresh
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def parse_pairs(spec: str) -> Dict[str, List[str]]:
+    """"luno:BTC/ZAR,ETH/ZAR;binance:BTC/USDT" -> {"luno": [...], "binance": [...]}"""
+    pairs: Dict[str, List[str]] = {}
+    for part in spec.split(';'):
+        if ':' not in part:
+            continue
+        exchange, symbols = part.split(':', 1)
+        symbols = [s.strip() for s in symbols.split(',') if s.strip()]
+        if exchange.strip() and symbols:
+            pairs.setdefault(exchange.strip().lower(), []).extend(symbols)
+    return pairs
+
+
+def ticker_change_pct(ticker: Dict, reference_open: Optional[float] = None) -> Optional[float]:
+    """24h % change from ticker fields; reference_open stands in for a missing open"""
+    if ticker.get('percentage') is not None:
+        return float(ticker['percentage'])
+    last = ticker.get('last') or ticker.get('close')
+    if not last:
+        return None
+    open_price = ticker.get('open') or reference_open
+    if open_price:
+        return (last - open_price) / open_price * 100
+    change = ticker.get('change')
+    if change is not None and last != change:
+        return change / (last - change) * 100
+    return None
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """Prices at one refresh; never mutated once published"""
+    version: int
+    taken_at: str
+    prices: Mapping[str, Mapping]  # pair -> {"price", "change", "exchange", "timestamp"}
+
+    def summary(self, pairs: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """{pair: {"price", "change"}} (zeros for pairs without a price yet)"""
+        pairs = pairs if pairs is not None else list(self.prices)
+        return {
+            pair: {"price": self.prices[pair]["price"], "change": self.prices[pair]["change"]}
+            if pair in self.prices else {"price": 0, "change": 0}
+            for pair in pairs
+        }
+
+    def changes_since(self, previous: Optional["PriceSnapshot"]) -> Dict[str, Mapping]:
+        """Pairs whose price or change differs from `previous` (everything if None)"""
+        if previous is None:
+            return dict(self.prices)
+        return {
+            pair: record for pair, record in self.prices.items()
+            if pair not in previous.prices
+            or (previous.prices[pair]["price"], previous.prices[pair]["change"]) != (record["price"], record["change"])
+        }
+
+
+EMPTY_SNAPSHOT = PriceSnapshot(version=0, taken_at="", prices=MappingProxyType({}))
+
+
+async def paper_engine_exchange(name: str):
+    """Public exchange client shared with the paper trading engine"""
+    from paper_trading_engine import paper_engine
+    exchange = getattr(paper_engine, f"{name}_exchange", None)
+    if exchange is None:
+        await paper_engine.init_exchanges()
+        exchange = getattr(paper_engine, f"{name}_exchange", None)
+    return exchange
+
+
+class PriceSnapshotService:
+    """Refreshes configured pairs on a fixed cadence and hands out immutable snapshots"""
+
+    def __init__(self, pairs: Optional[Dict[str, List[str]]] = None, interval: float = PRICE_SNAPSHOT_INTERVAL,
+                 exchange_provider: Callable[[str], Awaitable] = paper_engine_exchange,
+                 clock: Callable[[], float] = time.time):
+        self.pairs = pairs if pairs is not None else parse_pairs(PRICE_SNAPSHOT_PAIRS)
+        self.interval = interval
+        self.exchange_provider = exchange_provider
+        self.clock = clock
+        self.snapshot = EMPTY_SNAPSHOT
+        self._references: Dict[Tuple[str, str], Tuple[float, Optional[float]]] = {}
+        self._updated = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = Counter()
+
+    @property
+    def symbols(self) -> List[str]:
+        return [pair for pairs in self.pairs.values() for pair in pairs]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get(self) -> PriceSnapshot:
+        """Latest snapshot; the first read starts the loop and waits for one refresh"""
+        if self.snapshot.version == 0:
+            return await self.wait_for_update(0, FIRST_READ_TIMEOUT)
+        return self.snapshot
+
+    async def wait_for_update(self, version: int, timeout: float) -> PriceSnapshot:
+        """The first snapshot newer than `version`, or the current one after `timeout` seconds"""
+        self.start()
+        if self.snapshot.version <= version:
+            try:
+                await asyncio.wait_for(self._updated.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.snapshot
+
+    # ------------------------------------------------------------------
+    # Refresh loop
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Price snapshots refreshing every {self.interval}s: {self.pairs}")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Price snapshot refresh error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> PriceSnapshot:
+        """Fetch every exchange's pairs (one bulk call each) and publish if anything moved"""
+        results = await asyncio.gather(
+            *(self._fetch_exchange(name, pairs) for name, pairs in self.pairs.items()),
+            return_exceptions=True
+        )
+        taken_at = datetime.now(timezone.utc).isoformat()
+        prices = dict(self.snapshot.prices)  # pairs that failed keep their last price
+        for name, result in zip(self.pairs, results):
+            if isinstance(result, Exception):
+                self.stats['errors'] += 1
+                logger.warning(f"Price snapshot: {name} tickers failed: {result}")
+                continue
+            for pair, (price, change) in result.items():
+                prices[pair] = MappingProxyType({
+                    "price": round(price, 2),
+                    "change": round(change, 2) if change is not None else 0.0,
+                    "exchange": name,
+                    "timestamp": taken_at
+                })
+
+        candidate = PriceSnapshot(self.snapshot.version + 1, taken_at, MappingProxyType(prices))
+        self.stats['refreshes'] += 1
+        if self.snapshot.version == 0 or candidate.changes_since(self.snapshot):
+            self._publish(candidate)
+        return self.snapshot
+
+    def _publish(self, snapshot: PriceSnapshot):
+        self.snapshot = snapshot
+        self.stats['versions'] += 1
+        # Wake everyone waiting on the previous version
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    async def _fetch_exchange(self, name: str, pairs: List[str]) -> Dict[str, Tuple[float, Optional[float]]]:
+        exchange = await self.exchange_provider(name)
+        if exchange is None:
+            raise RuntimeError(f"exchange {name} unavailable")
+
+        if exchange.has.get('fetchTickers'):
+            tickers = await exchange.fetch_tickers(pairs)
+            self.stats['bulk_calls'] += 1
+        else:
+            fetched = await asyncio.gather(*(exchange.fetch_ticker(pair) for pair in pairs), return_exceptions=True)
+            tickers = {pair: t for pair, t in zip(pairs, fetched) if not isinstance(t, Exception)}
+            self.stats['ticker_calls'] += len(pairs)
+
+        result = {}
+        for pair in pairs:
+            ticker = tickers.get(pair) or {}
+            price = ticker.get('last') or ticker.get('close')
+            if not price:
+                continue
+            change = ticker_change_pct(ticker)
+            if change is None:
+                change = ticker_change_pct(ticker, await self._reference_open(exchange, name, pair))
+            result[pair] = (float(price), change)
+        return result
+
+    async def _reference_open(self, exchange, name: str, pair: str) -> Optional[float]:
+        """Open of the hourly candle 24h ago, for tickers without open/percentage"""
+        now = self.clock()
+        cached = self._references.get((name, pair))
+        if cached is not None and now - cached[0] < REFERENCE_TTL:
+            return cached[1]
+
+        reference = None
+        if exchange.has.get('fetchOHLCV'):
+            try:
+                candles = await exchange.fetch_ohlcv(pair, '1h', since=int(now * 1000) - DAY_MS, limit=1)
+                self.stats['reference_calls'] += 1
+                if candles:
+                    reference = float(candles[0][1])
+            except Exception as e:
+                logger.debug(f"Price snapshot: 24h reference for {pair} on {name}: {e}")
+        self._references[(name, pair)] = (now, reference)
+        return reference
+
+
+# Global instance
+price_snapshots = PriceSnapshotService()
@@ -0,0 +1,458 @@
+"""
+Rate Limit Service - Shared limiter for exchange, bot and user limits
+
+One limiter for every trading guard (RateLimiter, TradeLimiter,
+TradeBudgetManager and the OrderPipeline trade-limit gate) so that limits
+hold across uvicorn workers:
+- Window limits: fixed windows (daily budgets, aligned to UTC midnight) and
+  sliding windows (burst / per-minute), stored as O(1) bucket counters
+- Token buckets: smooth request-rate limiting with refill
+- Backends: MongoDB (atomic, shared across workers) or in-memory stand-in
+- In-process fast path: keys known to be exhausted are denied locally until
+  their window frees up, without a round trip to the shared backend
+
+Keys are built with exchange_key(), bot_key() and user_key(). Each guard
+passes its own scope, so its counters are shared across workers but never
+with another guard enforcing a different limit on the same entity. Guards
+consume with hit() / acquire() so a limit can never be overshot between a
+check and a record; a Hold remembers the buckets it took so release_hold()
+gives back exactly those. Cold daily trade counters are all seeded from
+database.count_trades_today().
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from pymongo import ReturnDocument
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+BLOCK_PRUNE_SECONDS = 60  # How often expired fast-path entries are dropped
+
+
+@dataclass(frozen=True)
+class Window:
+    """Window limit: at most `limit` hits per `seconds`
+
+    sliding=False gives a fixed window aligned to the epoch, so a daily
+    window (86400s) resets at UTC midnight. sliding=True weights the previous
+    bucket by its remaining overlap (sliding-window counter).
+    """
+    limit: int
+    seconds: int
+    sliding: bool = True
+
+
+@dataclass(frozen=True)
+class TokenBucket:
+    """Token bucket: bursts up to `capacity`, refills at `refill_per_second`"""
+    capacity: float
+    refill_per_second: float
+
+
+@dataclass
+class Hold:
+    """Hits taken by acquire(): (key, window, bucket) per rule, for release_hold()"""
+    hits: List[Tuple[str, Window, int]]
+    amount: int = 1
+
+
+def daily(limit: int) -> Window:
+    """Fixed UTC-day window"""
+    return Window(limit=int(limit), seconds=DAY_SECONDS, sliding=False)
+
+
+def _scoped(scope: Optional[str], parts: List[str]) -> str:
+    key = ":".join(parts)
+    return f"{scope}/{key}" if scope else key
+
+
+def exchange_key(exchange: str, *parts: str, scope: Optional[str] = None) -> str:
+    return _scoped(scope, ["exchange", (exchange or "").lower(), *map(str, parts)])
+
+
+def bot_key(bot_id: str, *parts: str, scope: Optional[str] = None) -> str:
+    return _scoped(scope, ["bot", str(bot_id), *map(str, parts)])
+
+
+def user_key(user_id: str, *parts: str, scope: Optional[str] = None) -> str:
+    return _scoped(scope, ["user", str(user_id), *map(str, parts)])
+
+
+# ============================================================================
+# Backends
+# ============================================================================
+
+class InMemoryRateLimitBackend:
+    """Process-local backend (single worker, tests, fallback without Mongo)
+
+    Operations never await, so each call is atomic on the event loop.
+    """
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, int], Dict[int, int]] = {}
+        self._tokens: Dict[str, Tuple[float, float]] = {}
+
+    async def get_counts(self, key: str, seconds: int, buckets: Iterable[int]) -> Dict[int, int]:
+        stored = self._counters.get((key, seconds), {})
+        return {b: stored[b] for b in buckets if b in stored}
+
+    async def incr(self, key: str, seconds: int, bucket: int, amount: int = 1) -> int:
+        stored = self._counters.setdefault((key, seconds), {})
+        # Only the current and previous buckets are ever read
+        for old in [b for b in stored if b < bucket - 1]:
+            del stored[old]
+        stored[bucket] = stored.get(bucket, 0) + amount
+        return stored[bucket]
+
+    async def seed(self, key: str, seconds: int, bucket: int, count: int) -> int:
+        stored = self._counters.setdefault((key, seconds), {})
+        return stored.setdefault(bucket, int(count))
+
+    async def take_tokens(
+        self, key: str, capacity: float, refill_per_second: float, cost: float, now: float
+    ) -> Tuple[bool, float]:
+        tokens, updated = self._tokens.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - updated) * refill_per_second)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._tokens[key] = (tokens, now)
+        return allowed, tokens
+
+
+class MongoRateLimitBackend:
+    """Shared backend on a MongoDB collection
+
+    Each window bucket is one document updated with atomic $inc, so a check
+    costs one indexed read regardless of traffic. Token buckets use a
+    pipeline update so refill and take happen in a single atomic write.
+    Expired buckets are removed by a TTL index on expires_at.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        try:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        except Exception as e:
+            logger.warning(f"Rate limit index creation warning: {e}")
+
+    @staticmethod
+    def _doc_id(key: str, seconds: int, bucket: int) -> str:
+        return f"{key}|{seconds}|{bucket}"
+
+    @staticmethod
+    def _expires_at(seconds: int, bucket: int):
+        # Keep one extra window so the bucket can still serve as "previous"
+        return datetime.fromtimestamp((bucket + 2) * seconds, tz=timezone.utc)
+
+    async def get_counts(self, key: str, seconds: int, buckets: Iterable[int]) -> Dict[int, int]:
+        ids = {self._doc_id(key, seconds, b): b for b in buckets}
+        counts = {}
+        async for doc in self.collection.find({"_id": {"$in": list(ids)}}, {"count": 1}):
+            counts[ids[doc["_id"]]] = int(doc.get("count", 0))
+        return counts
+
+    async def incr(self, key: str, seconds: int, bucket: int, amount: int = 1) -> int:
+        doc = await self.collection.find_one_and_update(
+            {"_id": self._doc_id(key, seconds, bucket)},
+            {
+                "$inc": {"count": amount},
+                "$setOnInsert": {"key": key, "expires_at": self._expires_at(seconds, bucket)}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return int(doc.get("count", 0))
+
+    async def seed(self, key: str, seconds: int, bucket: int, count: int) -> int:
+        doc = await self.collection.find_one_and_update(
+            {"_id": self._doc_id(key, seconds, bucket)},
+            {
+                "$setOnInsert": {
+                    "key": key,
+                    "count": int(count),
+                    "expires_at": self._expires_at(seconds, bucket)
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return int(doc.get("count", 0))
+
+    async def take_tokens(
+        self, key: str, capacity: float, refill_per_second: float, cost: float, now: float
+    ) -> Tuple[bool, float]:
+        refilled = {
+            "$min": [
+                capacity,
+                {"$add": [
+                    {"$ifNull": ["$tokens", capacity]},
+                    {"$multiply": [
+                        {"$max": [0, {"$subtract": [now, {"$ifNull": ["$ts", now]}]}]},
+                        refill_per_second
+                    ]}
+                ]}
+            ]
+        }
+        full_after = capacity / refill_per_second if refill_per_second > 0 else DAY_SECONDS
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{key}|tokens"},
+            [
+                {"$set": {"available": refilled}},
+                {"$set": {"allowed": {"$gte": ["$available", cost]}}},
+                {"$set": {
+                    "key": key,
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$available", cost]}, "$available"]},
+                    "ts": now,
+                    "expires_at": datetime.fromtimestamp(now + full_after, tz=timezone.utc)
+                }},
+                {"$unset": "available"}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return bool(doc.get("allowed")), float(doc.get("tokens", 0.0))
+
+
+# ============================================================================
+# Service
+# ============================================================================
+
+class RateLimitService:
+    """Window and token-bucket limits over a pluggable backend"""
+
+    def __init__(self, backend=None, clock: Callable[[], float] = time.time):
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.clock = clock
+        # In-process fast path: key -> epoch seconds until which it is exhausted
+        self._blocked_until: Dict[Tuple[str, int, int], float] = {}
+        self._next_prune = 0.0
+
+    def use_backend(self, backend):
+        """Swap the storage backend (e.g. to Mongo once the DB is connected)"""
+        self.backend = backend
+        self._blocked_until.clear()
+
+    # ------------------------------------------------------------------
+    # Window limits
+    # ------------------------------------------------------------------
+
+    def _estimate(self, window: Window, counts: Dict[int, int], bucket: int, now: float) -> float:
+        current = counts.get(bucket, 0)
+        if not window.sliding:
+            return current
+        elapsed = (now - bucket * window.seconds) / window.seconds
+        return current + counts.get(bucket - 1, 0) * max(0.0, 1.0 - elapsed)
+
+    def _retry_at(self, window: Window, counts: Dict[int, int], bucket: int) -> float:
+        """Earliest time the window can admit another hit (ignoring new hits)"""
+        bucket_end = (bucket + 1) * window.seconds
+        current = counts.get(bucket, 0)
+        previous = counts.get(bucket - 1, 0)
+        if not window.sliding or current >= window.limit or previous <= 0:
+            return bucket_end
+        fraction = 1.0 - (window.limit - current) / previous
+        return bucket * window.seconds + window.seconds * fraction
+
+    def _block(self, blocked_key: Tuple[str, int, int], until: float, now: float):
+        """Deny blocked_key locally until `until`; expired entries are dropped once a minute"""
+        if now >= self._next_prune:
+            for expired in [k for k, t in self._blocked_until.items() if t <= now]:
+                del self._blocked_until[expired]
+            self._next_prune = now + BLOCK_PRUNE_SECONDS
+        self._blocked_until[blocked_key] = until
+
+    def _fast_denied(self, key: str, window: Window, now: float) -> bool:
+        blocked_key = (key, window.seconds, window.limit)
+        until = self._blocked_until.get(blocked_key)
+        if until is None:
+            return False
+        if now < until:
+            return True
+        del self._blocked_until[blocked_key]
+        return False
+
+    async def count(
+        self,
+        key: str,
+        window: Window,
+        seed: Optional[Callable[[], Awaitable[int]]] = None
+    ) -> int:
+        """Current hits in the window
+
+        If the current bucket does not exist yet and `seed` is given, it is
+        called once to load the count from the source of truth (e.g. a
+        trades query after a deploy) and stored without overwriting hits
+        another worker may have recorded meanwhile.
+        """
+        now = self.clock()
+        bucket = int(now // window.seconds)
+        counts = await self.backend.get_counts(key, window.seconds, (bucket, bucket - 1))
+        if bucket not in counts and seed is not None:
+            counts[bucket] = await self.backend.seed(key, window.seconds, bucket, int(await seed()))
+        return int(math.ceil(self._estimate(window, counts, bucket, now) - 1e-9))
+
+    async def check(
+        self,
+        key: str,
+        window: Window,
+        seed: Optional[Callable[[], Awaitable[int]]] = None
+    ) -> Tuple[bool, int]:
+        """Check a window limit without consuming it: (allowed, current_count)"""
+        now = self.clock()
+        if self._fast_denied(key, window, now):
+            return False, window.limit
+        bucket = int(now // window.seconds)
+        counts = await self.backend.get_counts(key, window.seconds, (bucket, bucket - 1))
+        if bucket not in counts and seed is not None:
+            counts[bucket] = await self.backend.seed(key, window.seconds, bucket, int(await seed()))
+        current = int(math.ceil(self._estimate(window, counts, bucket, now) - 1e-9))
+        if current >= window.limit:
+            self._block((key, window.seconds, window.limit), self._retry_at(window, counts, bucket), now)
+            return False, current
+        return True, current
+
+    async def record(self, key: str, window: Window, amount: int = 1) -> int:
+        """Record hits against a window (after the guarded action happened)"""
+        bucket = int(self.clock() // window.seconds)
+        return await self.backend.incr(key, window.seconds, bucket, amount)
+
+    async def hit(
+        self,
+        key: str,
+        window: Window,
+        amount: int = 1,
+        seed: Optional[Callable[[], Awaitable[int]]] = None
+    ) -> Tuple[bool, int]:
+        """Atomically consume from a window limit: (allowed, count)
+
+        Increments first and rolls back if that overshoots, so concurrent
+        workers can never jointly exceed the limit. `seed` loads a cold
+        bucket first, as in count().
+        """
+        allowed, count, _ = await self._hit(key, window, amount, seed)
+        return allowed, count
+
+    async def _hit(self, key: str, window: Window, amount: int,
+                   seed: Optional[Callable[[], Awaitable[int]]]) -> Tuple[bool, int, int]:
+        """hit() that also returns the bucket it consumed from"""
+        now = self.clock()
+        bucket = int(now // window.seconds)
+        if self._fast_denied(key, window, now):
+            return False, window.limit, bucket
+        if seed is not None and bucket not in await self.backend.get_counts(key, window.seconds, (bucket,)):
+            await self.backend.seed(key, window.seconds, bucket, int(await seed()))
+        current = await self.backend.incr(key, window.seconds, bucket, amount)
+        counts = {bucket: current}
+        if window.sliding:
+            counts.update(await self.backend.get_counts(key, window.seconds, (bucket - 1,)))
+        estimate = int(math.ceil(self._estimate(window, counts, bucket, now) - 1e-9))
+        if estimate > window.limit:
+            await self.backend.incr(key, window.seconds, bucket, -amount)
+            counts[bucket] = current - amount
+            self._block((key, window.seconds, window.limit), self._retry_at(window, counts, bucket), now)
+            return False, estimate - amount, bucket
+        return True, estimate, bucket
+
+    async def release(self, key: str, window: Window, amount: int = 1, bucket: Optional[int] = None):
+        """Give back hits taken by hit() for an action that did not happen
+
+        `bucket` is the bucket the hits went into (defaults to the current
+        one); a hit taken just before a window rolled over is returned to
+        the window it was counted in.
+        """
+        self._blocked_until.pop((key, window.seconds, window.limit), None)
+        if bucket is None:
+            bucket = int(self.clock() // window.seconds)
+        await self.backend.incr(key, window.seconds, bucket, -amount)
+
+    async def acquire(self, rules: List[Tuple], amount: int = 1) -> Tuple[bool, str, Optional[Hold]]:
+        """Atomically consume from several (key, window, message[, seed]) rules
+
+        Rules are taken in order and the first exhausted one wins; hits already
+        taken are released, so a denied action consumes nothing. Returns
+        (allowed, message, hold); pass the hold to release_hold() if the
+        action then does not happen. The message may use {count} and {limit}
+        placeholders.
+        """
+        hold = Hold(hits=[], amount=amount)
+        for key, window, message, *seed in rules:
+            allowed, current, bucket = await self._hit(key, window, amount, seed[0] if seed else None)
+            if not allowed:
+                await self.release_hold(hold)
+                return False, message.format(count=current, limit=window.limit), None
+            hold.hits.append((key, window, bucket))
+        return True, "OK", hold
+
+    async def release_hold(self, hold: Optional[Hold]):
+        """Give back the hits of a successful acquire(), to the buckets they went into"""
+        if hold is None:
+            return
+        for key, window, bucket in reversed(hold.hits):
+            await self.release(key, window, hold.amount, bucket=bucket)
+        hold.hits = []
+
+    async def check_all(
+        self, rules: List[Tuple[str, Window, str]]
+    ) -> Tuple[bool, str]:
+        """Check several (key, window, message) rules, first failure wins
+
+        The message may use {count} and {limit} placeholders.
+        """
+        for key, window, message in rules:
+            allowed, current = await self.check(key, window)
+            if not allowed:
+                return False, message.format(count=current, limit=window.limit)
+        return True, "OK"
+
+    async def record_all(self, rules: List[Tuple[str, Window]], amount: int = 1):
+        for key, window in rules:
+            await self.record(key, window, amount)
+
+    # ------------------------------------------------------------------
+    # Token buckets
+    # ------------------------------------------------------------------
+
+    async def take(self, key: str, bucket: TokenBucket, cost: float = 1.0) -> bool:
+        """Take `cost` tokens from a bucket, returns False if not enough"""
+        blocked_key = (key, 0, int(bucket.capacity))
+        now = self.clock()
+        if self._blocked_until.get(blocked_key, 0) > now:
+            return False
+        allowed, tokens = await self.backend.take_tokens(
+            key, bucket.capacity, bucket.refill_per_second, cost, now
+        )
+        if not allowed and bucket.refill_per_second > 0:
+            self._block(blocked_key, now + (cost - tokens) / bucket.refill_per_second, now)
+        return allowed
+
+
+# Global instance (in-memory until init_rate_limit_service() runs at startup)
+rate_limit_service = RateLimitService()
+
+
+async def init_rate_limit_service(database, backend: Optional[str] = None) -> RateLimitService:
+    """Point the global service at the shared backend
+
+    Args:
+        database: Motor database (None keeps the in-memory backend)
+        backend: 'mongo' or 'memory' (defaults to RATE_LIMIT_BACKEND env var)
+    """
+    backend = (backend or os.getenv("RATE_LIMIT_BACKEND", "mongo")).lower()
+    if backend == "mongo" and database is not None:
+        mongo_backend = MongoRateLimitBackend(database["rate_limits"])
+        await mongo_backend.ensure_indexes()
+        rate_limit_service.use_backend(mongo_backend)
+        logger.info("Rate limit service using shared MongoDB backend")
+    else:
+        rate_limit_service.use_backend(InMemoryRateLimitBackend())
+        logger.info("Rate limit service using in-memory backend")
+    return rate_limit_service
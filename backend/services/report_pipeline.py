@@ -0,0 +1,411 @@
+"""
+Daily Report Pipeline
+Shared batch pipeline for the daily/morning/evening report emails
+
+- Users are processed in id-ordered batches; each batch is checkpointed in
+  `report_runs`, so an interrupted run resumes after the last finished batch
+- Per-batch stats come from three aggregations (bots, ledger fills, alerts)
+  instead of several queries per user
+- Templates are rendered off the event loop in a small worker pool
+- Emails go through SmtpQueue: a bounded queue drained by a fixed number of
+  workers, each keeping its SMTP connection open across messages
+"""
+
+import asyncio
+import os
+import smtplib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def empty_stats() -> Dict:
+    return {
+        'total_trades': 0,
+        'winning_trades': 0,
+        'losing_trades': 0,
+        'win_rate': 0.0,
+        'total_profit': 0.0,
+        'total_fees': 0.0,
+        'net_profit': 0.0,
+        'total_volume': 0.0,
+        'active_bots': 0,
+        'paused_bots': 0,
+        'stopped_bots': 0,
+        'total_bots': 0,
+        'total_equity': 0.0,
+        'initial_capital': 0.0,
+        'drawdown_percent': 0.0,
+        'best_bot': None,
+        'best_bot_profit': 0.0,
+        'alerts': []
+    }
+
+
+async def precompute_daily_stats(database, users: List[Dict], start: datetime, end: datetime) -> Dict[str, Dict]:
+    """Daily stats for a batch of users from one aggregation per collection
+
+    Args:
+        database: Motor database handle
+        users: user documents (id, funded_capital)
+        start: window start (inclusive)
+        end: window end (exclusive)
+
+    Returns:
+        user_id -> stats dict (see empty_stats)
+    """
+    user_ids = [u['id'] for u in users]
+    stats = {user_id: empty_stats() for user_id in user_ids}
+
+    # Bot counts and equity per (user, status)
+    async for row in database.bots.aggregate([
+        {"$match": {"user_id": {"$in": user_ids}, "status": {"$ne": "deleted"}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "status": "$status"},
+            "count": {"$sum": 1},
+            "equity": {"$sum": {"$ifNull": ["$current_capital", {"$ifNull": ["$initial_capital", 0]}]}},
+            "initial": {"$sum": {"$ifNull": ["$initial_capital", 0]}}
+        }}
+    ]):
+        s = stats.get(row['_id']['user_id'])
+        if s is None:
+            continue
+        status = row['_id'].get('status')
+        if status in ('active', 'paused', 'stopped'):
+            s[f'{status}_bots'] += row['count']
+        s['total_bots'] += row['count']
+        s['total_equity'] += row['equity']
+        s['initial_capital'] += row['initial']
+
+    # Fill stats per (user, bot, symbol) from the ledger. PnL is realized at average
+    # cost on the quantity bought and sold within the window; each (bot, symbol)
+    # that closed a position counts as one winning or losing trade.
+    def side_sum(side: str, value) -> Dict:
+        return {"$sum": {"$cond": [{"$eq": ["$side", side]}, value, 0]}}
+
+    per_bot: Dict[Tuple[str, str], float] = {}
+    async for row in database.fills_ledger.aggregate([
+        {"$match": {"user_id": {"$in": user_ids}, "timestamp": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "bot_id": "$bot_id", "symbol": "$symbol"},
+            "fills": {"$sum": 1},
+            "fees": {"$sum": {"$ifNull": ["$fee", 0]}},
+            "buy_qty": side_sum("buy", "$qty"),
+            "buy_value": side_sum("buy", {"$multiply": ["$qty", "$price"]}),
+            "sell_qty": side_sum("sell", "$qty"),
+            "sell_value": side_sum("sell", {"$multiply": ["$qty", "$price"]})
+        }}
+    ]):
+        user_id, bot_id = row['_id']['user_id'], row['_id'].get('bot_id')
+        s = stats.get(user_id)
+        if s is None:
+            continue
+        s['total_trades'] += row['fills']
+        s['total_fees'] += row['fees']
+        s['total_volume'] += row['buy_value'] + row['sell_value']
+
+        closed = min(row['buy_qty'], row['sell_qty'])
+        if closed <= 0:
+            continue
+        pnl = closed * (row['sell_value'] / row['sell_qty'] - row['buy_value'] / row['buy_qty'])
+        s['total_profit'] += pnl
+        s['winning_trades'] += int(pnl > 0)
+        s['losing_trades'] += int(pnl < 0)
+        per_bot[(user_id, bot_id)] = per_bot.get((user_id, bot_id), 0.0) + pnl
+
+    best_bot_ids = {}
+    for (user_id, bot_id), pnl in per_bot.items():
+        s = stats[user_id]
+        if user_id not in best_bot_ids or pnl > s['best_bot_profit']:
+            best_bot_ids[user_id] = bot_id
+            s['best_bot_profit'] = pnl
+
+    for s in stats.values():
+        closed_trades = s['winning_trades'] + s['losing_trades']
+        s['win_rate'] = (s['winning_trades'] / closed_trades * 100) if closed_trades > 0 else 0.0
+        s['net_profit'] = s['total_profit'] - s['total_fees']
+
+    if best_bot_ids:
+        names = {
+            bot['id']: bot.get('name', 'Unknown')
+            async for bot in database.bots.find(
+                {"id": {"$in": list(best_bot_ids.values())}},
+                {"_id": 0, "id": 1, "name": 1}
+            )
+        }
+        for user_id, bot_id in best_bot_ids.items():
+            stats[user_id]['best_bot'] = names.get(bot_id, 'Unknown')
+
+    # Error/critical alerts in the window, newest first, 10 per user
+    window = {"$gte": start.isoformat(), "$lt": end.isoformat()}
+    async for row in database.alerts.aggregate([
+        {"$match": {
+            "user_id": {"$in": user_ids},
+            "severity": {"$in": ["error", "critical"]},
+            "$or": [{"timestamp": window}, {"created_at": window}]
+        }},
+        {"$sort": {"timestamp": -1, "created_at": -1}},
+        {"$group": {"_id": "$user_id", "alerts": {"$push": {
+            "severity": "$severity",
+            "message": "$message",
+            "created_at": {"$ifNull": ["$created_at", "$timestamp"]}
+        }}}},
+        {"$project": {"alerts": {"$slice": ["$alerts", 10]}}}
+    ]):
+        if row['_id'] in stats:
+            stats[row['_id']]['alerts'] = row['alerts']
+
+    for user in users:
+        s = stats[user['id']]
+        funded = user.get('funded_capital') or s['initial_capital'] or s['total_equity']
+        s['drawdown_percent'] = ((funded - s['total_equity']) / funded * 100) if funded > 0 else 0.0
+
+    return stats
+
+
+class SmtpQueue:
+    """Bounded-concurrency SMTP sender that reuses connections"""
+
+    def __init__(self, host: str, port: int, user: Optional[str], password: Optional[str], from_addr: str,
+                 concurrency: Optional[int] = None, maxsize: Optional[int] = None,
+                 messages_per_connection: int = 100, connect: Optional[Callable] = None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_addr = from_addr
+        self.concurrency = concurrency or int(os.getenv("REPORT_SMTP_CONCURRENCY", "4"))
+        self.maxsize = maxsize or int(os.getenv("REPORT_SMTP_QUEUE_SIZE", "100"))
+        self.messages_per_connection = messages_per_connection
+        self._connect_fn = connect or self._connect
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.connections_opened = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.user and self.password)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        server.starttls()
+        server.login(self.user, self.password)
+        return server
+
+    @staticmethod
+    def _quit(conn):
+        try:
+            conn.quit()
+        except Exception:
+            pass
+
+    def build_message(self, to_email: str, subject: str, html: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.from_addr
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html, 'html'))
+        return msg
+
+    async def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self):
+        """Drain the queue and close every worker connection"""
+        if self._queue is None:
+            return
+        for _ in self._workers:
+            await self._queue.put(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queue = None
+        self._workers = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def send(self, to_email: str, subject: str, html: str) -> bool:
+        """Queue a message and wait for the result (waits for space when the queue is full)"""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((self.build_message(to_email, subject, html), future))
+        return await future
+
+    async def _worker(self):
+        conn = None
+        sent_on_conn = 0
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                msg, future = item
+                ok = False
+                for attempt in range(2):
+                    try:
+                        if conn is None:
+                            conn = await asyncio.to_thread(self._connect_fn)
+                            self.connections_opened += 1
+                            sent_on_conn = 0
+                        await asyncio.to_thread(conn.send_message, msg)
+                        sent_on_conn += 1
+                        ok = True
+                        break
+                    except smtplib.SMTPServerDisconnected:
+                        # Server dropped an idle connection - reconnect once
+                        conn = None
+                    except Exception as e:
+                        logger.error(f"Send email error to {msg['To']}: {e}")
+                        if conn is not None:
+                            await asyncio.to_thread(self._quit, conn)
+                        conn = None
+                        break
+                if not future.done():
+                    future.set_result(ok)
+                if conn is not None and sent_on_conn >= self.messages_per_connection:
+                    await asyncio.to_thread(self._quit, conn)
+                    conn = None
+        finally:
+            if conn is not None:
+                await asyncio.to_thread(self._quit, conn)
+
+
+Renderer = Callable[[Dict, Dict], Optional[Tuple[str, str]]]
+
+
+class ReportPipeline:
+    """Batch, render and send per-user reports with resumable checkpoints"""
+
+    def __init__(self, database, smtp: SmtpQueue, batch_size: Optional[int] = None,
+                 render_workers: Optional[int] = None):
+        self.database = database
+        self.smtp = smtp
+        self.batch_size = batch_size or int(os.getenv("REPORT_BATCH_SIZE", "200"))
+        self.render_workers = render_workers or int(os.getenv("REPORT_RENDER_WORKERS", "4"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _render_chunk(render: Renderer, chunk: List[Tuple[Dict, Dict]]) -> List:
+        out = []
+        for user, stats in chunk:
+            try:
+                out.append(render(user, stats))
+            except Exception as e:
+                logger.error(f"Render report error for {user.get('id')}: {e}")
+                out.append(None)
+        return out
+
+    async def render_batch(self, render: Renderer, items: List[Tuple[Dict, Dict]]) -> List:
+        """Render (user, stats) pairs in the worker pool, preserving order"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix="report-render")
+        loop = asyncio.get_running_loop()
+        size = max(1, -(-len(items) // self.render_workers))
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._render_chunk, render, chunk) for chunk in chunks
+        ))
+        return [item for chunk in results for item in chunk]
+
+    async def run(self, run_id: str, render: Renderer, start: datetime, end: datetime,
+                  user_query: Optional[Dict] = None, resume: bool = True) -> Dict:
+        """Send one report per user, checkpointing after every batch
+
+        Args:
+            run_id: checkpoint key, e.g. "daily:2026-01-01"
+            render: (user, stats) -> (subject, html) or None to skip
+            start: stats window start
+            end: stats window end
+            user_query: extra filter on users
+            resume: continue from the saved checkpoint for run_id
+
+        Returns:
+            summary with sent, failed, skipped, batches and duration
+        """
+        runs = self.database["report_runs"]
+        state = (await runs.find_one({"_id": run_id})) if resume else None
+        if state and state.get("completed_at"):
+            logger.info(f"📧 Report run {run_id} already completed - skipping")
+            return {**state, "resumed": True}
+
+        last_user_id = state.get("last_user_id") if state else None
+        summary = {
+            "run_id": run_id,
+            "sent": state.get("sent", 0) if state else 0,
+            "failed": state.get("failed", 0) if state else 0,
+            "skipped": state.get("skipped", 0) if state else 0,
+            "batches": 0
+        }
+        started = datetime.now(timezone.utc)
+
+        if last_user_id:
+            logger.info(f"📧 Resuming report run {run_id} after user {last_user_id}")
+
+        try:
+            async with self.smtp:
+                while True:
+                    query = {**(user_query or {}), "email": {"$nin": [None, ""]}}
+                    if last_user_id:
+                        query["id"] = {"$gt": last_user_id}
+
+                    users = await self.database.users.find(
+                        query,
+                        {"_id": 0, "id": 1, "email": 1, "name": 1, "first_name": 1, "funded_capital": 1}
+                    ).sort("id", 1).limit(self.batch_size).to_list(self.batch_size)
+                    if not users:
+                        break
+
+                    stats = await precompute_daily_stats(self.database, users, start, end)
+                    rendered = await self.render_batch(render, [(u, stats[u['id']]) for u in users])
+
+                    sends = []
+                    for user, report in zip(users, rendered):
+                        if not report:
+                            summary["skipped"] += 1
+                            continue
+                        subject, html = report
+                        sends.append(self.smtp.send(user['email'], subject, html))
+
+                    results = await asyncio.gather(*sends)
+                    summary["sent"] += sum(1 for ok in results if ok)
+                    summary["failed"] += sum(1 for ok in results if not ok)
+                    summary["batches"] += 1
+
+                    last_user_id = users[-1]['id']
+                    await runs.update_one(
+                        {"_id": run_id},
+                        {"$set": {
+                            "last_user_id": last_user_id,
+                            "sent": summary["sent"],
+                            "failed": summary["failed"],
+                            "skipped": summary["skipped"],
+                            "updated_at": datetime.now(timezone.utc)
+                        }},
+                        upsert=True
+                    )
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+        await runs.update_one(
+            {"_id": run_id},
+            {"$set": {"completed_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        summary["duration_seconds"] = round((datetime.now(timezone.utc) - started).total_seconds(), 2)
+        logger.info(
+            f"✅ Report run {run_id}: {summary['sent']} sent, {summary['failed']} failed, "
+            f"{summary['skipped']} skipped in {summary['duration_seconds']}s"
+        )
+        return summary
@@ -0,0 +1,273 @@
+"""
+Startup Orchestration
+Lazy loading of optional subsystems and parallel, profiled service startup
+
+- lazy(): proxy that imports a module (or one of its attributes) on first use
+- timed_import(): importlib.import_module that records how long each import took
+- StartupPlan: starts services level by level; services in one level have no
+  dependencies on each other and are started concurrently
+- startup_profile: import and init timings, served from /api/health/startup
+
+Profile the import cost of the heavy modules from a shell:
+    python -m services.startup [module ...]
+"""
+
+import asyncio
+import importlib
+import inspect
+import sys
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Modules server.py no longer imports at load time (and the optional ML / agent stacks)
+HEAVY_MODULES = (
+    "ccxt.async_support", "ccxt_service", "ai_service", "trading_scheduler",
+    "engines.regime_detector", "engines.sentiment_analyzer", "engines.alpha_fusion_engine",
+    "engines.self_healing_ai", "engines.uagents_framework"
+)
+
+
+class StartupProfile:
+    """Import time per module and init time per service for the current process"""
+
+    def __init__(self):
+        self.imports: Dict[str, Dict] = {}
+        self.services: Dict[str, Dict] = {}
+        self.started_at: Optional[str] = None
+        self.completed_at: Optional[str] = None
+        self.total_seconds: Optional[float] = None
+
+    def record_import(self, module: str, seconds: float, error: Optional[str] = None):
+        self.imports[module] = {
+            "seconds": round(seconds, 4),
+            "ok": error is None,
+            "error": error,
+            "at": datetime.now(timezone.utc).isoformat()
+        }
+
+    def record_service(self, name: str, status: str, seconds: float = 0.0,
+                       level: Optional[int] = None, error: Optional[str] = None):
+        self.services[name] = {
+            "status": status,
+            "seconds": round(seconds, 4),
+            "level": level,
+            "error": error
+        }
+
+    def to_dict(self) -> Dict:
+        imports = sorted(self.imports.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        return {
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "total_seconds": self.total_seconds,
+            "services": self.services,
+            "imports": dict(imports),
+            "import_seconds": round(sum(i["seconds"] for i in self.imports.values()), 4)
+        }
+
+    def summary(self) -> Dict:
+        """Compact form for /api/health"""
+        failed = [name for name, s in self.services.items() if s["status"] == "failed"]
+        return {
+            "completed": self.completed_at is not None,
+            "total_seconds": self.total_seconds,
+            "services_started": sum(1 for s in self.services.values() if s["status"] == "started"),
+            "services_failed": failed
+        }
+
+
+def timed_import(module_name: str):
+    """Import a module, recording the time taken the first time it is loaded"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except Exception as e:
+        startup_profile.record_import(module_name, time.perf_counter() - start, str(e))
+        raise
+    startup_profile.record_import(module_name, time.perf_counter() - start)
+    return module
+
+
+class LazyObject:
+    """Stands in for a module or module attribute until it is first used"""
+
+    def __init__(self, module: str, attr: Optional[str] = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+        self._error: Optional[Exception] = None
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            self._loaded = True
+            try:
+                target = timed_import(self._module)
+                self._target = getattr(target, self._attr) if self._attr else target
+            except Exception as e:
+                self._error = e
+                logger.warning(f"{self._module} not available: {e}")
+        if self._error is not None:
+            raise ImportError(f"{self._module} not available: {self._error}") from self._error
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self._loaded and self._error is None else "failed" if self._error else "pending"
+        return f"<lazy {self._module}{':' + self._attr if self._attr else ''} ({state})>"
+
+
+def lazy(module: str, attr: Optional[str] = None) -> Any:
+    return LazyObject(module, attr)
+
+
+def lazy_available(obj) -> bool:
+    """Load a lazy object if needed; False if its import failed"""
+    if not isinstance(obj, LazyObject):
+        return obj is not None
+    try:
+        obj._load()
+        return True
+    except ImportError:
+        return False
+
+
+def lazy_loaded(obj) -> bool:
+    """True if the object was imported already (without triggering the import)"""
+    if not isinstance(obj, LazyObject):
+        return obj is not None
+    return obj._loaded and obj._error is None
+
+
+@dataclass
+class ServiceSpec:
+    """
+    One startup step. `start` is either a callable (sync or async) or a
+    "module:object.method" target that is imported lazily when the step runs.
+    Background services return a long-running coroutine that is wrapped in a task.
+    """
+    name: str
+    start: Union[str, Callable]
+    depends_on: Tuple[str, ...] = ()
+    enabled: bool = True
+    background: bool = False
+    optional: bool = False
+    message: str = ""
+
+
+@dataclass
+class StartupResult:
+    tasks: List[asyncio.Task] = field(default_factory=list)
+    started: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+
+def resolve_target(target: str) -> Callable:
+    module_name, _, path = target.partition(":")
+    obj = timed_import(module_name)
+    for part in path.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+class StartupPlan:
+    """Starts services concurrently, a dependency level at a time"""
+
+    def __init__(self, services: List[ServiceSpec], profile: Optional[StartupProfile] = None):
+        self.services = {spec.name: spec for spec in services}
+        self.profile = profile or startup_profile
+
+    def levels(self) -> List[List[ServiceSpec]]:
+        """Group services so every dependency sits in an earlier level"""
+        for spec in self.services.values():
+            unknown = [d for d in spec.depends_on if d not in self.services]
+            if unknown:
+                raise ValueError(f"Service {spec.name} depends on unknown services: {unknown}")
+
+        remaining = dict(self.services)
+        placed = set()
+        levels = []
+        while remaining:
+            ready = [spec for spec in remaining.values() if all(d in placed for d in spec.depends_on)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between services: {sorted(remaining)}")
+            levels.append(ready)
+            for spec in ready:
+                placed.add(spec.name)
+                del remaining[spec.name]
+        return levels
+
+    async def _start(self, spec: ServiceSpec, level: int, result: StartupResult):
+        blocked = [d for d in spec.depends_on if d not in result.started]
+        if not spec.enabled or blocked:
+            status = "disabled" if not spec.enabled else "skipped"
+            self.profile.record_service(spec.name, status, level=level,
+                                        error=f"dependencies not started: {blocked}" if blocked else None)
+            result.skipped.append(spec.name)
+            if blocked:
+                logger.warning(f"Skipping {spec.name}: dependencies not started ({', '.join(blocked)})")
+            return
+
+        start = time.perf_counter()
+        try:
+            starter = resolve_target(spec.start) if isinstance(spec.start, str) else spec.start
+            outcome = starter()
+            if spec.background:
+                result.tasks.append(asyncio.create_task(outcome))
+            elif inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            self.profile.record_service(spec.name, "failed", time.perf_counter() - start, level, str(e))
+            result.failed.append(spec.name)
+            log = logger.warning if spec.optional else logger.error
+            log(f"Failed to start {spec.name}: {e}")
+            return
+
+        self.profile.record_service(spec.name, "started", time.perf_counter() - start, level)
+        result.started.append(spec.name)
+        if spec.message:
+            logger.info(spec.message)
+
+    async def run(self) -> StartupResult:
+        result = StartupResult()
+        for level, specs in enumerate(self.levels()):
+            await asyncio.gather(*(self._start(spec, level, result) for spec in specs))
+        return result
+
+
+# Global instance
+startup_profile = StartupProfile()
+
+
+def main(argv: List[str]) -> int:
+    """Print the import time of each module (default: HEAVY_MODULES)"""
+    for module_name in argv or HEAVY_MODULES:
+        try:
+            timed_import(module_name)
+        except Exception:
+            pass
+
+    print(f"{'seconds':>9}  module")
+    for module_name, entry in startup_profile.to_dict()["imports"].items():
+        suffix = "" if entry["ok"] else f"  (failed: {entry['error']})"
+        print(f"{entry['seconds']:>9.3f}  {module_name}{suffix}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main(sys.argv[1:]))
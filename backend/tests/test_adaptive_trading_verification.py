@@ -15,7 +15,7 @@ Run with: pytest backend/tests/test_adaptive_trading_verification.py -v
 
 import pytest
 import asyncio
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from unittest.mock import Mock, patch, AsyncMock
 import sys
 import os
@@ -79,15 +79,16 @@ class TestLedgerFirstTruth:
         
         # Mock methods for reconciliation
         ledger.compute_equity = AsyncMock(return_value=10000.00)
-        ledger.get_fills = AsyncMock(return_value=[{"id": "fill1"}] * 50)
         
-        # Mock trades collection with different total
-        mock_trades = AsyncMock()
-        mock_trades.find = MagicMock(return_value=mock_trades)
-        mock_trades.to_list = AsyncMock(return_value=[
-            {"profit_loss": 100} for _ in range(45)  # Different count
-        ])
-        mock_db.__getitem__.return_value = mock_trades
+        # Streamed join result with a different trade total
+        ledger.verifier.reconcile = AsyncMock(return_value={
+            "fills": 50,
+            "trades": 45,  # Different count
+            "matched": 45,
+            "unmatched_fills": 5,
+            "unmatched_trades": 0,
+            "trades_equity": 4500.0
+        })
         
         # Run reconciliation
         report = await ledger.reconcile_with_trades_collection("user_123")
@@ -107,22 +108,15 @@ class TestLedgerFirstTruth:
         
         # Mock for integrity checks
         ledger.compute_equity = AsyncMock(side_effect=[10000.00, 10000.00])  # Consistent
-        ledger.get_fills = AsyncMock(return_value=[
-            {
-                "_id": f"fill_{i}",
-                "user_id": "user_123",
-                "bot_id": "bot_1",
-                "exchange": "binance",
-                "symbol": "BTC/USDT",
-                "side": "buy",
-                "qty": 0.01,
-                "price": 50000,
-                "fee": 5.0,
-                "timestamp": datetime.now(timezone.utc) - timedelta(hours=i),
-                "client_order_id": f"order_{i}"
-            }
-            for i in range(10)
-        ])
+        ledger.verifier.scan_fills = AsyncMock(return_value={
+            "scanned": 10,
+            "missing_fee": 0,
+            "missing_fields": 0,
+            "out_of_order": 0
+        })
+        ledger.verifier.find_duplicate_client_order_ids = AsyncMock(return_value={
+            "ids": 0, "extra_fills": 0, "sample": []
+        })
         
         report = await ledger.verify_integrity("user_123")
         
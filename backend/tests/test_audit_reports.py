@@ -0,0 +1,177 @@
+"""
+Tests for server-side audit reports (daily count cache, native ts) and batched cleanup
+"""
+
+import pytest
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from pymongo.errors import OperationFailure
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database
+from benchmarks.memory_db import BenchCollection
+from engines.audit_logger import AuditLogger
+from migrations.audit_logs_native_timestamps import create_audit_indexes
+
+EVENT_TYPES = ["bot_created", "bot_paused", "api_key_added", "capital_changed"]
+SEVERITIES = ["info", "warning", "critical"]
+
+
+class CountingCollection(BenchCollection):
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.matched = 0
+
+    def aggregate(self, pipeline, **kwargs):
+        cursor = super().aggregate(pipeline[:1])
+        self.matched += len(cursor.docs)
+        return super().aggregate(pipeline, **kwargs)
+
+
+@pytest.fixture
+def audit(monkeypatch):
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(0, 12 * 24 * 4):  # every 15 minutes for 12 days
+        ts = now - timedelta(minutes=15 * i + 7)  # off the range boundaries the tests compute from now
+        event_type = EVENT_TYPES[i % 4]
+        docs.append({
+            "_id": i + 1, "user_id": "u1" if i % 7 else "u2", "event_type": event_type, "severity": SEVERITIES[i % 3],
+            "is_critical": event_type in ("bot_created", "api_key_added"), "details": {"i": i},
+            "timestamp": ts.isoformat(), "ts": ts
+        })
+    logs = CountingCollection(docs)
+    monkeypatch.setattr(database, "audit_logs_collection", logs, raising=False)
+    monkeypatch.setattr(database, "audit_daily_stats_collection", BenchCollection(), raising=False)
+    return AuditLogger(), logs, now
+
+
+def reference(logs, user_id, start, end):
+    selected = [d for d in logs.docs if d["user_id"] == user_id and start <= d["ts"] < end]
+    return (
+        len(selected),
+        dict(Counter(d["event_type"] for d in selected)),
+        Counter(d["severity"] for d in selected),
+        sum(d["is_critical"] for d in selected)
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("native", [False, True])
+async def test_report_counts_match_and_closed_days_come_from_the_cache(audit, monkeypatch, native):
+    audit, logs, now = audit
+    monkeypatch.setattr(database, "AUDIT_NATIVE_TS", native)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=9) + timedelta(hours=6, minutes=1)
+    total, by_type, by_severity, critical = reference(logs, "u1", start, now + timedelta(seconds=1))
+
+    report = await audit.generate_compliance_report("u1", start.isoformat(), now.isoformat())
+    assert (report["total_events"], report["by_type"], report["critical_events_total"]) == (total, by_type, critical)
+    assert all(report["by_severity"][s] == by_severity[s] for s in SEVERITIES)
+    assert len(report["critical_events"]) == 100
+    assert report["critical_events"][0]["timestamp"] >= report["critical_events"][-1]["timestamp"]
+    assert len(database.audit_daily_stats_collection.docs) == 8  # full closed days inside the range
+
+    # Closed days are no longer read: the second report scans only the two edge days
+    first_scan = logs.matched
+    logs.matched = 0
+    again = await audit.generate_compliance_report("u1", start.isoformat(), now.isoformat())
+    assert again["total_events"] == total and again["by_type"] == by_type
+    assert logs.matched < first_scan / 4
+
+    # Counts of closed days survive the raw entries expiring (the partial first day is read live)
+    partial_first_day = reference(logs, "u1", start, today - timedelta(days=8))[0]
+    logs.docs = [d for d in logs.docs if d["ts"] >= today - timedelta(days=3)]
+    report = await audit.generate_compliance_report("u1", start.isoformat(), now.isoformat())
+    assert report["total_events"] == total - partial_first_day
+
+
+@pytest.mark.asyncio
+async def test_statistics_and_date_only_ranges(audit):
+    audit, logs, now = audit
+    total, by_type, _, critical = reference(logs, "u1", now - timedelta(days=5), now + timedelta(seconds=1))
+
+    stats = await audit.get_statistics("u1", days=5)
+    assert (stats["total_events"], stats["critical_events"]) == (total, critical)
+    assert stats["most_common_event"] == max(by_type, key=by_type.get)
+
+    day = (now - timedelta(days=3)).strftime("%Y-%m-%d")
+    day_start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+    report = await audit.generate_compliance_report("u2", day, day)
+    assert report["total_events"] == reference(logs, "u2", day_start, day_start + timedelta(days=1))[0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("native", [False, True])
+async def test_report_bounds_with_a_utc_offset(audit, monkeypatch, native):
+    audit, logs, now = audit
+    monkeypatch.setattr(database, "AUDIT_NATIVE_TS", native)
+    sast = timezone(timedelta(hours=2))
+    start, end = now - timedelta(hours=5, minutes=1), now - timedelta(hours=1, minutes=1)
+
+    report = await audit.generate_compliance_report(
+        "u1", start.astimezone(sast).isoformat(), end.astimezone(sast).isoformat()
+    )
+    assert report["total_events"] == reference(logs, "u1", start, end + timedelta(microseconds=1))[0]
+
+
+@pytest.mark.asyncio
+async def test_log_event_stores_native_ts_and_cleanup_deletes_in_batches(audit):
+    audit, logs, now = audit
+    assert await audit.log_event("bot_created", "u3", {"bot_id": "b1"})
+    assert isinstance(logs.docs[-1]["ts"], datetime)
+
+    expected = sum(1 for d in logs.docs if d["ts"] < now - timedelta(days=10))
+    result = await audit.cleanup_old_logs(days=10, batch_size=50)
+    assert result["success"] and result["deleted_count"] == expected
+    assert result["batches"] == -(-expected // 50)
+    assert min(d["ts"] for d in logs.docs) >= now - timedelta(days=10, minutes=1)
+
+
+class TTLCollection:
+    """Index options as MongoDB keeps them: a changed TTL conflicts until collMod"""
+
+    def __init__(self):
+        self.name = "audit_logs"
+        self.indexes = {}
+        self.commands = []
+        self.database = self
+
+    async def create_index(self, keys, **options):
+        name = keys if isinstance(keys, str) else "_".join(f"{k}_{d}" for k, d in keys)
+        if name in self.indexes and self.indexes[name] != options:
+            raise OperationFailure("Index with name: ts_1 already exists with different options", code=85)
+        self.indexes[name] = options
+
+    async def command(self, name, collection, index):
+        self.commands.append((name, collection, index))
+        field, = index["keyPattern"]
+        self.indexes[field]["expireAfterSeconds"] = index["expireAfterSeconds"]
+
+
+@pytest.mark.asyncio
+async def test_ttl_index_only_when_retention_is_set(monkeypatch):
+    monkeypatch.setattr(database, "AUDIT_LOG_RETENTION_DAYS", None)
+    logs = TTLCollection()
+    await create_audit_indexes(logs)
+
+    assert "ts" not in logs.indexes
+    assert "user_id_1_ts_1" in logs.indexes
+
+
+@pytest.mark.asyncio
+async def test_changed_retention_is_applied_with_collmod(monkeypatch):
+    monkeypatch.setattr(database, "AUDIT_LOG_RETENTION_DAYS", 90)
+    logs = TTLCollection()
+    await create_audit_indexes(logs)
+
+    monkeypatch.setattr(database, "AUDIT_LOG_RETENTION_DAYS", 30)
+    await create_audit_indexes(logs)
+
+    assert logs.commands == [("collMod", "audit_logs", {"keyPattern": {"ts": 1}, "expireAfterSeconds": 30 * 86400})]
+    assert logs.indexes["ts"] == {"expireAfterSeconds": 30 * 86400}
@@ -0,0 +1,65 @@
+"""
+Tests for the benchmark harness and its in-memory Mongo stand-in
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from benchmarks.bench_ledger import make_fills
+from benchmarks.harness import best_of, compare, percentiles
+from benchmarks.memory_db import MemoryDatabase
+from services.ledger_service import LedgerService
+
+
+@pytest.mark.asyncio
+async def test_memory_db_serves_ledger_aggregates():
+    db = MemoryDatabase()
+    ledger = LedgerService(db)
+    fills = make_fills(200, bots=4)
+    await db["fills_ledger"].insert_many(fills)
+
+    stats = await ledger.get_stats("bench-user")
+    assert stats["total_fills"] == 200
+    assert stats["total_fees"] == pytest.approx(sum(f["fee"] for f in fills))
+    assert stats["total_volume"] == pytest.approx(sum(f["qty"] * f["price"] for f in fills))
+    assert await ledger.compute_fees_paid(bot_id="bench-bot-1") == pytest.approx(
+        sum(f["fee"] for f in fills if f["bot_id"] == "bench-bot-1"))
+    assert len(await ledger.profit_series("bench-user", limit=30)) > 0
+    assert db["fills_ledger"].indexes
+
+
+def test_compare_flags_regressions_by_metric_direction():
+    baseline = {"results": {"ledger": {"pnl": {"p50_ms": 10.0, "p99_ms": 12.0, "count": 5}},
+                            "broadcast": {"fanout": {"messages_per_second": 1000.0}}}}
+    results = {"ledger": {"pnl": {"p50_ms": 14.0, "p99_ms": 40.0, "count": 9}},
+               "broadcast": {"fanout": {"messages_per_second": 900.0}}}
+
+    by_key = {c.key: c for c in compare(results, baseline, tolerance=0.25)}
+
+    assert set(by_key) == {"ledger.pnl.p50_ms", "broadcast.fanout.messages_per_second"}
+    assert by_key["ledger.pnl.p50_ms"].regressed
+    assert by_key["ledger.pnl.p50_ms"].change == pytest.approx(0.4)
+    assert not by_key["broadcast.fanout.messages_per_second"].regressed
+    assert by_key["broadcast.fanout.messages_per_second"].change == pytest.approx(0.1)
+
+
+def test_best_of_keeps_best_value_per_compared_metric():
+    runs = [{"pnl": {"p50_ms": 14.0, "p99_ms": 30.0, "ops_per_second": 80.0, "count": 5}},
+            {"pnl": {"p50_ms": 10.0, "p99_ms": 50.0, "ops_per_second": 120.0, "count": 5}}]
+
+    merged = best_of(runs)
+
+    assert merged == {"pnl": {"p50_ms": 10.0, "p99_ms": 30.0, "ops_per_second": 120.0, "count": 5}}
+
+
+def test_percentiles_in_milliseconds():
+    stats = percentiles([i / 1000 for i in range(1, 101)])
+    assert stats["count"] == 100
+    assert stats["p50_ms"] == pytest.approx(51.0)
+    assert stats["p99_ms"] == pytest.approx(100.0)
+    assert stats["max_ms"] == pytest.approx(100.0)
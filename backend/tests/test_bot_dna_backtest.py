@@ -0,0 +1,114 @@
+"""
+Tests for backtest-based BotDNAEvolution (process pool scoring, fitness cache, bulk write)
+"""
+
+import math
+import random
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database
+from bot_dna_evolution import BotDNAEvolution
+from engines.genome_backtest import genome_key, load_history, score_batch
+
+
+def price_history(points=600):
+    trend = [1_000_000 * (1 + i / 2000 + 0.02 * math.sin(i / 7)) for i in range(points)]
+    chop = [50_000 * (1 + 0.03 * math.sin(i / 3)) for i in range(points)]
+    return {"luno:BTC/ZAR": trend, "luno:ETH/ZAR": chop, "luno:XRP/ZAR": chop[::-1]}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.docs[:length]]
+
+
+class FakeBots:
+    def __init__(self, bots):
+        self.bots = bots
+        self.bulk_calls = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([b for b in self.bots if b["user_id"] == query["user_id"]])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_calls.append(operations)
+
+
+def make_bots(count=6):
+    modes = ["safe", "balanced", "risky"]
+    pairs = ["BTC/ZAR", "ETH/ZAR", "XRP/ZAR"]
+    return [{"id": f"bot-{i}", "user_id": "u1", "risk_mode": modes[i % 3], "trading_pair": pairs[(i + 1) % 3],
+             "initial_capital": 1000.0, "exchange": "luno"} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_backtest_evolution_bulk_writes_winners_and_caches(monkeypatch):
+    bots = FakeBots(make_bots())
+    monkeypatch.setattr(database, "bots_collection", bots)
+    evolution = BotDNAEvolution()
+    history = price_history()
+
+    random.seed(4)
+    result = await evolution.evolve_with_backtests("u1", generations=3, population=24, history=history, workers=0)
+
+    assert result["generations_run"] == 3
+    assert result["evolved"] >= 1
+    assert len(bots.bulk_calls) == 1 and len(bots.bulk_calls[0]) == result["evolved"]
+    assert all(c["old_fitness"] is None or c["new_fitness"] > c["old_fitness"] for c in result["changes"])
+    best = max(result["best_fitness_per_generation"])
+    assert result["changes"][0]["new_fitness"] == best
+    assert result["genomes_backtested"] == result["genomes_evaluated"] <= 24 * 3
+
+    # Same search again: every genome is answered from the fitness cache
+    random.seed(4)
+    again = await evolution.evolve_with_backtests("u1", generations=3, population=24, history=history, workers=0)
+    assert again["genomes_backtested"] == 0
+    assert again["best_fitness_per_generation"] == result["best_fitness_per_generation"]
+
+
+@pytest.mark.asyncio
+async def test_process_pool_scores_match_in_process(monkeypatch):
+    monkeypatch.setattr(database, "bots_collection", FakeBots(make_bots(4)))
+    history = price_history()
+    evolution = BotDNAEvolution()
+    genomes = [evolution._genome(b) for b in make_bots(4)]
+
+    executor = evolution._open_pool(history, workers=2)
+    try:
+        scored, backtested = await evolution._score_genomes(genomes, history, "fp", executor)
+    finally:
+        executor.shutdown()
+
+    assert backtested == len({genome_key(g) for g in genomes})
+    assert [score for _, score in scored] == score_batch(genomes, history)
+
+
+def test_load_history_reads_ticks_and_candles(tmp_path):
+    (tmp_path / "ticks.csv").write_text("timestamp,symbol,price,exchange\n"
+                                        "2026-01-01T00:00:00,BTC/ZAR,100,luno\n2026-01-01T00:01:00,BTC/ZAR,101,luno\n")
+    (tmp_path / "candles.ndjson").write_text(
+        '{"timestamp": "2026-01-01T00:00:00", "symbol": "ETH/ZAR", "open": 1, "high": 2, "low": 1, "close": 2}\n')
+
+    assert load_history(tmp_path) == {"luno:BTC/ZAR": [100.0, 101.0], "luno:ETH/ZAR": [2.0]}
+
+
+def test_capital_is_not_part_of_the_genome_or_its_update():
+    evolution = BotDNAEvolution()
+    small, large = dict(make_bots(1)[0], initial_capital=100.0), dict(make_bots(1)[0], initial_capital=50_000.0)
+    assert evolution._genome(small) == evolution._genome(large)
+    assert genome_key(evolution._genome(small)) == genome_key(evolution._genome(large))
+
+    backtest_update = evolution._dna_update(evolution._genome(small), {"fitness": 1.0})["$set"]
+    assert "initial_capital" not in backtest_update and "current_capital" not in backtest_update
+
+    live_update = evolution._dna_update(evolution._mutate(evolution._crossover(small, large)))["$set"]
+    assert "current_capital" not in live_update
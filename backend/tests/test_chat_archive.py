@@ -0,0 +1,123 @@
+"""
+Tests for streamed chat archival and paginated history in AIMemoryManager
+"""
+
+import gzip
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from bson import json_util
+
+import database
+from ai_memory_manager import AIMemoryManager
+from benchmarks.memory_db import BenchCollection
+from engines.replay import MemoryCursor
+
+
+class StreamingCursor(MemoryCursor):
+    def __init__(self, docs):
+        super().__init__(docs)
+        self.batch = None
+
+    def batch_size(self, n):
+        self.batch = n
+        return self
+
+    async def to_list(self, length=None):
+        if self.batch:
+            raise AssertionError("archival must iterate the cursor, not load it")
+        return await super().to_list(length)
+
+
+class ChatCollection(BenchCollection):
+    def __init__(self, docs):
+        super().__init__()
+        self.deletes = []
+        self.load(docs)
+
+    def load(self, docs):
+        self.docs = [{**doc, "_id": i} for i, doc in enumerate(docs, 1)]
+
+    def find(self, query=None, projection=None):
+        return StreamingCursor(super().find(query, projection).docs)
+
+    async def delete_many(self, query):
+        self.deletes.append(len(query["_id"]["$in"]))
+        return await super().delete_many(query)
+
+
+def message(user_id, when, content):
+    return {"user_id": user_id, "role": "user", "content": content, "timestamp": when.isoformat()}
+
+
+def read_archive(path):
+    with gzip.open(path, "rt") as f:
+        return [json_util.loads(line) for line in f]
+
+
+@pytest.fixture
+def chats(monkeypatch):
+    now = datetime.now(timezone.utc)
+    old = datetime(2024, 1, 31, 23, 0, tzinfo=timezone.utc)
+    docs = [message("u1", old + timedelta(minutes=30 * i), f"old-{i}") for i in range(7)]  # Jan 31 -> Feb 1
+    docs += [message("u2", old, "u2-old"), message("u1", now - timedelta(days=1), "recent")]
+    collection = ChatCollection(docs)
+    monkeypatch.setattr(database, "chat_messages_collection", collection, raising=False)
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_archive_streams_batches_per_user_month(chats, tmp_path):
+    manager = AIMemoryManager(archive_path=tmp_path, batch_size=2)
+
+    stats = await manager.archive_old_conversations()
+
+    assert stats["archived"] == stats["deleted"] == 8
+    assert stats["files"] == ["chat_u1_2024-01.ndjson.gz", "chat_u1_2024-02.ndjson.gz", "chat_u2_2024-01.ndjson.gz"]
+    assert max(chats.deletes) <= 2
+    assert [m["content"] for m in chats.docs] == ["recent"]
+
+    january = read_archive(tmp_path / "chat_u1_2024-01.ndjson.gz")
+    february = read_archive(tmp_path / "chat_u1_2024-02.ndjson.gz")
+    assert [m["content"] for m in january + february] == [f"old-{i}" for i in range(7)]
+
+    # A later run appends to the month's file
+    await chats.insert_one(message("u2", datetime(2024, 1, 5, tzinfo=timezone.utc), "late"))
+    await manager.archive_old_conversations()
+    assert [m["content"] for m in read_archive(tmp_path / "chat_u2_2024-01.ndjson.gz")] == ["u2-old", "late"]
+
+
+@pytest.mark.asyncio
+async def test_archive_rotates_full_files(chats, tmp_path):
+    manager = AIMemoryManager(archive_path=tmp_path, batch_size=2, max_archive_bytes=1)
+
+    await manager.archive_old_conversations()
+
+    # Five February messages in batches of 2, 2, 1; every batch fills a file
+    parts = sorted(p.name for p in tmp_path.glob("chat_u1_2024-02*"))
+    assert parts == ["chat_u1_2024-02.1.ndjson.gz", "chat_u1_2024-02.2.ndjson.gz", "chat_u1_2024-02.ndjson.gz"]
+    assert sum(len(read_archive(tmp_path / name)) for name in parts) == 5
+
+
+@pytest.mark.asyncio
+async def test_history_pages_with_cursor(chats, tmp_path):
+    now = datetime.now(timezone.utc)
+    chats.load([message("u1", now - timedelta(hours=10 - i), f"m{i}") for i in range(5)])
+    manager = AIMemoryManager(archive_path=tmp_path)
+
+    seen, cursor = [], None
+    while True:
+        page = await manager.get_conversation_history("u1", limit=2, cursor=cursor)
+        seen.append([m["content"] for m in page["messages"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [["m0", "m1"], ["m2", "m3"], ["m4"]]
+    assert "_id" not in page["messages"][0]
@@ -0,0 +1,134 @@
+"""
+Tests for streamed AI chat (ChatStream timings, held commands, SSE endpoint)
+"""
+
+import json
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+from auth import get_current_user
+from engines.replay import MemoryCollection
+from routes import ai_chat
+from services.chat_stream import ChatStream, FakeChatModel, relay
+
+
+def parse_events(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def collect(frames):
+    return parse_events("".join([frame async for frame in frames]))
+
+
+@pytest.mark.asyncio
+async def test_tokens_stream_in_order_with_timings():
+    model = FakeChatModel("one two three four", first_token_delay=0.05, token_delay=0.01)
+    stream = ChatStream(model, [{"role": "user", "content": "hi"}])
+
+    events = await collect(stream.events())
+
+    assert [data["content"] for _, data in events] == ["one", " two", " three", " four"]
+    assert stream.text == "one two three four"
+    assert stream.stats["tokens"] == 4
+    assert stream.stats["time_to_first_token_ms"] >= 50
+    assert stream.stats["total_ms"] >= stream.stats["time_to_first_token_ms"]
+    assert stream.stats["tokens_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_held_command_is_replaced_by_finish_result():
+    stream = ChatStream(FakeChatModel("ACTION: pause_bot bot-1"), [], hold_prefix="ACTION:")
+
+    async def finish(stream):
+        assert stream.held
+        return {"content": "Paused bot-1"}
+
+    events = await collect(relay(stream, finish))
+
+    assert events == [
+        ("token", {"content": "Paused bot-1"}),
+        ("done", {"content": "Paused bot-1", "stats": stream.stats}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_command_is_reported_as_an_error_event():
+    stream = ChatStream(FakeChatModel("ACTION: pause_bot bot-1"), [], hold_prefix="ACTION:")
+
+    async def finish(stream):
+        return {"content": "❌ Action failed: bot not found", "error": "Action failed: bot not found"}
+
+    events = await collect(relay(stream, finish))
+
+    assert events == [
+        ("error", {"error": "Action failed: bot not found"}),
+        ("token", {"content": "❌ Action failed: bot not found"}),
+        ("done", {"content": "❌ Action failed: bot not found", "stats": stream.stats}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_prefix_lookalike_is_released_and_errors_reported():
+    stream = ChatStream(FakeChatModel("ACT now"), [], hold_prefix="ACTION:")
+    events = await collect(stream.events())
+    assert not stream.held
+    assert "".join(data["content"] for _, data in events) == "ACT now"
+
+    class BrokenModel:
+        async def stream(self, messages, max_tokens, temperature):
+            yield "partial"
+            raise RuntimeError("upstream closed")
+
+    stream = ChatStream(BrokenModel(), [])
+
+    async def finish(stream):
+        return {"content": stream.text + " [interrupted]"}
+
+    events = await collect(relay(stream, finish))
+    assert [name for name, _ in events] == ["token", "error", "token", "done"]
+    assert events[1][1] == {"error": "upstream closed"}
+    assert events[2][1] == {"content": " [interrupted]"}
+
+
+def test_ai_chat_stream_endpoint_persists_reply(monkeypatch):
+    messages = MemoryCollection()
+    monkeypatch.setattr(database, "chat_messages_collection", messages, raising=False)
+    monkeypatch.setenv("CHAT_MODEL", "fake")
+
+    state = {
+        "bots": {"total": 2, "active": 1, "paused": 1},
+        "capital": {"total": 2000, "total_profit": 15},
+        "recent_performance": {"recent_trades_count": 3, "recent_pnl": 4.5},
+    }
+    app = FastAPI()
+    app.include_router(ai_chat.router)
+    app.dependency_overrides[get_current_user] = lambda: "user-1"
+
+    with patch.object(ai_chat.action_router, "get_system_state", AsyncMock(return_value=state)), \
+            patch.object(ai_chat.manager, "send_message", AsyncMock()) as send:
+        response = TestClient(app).post("/api/ai/chat/stream", json={"content": "how are my bots?"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    reply = "(local model) You said: how are my bots?"
+    assert "".join(data["content"] for name, data in events if name == "token") == reply
+    assert events[-1][0] == "done"
+    assert events[-1][1]["system_state"] == state
+
+    assert [(m["role"], m["content"]) for m in messages.docs] == [("user", "how are my bots?"), ("assistant", reply)]
+    assert messages.docs[1]["stream_stats"]["tokens"] == len(reply.split(" "))
+    send.assert_awaited_once()
@@ -0,0 +1,238 @@
+"""
+Tests for the circuit breaker sweep mode (all bots from one ledger load)
+"""
+
+import pytest
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from bson import ObjectId
+from services.ledger_service import LedgerService
+
+
+class FakeCursor:
+    """Async-iterable cursor over preset documents"""
+
+    def __init__(self, docs, collection=None):
+        self.docs = list(docs)
+        self.collection = collection
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def _served(self, count):
+        if self.collection is not None:
+            self.collection.scanned += count
+
+    async def to_list(self, length=None):
+        self._served(len(self.docs))
+        return self.docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            doc = next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+        self._served(1)
+        return doc
+
+
+class FakeCollection:
+    """find() on equality and $in filters, counting the documents handed back"""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.scanned = 0
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, cond in query.items():
+            if isinstance(cond, dict):
+                if doc.get(field) not in cond["$in"]:
+                    return False
+            elif doc.get(field) != cond:
+                return False
+        return True
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if self._matches(d, query or {})], self)
+
+    def aggregate(self, pipeline):
+        match, group = pipeline[0]["$match"], pipeline[1]["$group"]
+        amount = group["amount"]["$sum"].lstrip("$")
+        totals = {}
+        for doc in self.docs:
+            if self._matches(doc, match):
+                totals[doc["bot_id"]] = totals.get(doc["bot_id"], 0.0) + doc[amount]
+        return FakeCursor([{"_id": bot_id, "amount": total} for bot_id, total in totals.items()])
+
+
+class FakeLedger:
+    """The ledger reads the breaker makes, per-bot ones through LedgerService's own code"""
+
+    get_fills = LedgerService.get_fills
+    compute_drawdown = LedgerService.compute_drawdown
+
+    def __init__(self, fills, funding):
+        self.fills_ledger = FakeCollection(fills)
+        self.ledger_events = FakeCollection([
+            {"user_id": "user_1", "bot_id": bot_id, "event_type": "funding", "currency": "USDT", "amount": amount}
+            for bot_id, amount in funding.items()
+        ])
+
+
+def fill(bot_id, side, qty, price, seconds_ago, fee=0.0):
+    return {
+        "_id": ObjectId(), "user_id": "user_1", "bot_id": bot_id, "symbol": "BTC/USDT", "side": side,
+        "qty": qty, "price": price, "fee": fee,
+        "timestamp": datetime.utcnow() - timedelta(seconds=seconds_ago)
+    }
+
+
+@pytest.fixture
+def ledger():
+    fills = [
+        # bot_a: five losing round trips in a row
+        *[f for i in range(5) for f in (
+            fill("bot_a", "buy", 1, 100, 60 - i * 2),
+            fill("bot_a", "sell", 1, 99, 59 - i * 2),
+        )],
+        # bot_b: one winning round trip
+        fill("bot_b", "buy", 1, 100, 30),
+        fill("bot_b", "sell", 1, 110, 20),
+    ]
+    return FakeLedger(fills, {"bot_a": 1000.0, "bot_b": 1000.0})
+
+
+@pytest.fixture
+def fake_db():
+    bots = [
+        {"id": "bot_a", "status": "active", "initial_capital": 1000, "current_capital": 995},
+        {"id": "bot_b", "status": "active", "initial_capital": 1000, "current_capital": 1010},
+        {"id": "bot_c", "status": "stopped", "initial_capital": 1000, "current_capital": 1000},
+    ]
+    return SimpleNamespace(
+        bots_collection=SimpleNamespace(
+            find=MagicMock(return_value=FakeCursor(bots)),
+            distinct=AsyncMock(return_value=["user_1", "user_2"]),
+        ),
+        alerts_collection=SimpleNamespace(aggregate=MagicMock(return_value=FakeCursor([]))),
+    )
+
+
+@pytest.mark.asyncio
+async def test_compute_bot_metrics_single_pass(fake_db, ledger):
+    from engines.circuit_breaker import CircuitBreaker
+
+    with patch("engines.circuit_breaker.db", fake_db):
+        metrics = await CircuitBreaker().compute_bot_metrics("user_1", ["bot_a", "bot_b"], ledger)
+
+    assert metrics["bot_a"]["consecutive_losses"] == 5
+    assert metrics["bot_a"]["daily_pnl"] == pytest.approx(-5.0)
+    assert metrics["bot_b"]["consecutive_losses"] == 0
+    assert metrics["bot_b"]["daily_pnl"] == pytest.approx(10.0)
+    assert ledger.fills_ledger.scanned == 12
+
+
+@pytest.mark.asyncio
+async def test_sweep_drawdown_counts_an_old_peak(fake_db, ledger):
+    from engines.circuit_breaker import CircuitBreaker
+
+    day = 86400
+    # bot_b peaked 60 days ago, then gave most of it back
+    ledger.fills_ledger.docs[:0] = [
+        fill("bot_b", "buy", 1, 100, 61 * day),
+        fill("bot_b", "sell", 1, 600, 60 * day),
+        fill("bot_b", "buy", 1, 600, 59 * day),
+        fill("bot_b", "sell", 1, 300, 58 * day),
+    ]
+
+    with patch("engines.circuit_breaker.db", fake_db):
+        metrics = await CircuitBreaker().compute_bot_metrics("user_1", ["bot_a", "bot_b"], ledger)
+
+    current_dd, _ = await ledger.compute_drawdown(bot_id="bot_b")
+    assert metrics["bot_b"]["current_drawdown"] == pytest.approx(current_dd)
+    assert metrics["bot_b"]["current_drawdown"] == pytest.approx((1500 - 1210) / 1500)
+
+
+@pytest.mark.asyncio
+async def test_sweep_matches_the_per_bot_checks(fake_db):
+    from engines.circuit_breaker import CircuitBreaker
+
+    rng = random.Random(7)
+    fills, bot_ids = [], [f"bot_{n}" for n in range(40)]
+    for bot_id in bot_ids:
+        for i in range(rng.randint(0, 12)):
+            seconds_ago = (rng.choice([1, 45]) * 86400) - i * 120
+            buy = rng.uniform(90, 110)
+            fills += [
+                fill(bot_id, "buy", 1, buy, seconds_ago, fee=0.1),
+                fill(bot_id, "sell", 1, buy * rng.uniform(0.7, 1.2), seconds_ago - 60, fee=0.1),
+            ]
+    ledger = FakeLedger(fills, {bot_id: 100.0 for bot_id in bot_ids})
+    breaker = CircuitBreaker()
+
+    with patch("engines.circuit_breaker.db", fake_db):
+        metrics = await breaker.compute_bot_metrics("user_1", bot_ids, ledger)
+        for bot_id in bot_ids:
+            current_dd, _ = await ledger.compute_drawdown(bot_id=bot_id)
+            assert metrics[bot_id]["current_drawdown"] == pytest.approx(current_dd)
+            breach, _ = await breaker.check_bot_drawdown_ledger("user_1", bot_id, ledger)
+            assert (metrics[bot_id]["current_drawdown"] > breaker.max_bot_drawdown) == breach
+            breach, _ = await breaker.check_consecutive_losses_ledger("user_1", bot_id, ledger)
+            assert (metrics[bot_id]["consecutive_losses"] >= breaker.max_consecutive_losses) == breach
+
+
+@pytest.mark.asyncio
+async def test_sweep_user_applies_breaches_and_reports_time(fake_db, ledger):
+    from engines.circuit_breaker import CircuitBreaker
+
+    breaker = CircuitBreaker()
+    breaker.trigger_bot_quarantine = AsyncMock()
+    breaker.trigger_bot_pause = AsyncMock()
+
+    with patch("engines.circuit_breaker.db", fake_db):
+        report = await breaker.sweep_user_ledger("user_1", ledger)
+
+    assert report["bots_checked"] == 2
+    assert report["breaches"] == [{
+        "bot_id": "bot_a", "reason": "Consecutive losses: 5", "action": "quarantined"
+    }]
+    assert report["sweep_ms"] >= 0
+    breaker.trigger_bot_quarantine.assert_awaited_once_with("bot_a", "Consecutive losses: 5")
+    breaker.trigger_bot_pause.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_sweep_all_users_summarizes(fake_db, ledger):
+    from engines.circuit_breaker import CircuitBreaker
+
+    breaker = CircuitBreaker()
+    breaker.sweep_user_ledger = AsyncMock(side_effect=lambda user_id, _: {
+        "user_id": user_id, "bots_checked": 3, "breaches": [], "sweep_ms": 1.5
+    })
+
+    with patch("engines.circuit_breaker.db", fake_db):
+        summary = await breaker.sweep_all_users(ledger, max_concurrency=1)
+
+    assert summary["users"] == 2
+    assert summary["bots_checked"] == 6
+    assert summary["slowest_user_ms"] == 1.5
+    assert breaker.last_sweep is summary
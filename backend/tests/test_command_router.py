@@ -0,0 +1,138 @@
+"""
+Tests for the compiled command grammar and the cached bot name index
+"""
+
+import random
+import re
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database
+import services.ai_command_router_enhanced as router_module
+from benchmarks.memory_db import BenchCollection
+from services.ai_command_router_enhanced import BotNameIndex, EnhancedAICommandRouter
+
+
+class CountingCollection(BenchCollection):
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.finds = 0
+
+    def find(self, query=None, projection=None):
+        self.finds += 1
+        return super().find(query, projection)
+
+
+def bot(bot_id, name, user_id="u1", status="active"):
+    return {"id": bot_id, "user_id": user_id, "name": name, "status": status}
+
+
+@pytest.fixture
+def router(monkeypatch):
+    bots = CountingCollection([
+        bot("b1", "Alpha Scalper"), bot("b2", "Beta Swing"), bot("b3", "Gamma Grid", status="paused"),
+        bot("x1", "Alpha Scalper", user_id="u2")
+    ])
+    index = BotNameIndex(ttl=60)
+    monkeypatch.setattr(router_module, "bot_name_index", index)
+    monkeypatch.setattr(database, "write_listeners", [index.on_write])
+    monkeypatch.setattr(database, "bots_collection", database.WatchedCollection(bots, "bots"), raising=False)
+    for name in ("users", "system_modes", "trades"):
+        monkeypatch.setattr(database, f"{name}_collection", BenchCollection(), raising=False)
+    # The server hands the router the database module itself
+    return EnhancedAICommandRouter(database), index, bots
+
+
+def sequential_normalize(text):
+    """Reference: one re.sub per synonym, in SYNONYMS order"""
+    text = text.lower()
+    for key, synonyms in EnhancedAICommandRouter.SYNONYMS.items():
+        for synonym in synonyms:
+            text = re.sub(r'\b' + re.escape(synonym) + r'\b', key, text)
+    return text
+
+
+def test_combined_synonym_matcher_matches_sequential_expansion():
+    words = [w for synonyms in EnhancedAICommandRouter.SYNONYMS.values() for w in synonyms]
+    words += ["trading", "alpha", "restarted", "stopwatch", "bot", "and", ",", "please"]
+    rng = random.Random(7)
+    router = EnhancedAICommandRouter({name: BenchCollection() for name in ("bots", "users", "system_modes", "trades")})
+
+    for _ in range(500):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        text = text.title() if rng.random() < 0.3 else text
+        assert router.normalize_text(text) == sequential_normalize(text)
+
+    assert router.normalize_text("Kill the Trading Bot") == "stop the bot"
+    assert router.normalize_text("trading agent") == "bot"
+    assert router.normalize_text("trading trader") == "bot"
+
+    # The bot identifier is what follows the phrase, as before
+    for text in ("pause trading agent alpha", "pause trading trader alpha"):
+        name, pattern = next((n, p) for n, p in router.COMMAND_GRAMMAR if p.search(router.normalize_text(text)))
+        assert name == "pause_bot" and pattern.search(router.normalize_text(text)).group("bot") == "alpha"
+
+
+@pytest.mark.asyncio
+async def test_grammar_order_and_cached_fuzzy_lookup(router):
+    router, index, bots = router
+
+    # "halt all" normalizes to "pause all": pause_bot is first in the grammar and wins
+    assert [name for name, _ in router.COMMAND_GRAMMAR][:3] == ["pause_bot", "resume_bot", "stop_bot"]
+    is_command, result = await router.parse_and_execute("u1", "halt all", confirmed=True)
+    assert is_command and result["command"] == "pause_bot" and result["error_code"] == "BOT_NOT_FOUND"
+
+    is_command, result = await router.parse_and_execute("u1", "freeze alpha scalper", confirmed=True)
+    assert result["ok"] and result["data"]["bot_id"] == "b1"
+
+    status = await router.find_bot_fuzzy("u1", "Gamma Grid")
+    assert status["status"] == "paused"
+    assert await router.find_bot_fuzzy("u1", "b2") == bot("b2", "Beta Swing")
+    assert await router.find_bot_fuzzy("u1", "zzzz") is None
+    assert bots.finds == 1 and index.stats["hits"] >= 3
+
+    # Status writes leave the index alone
+    assert "u1" in index.users
+
+
+@pytest.mark.asyncio
+async def test_multi_bot_command_resolves_bots_in_one_load(router):
+    router, index, bots = router
+
+    is_command, result = await router.parse_and_execute("u1", "pause Alpha Scalper and Beta Swing", confirmed=True)
+
+    assert result["multi_command"] and [r["data"]["bot_id"] for r in result["results"]] == ["b1", "b2"]
+    assert bots.finds == 1
+    assert [b["status"] for b in bots.docs[:2]] == ["paused", "paused"]
+
+
+@pytest.mark.asyncio
+async def test_index_dropped_on_create_rename_and_delete(router):
+    router, index, bots = router
+    assert (await router.resolve_bot("u1", "Delta Momentum")) is None
+    await router.resolve_bot("u2", "Alpha Scalper")
+
+    await database.bots_collection.insert_one(bot("b4", "Delta Momentum"))
+    assert "u1" not in index.users and "u2" in index.users
+    assert (await router.resolve_bot("u1", "Delta Momentum"))["id"] == "b4"
+
+    await database.bots_collection.update_one({"id": "b4"}, {"$set": {"name": "Epsilon Breakout"}})
+    assert (await router.resolve_bot("u1", "Epsilon Breakout"))["id"] == "b4"
+
+    await database.bots_collection.delete_many({"id": "b4", "user_id": "u1"})
+    assert (await router.resolve_bot("u1", "b4")) is None
+    assert bots.finds == 5
+
+    # Unknown owner: every user's index is dropped
+    index.on_write("bots", "delete_many", ({"status": "stopped"},), {})
+    assert not index.users
+
+    index.ttl = 0
+    await router.resolve_bot("u1", "Alpha")
+    await router.resolve_bot("u1", "Alpha")
+    assert bots.finds == 7
@@ -0,0 +1,113 @@
+"""
+Tests for the decision trace bus (no-op tracing, ring buffer replay, filters, backpressure)
+"""
+
+import math
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from engines.market_data import RecordedMarketData, ReplayClock
+from engines.replay import ReplaySession, replay_bots
+from services.decision_bus import NULL_TRACE, DecisionBus, decision_bus
+
+
+def publish(bus, symbol, bot_id=None, user_id=None, decision="buy"):
+    trace = bus.trace("test", symbol=symbol, bot_id=bot_id, user_id=user_id)
+    trace.gate("risk", True)
+    return trace.publish(decision)
+
+
+def test_tracing_is_a_no_op_without_subscribers():
+    bus = DecisionBus(buffer_size=3)
+    assert bus.trace("test", symbol="BTC/ZAR") is NULL_TRACE
+    assert publish(bus, "BTC/ZAR") is None
+    assert bus.stats["published"] == 0 and not bus.buffers
+
+    subscription = bus.subscribe()
+    assert publish(bus, "BTC/ZAR")["reasoning"] == ["risk: passed"]
+    subscription.close()
+    assert not bus.recording
+
+    assert len(bus.buffers["BTC/ZAR"]) == 1
+
+    # The global bus keeps a replay buffer but only traces while someone watches
+    assert decision_bus.buffer_size > 0 and not decision_bus.recording
+
+
+@pytest.mark.asyncio
+async def test_ring_buffer_replay_respects_filters():
+    bus = DecisionBus(buffer_size=3)
+    bus.subscribe()  # traces are only recorded while someone watches
+    for i in range(5):
+        publish(bus, "BTC/ZAR", decision=f"btc-{i}")
+    publish(bus, "ETH/ZAR", bot_id="b1", user_id="u1", decision="eth-u1")
+    publish(bus, "ETH/ZAR", bot_id="b2", user_id="u2", decision="eth-u2")
+
+    # Only the last 3 per symbol are kept; other users' bot decisions are never replayed
+    anonymous = bus.subscribe(replay=10)
+    assert [t["decision"] for t in drain(anonymous)] == ["btc-2", "btc-3", "btc-4"]
+
+    mine = bus.subscribe(symbols=["ETH/ZAR"], user_id="u1")
+    assert [t["decision"] for t in drain(mine)] == ["eth-u1"]
+
+    by_bot = bus.subscribe(bot_ids=["b2"], user_id="u2", replay=1)
+    publish(bus, "ETH/ZAR", bot_id="b1", user_id="u1", decision="later-b1")
+    publish(bus, "XRP/ZAR", bot_id="b2", user_id="u2", decision="later-b2")
+    assert [t["decision"] for t in drain(by_bot)] == ["eth-u2", "later-b2"]
+    assert await mine.get() == bus.buffers["ETH/ZAR"][-1]
+
+
+def drain(subscription):
+    traces = []
+    while not subscription.queue.empty():
+        traces.append(subscription.queue.get_nowait())
+    return traces
+
+
+def test_slow_subscriber_drops_its_oldest_traces_only():
+    bus = DecisionBus(buffer_size=0, queue_size=2)
+    slow = bus.subscribe()
+    fast = bus.subscribe()
+
+    for i in range(5):
+        publish(bus, "BTC/ZAR", decision=str(i))
+        if i % 2 == 0 or i == 4:
+            drain(fast)  # keeps up
+
+    assert [t["decision"] for t in drain(slow)] == ["3", "4"]
+    assert slow.take_dropped() == 3 and slow.dropped == 0
+    assert fast.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_paper_trades_publish_gate_traces(tmp_path):
+    t0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    lines = ["timestamp,symbol,price,exchange"]
+    for i in range(60):
+        lines.append(f"{(t0 + timedelta(minutes=i)).isoformat()},BTC/ZAR,{1_000_000 * (1 + 0.03 * math.sin(i / 10)):.2f},luno")
+    (tmp_path / "ticks.csv").write_text("\n".join(lines))
+
+    clock = ReplayClock(t0)
+    data = RecordedMarketData.from_files(clock, ticks=tmp_path / "ticks.csv")
+    subscription = decision_bus.subscribe(user_id="replay-user", replay=0)
+    try:
+        async with ReplaySession(data, clock, seed=7) as session:
+            await session.run(replay_bots(2), step=timedelta(minutes=5))
+    finally:
+        subscription.close()
+
+    traces = [t for t in drain(subscription) if t["source"] == "paper_trade"]
+    assert traces
+    assert all(t["user_id"] == "replay-user" and t["gates"][0]["gate"] == "rate_limit" for t in traces)
+    for trace in traces:
+        if trace["decision"] == "buy":
+            assert all(g["passed"] for g in trace["gates"])
+            assert trace["symbol"] == "BTC/ZAR" and trace["sizing"]["trade_amount"] > 0
+        else:
+            assert not trace["gates"][-1]["passed"]
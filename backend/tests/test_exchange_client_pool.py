@@ -0,0 +1,126 @@
+"""
+Tests for the per-(user, exchange) async exchange client pool
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.exchange_client_pool import ExchangeClientPool
+
+
+class FakeExchange:
+    def __init__(self, name, api_key):
+        self.name = name
+        self.api_key = api_key
+        self.load_markets = AsyncMock(return_value={})
+        self.close = AsyncMock()
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_pool(clock, **kwargs):
+    built = []
+
+    def factory(exchange_name, api_key, api_secret, passphrase=None):
+        exchange = FakeExchange(exchange_name, api_key)
+        built.append(exchange)
+        return exchange
+
+    pool = ExchangeClientPool(factory=factory, clock=clock, **kwargs)
+    return pool, built
+
+
+def key_doc(api_key="k1"):
+    return {"user_id": "user_1", "exchange": "binance", "api_key": api_key, "api_secret": "s"}
+
+
+@pytest.mark.asyncio
+async def test_client_is_reused_and_markets_loaded_once():
+    clock = FakeClock()
+    pool, built = make_pool(clock, idle_ttl=900, key_check_interval=60)
+
+    first = await pool.get("user_1", "binance", key_doc())
+    clock.now += 5
+    second = await pool.get("user_1", "binance")
+
+    assert first is second
+    assert len(built) == 1
+    first.load_markets.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_key_rotation_rebuilds_client():
+    clock = FakeClock()
+    pool, built = make_pool(clock, idle_ttl=900, key_check_interval=60)
+
+    old = await pool.get("user_1", "binance", key_doc("k1"))
+    new = await pool.get("user_1", "binance", key_doc("k2"))
+
+    assert new is not old
+    assert new.api_key == "k2"
+    old.close.assert_awaited_once()
+    assert pool.stats["rebuilds"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_key_check_reloads_from_db():
+    clock = FakeClock()
+    pool, built = make_pool(clock, idle_ttl=900, key_check_interval=60)
+    fake_db = SimpleNamespace(api_keys_collection=SimpleNamespace(
+        find_one=AsyncMock(return_value=key_doc("k2"))
+    ))
+
+    old = await pool.get("user_1", "binance", key_doc("k1"))
+    clock.now += 61
+    with patch("services.exchange_client_pool.db", fake_db):
+        new = await pool.get("user_1", "binance")
+
+    assert new.api_key == "k2"
+    old.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_idle_clients_are_evicted_and_close_all():
+    clock = FakeClock()
+    pool, built = make_pool(clock, idle_ttl=300, key_check_interval=60)
+
+    idle = await pool.get("user_1", "binance", key_doc())
+    clock.now += 200
+    busy = await pool.get("user_2", "kraken", {**key_doc(), "user_id": "user_2", "exchange": "kraken"})
+    clock.now += 150
+
+    assert await pool.evict_idle() == 1
+    idle.close.assert_awaited_once()
+    assert pool.get_stats()["open_clients"] == 1
+
+    await pool.close_all()
+    busy.close.assert_awaited_once()
+    assert pool.get_stats()["open_clients"] == 0
+
+
+@pytest.mark.asyncio
+async def test_live_engine_places_orders_without_threads():
+    from engines.trading_engine_live import LiveTradingEngine
+
+    engine = LiveTradingEngine()
+    exchange = MagicMock()
+    exchange.create_market_order = AsyncMock(return_value={"id": "o1"})
+
+    with patch("asyncio.to_thread", side_effect=AssertionError("no thread hop")):
+        order = await engine.place_market_order(exchange, "BTC/USDT", "buy", 0.01)
+
+    assert order == {"id": "o1"}
+    exchange.create_market_order.assert_awaited_once_with("BTC/USDT", "buy", 0.01)
@@ -4,7 +4,6 @@ Tests for Order Pipeline - Fee Coverage and Trade Limiter Guards
 
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from datetime import datetime, timedelta
 import sys
 from pathlib import Path
 
@@ -13,6 +12,23 @@ backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
 
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Isolate shared rate limit counters between tests"""
+    from services.rate_limit_service import rate_limit_service, InMemoryRateLimitBackend
+    rate_limit_service.use_backend(InMemoryRateLimitBackend())
+    yield rate_limit_service
+
+
+@pytest.fixture(autouse=True)
+def trades_today(monkeypatch):
+    """Seed for cold daily counters (today's trades), no trades by default"""
+    import database
+    seed = AsyncMock(return_value=0)
+    monkeypatch.setattr(database, "count_trades_today", seed)
+    return seed
+
+
 @pytest.fixture
 def mock_db():
     """Mock database"""
@@ -138,14 +154,14 @@ async def test_fee_coverage_calculates_costs_correctly(mock_db, mock_ledger, ord
 
 
 @pytest.mark.asyncio
-async def test_trade_limiter_respects_bot_daily_limit(mock_db, mock_ledger, order_pipeline_config):
+async def test_trade_limiter_respects_bot_daily_limit(mock_db, mock_ledger, order_pipeline_config, trades_today):
     """Test that trade limiter enforces bot daily limit"""
     from services.order_pipeline import OrderPipeline
     
     pipeline = OrderPipeline(mock_db, mock_ledger, order_pipeline_config)
     
-    # Mock ledger to return count at limit
-    mock_ledger.get_trade_count = AsyncMock(return_value=50)  # At limit
+    # Today's trades are at the limit
+    trades_today.return_value = 50
     
     result = await pipeline._gate_c_trade_limiter(
         user_id="user_123",
@@ -159,21 +175,22 @@ async def test_trade_limiter_respects_bot_daily_limit(mock_db, mock_ledger, orde
 
 
 @pytest.mark.asyncio
-async def test_trade_limiter_respects_user_daily_limit(mock_db, mock_ledger, order_pipeline_config):
+async def test_trade_limiter_respects_user_daily_limit(mock_db, mock_ledger, order_pipeline_config, trades_today):
     """Test that trade limiter enforces user daily limit"""
-    from services.order_pipeline import OrderPipeline
+    from services.order_pipeline import LIMIT_SCOPE, OrderPipeline
+    from services.rate_limit_service import bot_key, daily
     
     pipeline = OrderPipeline(mock_db, mock_ledger, order_pipeline_config)
     
-    # Mock ledger to return different counts for bot (under limit) and user (at limit)
-    async def mock_get_trade_count(*args, bot_id=None, user_id=None, **kwargs):
+    # Today's trades: bot under limit, user at limit
+    async def count_trades_today(bot_id=None, user_id=None):
         if bot_id:
             return 10  # Bot under limit
         if user_id:
             return 500  # User at limit
         return 0
     
-    mock_ledger.get_trade_count = mock_get_trade_count
+    trades_today.side_effect = count_trades_today
     
     result = await pipeline._gate_c_trade_limiter(
         user_id="user_123",
@@ -184,6 +201,8 @@ async def test_trade_limiter_respects_user_daily_limit(mock_db, mock_ledger, ord
     assert result["passed"] is False
     assert "User daily limit" in result["reason"]
     assert "500/500" in result["reason"]
+    # The bot counter taken before the user limit failed is given back
+    assert await pipeline.rate_limits.count(bot_key("bot_456", scope=LIMIT_SCOPE), daily(50)) == 10
 
 
 @pytest.mark.asyncio
@@ -193,18 +212,16 @@ async def test_trade_limiter_respects_burst_limit(mock_db, mock_ledger, order_pi
     
     pipeline = OrderPipeline(mock_db, mock_ledger, order_pipeline_config)
     
-    # Mock ledger to return low counts for daily limits
-    mock_ledger.get_trade_count = AsyncMock(return_value=0)
-    
     # Simulate burst by making multiple rapid requests
     user_id = "user_123"
     bot_id = "bot_456"
     exchange = "binance"
     
     # Fill up burst counter
-    burst_key = f"{exchange}:{user_id}"
-    now = datetime.utcnow()
-    pipeline.burst_counters[burst_key] = [now] * 10  # Fill to limit
+    from services.order_pipeline import LIMIT_SCOPE
+    from services.rate_limit_service import exchange_key
+    burst_key = exchange_key(exchange, "user", user_id, scope=LIMIT_SCOPE)
+    await pipeline.rate_limits.record(burst_key, pipeline._burst_window(), 10)  # Fill to limit
     
     result = await pipeline._gate_c_trade_limiter(
         user_id=user_id,
@@ -218,20 +235,22 @@ async def test_trade_limiter_respects_burst_limit(mock_db, mock_ledger, order_pi
 
 
 @pytest.mark.asyncio
-async def test_trade_limiter_cleans_old_burst_timestamps(mock_db, mock_ledger, order_pipeline_config):
+async def test_trade_limiter_cleans_old_burst_timestamps(mock_db, mock_ledger, order_pipeline_config, fresh_rate_limits):
     """Test that burst limiter cleans up old timestamps"""
-    from services.order_pipeline import OrderPipeline
+    from services.order_pipeline import LIMIT_SCOPE, OrderPipeline
+    from services.rate_limit_service import exchange_key
+    import time
     
     pipeline = OrderPipeline(mock_db, mock_ledger, order_pipeline_config)
-    mock_ledger.get_trade_count = AsyncMock(return_value=0)
     
     user_id = "user_123"
     exchange = "binance"
-    burst_key = f"{exchange}:{user_id}"
+    burst_key = exchange_key(exchange, "user", user_id, scope=LIMIT_SCOPE)
     
     # Add old timestamps (outside window)
-    old_time = datetime.utcnow() - timedelta(seconds=20)
-    pipeline.burst_counters[burst_key] = [old_time] * 10
+    fresh_rate_limits.clock = lambda: time.time() - 20
+    await pipeline.rate_limits.record(burst_key, pipeline._burst_window(), 10)
+    fresh_rate_limits.clock = time.time
     
     # Check limit - should pass because old timestamps are cleaned
     result = await pipeline._gate_c_trade_limiter(
@@ -241,8 +260,67 @@ async def test_trade_limiter_cleans_old_burst_timestamps(mock_db, mock_ledger, o
     )
     
     assert result["passed"] is True
-    # Old timestamps should be cleaned
-    assert len(pipeline.burst_counters[burst_key]) == 0
+    # Old timestamps should no longer count, only the order just taken
+    assert await pipeline.rate_limits.count(burst_key, pipeline._burst_window()) == 1
+
+
+@pytest.mark.asyncio
+async def test_trade_limiter_concurrent_orders_cannot_overshoot(mock_db, mock_ledger, order_pipeline_config, trades_today):
+    """Test that concurrent gate C calls share the last free slot atomically"""
+    import asyncio
+    from services.order_pipeline import OrderPipeline
+    
+    pipeline = OrderPipeline(mock_db, mock_ledger, order_pipeline_config)
+    trades_today.return_value = 49  # One trade left for the bot
+    
+    results = await asyncio.gather(*[
+        pipeline._gate_c_trade_limiter(user_id="user_123", bot_id="bot_456", exchange="binance")
+        for _ in range(5)
+    ])
+    
+    assert [r["passed"] for r in results].count(True) == 1
+    assert trades_today.await_count <= 2  # bot and user counters seeded once
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_rejection_releases_trade_counters(mock_db, mock_ledger, order_pipeline_config):
+    """Test that an order rejected after gate C does not use up the daily limits"""
+    from services.order_pipeline import LIMIT_SCOPE, OrderPipeline
+    from services.rate_limit_service import bot_key, user_key, daily
+    
+    pipeline = OrderPipeline(mock_db, mock_ledger, order_pipeline_config)
+    breaker = {"trigger_reason": "drawdown"}
+    
+    with patch.object(pipeline.pending_orders, 'find_one', new=AsyncMock(return_value=None)), \
+         patch.object(pipeline, '_gate_b_fee_coverage', new=AsyncMock(return_value={"passed": True})), \
+         patch.object(pipeline.circuit_breaker_state, 'find_one', new=AsyncMock(return_value=breaker)):
+        result = await pipeline.submit_order(
+            user_id="user_123", bot_id="bot_456", exchange="binance", symbol="BTC/USDT",
+            side="buy", amount=0.01, order_type="market", is_paper=True
+        )
+    
+    assert result["gate_failed"] == "circuit_breaker"
+    assert await pipeline.rate_limits.count(bot_key("bot_456", scope=LIMIT_SCOPE), daily(50)) == 0
+    assert await pipeline.rate_limits.count(user_key("user_123", scope=LIMIT_SCOPE), daily(500)) == 0
+
+
+@pytest.mark.asyncio
+async def test_live_trade_exception_releases_trade_budget(monkeypatch):
+    """Test that a live trade that raises gives its budget back"""
+    import database
+    import trading_scheduler
+    from engines.trade_budget_manager import LIMIT_SCOPE, trade_budget_manager
+    from services.rate_limit_service import bot_key, daily
+    
+    monkeypatch.setattr(database, "api_keys_collection", MagicMock(find_one=AsyncMock(return_value={"key": "k"})),
+                        raising=False)
+    monkeypatch.setattr(trade_budget_manager, "calculate_bot_daily_budget", AsyncMock(return_value=10))
+    monkeypatch.setattr(trading_scheduler.live_trading_engine, "execute_trade",
+                        AsyncMock(side_effect=RuntimeError("exchange down")))
+    
+    bot = {"id": "bot_456", "user_id": "user_123", "name": "Live", "exchange": "binance"}
+    assert await trading_scheduler.TradingScheduler().execute_live_trade(bot) is None
+    assert await trade_budget_manager.limits.count(bot_key("bot_456", scope=LIMIT_SCOPE), daily(10)) == 0
 
 
 @pytest.mark.asyncio
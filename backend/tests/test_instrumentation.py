@@ -0,0 +1,113 @@
+"""
+Tests for hot-path instrumentation (route templates, stage timers, Mongo listener, exchange wrapper)
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from engines import instrumentation
+from engines.instrumentation import (
+    BoundedLabel, MetricsMiddleware, MongoCommandListener, StageLaps, instrument_exchange, timed
+)
+
+
+@pytest.fixture
+def metrics():
+    fake = MagicMock()
+    with patch.object(instrumentation, "get_metrics", return_value=fake):
+        yield fake
+
+
+def test_bounded_label_collapses_overflow():
+    label = BoundedLabel(2)
+    assert [label("a"), label("b"), label("c"), label("a")] == ["a", "b", "other", "a"]
+
+
+def test_middleware_records_route_template(metrics):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/api/bots/{bot_id}")
+    async def get_bot(bot_id: str):
+        return {"id": bot_id}
+
+    client = TestClient(app)
+    client.get("/api/bots/abc123")
+    client.get("/nowhere")
+
+    routes = [call.args[0] for call in metrics.record_http_request.call_args_list]
+    statuses = [call.args[2] for call in metrics.record_http_request.call_args_list]
+    assert routes == ["/api/bots/{bot_id}", "unmatched"]
+    assert statuses == [200, 404]
+
+
+@pytest.mark.asyncio
+async def test_timed_and_laps_record_outcomes(metrics):
+    @timed("ledger")
+    async def compute_equity():
+        return 42
+
+    @timed("order_pipeline", "gate")
+    async def failing_gate():
+        raise ValueError("boom")
+
+    assert await compute_equity() == 42
+    with pytest.raises(ValueError):
+        await failing_gate()
+
+    laps = StageLaps("paper_trade")
+    laps.lap("price")
+    laps.lap("risk_check")
+
+    recorded = [(c.args[0], c.args[1], c.args[3]) for c in metrics.record_stage.call_args_list]
+    assert recorded == [
+        ("ledger", "compute_equity", "ok"),
+        ("order_pipeline", "gate", "error"),
+        ("paper_trade", "price", "ok"),
+        ("paper_trade", "risk_check", "ok"),
+    ]
+
+
+def test_mongo_listener_pairs_started_and_finished(metrics):
+    listener = MongoCommandListener()
+    started = SimpleNamespace(command_name="find", command={"find": "trades"}, connection_id=("h", 1), request_id=7)
+    get_more = SimpleNamespace(command_name="getMore", command={"getMore": 123, "collection": "bots"},
+                               connection_id=("h", 1), request_id=8)
+
+    listener.started(started)
+    listener.started(get_more)
+    listener.succeeded(SimpleNamespace(command_name="find", connection_id=("h", 1), request_id=7, duration_micros=1500))
+    listener.failed(SimpleNamespace(command_name="getMore", connection_id=("h", 1), request_id=8, duration_micros=10))
+
+    calls = [c.args for c in metrics.record_mongo_command.call_args_list]
+    assert calls == [("find", "trades", 0.0015, "ok"), ("getMore", "bots", 0.00001, "error")]
+    assert listener._pending == {}
+
+
+@pytest.mark.asyncio
+async def test_instrument_exchange_wraps_unified_methods(metrics):
+    class FakeExchange:
+        id = "luno"
+
+        async def fetch_ticker(self, symbol):
+            return {"symbol": symbol, "last": 1.0}
+
+    exchange = instrument_exchange(FakeExchange())
+    assert instrument_exchange(exchange) is exchange
+
+    ticker = await exchange.fetch_ticker("BTC/ZAR")
+
+    assert ticker["symbol"] == "BTC/ZAR"
+    args = metrics.record_exchange_call.call_args.args
+    assert (args[0], args[1], args[3]) == ("luno", "fetch_ticker", "ok")
+    assert metrics.record_exchange_call.call_count == 1
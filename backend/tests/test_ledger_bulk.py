@@ -0,0 +1,180 @@
+"""
+Tests for bulk fill ingestion (validation, duplicate tolerance, pipeline fan-out, NDJSON import)
+"""
+
+import json
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+from pymongo.errors import BulkWriteError
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import routes.ledger_endpoints as ledger_endpoints
+from benchmarks.memory_db import BenchCollection, MemoryDatabase
+from engines.replay import _matches
+from services.ledger_service import LedgerService
+from services.order_pipeline import OrderPipeline
+
+
+class LedgerCollection(BenchCollection):
+    """Unique client_order_id like the fills_ledger index; unordered inserts report duplicates"""
+
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.insert_calls = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        taken = {d["client_order_id"] for d in self.docs if "client_order_id" in d}
+        errors = []
+        for index, doc in enumerate(docs):
+            doc.setdefault("_id", f"f{len(self.docs) + 1}")
+            if "client_order_id" in doc and doc["client_order_id"] in taken:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+                continue
+            taken.add(doc.get("client_order_id"))
+            self.docs.append(dict(doc))
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+class OrdersCollection(BenchCollection):
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.bulk_writes = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes.append(len(requests))
+        for request in requests:
+            for doc in self.docs:
+                if _matches(doc, request._filter):
+                    doc.update(request._doc["$set"])
+
+
+def fill(i, **overrides):
+    record = {
+        "user_id": "u1", "bot_id": "b1", "exchange": "luno", "symbol": "BTC/ZAR", "side": "BUY",
+        "qty": 0.01, "price": 1_000_000 + i, "fee": 25.0, "fee_currency": "ZAR",
+        "timestamp": f"2026-03-01T00:{i:02d}:00Z", "order_id": f"o{i}", "client_order_id": f"c{i}"
+    }
+    record.update(overrides)
+    return record
+
+
+@pytest.fixture
+def ledger():
+    db = MemoryDatabase()
+    db.collections["fills_ledger"] = LedgerCollection([{"_id": "old", "client_order_id": "c4"}])
+    return LedgerService(db)
+
+
+@pytest.mark.asyncio
+async def test_append_fills_validates_and_tolerates_duplicates(ledger):
+    rows = [
+        fill(0),
+        fill(1, qty=-1),
+        fill(2, price="abc"),
+        fill(3, side="hold"),
+        fill(4),  # client_order_id already in the ledger
+        fill(5, fee_currency=None),
+        fill(6, timestamp="yesterday"),
+        None,
+        fill(8, client_order_id="c0"),  # repeats row 0
+        fill(9, client_order_id=None, timestamp=1772323200000),
+    ]
+
+    summary = await ledger.append_fills(iter(rows), batch_size=3, return_ids=True)
+
+    assert (summary["received"], summary["inserted"], summary["duplicates"], summary["invalid"]) == (10, 2, 2, 6)
+    assert summary["errors"] == [
+        {"index": 1, "error": "qty must be a positive number"},
+        {"index": 2, "error": "price must be a positive number"},
+        {"index": 3, "error": "side must be buy or sell"},
+        {"index": 5, "error": "missing fee_currency"},
+        {"index": 6, "error": "timestamp is not a datetime, ISO string or epoch"},
+        {"index": 7, "error": "not a JSON object"},
+    ]
+    assert sorted(summary["fill_ids"]) == [0, 9]
+    assert summary["rejected"] == {e["index"]: e["error"] for e in summary["errors"]}
+    assert ledger.fills_ledger.insert_calls == 3  # the batch holding rows 6-8 had nothing valid
+
+    first, last = ledger.fills_ledger.docs[1:]
+    assert first["side"] == "buy" and first["timestamp"] == datetime(2026, 3, 1, 0, 0)
+    assert "client_order_id" not in last and last["timestamp"] == datetime(2026, 3, 1)
+
+
+@pytest.mark.asyncio
+async def test_record_fill_executions_writes_fills_and_orders_in_one_pass(ledger):
+    orders = OrdersCollection([
+        {"order_id": f"o{i}", "user_id": "u1", "bot_id": "b1", "exchange": "luno", "symbol": "BTC/ZAR",
+         "side": "buy", "price": 100.0, "idempotency_key": f"c{i}", "state": "pending",
+         "execution_summary": {"fee_bps": 25}}
+        for i in range(4, 7)
+    ])
+    ledger.db.collections["pending_orders"] = orders
+    pipeline = OrderPipeline(ledger.db, ledger)
+
+    executions = [
+        {"order_id": order_id, "filled_price": 101.0, "filled_qty": 2.0, "actual_fee": 0.5, "fee_currency": "ZAR"}
+        for order_id in ("o5", "o4", "missing", "o6")
+    ]
+    result = await pipeline.record_fill_executions(executions)
+
+    assert result["success"] and (result["inserted"], result["duplicates"]) == (2, 1)
+    assert [r["success"] for r in result["results"]] == [True, True, False, True]
+    assert result["results"][0]["slippage_bps"] == pytest.approx(100.0)
+    assert result["results"][1]["fill_id"] is None  # c4 was already in the ledger
+    assert ledger.fills_ledger.insert_calls == 1 and orders.bulk_writes == [3]
+    assert [o["state"] for o in orders.docs] == ["filled"] * 3
+    assert orders.docs[1]["fill_id"] == result["results"][0]["fill_id"]
+
+
+@pytest.mark.asyncio
+async def test_record_fill_executions_reports_every_rejection_past_the_error_cap(ledger, monkeypatch):
+    import services.ledger_service as ledger_service
+    monkeypatch.setattr(ledger_service, "MAX_REPORTED_ERRORS", 1)
+    orders = OrdersCollection([
+        {"order_id": f"o{i}", "user_id": "u1", "bot_id": "b1", "exchange": "luno", "symbol": "BTC/ZAR",
+         "side": "buy", "price": 100.0, "idempotency_key": f"k{i}", "state": "pending"}
+        for i in range(3)
+    ])
+    ledger.db.collections["pending_orders"] = orders
+    pipeline = OrderPipeline(ledger.db, ledger)
+
+    executions = [
+        {"order_id": f"o{i}", "filled_price": 101.0, "filled_qty": -1.0 if i else 2.0, "actual_fee": 0.5,
+         "fee_currency": "ZAR"}
+        for i in range(3)
+    ]
+    result = await pipeline.record_fill_executions(executions)
+
+    assert [r["success"] for r in result["results"]] == [True, False, False]
+    assert {r.get("error") for r in result["results"][1:]} == {"qty must be a positive number"}
+    assert [o["state"] for o in orders.docs] == ["filled", "pending", "pending"]
+
+
+class StreamedRequest:
+    def __init__(self, body: bytes, chunk: int):
+        self.body, self.chunk = body, chunk
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk):
+            yield self.body[start:start + self.chunk]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_import_streams_lines_owned_by_the_caller(ledger, monkeypatch):
+    monkeypatch.setattr(ledger_endpoints, "get_ledger_service", lambda db: ledger)
+    lines = [json.dumps(fill(i, user_id="someone-else")) for i in range(3)]
+    body = ("\n".join(lines[:2]) + "\n\n{not json\n" + lines[2]).encode()
+
+    summary = await ledger_endpoints.import_fills(StreamedRequest(body, 7), is_paper=False, user_id="u1", db=None)
+
+    assert (summary["inserted"], summary["invalid"]) == (3, 1)
+    assert summary["errors"] == [{"index": 2, "error": "not a JSON object"}]
+    assert {d["user_id"] for d in ledger.fills_ledger.docs[1:]} == {"u1"}
+    assert not any(d["is_paper"] for d in ledger.fills_ledger.docs[1:])
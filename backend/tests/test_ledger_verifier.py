@@ -0,0 +1,147 @@
+"""
+Tests for the streaming ledger verifier (merge-join reconciliation, resumable scans)
+"""
+
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database
+from services.ledger_verifier import LedgerVerifier
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def matches(doc, query):
+    for field, cond in query.items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(field)
+            if "$ne" in cond and value == cond["$ne"]:
+                return False
+            if "$gt" in cond and not (value is not None and value > cond["$gt"]):
+                return False
+        elif doc.get(field) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs, fail_after=None):
+        self.docs = docs
+        self.fail_after = fail_after
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def __aiter__(self):
+        for i, doc in enumerate(self.docs):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise ConnectionError("cursor lost")
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.fail_after = None
+
+    def find(self, query, projection=None):
+        cursor = FakeCursor([d for d in self.docs if matches(d, query)], self.fail_after)
+        self.fail_after = None
+        return cursor
+
+    async def find_one(self, query):
+        return next((d for d in self.docs if matches(d, query)), None)
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        self.docs.append({**query, **doc})
+
+
+def make_db(fills, trades):
+    return {"fills_ledger": FakeCollection(fills), "trades": FakeCollection(trades),
+            "ledger_checkpoints": FakeCollection()}
+
+
+def fill(i, seconds, bot="bot_1", side="buy", **extra):
+    doc = {"_id": i, "user_id": "u1", "bot_id": bot, "exchange": "luno", "symbol": "BTC/ZAR",
+           "side": side, "qty": 1.0, "price": 100.0, "fee": 0.1, "timestamp": T0 + timedelta(seconds=seconds)}
+    doc.update(extra)
+    return doc
+
+
+def trade(i, seconds, bot="bot_1", side="buy", pnl=1.0):
+    ts = T0 + timedelta(seconds=seconds)
+    return {"_id": i, "user_id": "u1", "bot_id": bot, "pair": "BTCZAR", "side": side,
+            "profit_loss": pnl, "timestamp": ts.isoformat(), "ts": ts}
+
+
+def sample_data():
+    fills = [fill(1, 0), fill(2, 10, side="sell"), fill(3, 20), fill(4, 100, bot="bot_2")]
+    trades = [trade(11, 1), trade(12, 12, side="sell"), trade(13, 21), trade(14, 300, bot="bot_3", pnl=5.0)]
+    return fills, trades
+
+
+@pytest.mark.asyncio
+async def test_merge_join_matches_within_tolerance():
+    fills, trades = sample_data()
+    verifier = LedgerVerifier(make_db(fills, trades), batch_size=2)
+
+    report = await verifier.reconcile("u1")
+
+    assert report["matched"] == 3
+    assert report["unmatched_fills"] == 1
+    assert report["unmatched_trades"] == 1
+    assert report["fills"] == 4 and report["trades"] == 4
+    assert report["trades_equity"] == pytest.approx(8.0)
+    assert report["batches"] == 4
+    assert {s["id"] for s in report["unmatched_sample"]} == {"4", "14"}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_resumes_from_checkpoint(monkeypatch):
+    monkeypatch.setattr(database, "TRADES_NATIVE_TS", True)
+    fills, trades = sample_data()
+    db = make_db(fills, trades)
+    verifier = LedgerVerifier(db, batch_size=1, checkpoint_every=1)
+
+    db["trades"].fail_after = 2
+    with pytest.raises(ConnectionError):
+        await verifier.reconcile("u1")
+    assert db["ledger_checkpoints"].docs[0]["status"] == "running"
+
+    report = await verifier.reconcile("u1")
+
+    assert report["resumed"] is True
+    assert (report["matched"], report["unmatched_fills"], report["unmatched_trades"]) == (3, 1, 1)
+    assert report["fills"] == 4 and report["trades"] == 4
+    assert report["trades_equity"] == pytest.approx(8.0)
+    assert db["ledger_checkpoints"].docs[0]["status"] == "complete"
+
+
+@pytest.mark.asyncio
+async def test_scan_fills_counts_problems_in_one_pass():
+    fills = [fill(1, 10), fill(2, 5, fee=None), fill(3, 20), fill(4, 30)]
+    del fills[3]["exchange"]
+    verifier = LedgerVerifier(make_db(fills, []), batch_size=2)
+
+    report = await verifier.scan_fills("u1")
+
+    assert report["scanned"] == 4
+    assert report["missing_fee"] == 1
+    assert report["missing_fields"] == 1
+    assert report["out_of_order"] == 1
+    assert report["resumed"] is False
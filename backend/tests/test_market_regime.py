@@ -0,0 +1,117 @@
+"""
+Tests for the bucketed price series behind MarketRegimeDetector
+"""
+
+import math
+import random
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import MappingProxyType
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from engines.market_data import ReplayClock
+from market_regime import MarketRegimeDetector, PriceSeries
+from paper_trading_engine import paper_engine
+from services.price_snapshot import PriceSnapshot, price_snapshots
+
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def window_stats(points, now, resolution=300, size=288):
+    """Reference: last price per bucket, buckets inside the window ending at now"""
+    buckets = {}
+    for timestamp, price in points:
+        buckets[int(timestamp // resolution)] = price
+    newest = max(buckets)
+    buckets = {b: p for b, p in buckets.items() if b > max(newest, int(now // resolution)) - size}
+    prices = [buckets[b] for b in sorted(buckets)]
+    mean = sum(prices) / len(prices)
+    return len(prices), prices[0], prices[-1], mean, math.sqrt(sum((p - mean) ** 2 for p in prices) / len(prices))
+
+
+def test_running_sums_match_a_full_recompute():
+    rng = random.Random(3)
+    series = PriceSeries()
+    points, now, price = [], T0.timestamp(), 1_000_000.0
+
+    for i in range(3000):
+        now += rng.choice([20, 60, 300, 900, 7200]) if i % 500 else 30 * 3600  # includes a gap longer than the window
+        price *= 1 + rng.gauss(0, 0.004)
+        late = now - rng.randint(0, 3600) if rng.random() < 0.1 else now
+        series.add(price, late)
+        points.append((late, price))
+        if i % 37 == 0:
+            series.expire(now)
+            count, first, last, mean, std = window_stats(points, now)
+            assert (len(series), series.first, series.last) == (count, first, last)
+            assert series.mean == pytest.approx(mean, rel=1e-9)
+            assert series.std == pytest.approx(std, rel=1e-6)
+
+    assert len(series) <= 288
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    clock = ReplayClock(T0)
+    candle_calls = []
+
+    async def get_ohlcv(symbol, exchange='luno', timeframe='5m', limit=20):
+        candle_calls.append((symbol, timeframe, limit))
+        start = int(clock.timestamp()) - limit * 300
+        return [[(start + i * 300) * 1000, 0, 0, 0, 100.0 * (1 + 0.0005 * i), 0] for i in range(limit)]
+
+    async def no_ticker(*args, **kwargs):
+        raise AssertionError("regime reads must not fetch prices")
+
+    monkeypatch.setattr(paper_engine, "get_ohlcv", get_ohlcv)
+    monkeypatch.setattr(paper_engine, "get_real_price", no_ticker)
+    return MarketRegimeDetector(clock=clock), clock, candle_calls
+
+
+@pytest.mark.asyncio
+async def test_detection_warms_up_from_candles_and_reads_from_memory(detector):
+    detector, clock, candle_calls = detector
+
+    regime = await detector.detect_regime("BTC/ZAR")
+    assert candle_calls == [("BTC/ZAR", "5m", 288)]
+    # The candle opened exactly 24h ago is already outside the window
+    assert len(detector.price_history["BTC/ZAR"]) == 287 and regime["confidence"] == 1.0
+    assert regime["trend"] == "bullish" and regime["trend_pct"] == round(100 * (1.1435 / 1.0005 - 1), 2)
+
+    # A caller's fresh price joins the current bucket; no further candle or ticker calls
+    clock.advance(timedelta(minutes=1))
+    regime = await detector.detect_regime("BTC/ZAR", price=90.0)
+    assert regime["trend"] == "bearish" and candle_calls == [("BTC/ZAR", "5m", 288)]
+
+    # Without new samples the window runs dry
+    clock.advance(timedelta(hours=25))
+    assert (await detector.detect_regime("BTC/ZAR"))["regime"] == "unknown"
+
+
+@pytest.mark.asyncio
+async def test_sampler_reads_the_price_snapshot_then_one_bulk_call(detector, monkeypatch):
+    detector, clock, candle_calls = detector
+    bulk_calls = []
+
+    async def get_prices(symbols, exchange='luno'):
+        bulk_calls.append((tuple(symbols), exchange))
+        return {s: 7.0 for s in symbols if s != "DOGE/ZAR"}  # DOGE/ZAR has no price
+
+    monkeypatch.setattr(paper_engine, "get_prices", get_prices)
+    record = MappingProxyType({"price": 150.0, "change": 0.0, "exchange": "luno", "timestamp": ""})
+    monkeypatch.setattr(price_snapshots, "snapshot", PriceSnapshot(1, "", MappingProxyType({"BTC/ZAR": record})))
+
+    for pair in ("BTC/ZAR", "ETH/ZAR", "DOGE/ZAR"):
+        await detector.get_series(pair)
+    clock.advance(timedelta(minutes=5))
+    await detector.sample()
+
+    assert bulk_calls == [(("ETH/ZAR", "DOGE/ZAR"), "luno")]
+    assert detector.price_history["BTC/ZAR"].last == 150.0
+    assert detector.price_history["ETH/ZAR"].last == 7.0
+    assert detector.price_history["DOGE/ZAR"].last != 7.0  # unpriced pair gets no sample
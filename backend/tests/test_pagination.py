@@ -0,0 +1,129 @@
+"""
+Tests for keyset pagination of fills, the merged ledger audit trail and audit logs
+"""
+
+import json
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from bson import ObjectId
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database
+from benchmarks.memory_db import BenchCollection, MemoryDatabase
+from engines.audit_logger import AuditLogger
+from services.ledger_service import LedgerService
+from services.pagination import PaginationError, keyset_stream, ndjson_lines
+
+T0 = datetime(2026, 3, 1)
+
+
+class CountingCollection(BenchCollection):
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.finds = 0
+
+    def find(self, query=None, projection=None):
+        self.finds += 1
+        return super().find(query, projection)
+
+
+def newest_first(docs):
+    return sorted(docs, key=lambda d: (d["timestamp"], d["_id"]), reverse=True)
+
+
+@pytest.fixture
+def ledger():
+    db = MemoryDatabase()
+    # Several fills share a timestamp so pages split inside a tie
+    db.collections["fills_ledger"] = CountingCollection([
+        {"_id": ObjectId(), "user_id": "u1" if i % 5 else "u2", "bot_id": f"b{i % 2}", "symbol": "BTC/ZAR",
+         "side": "buy", "qty": 0.1, "price": 100.0 + i, "timestamp": T0 + timedelta(minutes=i // 3)}
+        for i in range(40)
+    ])
+    db.collections["ledger_events"] = BenchCollection([
+        {"_id": ObjectId(), "user_id": "u1", "event_type": "funding", "amount": 10.0 * i,
+         "timestamp": T0 + timedelta(minutes=4 * i)}
+        for i in range(4)
+    ])
+    return LedgerService(db)
+
+
+@pytest.mark.asyncio
+async def test_fill_pages_walk_the_keyset_without_gaps(ledger):
+    expected = newest_first([d for d in ledger.fills_ledger.docs if d["user_id"] == "u1"])
+
+    seen, cursor = [], None
+    while True:
+        page = await ledger.get_fills_page("u1", limit=7, cursor=cursor, fields="symbol,price")
+        seen += page["fills"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [f["_id"] for f in seen] == [str(d["_id"]) for d in expected]
+    assert set(seen[0]) == {"_id", "timestamp", "symbol", "price"}
+    assert ledger.fills_ledger.finds == 5  # 32 fills in pages of 7
+
+    # Tokens only continue the listing that issued them
+    first = await ledger.get_fills_page("u1", limit=7)
+    with pytest.raises(PaginationError):
+        await ledger.get_fills_page("u1", bot_id="b1", cursor=first["next_cursor"])
+    with pytest.raises(PaginationError):
+        await ledger.get_fills_page("u1", cursor="not-a-cursor")
+    with pytest.raises(PaginationError):
+        await ledger.get_fills_page("u1", fields="price,password")
+
+
+@pytest.mark.asyncio
+async def test_audit_trail_pages_merge_fills_and_events(ledger):
+    docs = [("fill", d) for d in ledger.fills_ledger.docs if d["user_id"] == "u1"]
+    docs += [("event", d) for d in ledger.ledger_events.docs]
+    expected = sorted(docs, key=lambda kd: (kd[1]["timestamp"], kd[0], kd[1]["_id"]), reverse=True)
+
+    seen, cursor = [], None
+    while True:
+        page = await ledger.audit_trail_page("u1", limit=5, cursor=cursor, fields="amount,price")
+        seen += page["entries"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [(e["type"], e["_id"]) for e in seen] == [(kind, str(d["_id"])) for kind, d in expected]
+    assert {e.get("amount") is not None for e in seen if e["type"] == "event"} == {True}
+    assert all("amount" not in e and "price" in e for e in seen if e["type"] == "fill")
+
+
+@pytest.mark.asyncio
+async def test_audit_logger_pages_and_streams_ndjson(monkeypatch):
+    now = datetime.now(timezone.utc)
+    logs = CountingCollection([
+        {"_id": ObjectId(), "user_id": "u1", "event_type": "bot_created" if i % 4 == 0 else "bot_paused",
+         "severity": "info", "details": {"n": i}, "is_critical": i % 4 == 0,
+         "timestamp": (now - timedelta(minutes=i)).isoformat()}
+        for i in range(25)
+    ])
+    monkeypatch.setattr(database, "audit_logs_collection", logs, raising=False)
+    audit = AuditLogger()
+
+    page = await audit.audit_trail_page("u1", limit=10, fields="event_type")
+    assert [set(log) for log in page["logs"]] == [{"event_type", "timestamp"}] * 10
+    second = await audit.audit_trail_page("u1", limit=10, cursor=page["next_cursor"], fields="event_type")
+    assert page["logs"][-1]["timestamp"] > second["logs"][0]["timestamp"]
+    with pytest.raises(PaginationError):
+        await audit.audit_trail_page("u1", critical_only=True, cursor=page["next_cursor"])
+
+    critical = await audit.get_critical_events("u1", days=1)
+    assert [log["details"]["n"] for log in critical] == [0, 4, 8, 12, 16, 20, 24]
+
+    logs.finds = 0
+    lines = b"".join([chunk async for chunk in ndjson_lines(audit.export_audit_trail("u1", days=1))]).splitlines()
+    assert [json.loads(line)["details"]["n"] for line in lines] == list(range(25))
+    assert logs.finds == 1
+
+    batches = [doc async for doc in keyset_stream(logs, {"user_id": "u1"}, batch_size=10)]
+    assert len(batches) == 25 and logs.finds == 4
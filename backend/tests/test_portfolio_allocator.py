@@ -0,0 +1,116 @@
+"""
+Tests for the vectorized portfolio allocator
+"""
+
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database as db
+from engines.capital_allocator import CapitalAllocator
+from engines.portfolio_allocator import (
+    PortfolioAllocator, ReturnStats, kelly_allocation, performance_tiers, risk_parity_allocation
+)
+
+
+def bot(i, **kwargs):
+    doc = {"id": f"bot_{i}", "name": f"Bot {i}", "risk_mode": "safe", "initial_capital": 1000,
+           "current_capital": 1000, "total_profit": 0, "trades_count": 0, "win_count": 0}
+    doc.update(kwargs)
+    return doc
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_tier_solve_matches_single_bot_calculation():
+    bots = [
+        bot(0, total_profit=200, trades_count=50, win_count=30, risk_mode="balanced"),
+        bot(1, total_profit=-100, trades_count=10, win_count=0, risk_mode="aggressive"),
+        bot(2, total_profit=5, trades_count=4, win_count=0, risk_mode="risky"),
+    ]
+    allocator = CapitalAllocator()
+    balance = {"total_zar": 100000}
+
+    with patch("engines.capital_allocator.wallet_manager.get_master_balance", AsyncMock(return_value=balance)):
+        single = [await allocator.calculate_optimal_allocation("u1", b) for b in bots]
+
+    batched = PortfolioAllocator().solve(bots, balance["total_zar"], "tier")
+    assert batched.tolist() == pytest.approx(single)
+    assert performance_tiers(bots) == ["elite", "poor", "average"]
+
+
+def test_risk_parity_and_kelly_weights():
+    bots = [bot(i) for i in range(3)]
+    stats = ReturnStats(
+        trades=np.array([40.0, 40.0, 0.0]),
+        wins=np.array([28.0, 12.0, 0.0]),
+        avg_profit=np.array([20.0, 10.0, 0.0]),
+        avg_loss=np.array([-10.0, -10.0, 0.0]),
+        return_std=np.array([0.01, 0.04, 0.0])
+    )
+
+    parity = risk_parity_allocation(bots, stats, 20000, use_tier_weights=False)
+    # Inverse volatility: the calm bot gets 4x the volatile one
+    assert parity[0] == pytest.approx(4 * parity[1])
+    assert parity.max() <= 10000
+
+    kelly = kelly_allocation(bots, stats, 20000, use_tier_weights=False)
+    # Negative edge gets no Kelly weight; no history gets the calculator's minimum fraction
+    assert kelly[1] == 500
+    assert kelly[0] > kelly[2] > kelly[1]
+
+
+@pytest.mark.asyncio
+async def test_rebalance_applies_with_one_bulk_write_and_dry_run_matches():
+    bots = [bot(i, current_capital=1000 * (i + 1)) for i in range(4)]
+    bots_collection = SimpleNamespace(
+        find=MagicMock(side_effect=lambda *a, **k: FakeCursor(bots)),
+        bulk_write=AsyncMock()
+    )
+    actions = SimpleNamespace(insert_one=AsyncMock())
+    trades = SimpleNamespace(aggregate=MagicMock(return_value=FakeCursor([
+        {"_id": "bot_0", "trades": 30, "wins": 20, "avg_profit": 15.0, "avg_loss": -10.0, "pnl_std": 12.0}
+    ])))
+    balance = AsyncMock(return_value={"total_zar": 56250})  # 80% / 45 bots = R1000 base
+
+    with patch.object(db, "bots_collection", bots_collection), \
+            patch.object(db, "autopilot_actions_collection", actions), \
+            patch.object(db, "trades_collection", trades), \
+            patch("engines.wallet_manager.wallet_manager.get_master_balance", balance):
+        allocator = PortfolioAllocator()
+        preview = await allocator.rebalance("u1", dry_run=True)
+        applied = await allocator.rebalance("u1")
+        kelly = await allocator.rebalance("u1", method="kelly", dry_run=True)
+
+    assert preview["changes"] == applied["changes"]
+    assert [c["bot_id"] for c in applied["changes"]] == ["bot_1", "bot_2", "bot_3"]
+    bots_collection.bulk_write.assert_awaited_once()
+    assert len(bots_collection.bulk_write.await_args.args[0]) == 3
+    actions.insert_one.assert_awaited_once()
+    # Return statistics come from a single aggregation
+    assert trades.aggregate.call_count == 1
+    assert kelly["method"] == "kelly"
@@ -0,0 +1,115 @@
+"""
+Tests for the per-user portfolio read model (incremental writes, dirty marking, TTL)
+"""
+
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from pymongo import UpdateOne
+
+import database
+from benchmarks.memory_db import BenchCollection
+from services.portfolio_state import PortfolioStateService
+
+
+def bot(bot_id, user_id="u1", status="active", mode="paper", current=1100.0, initial=1000.0, **extra):
+    return {"id": bot_id, "user_id": user_id, "name": bot_id, "status": status, "trading_mode": mode,
+            "current_capital": current, "initial_capital": initial, "total_profit": current - initial, **extra}
+
+
+def trade(user_id, pnl, hours_ago=1.0):
+    when = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+    return {"user_id": user_id, "profit_loss": pnl, "timestamp": when.isoformat()}
+
+
+class CountingCollection(BenchCollection):
+    def __init__(self, docs=None):
+        super().__init__(docs)
+        self.finds = 0
+
+    def find(self, query=None, projection=None):
+        self.finds += 1
+        return super().find(query, projection)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    bots = CountingCollection([
+        bot("b1"), bot("b2", mode="live", current=2000.0, initial=1500.0, total_injections=200.0),
+        bot("b3", status="paused", current=500.0, initial=600.0), bot("x1", user_id="u2")
+    ])
+    trades = CountingCollection([trade("u1", 12.5), trade("u1", -2.5), trade("u1", 99.0, hours_ago=30)])
+    service = PortfolioStateService(ttl=60)
+    monkeypatch.setattr(database, "bots_collection", database.WatchedCollection(bots, "bots"), raising=False)
+    monkeypatch.setattr(database, "trades_collection", database.WatchedCollection(trades, "trades"), raising=False)
+    monkeypatch.setattr(database, "write_listeners", [service.on_write])
+    return service, bots, trades
+
+
+@pytest.mark.asyncio
+async def test_snapshot_matches_recompute_and_is_served_from_memory(store):
+    service, bots, trades = store
+
+    snapshot = await service.get("u1")
+    assert snapshot["bots"] == {"total": 3, "active": 2, "paused": 1, "stopped": 0,
+                                "by_status": {"active": 2, "paused": 1}, "active_paper": 1, "active_live": 1}
+    assert snapshot["capital"]["total"] == 3600.0
+    assert snapshot["capital"]["net_profit"] == 3100.0 - 2500.0 - 200.0
+    assert snapshot["pnl_24h"] == 10.0
+    assert snapshot["trades_24h"] == 2
+
+    await service.get("u1")
+    assert (bots.finds, trades.finds) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_bot_and_trade_writes_apply_incrementally(store):
+    service, bots, trades = store
+    await service.get("u1")
+
+    await database.bots_collection.update_one({"id": "b1"}, {"$set": {"status": "paused"}, "$inc": {"current_capital": 50}})
+    await database.bots_collection.insert_one(bot("b4", status="stopped", current=0.0, initial=0.0))
+    await database.bots_collection.delete_many({"user_id": "u1", "status": "paused"})
+    await database.trades_collection.insert_one(trade("u1", 7.0, hours_ago=0))
+    # bulk_write (not in the memory store): apply directly, then notify
+    await bots.update_one({"id": "b2"}, {"$set": {"trading_mode": "paper"}})
+    service.on_write("bots", "bulk_write", ([UpdateOne({"id": "b2"}, {"$set": {"trading_mode": "paper"}})],), {})
+
+    snapshot = await service.get("u1")
+    assert (bots.finds, trades.finds) == (1, 1)
+    assert snapshot["bots"]["by_status"] == {"active": 1, "stopped": 1}
+    assert snapshot["bots"]["active_paper"] == 1 and snapshot["bots"]["active_live"] == 0
+    assert snapshot["pnl_24h"] == 17.0
+
+    # Matches a reload from the store
+    service.invalidate("u1")
+    assert (await service.get("u1"))["bots"] == snapshot["bots"]
+    assert bots.finds == 2
+
+
+@pytest.mark.asyncio
+async def test_unrecognised_writes_and_ttl_trigger_recompute(store):
+    service, bots, trades = store
+    await service.get("u1")
+    await service.get("u2")
+
+    # Operator filter: only the named user is reloaded
+    service.on_write("bots", "update_many", ({"user_id": "u1", "current_capital": {"$gt": 0}}, {"$set": {"status": "paused"}}), {})
+    assert service.users["u1"].dirty and not service.users["u2"].dirty
+
+    # Unknown owner and unsupported operator: everyone is reloaded
+    service.on_write("bots", "update_one", ({"name": "x1"}, {"$push": {"tags": "a"}}), {})
+    assert service.users["u2"].dirty
+
+    await service.get("u1")
+    assert bots.finds == 3
+
+    service.ttl = 0
+    await service.get("u1")
+    assert bots.finds == 4
@@ -0,0 +1,127 @@
+"""
+Tests for the shared live price snapshot (bulk refresh, 24h change, versions and deltas)
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.price_snapshot import PriceSnapshotService, ticker_change_pct
+
+
+class FakeExchange:
+    def __init__(self, tickers, bulk=True, candles=None):
+        self.tickers = tickers
+        self.candles = candles
+        self.has = {"fetchTickers": bulk, "fetchOHLCV": candles is not None}
+        self.calls = []
+
+    async def fetch_tickers(self, symbols):
+        self.calls.append(("fetch_tickers", tuple(symbols)))
+        return {s: dict(self.tickers[s]) for s in symbols if s in self.tickers}
+
+    async def fetch_ticker(self, symbol):
+        self.calls.append(("fetch_ticker", symbol))
+        return dict(self.tickers[symbol])
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append(("fetch_ohlcv", symbol))
+        return self.candles[symbol]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def exchanges():
+    return {
+        # Luno-style tickers: last price only, 24h reference from hourly candles
+        "luno": FakeExchange(
+            {"BTC/ZAR": {"last": 1_100_000.0}, "ETH/ZAR": {"last": 60_000.0}},
+            candles={"BTC/ZAR": [[0, 1_000_000.0, 0, 0, 0, 0]], "ETH/ZAR": [[0, 60_000.0, 0, 0, 0, 0]]}
+        ),
+        "binance": FakeExchange({"BTC/USDT": {"last": 60_000.0, "percentage": -1.234}}),
+        "kraken": FakeExchange({"XBT/EUR": {"last": 55_000.0, "open": 50_000.0}}, bulk=False),
+    }
+
+
+def service_for(exchanges, clock=None, **kwargs):
+    async def provider(name):
+        return exchanges[name]
+
+    pairs = {name: list(exchange.tickers) for name, exchange in exchanges.items()}
+    return PriceSnapshotService(pairs=pairs, exchange_provider=provider, clock=clock or Clock(), **kwargs)
+
+
+def test_change_from_ticker_fields():
+    assert ticker_change_pct({"last": 110.0, "percentage": 2.5}) == 2.5
+    assert ticker_change_pct({"last": 110.0, "open": 100.0}) == pytest.approx(10.0)
+    assert ticker_change_pct({"last": 110.0, "change": 10.0}) == pytest.approx(10.0)
+    assert ticker_change_pct({"last": 110.0}) is None
+    assert ticker_change_pct({"last": 110.0}, reference_open=100.0) == pytest.approx(10.0)
+
+
+@pytest.mark.asyncio
+async def test_refresh_makes_one_bulk_call_per_exchange(exchanges):
+    clock = Clock()
+    service = service_for(exchanges, clock)
+
+    snapshot = await service.refresh()
+
+    assert snapshot.version == 1
+    assert snapshot.summary(["BTC/ZAR", "BTC/USDT", "XBT/EUR", "XRP/ZAR"]) == {
+        "BTC/ZAR": {"price": 1_100_000.0, "change": 10.0},
+        "BTC/USDT": {"price": 60_000.0, "change": -1.23},
+        "XBT/EUR": {"price": 55_000.0, "change": 10.0},
+        "XRP/ZAR": {"price": 0, "change": 0},
+    }
+    assert exchanges["binance"].calls == [("fetch_tickers", ("BTC/USDT",))]
+    assert [c[0] for c in exchanges["kraken"].calls] == ["fetch_ticker"]
+    with pytest.raises(TypeError):
+        snapshot.prices["BTC/ZAR"]["price"] = 0
+
+    # Unchanged prices keep the version; the 24h reference is fetched hourly, not per refresh
+    assert (await service.refresh()) is snapshot
+    clock.now += 3601
+    await service.refresh()
+    luno_calls = [c[0] for c in exchanges["luno"].calls]
+    assert luno_calls.count("fetch_tickers") == 3 and luno_calls.count("fetch_ohlcv") == 4
+
+
+@pytest.mark.asyncio
+async def test_waiters_receive_new_versions_as_deltas(exchanges):
+    service = service_for(exchanges, interval=3600)
+    try:
+        first = await service.get()  # starts the loop, waits for its first refresh
+        assert first.version == 1
+
+        waiter = asyncio.create_task(service.wait_for_update(first.version, timeout=5))
+        await asyncio.sleep(0)
+        exchanges["binance"].tickers["BTC/USDT"] = {"last": 61_000.0, "percentage": 0.5}
+        await service.refresh()
+
+        second = await waiter
+        assert second.version == 2
+        assert dict(second.changes_since(first)) == {"BTC/USDT": second.prices["BTC/USDT"]}
+        assert first.prices["BTC/USDT"]["price"] == 60_000.0  # old snapshot untouched
+
+        # Nothing new: the wait times out with the current snapshot
+        assert (await service.wait_for_update(second.version, timeout=0.01)) is second
+    finally:
+        await service.stop()
+
+    # An exchange outage keeps its pairs' last prices
+    exchanges["luno"].tickers = {}
+    exchanges["luno"].fetch_tickers = None
+    third = await service.refresh()
+    assert third.prices["BTC/ZAR"]["price"] == 1_100_000.0 and service.stats["errors"] == 1
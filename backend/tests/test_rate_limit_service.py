@@ -0,0 +1,164 @@
+"""
+Tests for the shared rate limit service (window limits, token buckets, fast path)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.rate_limit_service import (
+    RateLimitService, InMemoryRateLimitBackend, Window, TokenBucket, daily, bot_key
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def service(clock):
+    return RateLimitService(InMemoryRateLimitBackend(), clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_blocks_then_decays(service, clock):
+    window = Window(limit=10, seconds=10)
+    await service.record("exchange:binance", window, 10)
+
+    allowed, count = await service.check("exchange:binance", window)
+    assert allowed is False
+    assert count == 10
+
+    # Two windows later nothing from the old bucket counts
+    clock.now += 20
+    allowed, count = await service.check("exchange:binance", window)
+    assert allowed is True
+    assert count == 0
+
+
+@pytest.mark.asyncio
+async def test_daily_window_seeds_cold_counter_once(service):
+    calls = []
+
+    async def seed():
+        calls.append(1)
+        return 7
+
+    assert await service.count(bot_key("bot_1"), daily(50), seed=seed) == 7
+    await service.record(bot_key("bot_1"), daily(50))
+    assert await service.count(bot_key("bot_1"), daily(50), seed=seed) == 8
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hit_never_exceeds_limit(service):
+    window = Window(limit=3, seconds=60)
+    results = [await service.hit("user:u1", window) for _ in range(5)]
+    assert [allowed for allowed, _ in results] == [True, True, True, False, False]
+    assert await service.count("user:u1", window) == 3
+
+
+@pytest.mark.asyncio
+async def test_acquire_takes_nothing_when_a_rule_is_exhausted(service):
+    async def seed():
+        return 4
+
+    rules = [
+        (bot_key("bot_1"), daily(10), "bot {count}/{limit}", seed),
+        ("user:u1", daily(5), "user {count}/{limit}", seed),
+    ]
+    allowed, message, hold = await service.acquire(rules)
+    assert (allowed, message) == (True, "OK")
+    assert await service.acquire(rules) == (False, "user 5/5", None)
+
+    # The bot hit taken before the user rule failed was released
+    assert await service.count(bot_key("bot_1"), daily(10)) == 5
+    await service.release_hold(hold)
+    assert (await service.acquire(rules))[0] is True
+
+
+@pytest.mark.asyncio
+async def test_release_returns_hits_to_the_bucket_they_were_taken_from(service, clock):
+    clock.now = 1_700_006_399.0  # one second before UTC midnight
+    rules = [(bot_key("bot_1"), daily(3), "bot {count}/{limit}")]
+    for _ in range(3):
+        assert (await service.acquire(rules))[0]
+    _, _, hold = await service.acquire([(bot_key("bot_1"), daily(10), "bot {count}/{limit}")])
+
+    clock.now += 2
+    await service.release_hold(hold)
+    # The new day starts from zero; yesterday's counter dropped back to its 3 hits
+    assert await service.count(bot_key("bot_1"), daily(3)) == 0
+    clock.now -= 2
+    assert await service.count(bot_key("bot_1"), daily(3)) == 3
+
+
+def test_scoped_keys_keep_guards_apart():
+    assert bot_key("b1", scope="budget") == "budget/bot:b1"
+    assert bot_key("b1", scope="budget") != bot_key("b1", scope="pipeline") != bot_key("b1")
+
+
+@pytest.mark.asyncio
+async def test_expired_fast_path_entries_are_pruned(service, clock):
+    window = Window(limit=1, seconds=10, sliding=False)
+    for i in range(100):
+        await service.record(f"user:u{i}", window)
+        await service.check(f"user:u{i}", window)
+    assert len(service._blocked_until) == 100
+
+    clock.now += 120
+    await service.record("user:last", window)
+    await service.check("user:last", window)
+    assert list(service._blocked_until) == [("user:last", 10, 1)]
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_a_backend_share_limits(clock):
+    backend = InMemoryRateLimitBackend()
+    worker_a = RateLimitService(backend, clock=clock)
+    worker_b = RateLimitService(backend, clock=clock)
+    window = daily(2)
+
+    await worker_a.record(bot_key("bot_1"), window)
+    await worker_b.record(bot_key("bot_1"), window)
+
+    allowed, count = await worker_a.check(bot_key("bot_1"), window)
+    assert allowed is False
+    assert count == 2
+
+
+@pytest.mark.asyncio
+async def test_fast_path_denies_without_backend_roundtrip(service, clock):
+    window = Window(limit=1, seconds=60, sliding=False)
+    await service.record("exchange:luno", window)
+    assert (await service.check("exchange:luno", window))[0] is False
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("backend should not be queried")
+
+    service.backend.get_counts = fail
+    assert (await service.check("exchange:luno", window))[0] is False
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills(service, clock):
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    assert await service.take("exchange:kraken:api", bucket) is True
+    assert await service.take("exchange:kraken:api", bucket) is True
+    assert await service.take("exchange:kraken:api", bucket) is False
+
+    clock.now += 1
+    assert await service.take("exchange:kraken:api", bucket) is True
@@ -0,0 +1,102 @@
+"""
+Tests for recorded market data and historical replay through PaperTradingEngine
+"""
+
+import math
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database
+from engines.market_data import RecordedMarketData, ReplayClock
+from engines.replay import ReplaySession, replay_bots
+from paper_trading_engine import paper_engine
+
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def write_ticks(path, minutes=120):
+    lines = ["timestamp,symbol,price,exchange"]
+    for i in range(minutes):
+        price = 1_000_000 * (1 + 0.03 * math.sin(i / 10))
+        lines.append(f"{(T0 + timedelta(minutes=i)).isoformat()},BTC/ZAR,{price:.2f},luno")
+        lines.append(f"{(T0 + timedelta(minutes=i)).isoformat()},ETH/ZAR,{price / 20:.2f},luno")
+    path.write_text("\n".join(lines))
+    return path
+
+
+@pytest.mark.asyncio
+async def test_recorded_data_never_sees_the_future(tmp_path):
+    clock = ReplayClock(T0 + timedelta(minutes=12, seconds=30))
+    data = RecordedMarketData.from_files(clock, ticks=write_ticks(tmp_path / "ticks.csv"))
+
+    assert await data.get_pairs("luno") == ["BTC/ZAR", "ETH/ZAR"]
+    expected = 1_000_000 * (1 + 0.03 * math.sin(12 / 10))
+    assert await data.fetch_price("BTC/ZAR", "luno") == pytest.approx(expected, abs=0.01)
+
+    candles = await data.fetch_ohlcv("BTC/ZAR", "luno", "5m", 20)
+    # 12:30 into the recording: the 00:00 and 00:05 buckets are closed, 00:10 is not
+    assert [c[0] for c in candles] == [T0.timestamp() * 1000, (T0 + timedelta(minutes=5)).timestamp() * 1000]
+    assert candles[0][4] == pytest.approx(1_000_000 * (1 + 0.03 * math.sin(4 / 10)), abs=0.01)
+
+    clock.set(T0 + timedelta(minutes=119))
+    assert len(await data.fetch_ohlcv("BTC/ZAR", "luno", "5m", 20)) == 20
+
+
+async def replay_once(ticks, seed):
+    clock = ReplayClock(T0)
+    data = RecordedMarketData.from_files(clock, ticks=ticks)
+    async with ReplaySession(data, clock, seed=seed) as session:
+        report = await session.run(replay_bots(4, capital=5000), step=timedelta(minutes=2))
+        trades = await session.collections["trades"].find({}, {"_id": 0}).to_list(None)
+    return report, trades
+
+
+@pytest.mark.asyncio
+async def test_replay_is_deterministic_and_restores_engine(tmp_path):
+    ticks = write_ticks(tmp_path / "ticks.csv")
+    saved_bots = database.bots_collection
+    saved_limiter = paper_engine.rate_limiter
+    saved_risk = paper_engine.risk_engine
+
+    first, first_trades = await replay_once(ticks, seed=11)
+    second, second_trades = await replay_once(ticks, seed=11)
+
+    assert first["cycles"] == 4 * 60
+    assert first["trades"] == len(first_trades) > 0
+    for key in ("trades", "outcomes", "final_capital", "total_profit"):
+        assert first[key] == second[key]
+    assert [t["profit_loss"] for t in first_trades] == [t["profit_loss"] for t in second_trades]
+    # Trades carry simulated time, not wall time
+    assert all(t["timestamp"].startswith("2026-03-01") for t in first_trades)
+    assert all(t["data_source"] == "REPLAY_LUNO" for t in first_trades)
+
+    assert paper_engine.market_data is None
+    assert paper_engine.rate_limiter is saved_limiter
+    assert paper_engine.risk_engine is saved_risk and not saved_risk.user_daily_loss
+    assert database.bots_collection is saved_bots
+
+
+@pytest.mark.asyncio
+async def test_risk_checks_run_on_the_replay_clock(tmp_path):
+    clock = ReplayClock(T0 + timedelta(hours=1))
+    data = RecordedMarketData.from_files(clock, ticks=write_ticks(tmp_path / "ticks.csv"))
+
+    async with ReplaySession(data, clock) as session:
+        session.collections["trades"].docs += [
+            {"user_id": "u1", "profit_loss": -40.0, "timestamp": (T0 + timedelta(minutes=10)).isoformat(),
+             "ts": T0 + timedelta(minutes=10)},
+            {"user_id": "u1", "profit_loss": -5.0, "timestamp": (T0 - timedelta(hours=2)).isoformat(),
+             "ts": T0 - timedelta(hours=2)},
+        ]
+        risk = paper_engine.risk_engine
+        await risk._check_daily_loss("u1", total_equity=1000)
+
+        # "Today" is the simulated day, not the wall-clock one
+        assert risk.last_reset == T0.date()
+        assert risk.user_daily_loss == {"u1": -40.0}
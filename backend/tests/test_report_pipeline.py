@@ -0,0 +1,186 @@
+"""
+Tests for the batched daily report pipeline (aggregated stats, SMTP queue, checkpoints)
+"""
+
+import pytest
+import smtplib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.report_pipeline import ReportPipeline, SmtpQueue, precompute_daily_stats
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self._limit = None
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:self._limit] if self._limit else self.docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeUsers:
+    def __init__(self, users):
+        self.users = users
+
+    def find(self, query, projection=None):
+        after = query.get("id", {}).get("$gt")
+        return FakeCursor(u for u in self.users if after is None or u["id"] > after)
+
+
+class FakeRuns:
+    def __init__(self, doc=None):
+        self.doc = doc
+        self.updates = 0
+
+    async def find_one(self, query):
+        return self.doc
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates += 1
+        self.doc = {**(self.doc or {}), **update["$set"]}
+
+
+class FakeDatabase(SimpleNamespace):
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+class FakeConnection:
+    def __init__(self, log):
+        self.log = log
+
+    def send_message(self, msg):
+        self.log.append(msg["To"])
+
+    def quit(self):
+        pass
+
+
+def make_db(users, runs=None, fills=(), bots=()):
+    return FakeDatabase(
+        users=FakeUsers(users),
+        bots=SimpleNamespace(
+            aggregate=MagicMock(return_value=FakeCursor(bots)),
+            find=MagicMock(return_value=FakeCursor([{"id": "bot_1", "name": "Alpha"}]))
+        ),
+        fills_ledger=SimpleNamespace(aggregate=MagicMock(return_value=FakeCursor(fills))),
+        alerts=SimpleNamespace(aggregate=MagicMock(side_effect=lambda *_: FakeCursor([]))),
+        report_runs=runs or FakeRuns()
+    )
+
+
+def make_smtp(sent, **kwargs):
+    opened = []
+
+    def connect():
+        opened.append(1)
+        return FakeConnection(sent)
+
+    return SmtpQueue("smtp.test", 587, "user", "pass", "reports@test", connect=connect, **kwargs), opened
+
+
+WINDOW = (datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 2, tzinfo=timezone.utc))
+
+
+@pytest.mark.asyncio
+async def test_precompute_maps_aggregations_per_user():
+    database = make_db(
+        users=[],
+        bots=[{"_id": {"user_id": "u1", "status": "active"}, "count": 2, "equity": 900.0, "initial": 1000.0}],
+        fills=[
+            {"_id": {"user_id": "u1", "bot_id": "bot_1", "symbol": "BTC/ZAR"}, "fills": 4, "fees": 4.0,
+             "buy_qty": 2.0, "buy_value": 200.0, "sell_qty": 2.0, "sell_value": 250.0},
+            {"_id": {"user_id": "u1", "bot_id": "bot_2", "symbol": "ETH/ZAR"}, "fills": 2, "fees": 1.0,
+             "buy_qty": 1.0, "buy_value": 100.0, "sell_qty": 1.0, "sell_value": 90.0},
+            # Still open: counts as fills and volume, not as a closed trade
+            {"_id": {"user_id": "u1", "bot_id": "bot_2", "symbol": "XRP/ZAR"}, "fills": 1, "fees": 0.0,
+             "buy_qty": 5.0, "buy_value": 50.0, "sell_qty": 0.0, "sell_value": 0.0},
+        ]
+    )
+
+    stats = await precompute_daily_stats(database, [{"id": "u1"}, {"id": "u2"}], *WINDOW)
+
+    assert stats["u1"]["active_bots"] == 2
+    assert stats["u1"]["total_trades"] == 7
+    assert stats["u1"]["total_volume"] == 690.0
+    assert stats["u1"]["win_rate"] == 50.0
+    assert stats["u1"]["total_profit"] == 40.0
+    assert stats["u1"]["net_profit"] == 35.0
+    assert stats["u1"]["best_bot"] == "Alpha"
+    assert stats["u1"]["best_bot_profit"] == 50.0
+    assert stats["u1"]["drawdown_percent"] == pytest.approx(10.0)
+    assert stats["u2"]["total_trades"] == 0
+    # One ledger fills aggregation for the whole batch
+    assert database.fills_ledger.aggregate.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_smtp_queue_reuses_connection_and_reconnects():
+    sent = []
+    smtp, opened = make_smtp(sent, concurrency=1)
+
+    async with smtp:
+        assert all([await smtp.send(f"u{i}@test", "s", "<p/>") for i in range(5)])
+    assert len(sent) == 5
+    assert len(opened) == 1
+
+    # A dropped connection is reopened and the message retried
+    class Flaky(FakeConnection):
+        def send_message(self, msg):
+            raise smtplib.SMTPServerDisconnected()
+
+    connections = iter([Flaky(sent), FakeConnection(sent)])
+    flaky = SmtpQueue("smtp.test", 587, "user", "pass", "reports@test", concurrency=1,
+                      connect=lambda: next(connections))
+    async with flaky:
+        assert await flaky.send("retry@test", "s", "<p/>") is True
+    assert sent[-1] == "retry@test"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_checkpoints_batches_and_resumes():
+    users = [{"id": f"u{i}", "email": f"u{i}@test"} for i in range(5)]
+    runs = FakeRuns({"last_user_id": "u1", "sent": 2, "failed": 0, "skipped": 0})
+    database = make_db(users, runs)
+    sent = []
+    smtp, _ = make_smtp(sent, concurrency=2)
+
+    pipeline = ReportPipeline(database, smtp, batch_size=2, render_workers=2)
+    summary = await pipeline.run("daily:2026-01-01", lambda u, s: ("subject", f"<p>{u['id']}</p>"), *WINDOW)
+
+    # Users before the checkpoint are not resent
+    assert sorted(sent) == ["u2@test", "u3@test", "u4@test"]
+    assert summary["sent"] == 5
+    assert summary["batches"] == 2
+    assert runs.doc["last_user_id"] == "u4"
+    assert "completed_at" in runs.doc
+
+    # A completed run is skipped
+    again = await pipeline.run("daily:2026-01-01", lambda u, s: ("subject", ""), *WINDOW)
+    assert again["resumed"] is True
+    assert len(sent) == 3
@@ -0,0 +1,141 @@
+"""
+Tests for the batched RiskManagement position monitor
+"""
+
+import pytest
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database as db
+from engines.market_data import ReplayClock
+from engines.risk_management import PRICE_MAX_AGE_SECONDS, RiskManagement
+from paper_trading_engine import PaperTradingEngine
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_evaluate_positions_matches_check_position():
+    batched, single = RiskManagement(), RiskManagement()
+    for rm in (batched, single):
+        for bot_id in ("sl", "tp", "trail", "hold"):
+            await rm.set_position(bot_id, 100.0, 2.0, 5.0, 3.0)
+        # Trailing position already ran up to 104 (stop 100.88)
+        rm.active_positions["trail"].update(highest_price=104.0, trailing_stop_price=100.88)
+
+    prices = {"sl": 97.0, "tp": 106.0, "trail": 100.5, "hold": 103.0}
+
+    signals = batched.evaluate_positions(list(prices), list(prices.values()))
+    expected = {}
+    for bot_id, price in prices.items():
+        signal = await single.check_position(bot_id, price)
+        if signal:
+            expected[bot_id] = signal['action']
+
+    assert {s['bot_id']: s['action'] for s in signals} == expected == {
+        "sl": "stop_loss", "tp": "take_profit", "trail": "trailing_stop"
+    }
+    # The held position's trailing stop was raised in place
+    assert batched.active_positions["hold"]["highest_price"] == 103.0
+    assert batched.active_positions["hold"]["trailing_stop_price"] == pytest.approx(99.91)
+
+
+@pytest.mark.asyncio
+async def test_monitor_thousand_positions_in_one_pass():
+    rm = RiskManagement()
+    bots = []
+    for i in range(1000):
+        await rm.set_position(f"bot_{i}", 100.0, pair="BTC/ZAR", exchange="luno")
+        bots.append({"id": f"bot_{i}", "status": "active" if i else "paused", "current_capital": 1000.0})
+
+    # bot_0 is paused and gets closed; 99.0 is inside every band so nothing exits
+    bots_collection = SimpleNamespace(find=MagicMock(return_value=FakeCursor(bots)))
+    engine = SimpleNamespace(get_prices=AsyncMock(return_value={"BTC/ZAR": 99.0}))
+    rm.execute_exit = AsyncMock(return_value=True)
+
+    with patch.object(db, "bots_collection", bots_collection), \
+            patch("paper_trading_engine.paper_engine", engine):
+        start = time.perf_counter()
+        summary = await rm.monitor_positions()
+        elapsed = time.perf_counter() - start
+
+    assert summary == {"checked": 999, "closed": 1, "exits": 0}
+    bots_collection.find.assert_called_once()
+    engine.get_prices.assert_awaited_once_with(["BTC/ZAR"], "luno", max_age=PRICE_MAX_AGE_SECONDS)
+    assert elapsed < 1.0
+
+    # Price through every stop: all remaining positions exit concurrently
+    engine.get_prices.return_value = {"BTC/ZAR": 97.0}
+    bots_collection.find.return_value = FakeCursor(bots)
+    with patch.object(db, "bots_collection", bots_collection), \
+            patch("paper_trading_engine.paper_engine", engine):
+        summary = await rm.monitor_positions()
+
+    assert summary["exits"] == 999
+    assert rm.execute_exit.await_args.kwargs["bot"]["id"].startswith("bot_")
+
+
+class FlakyMarketData:
+    def __init__(self, prices):
+        self.prices = prices
+
+    async def fetch_price(self, symbol, exchange):
+        return self.prices.get(symbol)
+
+
+@pytest.mark.asyncio
+async def test_get_prices_returns_only_fetched_or_fresh_cached_prices():
+    engine = PaperTradingEngine()
+    engine.clock = ReplayClock(datetime(2026, 3, 1, tzinfo=timezone.utc))
+    engine.market_data = FlakyMarketData({"BTC/ZAR": 100.0, "ETH/ZAR": 50.0})
+    assert await engine.get_prices(["BTC/ZAR", "ETH/ZAR", "XRP/ZAR"]) == {"BTC/ZAR": 100.0, "ETH/ZAR": 50.0}
+
+    # ETH/ZAR stops pricing: its cached price is used until it is older than max_age
+    engine.market_data.prices = {"BTC/ZAR": 101.0}
+    engine.clock.advance(timedelta(seconds=5))
+    assert await engine.get_prices(["BTC/ZAR", "ETH/ZAR"], max_age=10) == {"BTC/ZAR": 101.0, "ETH/ZAR": 50.0}
+    engine.clock.advance(timedelta(seconds=6))
+    assert await engine.get_prices(["BTC/ZAR", "ETH/ZAR"], max_age=10) == {"BTC/ZAR": 101.0}
+    assert await engine.get_prices(["ETH/ZAR"]) == {"ETH/ZAR": 50.0}
+
+
+@pytest.mark.asyncio
+async def test_monitor_skips_positions_without_a_fresh_price():
+    rm = RiskManagement()
+    await rm.set_position("btc_bot", 100.0, pair="BTC/ZAR", exchange="luno")
+    await rm.set_position("eth_bot", 100.0, pair="ETH/ZAR", exchange="luno")
+    bots = [{"id": bot_id, "status": "active"} for bot_id in ("btc_bot", "eth_bot")]
+
+    engine = PaperTradingEngine()
+    engine.clock = ReplayClock(datetime(2026, 3, 1, tzinfo=timezone.utc))
+    engine.market_data = FlakyMarketData({"BTC/ZAR": 90.0})  # no ETH/ZAR price and nothing cached
+    rm.execute_exit = AsyncMock(return_value=True)
+
+    with patch.object(db, "bots_collection", SimpleNamespace(find=MagicMock(return_value=FakeCursor(bots)))), \
+            patch("paper_trading_engine.paper_engine", engine):
+        summary = await rm.monitor_positions()
+
+    assert summary == {"checked": 1, "closed": 0, "exits": 1}
+    assert rm.execute_exit.await_args.args[0] == "btc_bot"
+
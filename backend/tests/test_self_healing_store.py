@@ -0,0 +1,93 @@
+"""
+Tests for the bounded, fingerprint-indexed SelfHealingAI error store
+"""
+
+import pytest
+from datetime import datetime, timezone
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from engines.self_healing_ai import ErrorEvent, ErrorSeverity, ErrorStore, RollingCounter, SelfHealingAI
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def event(error_type="connection_timeout", component="api"):
+    return ErrorEvent(
+        timestamp=datetime.now(timezone.utc), error_type=error_type, error_message="x",
+        severity=ErrorSeverity.MEDIUM, component=component, stack_trace="", context={}
+    )
+
+
+def test_rolling_counter_expires_buckets():
+    clock = FakeClock()
+    counter = RollingCounter(60, buckets=6, clock=clock)
+
+    counter.add(3)
+    clock.now = 30
+    counter.add(2)
+    assert counter.total() == 5
+
+    clock.now = 65  # first bucket (t=0..10) has left the window
+    assert counter.total() == 2
+
+    clock.now = 500
+    assert counter.total() == 0
+
+
+def test_store_stays_bounded_under_error_storm():
+    store = ErrorStore(capacity=100, max_fingerprints=10)
+
+    for i in range(10000):
+        store.add(event(component=f"component_{i % 50}"))
+
+    assert len(store.events) == 100
+    assert len(store.fingerprints) == 10
+    assert len(store.component_rates) == 10
+    # The most recently seen fingerprints are the ones kept
+    assert ("connection_timeout", "component_49") in store.fingerprints
+
+    # A hot component keeps an exact windowed count
+    for _ in range(500):
+        store.add(event(component="hot"))
+    assert store.component_rate("hot") == 500
+    assert store.fingerprints[("connection_timeout", "hot")].count == 500
+
+
+@pytest.mark.asyncio
+async def test_monitor_heals_each_fingerprint_once():
+    ai = SelfHealingAI(max_error_rate=5)
+
+    for _ in range(20):
+        await ai.report_error(Exception("Connection timeout"), component="exchange")
+    await ai.report_error(Exception("Invalid order amount"), component="orders")
+
+    assert ai.component_health["exchange"]["status"] == "degraded"
+
+    pending = ai.error_store.pending()
+    assert sorted(fp.error_type for fp in pending) == ["connection_timeout", "invalid_order"]
+
+    for fp in pending:
+        await ai.heal_error(fp.last_event)
+
+    assert ai.error_store.pending() == []
+    assert all(ai.error_store.is_healed(e) for e in ai.error_history)
+    assert len(ai.healing_history) == 2
+
+    # A new error of a healed fingerprint is pending again
+    new = await ai.report_error(Exception("Connection timeout"), component="exchange")
+    assert not ai.error_store.is_healed(new)
+
+    report = await ai.get_health_report()
+    assert report["error_distribution"] == {"connection_timeout": 21, "invalid_order": 1}
+    assert report["metrics"]["recent_healings"] == 2
@@ -0,0 +1,87 @@
+"""
+Tests for parallel, profiled service startup and lazy subsystem loading
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.startup import (
+    StartupPlan, StartupProfile, ServiceSpec, lazy, lazy_available, lazy_loaded
+)
+
+
+@pytest.mark.asyncio
+async def test_independent_services_start_concurrently():
+    running = set()
+    overlap = []
+
+    def service(name):
+        async def start():
+            running.add(name)
+            await asyncio.sleep(0.01)
+            overlap.append(set(running))
+            running.discard(name)
+        return start
+
+    profile = StartupProfile()
+    plan = StartupPlan([
+        ServiceSpec("a", service("a")),
+        ServiceSpec("b", service("b")),
+        ServiceSpec("c", service("c"), depends_on=("a",))
+    ], profile)
+
+    assert [[s.name for s in level] for level in plan.levels()] == [["a", "b"], ["c"]]
+
+    result = await plan.run()
+
+    assert sorted(result.started) == ["a", "b", "c"]
+    assert {"a", "b"} in overlap
+    assert overlap[-1] == {"c"}
+    assert profile.services["c"]["level"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_dependency_skips_dependents():
+    def broken():
+        raise RuntimeError("boom")
+
+    profile = StartupProfile()
+    plan = StartupPlan([
+        ServiceSpec("engine", broken),
+        ServiceSpec("risk", lambda: None, depends_on=("engine",)),
+        ServiceSpec("off", lambda: None, enabled=False),
+        ServiceSpec("background", lambda: asyncio.sleep(0), background=True)
+    ], profile)
+
+    result = await plan.run()
+    await asyncio.gather(*result.tasks)
+
+    assert result.failed == ["engine"]
+    assert sorted(result.skipped) == ["off", "risk"]
+    assert len(result.tasks) == 1
+    assert profile.services["engine"]["error"] == "boom"
+    assert profile.services["risk"]["status"] == "skipped"
+    assert profile.summary()["services_failed"] == ["engine"]
+
+    with pytest.raises(ValueError):
+        StartupPlan([ServiceSpec("x", lambda: None, depends_on=("y",))]).levels()
+
+
+def test_lazy_object_imports_on_first_use():
+    dumps = lazy("json", "dumps")
+    missing = lazy("module_that_does_not_exist", "thing")
+
+    assert not lazy_loaded(dumps)
+    assert dumps({"a": 1}) == '{"a": 1}'
+    assert lazy_loaded(dumps)
+
+    assert lazy_available(missing) is False
+    assert lazy_loaded(missing) is False
+    with pytest.raises(ImportError):
+        missing.anything
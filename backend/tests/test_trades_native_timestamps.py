@@ -0,0 +1,125 @@
+"""
+Tests for the trades native timestamp migration and the reader flag
+"""
+
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database as db
+from migrations.trades_native_timestamps import backfill_trade_ts, summarize_explain
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self._limit = None
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:self._limit] if self._limit else self.docs
+
+
+class FakeTrades:
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.bulk_calls = 0
+
+    def find(self, query, projection=None):
+        after = query.get("_id", {}).get("$gt")
+        docs = [
+            d for _id, d in sorted(self.docs.items())
+            if "ts" not in d and (after is None or _id > after)
+        ]
+        return FakeCursor(docs)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_calls += 1
+        for op in ops:
+            self.docs[op._filter["_id"]].update(op._doc["$set"])
+        return SimpleNamespace(modified_count=len(ops))
+
+
+class FakeState:
+    def __init__(self):
+        self.doc = None
+
+    async def find_one(self, query):
+        return self.doc
+
+    async def update_one(self, query, update, upsert=False):
+        self.doc = {**(self.doc or {}), **update["$set"]}
+
+
+def trades(n, bad=()):
+    return [
+        {"_id": i, "timestamp": "not-a-date" if i in bad else f"2026-01-01T00:00:{i:02d}+00:00"}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_backfill_sets_native_datetimes_in_batches():
+    collection = FakeTrades(trades(5, bad={3}))
+    state = FakeState()
+
+    result = await backfill_trade_ts(collection, state, batch_size=2)
+
+    assert result == {"updated": 4, "skipped": 1, "batches": 3}
+    assert collection.docs[0]["ts"] == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert "ts" not in collection.docs[3]
+    assert state.doc["last_id"] == 4
+    assert "completed_at" in state.doc
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint():
+    collection = FakeTrades(trades(4, bad={1}))
+    state = FakeState()
+    state.doc = {"last_id": 1, "updated": 1, "skipped": 1}
+
+    result = await backfill_trade_ts(collection, state, batch_size=10)
+
+    # Only documents after the checkpoint are read
+    assert result == {"updated": 3, "skipped": 1, "batches": 1}
+    assert "ts" not in collection.docs[0]
+
+
+def test_summarize_explain_walks_plan():
+    explain = {
+        "queryPlanner": {"winningPlan": {
+            "stage": "FETCH",
+            "inputStage": {"stage": "IXSCAN", "indexName": "user_id_1_ts_-1"}
+        }},
+        "executionStats": {"totalKeysExamined": 12, "totalDocsExamined": 12, "nReturned": 12, "executionTimeMillis": 1}
+    }
+
+    summary = summarize_explain(explain)
+    assert summary["stages"] == "FETCH <- IXSCAN"
+    assert summary["indexes"] == ["user_id_1_ts_-1"]
+    assert summary["docs_examined"] == 12
+
+
+def test_trades_since_follows_flag():
+    since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    with patch.object(db, "TRADES_NATIVE_TS", False):
+        assert db.trades_since(since) == {"timestamp": {"$gte": since.isoformat()}}
+        assert db.trade_time_field() == "timestamp"
+
+    with patch.object(db, "TRADES_NATIVE_TS", True):
+        assert db.trades_since(since) == {"ts": {"$gte": since}}
+        assert db.trade_time_field() == "ts"
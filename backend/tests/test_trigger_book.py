@@ -0,0 +1,145 @@
+"""
+Tests for the price-indexed advanced order trigger book
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import database as db
+from advanced_orders import AdvancedOrderManager, TriggerBook
+
+
+def stop(order_id, price):
+    return {"id": order_id, "type": "stop_loss", "stop_price": price, "status": "active"}
+
+
+def target(order_id, price):
+    return {"id": order_id, "type": "take_profit", "target_price": price, "status": "active"}
+
+
+def trailing(order_id, high, pct):
+    return {"id": order_id, "type": "trailing_stop", "trail_percent": pct, "highest_price": high,
+            "current_stop": high * (1 - pct / 100), "status": "active"}
+
+
+def test_tick_fires_only_crossed_orders():
+    book = TriggerBook()
+    for order in [stop("s90", 90), stop("s95", 95), stop("s80", 80), target("t110", 110), target("t120", 120)]:
+        book.add(order)
+
+    fired, _ = book.on_price(100)
+    assert fired == []
+
+    fired, _ = book.on_price(95)
+    assert [(o["id"], reason) for o, reason in fired] == [("s95", "Stop-loss triggered")]
+
+    fired, _ = book.on_price(115)
+    assert [o["id"] for o, _ in fired] == ["t110"]
+    assert sorted(book.orders) == ["s80", "s90", "t120"]
+
+
+def test_trailing_stop_reanchors_on_new_high_only():
+    book = TriggerBook()
+    book.add(trailing("a", 100, 10))
+    book.add(trailing("b", 105, 10))
+
+    # Below both highs: nothing moves or fires
+    fired, moved = book.on_price(99)
+    assert (fired, moved) == ([], [])
+
+    # New high for "a" only
+    _, moved = book.on_price(103)
+    assert [o["id"] for o in moved] == ["a"]
+    assert book.orders["a"]["current_stop"] == pytest.approx(92.7)
+    assert book.orders["b"]["current_stop"] == pytest.approx(94.5)
+
+    fired, _ = book.on_price(94)
+    assert [(o["id"], reason) for o, reason in fired] == [("b", "Trailing stop triggered")]
+    assert book.trailing == [(103, "a")]
+
+
+@pytest.mark.asyncio
+async def test_manager_prices_each_symbol_once_and_persists():
+    collection = SimpleNamespace(
+        replace_one=AsyncMock(),
+        update_one=AsyncMock(),
+        bulk_write=AsyncMock(),
+        find=MagicMock()
+    )
+    bots = SimpleNamespace(find_one=AsyncMock(return_value={"id": "bot_1", "user_id": "u1", "exchange": "luno"}))
+    trades = SimpleNamespace(insert_one=AsyncMock())
+    engine = SimpleNamespace(get_real_price=AsyncMock(return_value=93.5))
+
+    with patch.object(db, "advanced_orders_collection", collection), \
+            patch.object(db, "bots_collection", bots), \
+            patch.object(db, "trades_collection", trades), \
+            patch("paper_trading_engine.paper_engine", engine):
+        manager = AdvancedOrderManager()
+        for i in range(5):
+            await manager.create_stop_loss("bot_1", "BTC/ZAR", 95.0 - i, 100.0, exchange="luno")
+        await manager.create_take_profit("bot_1", "BTC/ZAR", 150.0, exchange="luno")
+
+        executed = await manager.process_tick()
+
+    engine.get_real_price.assert_awaited_once_with("BTC/ZAR", "luno")
+    # Stops at 95 and 94 are crossed; 93, 92, 91 and the take-profit stay
+    assert executed == 2
+    assert len(manager.books[("luno", "BTC/ZAR")]) == 4
+    assert collection.replace_one.await_count == 6
+    assert trades.insert_one.await_count == 2
+    statuses = [c.args[1]["$set"]["status"] for c in collection.update_one.await_args_list]
+    assert statuses == ["executed", "executed"]
+
+
+@pytest.mark.asyncio
+async def test_failed_execution_retries_then_persists_failed():
+    collection = SimpleNamespace(replace_one=AsyncMock(), update_one=AsyncMock())
+    bots = SimpleNamespace(find_one=AsyncMock(return_value={"id": "bot_1", "user_id": "u1", "exchange": "luno"}))
+    trades = SimpleNamespace(insert_one=AsyncMock(side_effect=RuntimeError("write failed")))
+
+    with patch.object(db, "advanced_orders_collection", collection), \
+            patch.object(db, "bots_collection", bots), \
+            patch.object(db, "trades_collection", trades):
+        manager = AdvancedOrderManager()
+        order = await manager.create_stop_loss("bot_1", "BTC/ZAR", 95.0, 100.0, exchange="luno")
+
+        # Back in the book after each failure, until the attempts run out
+        for attempt in range(1, 3):
+            assert await manager.on_price("luno", "BTC/ZAR", 94.0) == 0
+            assert order["id"] in manager.books[("luno", "BTC/ZAR")].orders
+            assert order["id"] in manager.active_orders
+            collection.update_one.assert_not_awaited()
+
+        assert await manager.on_price("luno", "BTC/ZAR", 94.0) == 0
+
+    assert ("luno", "BTC/ZAR") not in manager.books
+    assert order["id"] not in manager.active_orders
+    assert order["status"] == "failed"
+    collection.update_one.assert_awaited_once_with(
+        {"id": order["id"]}, {"$set": {"status": "failed", "error": "write failed"}})
+
+
+@pytest.mark.asyncio
+async def test_recorded_trade_is_not_retried_when_status_write_fails():
+    collection = SimpleNamespace(replace_one=AsyncMock(), update_one=AsyncMock(side_effect=[RuntimeError("down"), None]))
+    bots = SimpleNamespace(find_one=AsyncMock(return_value={"id": "bot_1", "user_id": "u1", "exchange": "luno"}))
+    trades = SimpleNamespace(insert_one=AsyncMock())
+
+    with patch.object(db, "advanced_orders_collection", collection), \
+            patch.object(db, "bots_collection", bots), \
+            patch.object(db, "trades_collection", trades):
+        manager = AdvancedOrderManager()
+        order = await manager.create_stop_loss("bot_1", "BTC/ZAR", 95.0, 100.0, exchange="luno")
+
+        assert await manager.on_price("luno", "BTC/ZAR", 94.0) == 1
+
+    assert ("luno", "BTC/ZAR") not in manager.books
+    assert trades.insert_one.await_count == 1
+    assert collection.update_one.await_args_list[-1].args[1]["$set"]["status"] == "executed"
@@ -10,8 +10,10 @@ from datetime import datetime, timezone
 from paper_trading_engine import paper_engine
 from engines.trading_engine_live import live_trading_engine
 from engines.trade_staggerer import trade_staggerer
+from engines.trade_budget_manager import trade_budget_manager
 import database as db
 from websocket_manager import manager
+from engines.instrumentation import timed
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,7 @@ class TradingScheduler:
         self.task = None
         self.check_interval = 10  # Check every 10 seconds for ready trades
         
+    @timed("scheduler", "trading_tick")
     async def execute_bot_trades(self):
         """Execute trades using staggered queue - CONTINUOUS OPERATION"""
         try:
@@ -170,16 +173,27 @@ class TradingScheduler:
                     {'bots': db.bots_collection, 'trades': db.trades_collection}
                 )
             
-            # Execute trade via live engine
-            trade_result = await live_trading_engine.execute_trade(
-                bot_id=bot['id'],
-                bot_data=bot,
-                symbol=pair,
-                side=side,
-                amount=0.001,  # Small amount for testing
-                price=None,  # Market order
-                paper_mode=False  # LIVE MODE
-            )
+            # Take the trade from the bot/exchange budgets before placing it
+            acquired, reason, hold = await trade_budget_manager.acquire_trade(bot['id'], exchange)
+            if not acquired:
+                logger.info(f"Live trade skipped for {bot['name']}: {reason}")
+                return None
+            
+            # Execute trade via live engine; the budget is given back unless it succeeds
+            trade_result = None
+            try:
+                trade_result = await live_trading_engine.execute_trade(
+                    bot_id=bot['id'],
+                    bot_data=bot,
+                    symbol=pair,
+                    side=side,
+                    amount=0.001,  # Small amount for testing
+                    price=None,  # Market order
+                    paper_mode=False  # LIVE MODE
+                )
+            finally:
+                if not (trade_result and trade_result.get('success')):
+                    await trade_budget_manager.release_trade(hold)
             
             if not trade_result.get('success'):
                 logger.error(f"Live trade failed: {trade_result.get('error')}")
@@ -200,6 +214,7 @@ class TradingScheduler:
                 "timestamp": datetime.now(timezone.utc).isoformat(),
                 "exchange": exchange
             }
+            trade_doc["ts"] = db.trade_ts(trade_doc["timestamp"])
             
             await db.trades_collection.insert_one(trade_doc)
             
@@ -217,6 +232,7 @@ class TradingScheduler:
                     "$inc": {
                         "total_profit": trade_result.get('net_profit', 0),
                         "trades_count": 1,
+                        "daily_trade_count": 1,
                         "win_count": 1 if is_win else 0,
                         "loss_count": 0 if is_win else 1
                     }
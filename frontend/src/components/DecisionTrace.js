@@ -25,7 +25,9 @@ export default function DecisionTrace() {
     const connectWebSocket = () => {
       try {
         const wsUrl = process.env.REACT_APP_WS_URL || 'ws://localhost:8000';
-        const ws = new WebSocket(`${wsUrl}/ws/decisions`);
+        // Token is optional: with it the stream includes this user's bot decisions
+        const token = localStorage.getItem('token');
+        const ws = new WebSocket(`${wsUrl}/ws/decisions${token ? `?token=${token}` : ''}`);
         
         ws.onopen = () => {
           console.log('✅ DecisionTrace WebSocket connected');
@@ -35,6 +37,8 @@ export default function DecisionTrace() {
         ws.onmessage = (event) => {
           try {
             const decision = JSON.parse(event.data);
+            // Skip status / dropped notices
+            if (decision.type && decision.type !== 'decision') return;
             setDecisions(prev => {
               const updated = [...prev, decision];
               // Keep last 100 decisions